@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Model Load Benchmark
+Mede o tempo de carga (cold start) de uma versão do registro de modelos
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+
+A batch version is trained on a synthetic workload in a scratch workspace,
+then its artifacts are loaded with plain ``joblib.load`` (arrays copied
+into memory) and with ``ModelRegistry.load`` (``mmap_mode="r"``).
+
+Usage:
+    python -m benchmarks.calibration.bench_model_load --samples 50000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+import joblib
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from benchmarks.metrics.workload import generate_metrics
+from src.core.calibration.auto_calibration import AutoCalibrationEngine
+from src.core.calibration.model_registry import ARTIFACTS
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark calibration model load time")
+    parser.add_argument("--samples", type=int, default=50000, help="training interactions")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workspace:
+        os.chdir(workspace)
+        try:
+            Path("research/evidence").mkdir(parents=True)
+            engine = AutoCalibrationEngine()
+            interactions = [asdict(m) for m in generate_metrics(args.samples, seed=args.seed, days=90)]
+            version = engine.train_models(interactions)["model_version"]
+            directory = engine.registry.versions_path / version
+
+            copied = best_of(lambda: [joblib.load(directory / f"{name}.joblib") for name in ARTIFACTS], args.repeat)
+            mapped = best_of(lambda: engine.registry.load(version), args.repeat)
+            metadata = engine.registry.metadata(version)
+        finally:
+            os.chdir(previous_cwd)
+
+    print(json.dumps({
+        "samples": args.samples,
+        "version": version,
+        "size_bytes": metadata["size_bytes"],
+        "joblib_load_seconds": round(copied, 4),
+        "mmap_load_seconds": round(mapped, 4),
+        "speedup": round(copied / mapped, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Calibration Model Selection Benchmark
+Escalabilidade da busca de hiperparâmetros de 1 a N processos
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+
+Features are extracted from a synthetic workload in time order, then the
+same time-ordered cross-validation grid is run with each worker count.
+``speedup`` is relative to the first count; on a single-core machine the
+extra workers can only add overhead.
+
+Usage:
+    python -m benchmarks.calibration.bench_model_selection --samples 5000
+    python -m benchmarks.calibration.bench_model_selection --workers 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from dataclasses import asdict
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from benchmarks.metrics.workload import generate_metrics
+from src.core.calibration.auto_calibration import AutoCalibrationEngine
+from src.core.calibration.model_selection import scaling_report
+from src.core.metrics.columnar import InteractionColumns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel model selection scaling")
+    parser.add_argument("--samples", type=int, default=5000)
+    parser.add_argument("--workers", type=int, nargs="+", help="worker counts (default: 1, 2, 4.. up to the cores)")
+    parser.add_argument("--splits", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    interactions = InteractionColumns.from_records(asdict(m) for m in generate_metrics(args.samples, seed=args.seed))
+    interactions = interactions.take(np.argsort(interactions["timestamp"], kind="stable"))
+
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workspace:
+        os.chdir(workspace)
+        try:
+            Path("research/evidence").mkdir(parents=True)
+            X, y, _ = AutoCalibrationEngine()._extract_features(interactions)
+        finally:
+            os.chdir(previous_cwd)
+
+    report = scaling_report(X, y, worker_counts=args.workers, n_splits=args.splits)
+    report["features"] = X.shape[1]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Calibration Prediction Benchmark
+Compara predições uma a uma com predict_batch
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+
+Models are trained on a synthetic workload in a scratch workspace (the
+engine's model path is relative), then the same contexts are scored with
+``predict_optimal_config`` in a loop and with one ``predict_batch`` call.
+
+Usage:
+    python -m benchmarks.calibration.bench_predict --contexts 1000
+    python -m benchmarks.calibration.bench_predict --contexts 1000 --online
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from benchmarks.metrics.workload import CONTEXTS, PATTERN_WEIGHTS, generate_metrics
+from src.core.calibration.auto_calibration import AutoCalibrationEngine
+from src.core.metrics.interaction_analyzer import MetricsCollector
+
+
+def make_contexts(count: int, seed: int = 42) -> List[Dict]:
+    """Contextos de consulta com elementos, padrão e tamanhos variados"""
+    rng = random.Random(seed)
+    patterns = list(PATTERN_WEIGHTS)
+    return [
+        {
+            "type": rng.choice(CONTEXTS),
+            "context_elements": rng.sample(CONTEXTS, rng.randint(1, 4)),
+            "pattern": rng.choice(patterns),
+            "prompt_tokens": rng.randint(50, 2000),
+            "complexity": rng.randint(1, 3),
+            "urgency": rng.randint(1, 3),
+        }
+        for _ in range(count)
+    ]
+
+
+def train(engine: AutoCalibrationEngine, samples: int, seed: int, online: bool) -> Dict:
+    interactions = [asdict(m) for m in generate_metrics(samples, seed=seed, days=30)]
+    if not online:
+        return engine.train_models(interactions)
+    collector = MetricsCollector(storage_path=Path("data"))
+    collector.capture_many(generate_metrics(samples, seed=seed, days=30))
+    result = engine.train_since_checkpoint(collector, settle_seconds=0)
+    collector.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single vs batch calibration predictions")
+    parser.add_argument("--contexts", type=int, default=1000)
+    parser.add_argument("--samples", type=int, default=5000, help="training interactions")
+    parser.add_argument("--online", action="store_true", help="use the online (SGD) models")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workspace:
+        os.chdir(workspace)
+        try:
+            Path("research/evidence").mkdir(parents=True)
+            engine = AutoCalibrationEngine()
+            train(engine, args.samples, args.seed, args.online)
+            contexts = make_contexts(args.contexts, args.seed)
+
+            start = time.perf_counter()
+            single = [engine.predict_optimal_config(context) for context in contexts]
+            single_seconds = time.perf_counter() - start
+
+            # Sem as linhas de features que as chamadas unitárias deixaram no LRU
+            engine._context_features.clear()
+            start = time.perf_counter()
+            batch = engine.predict_batch(contexts)
+            batch_seconds = time.perf_counter() - start
+        finally:
+            os.chdir(previous_cwd)
+
+    print(json.dumps({
+        "contexts": args.contexts,
+        "model": "online" if args.online else "batch",
+        "single_seconds": round(single_seconds, 4),
+        "single_per_sec": round(args.contexts / single_seconds, 1),
+        "batch_seconds": round(batch_seconds, 4),
+        "batch_per_sec": round(args.contexts / batch_seconds, 1),
+        "speedup": round(single_seconds / batch_seconds, 1),
+        "max_confidence_difference": max(abs(a.confidence - b.confidence) for a, b in zip(single, batch)),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
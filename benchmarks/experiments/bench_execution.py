@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Experiment Execution Benchmark
+Tempo para medir um experimento sobre as interações registradas
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+
+A synthetic workload is captured into a scratch metrics store (a share of
+it tagged for one variant) and compacted into a columnar snapshot. The
+benchmark then times ``ExperimentRunner.run_experiment`` on the columnar
+read. For reference it also times one plain record-by-record scan of the
+same store.
+
+Usage:
+    python -m benchmarks.experiments.bench_execution --interactions 100000
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from benchmarks.metrics.workload import generate_metrics
+from src.core.metrics.interaction_analyzer import MetricsCollector
+from src.experiments.experiment_runner import Experiment, ExperimentRunner, ExperimentVariant
+
+
+def variant(variant_id: str, modifiers=(), pattern=None) -> ExperimentVariant:
+    return ExperimentVariant(id=variant_id, name=variant_id, prompt_template=variant_id,
+                             context_modifiers=list(modifiers), expected_outcome="",
+                             success_criteria=["quality_score > 0.75", "response_time < 2500"], pattern=pattern)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark measured experiment execution")
+    parser.add_argument("--interactions", type=int, default=100000)
+    parser.add_argument("--tagged", type=float, default=0.05, help="share tagged for the 'tagged' variant")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as workspace:
+        workspace = Path(workspace)
+        collector = MetricsCollector(storage_path=workspace / "data")
+        runner = ExperimentRunner(base_path=workspace, collector=collector)
+        experiment = Experiment(
+            id="bench", name="Bench", hypothesis="", control_variant="control",
+            metrics_to_track=["quality_score"], sample_size=1000,
+            variants=[variant("control"), variant("debugging", ["debugging"]),
+                      variant("evaluator", pattern="evaluator"), variant("tagged")],
+        )
+        runner.create_experiment(experiment)
+
+        metrics = generate_metrics(args.interactions, seed=args.seed)
+        tag = runner.variant_tag("bench", "tagged")
+        for item in metrics:
+            if rng.random() < args.tagged:
+                item.context_used = item.context_used + [tag]
+        collector.capture_many(metrics)
+        collector.build_snapshot()
+
+        start = time.perf_counter()
+        results = runner.run_experiment("bench")
+        measured_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scanned = sum(1 for _ in collector.iter_interactions())
+        scan_seconds = time.perf_counter() - start
+        collector.close()
+
+    print(json.dumps({
+        "interactions": args.interactions,
+        "run_experiment_seconds": round(measured_seconds, 4),
+        "measurement_seconds": results["measurement_seconds"],
+        "record_scan_seconds": round(scan_seconds, 4),
+        "records_scanned": scanned,
+        "assigned": {k: v["total_interactions"] for k, v in results["variant_results"].items()},
+        "unassigned": results["unassigned"],
+        "ambiguous": results["ambiguous"],
+        "winner": results.get("winner"),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Experiment Statistics Benchmark
+Tempo do bootstrap e do teste de permutação vetorizados
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+
+Times ``bootstrap_ci`` and ``permutation_test`` on samples shaped like the
+stored metrics: 3-decimal quality scores, integer latencies in ms, and
+success flags. It also times ``analyze`` for a multi-variant, multi-metric
+experiment with 1 and N workers.
+
+Usage:
+    python -m benchmarks.experiments.bench_statistics --samples 100000 --resamples 10000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.experiments.statistics import analyze, bootstrap_ci, permutation_test
+
+
+def metric_samples(rng: np.random.Generator, n: int, shift: float = 0.0):
+    quality = np.round(np.clip(rng.normal(0.75 + shift, 0.12, n), 0, 1), 3)
+    return {
+        "quality_score": quality,
+        "response_time": np.round(rng.lognormal(7.1, 0.4, n)),
+        "success": (quality > 0.7).astype(float),
+    }
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, round(time.perf_counter() - start, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark experiment statistics")
+    parser.add_argument("--samples", type=int, default=100000, help="interactions per variant")
+    parser.add_argument("--resamples", type=int, default=10000)
+    parser.add_argument("--variants", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    control = metric_samples(rng, args.samples)
+    treatment = metric_samples(rng, args.samples, shift=0.002)
+
+    results = {"samples": args.samples, "resamples": args.resamples, "single_pair": {}}
+    for metric in control:
+        _, bootstrap_seconds = timed(bootstrap_ci, control[metric], args.resamples, rng=rng)
+        p_value, permutation_seconds = timed(permutation_test, control[metric], treatment[metric], args.resamples, rng)
+        results["single_pair"][metric] = {
+            "bootstrap_seconds": bootstrap_seconds,
+            "permutation_seconds": permutation_seconds,
+            "permutation_p": round(p_value, 4),
+        }
+
+    samples = {"control": control, **{f"v{i}": metric_samples(rng, args.samples, 0.002 * i)
+                                      for i in range(1, args.variants)}}
+    workers = os.cpu_count() or 1
+    kwargs = {"n_resamples": args.resamples, "n_permutations": args.resamples}
+    _, single_seconds = timed(analyze, samples, "control", list(control), **kwargs)
+    _, pooled_seconds = timed(analyze, samples, "control", list(control), workers=workers, **kwargs)
+    results["analyze"] = {
+        "comparisons": (args.variants - 1) * len(control),
+        "single_process_seconds": single_seconds,
+        "workers": workers,
+        "pool_seconds": pooled_seconds,
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
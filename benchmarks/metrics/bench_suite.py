@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Metrics Benchmark Suite
+Mede ingestão, relatórios, dashboard e treino em 10k/100k/1M interações
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+
+Each size runs in a scratch workspace (the process changes into it, so the
+pipeline's relative data paths never touch the repository):
+
+- ``capture_batch``: fills the store through ``capture_many``;
+- ``capture_single``: ``capture_interaction`` on the populated store;
+- ``report_<N>d``: ``generate_report`` per window, cold (new collector)
+  and warm (second call);
+- ``dashboard_load_<N>d``: ``PerformanceDashboard.load_interaction_data``,
+  before and after a columnar snapshot exists;
+- ``train_calibration``: ``IntegrationPipeline.train_calibration_models``.
+
+Results are written as JSON; ``--compare`` reads a previous result file and
+reports the change in seconds for every benchmark both runs share.
+
+Usage:
+    python -m benchmarks.metrics.bench_suite --sizes 10000 100000 --output results.json
+    python -m benchmarks.metrics.bench_suite --sizes 10000 --compare results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+REPO_ROOT = Path(__file__).parent.parent.parent
+sys.path.append(str(REPO_ROOT))
+
+from benchmarks.metrics.workload import WorkloadGenerator
+from src.core.metrics.interaction_analyzer import MetricsCollector
+
+SUITE_VERSION = 1
+BENCHMARKS = ("capture", "report", "dashboard", "train")
+DATA_PATH = Path("data/metrics/data")
+
+
+def _timed(fn: Callable, repeat: int = 1) -> Dict:
+    """Executa ``fn`` ``repeat`` vezes; retorna o melhor e o pior tempo"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {"seconds": round(min(timings), 4), "max_seconds": round(max(timings), 4), "repeat": repeat}
+
+
+def environment() -> Dict:
+    """Versões e máquina, para comparar apenas execuções comparáveis"""
+    import numpy
+    import pandas
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+        "git_commit": commit,
+    }
+
+
+def run_size(size: int, seed: int, windows: List[int], benchmarks: List[str],
+             batch_size: int, single_count: int, repeat: int) -> Dict:
+    """Roda os benchmarks pedidos sobre um armazenamento com ``size`` interações"""
+    results: Dict[str, Dict] = {}
+    generator = WorkloadGenerator(seed=seed)
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workspace:
+        os.chdir(workspace)
+        try:
+            # Diretórios que os componentes esperam encontrar no repositório
+            for path in (DATA_PATH, Path("data/metrics/reports"), Path("research/evidence/models"),
+                         Path("experiments/hypothesis"), Path("experiments/results")):
+                path.mkdir(parents=True, exist_ok=True)
+
+            collector = MetricsCollector(storage_path=DATA_PATH)
+            start = time.perf_counter()
+            for batch in generator.batches(size, batch_size):
+                collector.capture_many(batch)
+            collector.flush()
+            seconds = time.perf_counter() - start
+            results["capture_batch"] = {"seconds": round(seconds, 4), "count": size,
+                                        "per_sec": round(size / seconds, 1)}
+
+            if "capture" in benchmarks and single_count:
+                extra = generator.generate(single_count)
+                start = time.perf_counter()
+                for metrics in extra:
+                    collector.capture_interaction(metrics)
+                collector.flush()
+                seconds = time.perf_counter() - start
+                results["capture_single"] = {"seconds": round(seconds, 4), "count": single_count,
+                                             "per_sec": round(single_count / seconds, 1)}
+            collector.close()
+
+            if "report" in benchmarks:
+                for days in windows:
+                    cold = MetricsCollector(storage_path=DATA_PATH)
+                    results[f"report_{days}d_cold"] = _timed(lambda: cold.generate_report(days=days))
+                    results[f"report_{days}d_warm"] = _timed(lambda: cold.generate_report(days=days), repeat)
+                    cold.close()
+
+            if "dashboard" in benchmarks:
+                from src.core.calibration.dashboard import PerformanceDashboard
+
+                dashboard = PerformanceDashboard(data_path=DATA_PATH)
+                for days in windows:
+                    results[f"dashboard_load_{days}d"] = _timed(lambda: dashboard.load_interaction_data(days), repeat)
+                snapshot_collector = MetricsCollector(storage_path=DATA_PATH)
+                results["snapshot_build"] = _timed(snapshot_collector.build_snapshot)
+                snapshot_collector.close()
+                for days in windows:
+                    results[f"dashboard_load_{days}d_snapshot"] = _timed(
+                        lambda: dashboard.load_interaction_data(days), repeat)
+
+            if "train" in benchmarks:
+                from src.core.pipeline.integration_pipeline import IntegrationPipeline
+
+                pipeline = IntegrationPipeline()
+                outcome = {}
+                # O pipeline imprime progresso; o JSON vai para stdout
+                with contextlib.redirect_stdout(io.StringIO()):
+                    timing = _timed(lambda: outcome.update(pipeline.train_calibration_models()))
+                timing["status"] = outcome.get("status")
+                timing["samples_used"] = outcome.get("samples_used")
+                results["train_calibration"] = timing
+                pipeline.metrics_collector.close()
+        finally:
+            os.chdir(previous_cwd)
+    return {"size": size, "results": results}
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = 0.2) -> List[Dict]:
+    """Variação de tempo por benchmark presente nas duas execuções"""
+    previous = {(run["size"], name): result for run in baseline.get("runs", [])
+                for name, result in run["results"].items()}
+    changes = []
+    for run in current["runs"]:
+        for name, result in run["results"].items():
+            old = previous.get((run["size"], name))
+            if not old or not old.get("seconds") or "seconds" not in result:
+                continue
+            ratio = result["seconds"] / old["seconds"]
+            changes.append({
+                "size": run["size"],
+                "benchmark": name,
+                "baseline_seconds": old["seconds"],
+                "seconds": result["seconds"],
+                "ratio": round(ratio, 3),
+                "regression": ratio > 1 + threshold,
+            })
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the metrics subsystem at several data sizes")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10000, 100000])
+    parser.add_argument("--windows", nargs="+", type=int, default=[1, 7, 30, 90])
+    parser.add_argument("--benchmarks", nargs="+", default=list(BENCHMARKS), choices=BENCHMARKS)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--single-count", type=int, default=2000,
+                        help="capture_interaction calls timed on the populated store")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="write the JSON results here")
+    parser.add_argument("--compare", type=Path, help="previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="slowdown ratio above 1 + threshold counts as a regression")
+    args = parser.parse_args()
+
+    output = {
+        "suite": "metrics",
+        "version": SUITE_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "seed": args.seed,
+        "environment": environment(),
+        "runs": [run_size(size, args.seed, args.windows, args.benchmarks,
+                          args.batch_size, args.single_count, args.repeat) for size in args.sizes],
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            output["comparison"] = compare(output, json.load(f), args.threshold)
+
+    text = json.dumps(output, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text + "\n")
+    print(text)
+    if any(change["regression"] for change in output.get("comparison", [])):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
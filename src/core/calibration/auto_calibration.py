@@ -7,15 +7,40 @@ Author: Anderson Henrique da Silva
 Location: Minas Gerais, Brazil
 """
 
+import datetime
+import json
+import os
+import threading
 import numpy as np
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
 import joblib
 
+from src.core.calibration import model_selection
+from src.core.calibration.feature_store import FeatureStore
+from src.core.calibration.model_registry import ModelBundle, ModelCache, ModelRegistry, feature_schema
+from src.core.metrics.columnar import InteractionColumns
+from src.core.metrics.ids import id_lower_bound, is_interaction_id
+from src.core.metrics.locking import file_lock
+
+MODEL_FILES = ("success_predictor.pkl", "pattern_clusterer.pkl", "vectorizer.pkl")
+ONLINE_DIR = "online"
+CHECKPOINT_FILE = "checkpoint.json"
+HASH_FEATURES = 2 ** 10
+N_CLUSTERS = 5
+SUCCESS_CLASSES = np.array([0, 1])
+FEATURE_VERSION = 1  # incrementar quando a forma de calcular as features mudar
+FEATURE_SPACES = ("tfidf", "hashing")
+CONTEXT_CACHE_SIZE = 4096
+NUMERIC_FEATURES = ("prompt_tokens/1000", "response_tokens/1000", "response_time_s", "iteration_count")
+
 @dataclass
 class CalibrationPattern:
     context_type: str
@@ -29,101 +54,412 @@ class AutoCalibrationEngine:
         self.data_path = data_path
         self.model_path = Path("research/evidence/models")
         self.model_path.mkdir(exist_ok=True)
+        self.online_path = self.model_path / ONLINE_DIR
+        self.registry = ModelRegistry(self.model_path / "registry")
+        self.model_cache = ModelCache(self.registry)
+        self.feature_path = self.model_path / "features"
+        # LRU de linhas de features de contexto: (versão, contexto normalizado) -> linha
+        self._context_features: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._context_lock = threading.Lock()
+        # Estado de treino; as predições usam a versão ativa do registro
         self.vectorizer = None
         self.success_predictor = None
         self.pattern_clusterer = None
+        # Modelos online carregados/treinados nesta instância
+        self.online = False
+        
+    def train_models(self, interactions: Union[List[Dict], InteractionColumns],
+                     promote: bool = True, feature_space: str = "tfidf",
+                     select: bool = False, workers: Optional[int] = None) -> Dict[str, float]:
+        """Treina modelos de predição com dados históricos e registra uma nova versão.
         
-    def train_models(self, interactions: List[Dict]) -> Dict[str, float]:
-        """Treina modelos de predição com dados históricos"""
+        ``feature_space="hashing"`` uses the stateless vectorizer: its rows
+        come from the feature store, so a retrain only featurizes new IDs.
+        
+        With ``select`` the rows are put in time order and ``n_estimators``,
+        ``max_depth`` and the cluster count are chosen by time-ordered
+        cross-validation over ``workers`` processes (default: all cores);
+        ``model_accuracy`` is then the held-out accuracy of the chosen
+        forest. The final models are refitted on all rows. Selection always
+        uses the hashing feature space: a TF-IDF fitted on all rows would
+        carry vocabulary and idf from the future folds into the earlier ones
+        and inflate the held-out metrics.
+        """
+        if feature_space not in FEATURE_SPACES:
+            raise ValueError(f"Unknown feature space: {feature_space}")
+        if select:
+            feature_space = "hashing"
         if len(interactions) < 50:
             return {"error": "Need at least 50 interactions for training"}
+        if not isinstance(interactions, InteractionColumns):
+            interactions = InteractionColumns.from_records(interactions)
+        if select and "timestamp" in interactions.columns:
+            # Validação temporal: cada fold treina no passado e mede no futuro
+            interactions = interactions.take(np.argsort(interactions["timestamp"], kind="stable"))
             
         # Prepara features
-        X, y_success, y_quality = self._extract_features(interactions)
+        if feature_space == "hashing":
+            self.vectorizer = self._hashing_vectorizer()
+            X, y_success, y_quality = self._extract_features(interactions, self.vectorizer)
+        else:
+            X, y_success, y_quality = self._extract_features(interactions)
+        
+        params = {"n_estimators": 100, "max_depth": None, "n_clusters": N_CLUSTERS}
+        selection = None
+        if select:
+            selection = model_selection.search(X, y_success, workers=workers)
+            params = selection["best_params"]
         
         # Treina preditor de sucesso
-        self.success_predictor = RandomForestClassifier(n_estimators=100, random_state=42)
+        self.success_predictor = RandomForestClassifier(
+            n_estimators=params["n_estimators"], max_depth=params["max_depth"], random_state=42)
         self.success_predictor.fit(X, y_success)
         
         # Treina clusterizador de padrões
-        self.pattern_clusterer = KMeans(n_clusters=5, random_state=42)
+        self.pattern_clusterer = KMeans(n_clusters=params["n_clusters"], random_state=42)
         clusters = self.pattern_clusterer.fit_predict(X)
         
-        # Salva modelos
-        joblib.dump(self.success_predictor, self.model_path / "success_predictor.pkl")
-        joblib.dump(self.pattern_clusterer, self.model_path / "pattern_clusterer.pkl")
-        joblib.dump(self.vectorizer, self.model_path / "vectorizer.pkl")
+        self.online = False
         
-        # Avalia performance
-        accuracy = self.success_predictor.score(X, y_success)
+        # Avalia performance (no próprio treino; a seleção traz a medida fora da amostra)
+        train_accuracy = self.success_predictor.score(X, y_success)
+        accuracy = selection["held_out"]["accuracy_mean"] if selection else train_accuracy
+        metrics = {"train_accuracy": train_accuracy, "clusters_found": len(set(clusters))}
+        if selection:
+            metrics.update({"held_out": selection["held_out"], "params": params,
+                            "search_seconds": selection["seconds"], "search_workers": selection["workers"]})
         
-        return {
+        # Registra (e promove) a nova versão
+        version = self._register_version("batch", promote, {
+            "training_data": self._training_range(interactions),
+            "metrics": metrics,
+        })
+        
+        result = {
             "training_completed": True,
             "model_accuracy": accuracy,
+            "train_accuracy": train_accuracy,
             "clusters_found": len(set(clusters)),
-            "samples_used": len(interactions)
+            "samples_used": len(interactions),
+            "feature_space": feature_space,
+            "model_version": version
         }
+        if selection:
+            result["model_selection"] = {key: selection[key] for key in
+                                         ("best_params", "held_out", "n_splits", "tasks", "workers", "seconds")}
+        return result
     
-    def _extract_features(self, interactions: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-        """Extrai features vetoriais das interações"""
-        # Texto combinado para análise
-        texts = []
-        for interaction in interactions:
-            context_text = " ".join(interaction.get('context_used', []))
-            pattern_text = interaction.get('pattern_applied', '')
-            texts.append(f"{context_text} {pattern_text}")
+    # -- registro de versões ------------------------------------------------
+    
+    def _training_range(self, interactions: InteractionColumns) -> Dict:
+        """Quantidade e intervalo de datas das interações de treino"""
+        data = {"samples": len(interactions)}
+        if "timestamp" in interactions.columns:
+            timestamps = interactions["timestamp"]
+            timestamps = timestamps[~np.isnat(timestamps)]
+            if len(timestamps):
+                data["first_timestamp"] = str(timestamps.min())
+                data["last_timestamp"] = str(timestamps.max())
+        return data
+    
+    def _register_version(self, kind: str, promote: bool, metadata: Dict) -> str:
+        """Grava os modelos atuais como nova versão; com ``promote``, passa a servi-la"""
+        bundle = ModelBundle(None, self.success_predictor, self.pattern_clusterer, self.vectorizer)
+        version = self.registry.register(bundle, {
+            "kind": kind,
+            "feature_schema": self._feature_schema(self.vectorizer),
+            **metadata,
+        })
+        if promote:
+            self.registry.promote(version)
+            self.model_cache.put(bundle)
+        return version
+    
+    def promote(self, version: str):
+        """Promove uma versão registrada (ex.: rollback); outros processos a carregam sozinhos"""
+        self.registry.promote(version)
+    
+    def model_status(self) -> Dict:
+        """Versão ativa e seus metadados, ou se há apenas modelos legados"""
+        active = self.registry.active_version()
+        if active is None:
+            legacy = all((self.model_path / name).exists() for name in MODEL_FILES)
+            return {"active_version": None, "legacy_models": legacy, "versions": 0}
+        metadata = self.registry.metadata(active)
+        return {
+            "active_version": active,
+            "kind": metadata.get("kind"),
+            "created_at": metadata.get("created_at"),
+            "training_data": metadata.get("training_data"),
+            "metrics": metadata.get("metrics"),
+            "feature_schema_hash": metadata.get("feature_schema_hash"),
+            "load_seconds": metadata.get("load_seconds"),
+            "versions": len(self.registry.versions())
+        }
+    
+    # -- treino online ------------------------------------------------------
+    
+    def _hashing_vectorizer(self) -> HashingVectorizer:
+        """Vetorizador sem estado: o mesmo texto gera sempre as mesmas features"""
+        return HashingVectorizer(n_features=HASH_FEATURES, alternate_sign=False)
+    
+    def _ensure_online_models(self):
+        """Carrega os modelos online salvos ou cria modelos novos"""
+        if self.online and self._models_loaded():
+            return
+        if not self._load_models(self.online_path):
+            self.success_predictor = SGDClassifier(loss="log_loss", random_state=42)
+            self.pattern_clusterer = MiniBatchKMeans(n_clusters=N_CLUSTERS, random_state=42, n_init=3)
+        self.vectorizer = self._hashing_vectorizer()
+        self.online = True
+    
+    def train_incremental(self, interactions: Union[List[Dict], InteractionColumns]) -> Dict[str, float]:
+        """Atualiza os modelos online com um lote novo (custo proporcional ao lote).
         
-        # Vetorização TF-IDF
-        self.vectorizer = TfidfVectorizer(max_features=50, stop_words=None)
-        text_features = self.vectorizer.fit_transform(texts).toarray()
+        ``model_accuracy`` is measured on the batch before the model sees it
+        (progressive validation), or is None on the very first batch.
+        """
+        if not len(interactions):
+            return {"training_completed": True, "samples_used": 0}
+        self._ensure_online_models()
+        X, y_success, _ = self._extract_features(interactions, self.vectorizer)
         
-        # Features numéricas
-        numeric_features = []
-        for interaction in interactions:
-            features = [
-                interaction.get('prompt_tokens', 0) / 1000,  # normalizado
-                interaction.get('response_tokens', 0) / 1000,
-                interaction.get('response_time_ms', 0) / 1000,
-                interaction.get('iteration_count', 1),
-            ]
-            numeric_features.append(features)
+        accuracy = None
+        if hasattr(self.success_predictor, "coef_"):
+            accuracy = self.success_predictor.score(X, y_success)
+        self.success_predictor.partial_fit(X, y_success, classes=SUCCESS_CLASSES)
         
-        # Combina features
-        X = np.hstack([text_features, numeric_features])
+        # O primeiro lote do MiniBatchKMeans precisa de ao menos N_CLUSTERS amostras
+        clustered = hasattr(self.pattern_clusterer, "cluster_centers_") or len(X) >= N_CLUSTERS
+        if clustered:
+            self.pattern_clusterer.partial_fit(X)
+        
+        return {
+            "training_completed": True,
+            "model_accuracy": accuracy,
+            "clusters_updated": clustered,
+            "samples_used": len(X)
+        }
+    
+    def load_checkpoint(self) -> Dict:
+        """Estado do treino online: último ID incorporado e total de amostras"""
+        try:
+            with open(self.online_path / CHECKPOINT_FILE) as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+    
+    def train_since_checkpoint(self, collector, chunk_size: int = 5000,
+                               settle_seconds: float = 5.0, reset: bool = False,
+                               promote: bool = True) -> Dict:
+        """Treina os modelos online com as interações capturadas desde o último checkpoint.
+        
+        Interactions are read by time-ordered ID, so the scan skips everything
+        already folded in. IDs newer than ``settle_seconds`` are left for the
+        next run: another process may still be writing older IDs. Records
+        without a time-ordered ID (legacy files, migrated or not) are folded in
+        by the first run only. ``reset`` discards the online models and starts
+        again from all stored history.
+        """
+        self.online_path.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.online_path / ".lock"):
+            if reset:
+                for name in MODEL_FILES + (CHECKPOINT_FILE,):
+                    (self.online_path / name).unlink(missing_ok=True)
+                self.online = False
+            checkpoint = self.load_checkpoint()
+            last_id = checkpoint.get("last_id")
+            upper = id_lower_bound(datetime.datetime.now() - datetime.timedelta(seconds=settle_seconds))
+            
+            first_run = not checkpoint
+            records = []
+            for record in collector.iter_interactions(since_id=last_id):
+                record_id = str(record.get("id", ""))
+                if not is_interaction_id(record_id):
+                    # Registros legados (sem ID ordenado) só entram no primeiro treino
+                    if first_run:
+                        records.append(record)
+                elif (last_id is None or record_id > last_id) and record_id < upper:
+                    records.append(record)
+            # Legados primeiro, depois em ordem de ID
+            records.sort(key=lambda record: (is_interaction_id(str(record.get("id", ""))), str(record.get("id", ""))))
+            if not records:
+                return {
+                    "training_completed": True,
+                    "mode": "online",
+                    "new_samples": 0,
+                    "samples_seen": checkpoint.get("samples_seen", 0),
+                    "last_id": last_id
+                }
+            
+            self.online = False  # relê do disco: outro processo pode ter treinado
+            correct = scored = 0
+            for start in range(0, len(records), chunk_size):
+                chunk = records[start:start + chunk_size]
+                result = self.train_incremental(chunk)
+                if result.get("model_accuracy") is not None:
+                    correct += result["model_accuracy"] * len(chunk)
+                    scored += len(chunk)
+            
+            self._save_models(self.online_path)
+            ids = [str(record["id"]) for record in records if is_interaction_id(str(record.get("id", "")))]
+            checkpoint = {
+                "last_id": ids[-1] if ids else last_id,
+                "samples_seen": checkpoint.get("samples_seen", 0) + len(records),
+                "feature_space": {"type": "hashing", "n_features": HASH_FEATURES},
+                "updated_at": datetime.datetime.now().isoformat()
+            }
+            # O checkpoint é gravado por último: ele confirma os modelos salvos
+            self._write_json(self.online_path / CHECKPOINT_FILE, checkpoint)
+            
+            accuracy = correct / scored if scored else None
+            version = self._register_version("online", promote, {
+                "training_data": {
+                    "samples": checkpoint["samples_seen"],
+                    "new_samples": len(records),
+                    "first_id": str(records[0].get("id", "")) or None,
+                    "last_id": checkpoint["last_id"],
+                },
+                "metrics": {"progressive_accuracy": accuracy},
+            })
+            
+            return {
+                "training_completed": True,
+                "mode": "online",
+                "new_samples": len(records),
+                "samples_seen": checkpoint["samples_seen"],
+                "model_accuracy": accuracy,
+                "last_id": checkpoint["last_id"],
+                "model_version": version
+            }
+    
+    def _save_models(self, directory: Path):
+        """Grava o estado de treino online (três modelos, substituição atômica de cada arquivo)"""
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, model in zip(MODEL_FILES, (self.success_predictor, self.pattern_clusterer, self.vectorizer)):
+            tmp = directory / f".{name}.{os.getpid()}.tmp"
+            joblib.dump(model, tmp)
+            tmp.replace(directory / name)
+    
+    def _write_json(self, path: Path, data: Dict):
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=2)
+        tmp.replace(path)
+    
+    def _feature_schema(self, vectorizer) -> Dict:
+        return {**feature_schema(vectorizer, NUMERIC_FEATURES), "feature_version": FEATURE_VERSION}
+    
+    def _feature_store(self, vectorizer) -> Optional[FeatureStore]:
+        """Cache de features para vetorizadores sem estado; None para TF-IDF"""
+        if not isinstance(vectorizer, HashingVectorizer):
+            return None
+        return FeatureStore(self.feature_path, self._feature_schema(vectorizer), vectorizer.n_features)
+    
+    def _extract_features(self, interactions: Union[List[Dict], InteractionColumns],
+                          vectorizer: Optional[HashingVectorizer] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Extrai features vetoriais das interações (lista de dicts ou colunas).
+        
+        Without ``vectorizer`` a new TF-IDF vocabulary is fitted (batch mode);
+        a stateless vectorizer is only applied, and its rows are read from and
+        added to the feature store by interaction ID.
+        """
+        if not isinstance(interactions, InteractionColumns):
+            interactions = InteractionColumns.from_records(interactions)
+        
+        store = self._feature_store(vectorizer) if "id" in interactions.columns else None
+        if store is None:
+            text_features, numeric_features = self._featurize(interactions, vectorizer)
+        else:
+            # Só as interações fora do cache são tokenizadas
+            found, cached_text, cached_numeric = store.lookup(interactions['id'])
+            missing = np.flatnonzero(~found)
+            if len(missing) == len(interactions):
+                text_features, numeric_features = self._featurize(interactions, vectorizer)
+                store.add(interactions['id'], text_features, numeric_features)
+            elif len(missing):
+                new_text, new_numeric = self._featurize(interactions.take(missing), vectorizer)
+                store.add(interactions['id'][missing], new_text, new_numeric)
+                order = np.argsort(np.concatenate([np.flatnonzero(found), missing]), kind="stable")
+                text_features = sparse.vstack([cached_text, new_text], format="csr")[order]
+                numeric_features = np.vstack([cached_numeric, new_numeric])[order]
+            else:
+                text_features, numeric_features = cached_text, cached_numeric
+        
+        X = self._combine_features(text_features, numeric_features)
         
         # Targets
-        y_success = np.array([
-            1 if i.get('quality_score', 0) > 0.7 else 0 
-            for i in interactions
-        ])
-        y_quality = np.array([i.get('quality_score', 0) for i in interactions])
+        y_quality = np.nan_to_num(interactions['quality_score'], nan=0.0)
+        y_success = (y_quality > 0.7).astype(int)
         
         return X, y_success, y_quality
     
+    def _combine_features(self, text_features: sparse.csr_matrix, numeric_features: np.ndarray) -> np.ndarray:
+        """Matriz densa [texto | numéricas] sem cópias intermediárias"""
+        n_text = text_features.shape[1]
+        # np.zeros só aloca páginas tocadas; as features de texto são esparsas
+        X = np.zeros((text_features.shape[0], n_text + numeric_features.shape[1]))
+        coo = text_features.tocoo()
+        X[coo.row, coo.col] = coo.data
+        X[:, n_text:] = numeric_features
+        return X
+    
+    def _featurize(self, interactions: InteractionColumns, vectorizer=None) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        """Features de texto (esparsas) e numéricas; sem ``vectorizer`` ajusta um TF-IDF novo"""
+        # Texto combinado para análise
+        patterns = interactions.pattern_values()
+        texts = [
+            f"{' '.join(contexts)} {pattern or ''}"
+            for contexts, pattern in zip(interactions.context_lists(), patterns)
+        ]
+        
+        if vectorizer is not None:
+            text_features = vectorizer.transform(texts)
+        else:
+            # Vetorização TF-IDF
+            self.vectorizer = TfidfVectorizer(max_features=50, stop_words=None)
+            text_features = self.vectorizer.fit_transform(texts)
+        
+        # Features numéricas (colunas inteiras, sem laço por interação)
+        numeric_features = np.column_stack([
+            interactions['prompt_tokens'] / 1000,  # normalizado
+            interactions['response_tokens'] / 1000,
+            np.nan_to_num(interactions['response_time_ms'], nan=0.0) / 1000,
+            np.nan_to_num(interactions['iteration_count'], nan=1.0),
+        ])
+        return sparse.csr_matrix(text_features), numeric_features
+    
     def predict_optimal_config(self, context: Dict) -> CalibrationPattern:
         """Prediz configuração ótima para novo contexto"""
-        if not self._models_loaded():
-            self._load_models()
+        return self.predict_batch([context])[0]
+    
+    def predict_batch(self, contexts: List[Dict]) -> List[CalibrationPattern]:
+        """Prediz configurações para N contextos com uma chamada por modelo"""
+        if not contexts:
+            return []
+        # Uma referência para a chamada inteira: uma troca de versão não a afeta
+        models = self._serving_models()
             
-        # Extrai features do contexto
-        features = self._context_to_features(context)
+        # Extrai features de todos os contextos em uma matriz
+        features = self._contexts_to_features(contexts, models.vectorizer, models.version)
         
         # Prediz probabilidade de sucesso
-        success_prob = self.success_predictor.predict_proba(features)[0][1]
+        success_probs = models.success_predictor.predict_proba(features)[:, 1]
         
         # Identifica cluster mais próximo
-        cluster = self.pattern_clusterer.predict(features)[0]
+        clusters = models.pattern_clusterer.predict(features)
         
         # Gera recomendações baseadas no cluster
-        recommendations = self._generate_cluster_recommendations(cluster, success_prob)
-        
-        return CalibrationPattern(
-            context_type=context.get('type', 'unknown'),
-            prompt_characteristics=self._analyze_prompt_characteristics(context),
-            success_metrics={"predicted_success": success_prob},
-            recommended_adjustments=recommendations,
-            confidence=success_prob
-        )
+        return [
+            CalibrationPattern(
+                context_type=context.get('type', 'unknown'),
+                prompt_characteristics=self._analyze_prompt_characteristics(context),
+                success_metrics={"predicted_success": float(success_prob)},
+                recommended_adjustments=self._generate_cluster_recommendations(int(cluster), success_prob),
+                confidence=float(success_prob)
+            )
+            for context, success_prob, cluster in zip(contexts, success_probs, clusters)
+        ]
     
     def _models_loaded(self) -> bool:
         """Verifica se modelos estão carregados"""
@@ -133,35 +469,97 @@ class AutoCalibrationEngine:
             self.vectorizer is not None
         ])
     
-    def _load_models(self):
-        """Carrega modelos salvos"""
+    def _serving_models(self) -> ModelBundle:
+        """Versão ativa do registro; sem registro, os modelos legados de nome fixo"""
+        bundle = self.model_cache.get()
+        if bundle is not None:
+            return bundle
+        if not self._models_loaded():
+            self._load_models()
+        if not self._models_loaded():
+            raise RuntimeError("No calibration models trained yet")
+        return ModelBundle(None, self.success_predictor, self.pattern_clusterer, self.vectorizer)
+    
+    def _load_models(self, directory: Optional[Path] = None) -> bool:
+        """Carrega modelos salvos (por padrão, os legados em model_path)"""
+        directory = directory or self.model_path
         try:
-            self.success_predictor = joblib.load(self.model_path / "success_predictor.pkl")
-            self.pattern_clusterer = joblib.load(self.model_path / "pattern_clusterer.pkl")
-            self.vectorizer = joblib.load(self.model_path / "vectorizer.pkl")
+            models = [joblib.load(directory / name) for name in MODEL_FILES]
         except FileNotFoundError:
             # Modelos não treinados ainda
-            pass
+            return False
+        self.success_predictor, self.pattern_clusterer, self.vectorizer = models
+        self.online = directory == self.online_path
+        return True
     
     def _context_to_features(self, context: Dict) -> np.ndarray:
-        """Converte contexto em features vetoriais"""
+        """Converte contexto em features vetoriais (pelo LRU da versão servida)"""
+        models = self._serving_models()
+        return self._contexts_to_features([context], models.vectorizer, models.version)
+    
+    def _contexts_to_features(self, contexts: List[Dict], vectorizer=None,
+                              version: Optional[str] = None) -> np.ndarray:
+        """Converte N contextos em uma matriz de features (uma transformação de texto).
+        
+        With a registry ``version`` the rows are cached (LRU keyed by the
+        version and the normalized context); only the misses are vectorized.
+        """
+        if version is None:
+            return self._vectorize_contexts(contexts, vectorizer or self.vectorizer)
+        
+        keys = [(version, self._context_key(context)) for context in contexts]
+        rows: List[Optional[np.ndarray]] = [None] * len(contexts)
+        with self._context_lock:
+            for i, key in enumerate(keys):
+                row = self._context_features.get(key)
+                if row is not None:
+                    self._context_features.move_to_end(key)
+                    rows[i] = row
+        
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if missing:
+            features = self._vectorize_contexts([contexts[i] for i in missing], vectorizer or self.vectorizer)
+            with self._context_lock:
+                for i, row in zip(missing, features):
+                    rows[i] = row
+                    self._context_features[keys[i]] = row
+                while len(self._context_features) > CONTEXT_CACHE_SIZE:
+                    self._context_features.popitem(last=False)
+        return np.vstack(rows)
+    
+    def _context_key(self, context: Dict) -> Tuple:
+        """Contexto normalizado: a ordem e a caixa dos elementos não mudam as features"""
+        return (
+            tuple(sorted(str(element).strip().lower() for element in context.get('context_elements', []))),
+            str(context.get('pattern', '')).strip().lower(),
+            context.get('prompt_tokens', 150),
+            context.get('expected_tokens', 200),
+            context.get('complexity', 1),
+            context.get('urgency', 1),
+        )
+    
+    def _vectorize_contexts(self, contexts: List[Dict], vectorizer) -> np.ndarray:
         # Texto do contexto
-        context_text = " ".join(context.get('context_elements', []))
-        pattern_text = context.get('pattern', '')
-        full_text = f"{context_text} {pattern_text}"
+        texts = [
+            f"{' '.join(context.get('context_elements', []))} {context.get('pattern', '')}"
+            for context in contexts
+        ]
         
         # Vetoriza texto
-        text_features = self.vectorizer.transform([full_text]).toarray()[0]
+        text_features = vectorizer.transform(texts).toarray()
         
         # Features numéricas
         numeric_features = np.array([
-            context.get('prompt_tokens', 150) / 1000,
-            context.get('expected_tokens', 200) / 1000,
-            context.get('complexity', 1),
-            context.get('urgency', 1)
-        ])
+            [
+                context.get('prompt_tokens', 150) / 1000,
+                context.get('expected_tokens', 200) / 1000,
+                context.get('complexity', 1),
+                context.get('urgency', 1)
+            ]
+            for context in contexts
+        ], dtype=float)
         
-        return np.hstack([text_features, numeric_features]).reshape(1, -1)
+        return np.hstack([text_features, numeric_features])
     
     def _analyze_prompt_characteristics(self, context: Dict) -> Dict[str, float]:
         """Analisa características do prompt"""
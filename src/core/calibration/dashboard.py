@@ -8,161 +8,292 @@ Location: Minas Gerais, Brazil
 """
 
 import json
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import pandas as pd
 
+from src.core.calibration.html_export import HtmlDashboardExporter
+from src.core.calibration.report_context import ReportContext
+from src.core.metrics.columnar import load_columns
+from src.core.metrics.rollups import InteractionRollup, RollupStore
+from src.core.metrics.storage import data_version, iter_stored_interactions
+from src.core.metrics.trends import TrendEngine
+
+# matplotlib.pyplot e seaborn: importados só quando um gráfico é pedido
+plt = None
+sns = None
+
+# O estado do pyplot é global: um gráfico por vez, seja qual for a thread
+_RENDER_LOCK = threading.Lock()
+
+
+def _load_plotting():
+    """Importa e configura matplotlib/seaborn na primeira renderização"""
+    global plt, sns
+    if plt is None:
+        import matplotlib
+        if "matplotlib.pyplot" not in sys.modules and not os.environ.get("MPLBACKEND"):
+            matplotlib.use("Agg")  # renderização em arquivo, sem janela
+        import matplotlib.pyplot as pyplot
+        pyplot.style.use('seaborn-v0_8')
+        plt = pyplot
+    if sns is None:
+        import seaborn
+        seaborn.set_palette("husl")
+        sns = seaborn
+
+
 class PerformanceDashboard:
-    def __init__(self, data_path: Path = Path("data/metrics/data")):
+    def __init__(self, data_path: Path = Path("data/metrics/data"), chart_workers: int = 1, collector=None):
         self.data_path = data_path
+        # Agregados diários: os do coletor, se houver, senão um RollupStore aberto no primeiro uso
+        self.collector = collector
+        self._rollups: Optional[RollupStore] = None
         self.reports_path = Path("data/metrics/reports")
         self.reports_path.mkdir(exist_ok=True)
         
-        # Configura estilo dos gráficos
-        plt.style.use('seaborn-v0_8')
-        sns.set_palette("husl")
+        # Renderização em segundo plano (criada no primeiro pedido)
+        self.chart_workers = chart_workers
+        self._chart_executor: Optional[ThreadPoolExecutor] = None
+        self._chart_jobs: Dict[Tuple, Future] = {}
+        self._chart_lock = threading.Lock()
         
     def load_interaction_data(self, days: int = 30) -> pd.DataFrame:
         """Carrega dados de interações do período"""
-        interactions = []
         cutoff_date = datetime.now() - timedelta(days=days)
-        
-        for file in self.data_path.glob("*.json"):
-            try:
-                with open(file) as f:
-                    data = json.load(f)
-                    interaction_date = datetime.fromisoformat(data['timestamp'])
-                    if interaction_date > cutoff_date:
-                        interactions.append(data)
-            except (json.JSONDecodeError, KeyError, ValueError):
-                continue
+        columns = load_columns(self.data_path, since=cutoff_date)
                 
-        return pd.DataFrame(interactions)
+        return columns.to_dataframe()
     
-    def generate_comprehensive_report(self, days: int = 30) -> Dict:
-        """Gera relatório abrangente de performance"""
+    def generate_comprehensive_report(self, days: int = 30, render_charts: bool = False) -> Dict:
+        """Gera relatório abrangente de performance.
+
+        Charts are only rendered with ``render_charts=True`` (reusing this
+        report's data); otherwise matplotlib is never touched.
+        """
+        start = time.perf_counter()
         df = self.load_interaction_data(days)
+        load_seconds = time.perf_counter() - start
         
         if df.empty:
             return {"error": "No data available for the specified period"}
-            
-        # Calcula métricas principais
-        metrics = {
-            "period": f"Last {days} days",
-            "total_interactions": len(df),
-            "avg_quality_score": df['quality_score'].mean(),
-            "avg_response_time": df['response_time_ms'].mean(),
-            "avg_iterations": df['iteration_count'].mean(),
-            "success_rate": (df['quality_score'] > 0.7).mean(),
-            "trend_analysis": self._calculate_trends(df, days),
-            "pattern_analysis": self._analyze_patterns(df),
-            "context_performance": self._analyze_context_performance(df),
-            "recommendations": self._generate_recommendations(df)
-        }
         
-        # Gera visualizações
-        self._create_visualizations(df, days)
+        # Timestamps, agregados diários, groupbys e tendências: uma vez por relatório
+        ctx = ReportContext(df)
+        ctx.timings["load_data"] = load_seconds
         
-        # Salva relatório
-        self._save_report(metrics, days)
+        # Calcula métricas principais
+        with ctx.timed("summary"):
+            metrics = {
+                "period": f"Last {days} days",
+                "total_interactions": len(df),
+                "avg_quality_score": df['quality_score'].mean(),
+                "avg_response_time": df['response_time_ms'].mean(),
+                "avg_iterations": df['iteration_count'].mean(),
+                "success_rate": (df['quality_score'] > 0.7).mean(),
+            }
+        with ctx.timed("trend_analysis"):
+            metrics["trend_analysis"] = self._calculate_trends(df, days, ctx)
+        with ctx.timed("pattern_analysis"):
+            metrics["pattern_analysis"] = self._analyze_patterns(df, ctx)
+        with ctx.timed("context_analysis"):
+            metrics["context_performance"] = self._analyze_context_performance(df, ctx)
+            metrics["context_statistics"] = self._context_statistics_dict(ctx.context_stats)
+        with ctx.timed("percentiles"):
+            metrics["percentiles"] = self._calculate_percentiles(days)
+        with ctx.timed("rolling_trends"):
+            metrics["rolling_trends"] = self._calculate_rolling_trends()
+        with ctx.timed("recommendations"):
+            metrics["recommendations"] = self._generate_recommendations(df, ctx)
+        
+        # Gera visualizações só quando pedidas
+        if render_charts:
+            with ctx.timed("visualizations"):
+                metrics["charts"] = self.render_charts(days, df=df, ctx=ctx)
+        
+        # Salva relatório (com os tempos de cada seção até aqui)
+        metrics["section_timings_ms"] = ctx.timings_ms()
+        with ctx.timed("save_report"):
+            self._save_report(metrics, days)
+        metrics["section_timings_ms"] = ctx.timings_ms()
         
         return metrics
     
-    def _calculate_trends(self, df: pd.DataFrame, days: int) -> Dict:
+    # -- gráficos -----------------------------------------------------------
+    
+    def chart_key(self, days: int) -> Tuple[int, str, str]:
+        """Chave de cache dos gráficos: (janela, dia, versão dos dados)"""
+        return days, datetime.now().strftime('%Y%m%d'), data_version(self.data_path)
+    
+    def _chart_manifest(self, key: Tuple[int, str, str]) -> Path:
+        days, day, version = key
+        return self.reports_path / f"charts_{days}days_{day}_{version}.json"
+    
+    def cached_charts(self, days: int, key: Optional[Tuple[int, str, str]] = None) -> Optional[Dict]:
+        """Gráficos já renderizados para a janela e versão atuais (ou para ``key``), se houver"""
+        manifest = self._chart_manifest(key or self.chart_key(days))
+        try:
+            with open(manifest) as f:
+                charts = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if not all(Path(path).exists() for path in charts["paths"]):
+            return None
+        return {**charts, "status": "cached"}
+    
+    def render_charts(self, days: int = 30, df: Optional[pd.DataFrame] = None,
+                      ctx: Optional[ReportContext] = None) -> Dict:
+        """Renderiza (ou devolve do cache) os gráficos da janela"""
+        # Uma única leitura da versão: a chave do cache e a do manifesto coincidem
+        key = self.chart_key(days)
+        cached = self.cached_charts(days, key)
+        if cached is not None:
+            return cached
+        if df is None:
+            df = self.load_interaction_data(days)
+        if df.empty:
+            return {"status": "no_data", "paths": []}
+        
+        days, day, version = key
+        with _RENDER_LOCK:
+            _load_plotting()
+            paths = self._create_visualizations(df, days, ctx, tag=f"{day}_{version}")
+        charts = {"days": days, "data_version": version, "paths": [str(p) for p in paths],
+                  "rendered_at": datetime.now().isoformat()}
+        manifest = self._chart_manifest(key)
+        tmp = manifest.with_name(f".{manifest.name}.{os.getpid()}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(charts, f, indent=2)
+        tmp.replace(manifest)
+        self._prune_charts(days, keep=manifest)
+        return {**charts, "status": "rendered"}
+    
+    def _prune_charts(self, days: int, keep: Path):
+        """Remove gráficos de versões anteriores da mesma janela"""
+        for old in self.reports_path.glob(f"charts_{days}days_*.json"):
+            if old == keep:
+                continue
+            try:
+                with open(old) as f:
+                    paths = json.load(f).get("paths", [])
+            except (OSError, json.JSONDecodeError):
+                paths = []
+            for path in paths:
+                Path(path).unlink(missing_ok=True)
+            old.unlink(missing_ok=True)
+    
+    def render_charts_async(self, days: int = 30) -> Future:
+        """Agenda a renderização em um worker; pedidos iguais em andamento são unificados"""
+        key = self.chart_key(days)
+        with self._chart_lock:
+            job = self._chart_jobs.get(key)
+            if job is not None and not job.done():
+                return job
+            if self._chart_executor is None:
+                self._chart_executor = ThreadPoolExecutor(max_workers=self.chart_workers,
+                                                          thread_name_prefix="dashboard-charts")
+            job = self._chart_executor.submit(self.render_charts, days)
+            self._chart_jobs = {k: j for k, j in self._chart_jobs.items() if not j.done()}
+            self._chart_jobs[key] = job
+            return job
+    
+    def close(self, wait: bool = True):
+        """Encerra o worker de gráficos"""
+        with self._chart_lock:
+            if self._chart_executor is not None:
+                self._chart_executor.shutdown(wait=wait)
+                self._chart_executor = None
+    
+    def export_html(self, days: int = 365, output: Optional[Path] = None) -> Dict:
+        """Dashboard HTML interativo a partir dos agregados diários (ver html_export)"""
+        return HtmlDashboardExporter(self.data_path, self.reports_path).export(days, output)
+    
+    def _calculate_trends(self, df: pd.DataFrame, days: int, ctx: Optional[ReportContext] = None) -> Dict:
         """Calcula tendências ao longo do tempo"""
-        df['date'] = pd.to_datetime(df['timestamp']).dt.date
-        daily_metrics = df.groupby('date').agg({
-            'quality_score': 'mean',
-            'response_time_ms': 'mean',
-            'iteration_count': 'mean'
-        }).reset_index()
-        
-        # Calcula tendências lineares
-        from scipy import stats
-        
-        if len(daily_metrics) < 2:
-            return {"insufficient_data": True}
-            
-        x = range(len(daily_metrics))
-        
-        quality_trend = stats.linregress(x, daily_metrics['quality_score'])
-        response_trend = stats.linregress(x, daily_metrics['response_time_ms'])
-        iteration_trend = stats.linregress(x, daily_metrics['iteration_count'])
-        
+        return (ctx or ReportContext(df)).trends
+    
+    def _rollup_store(self) -> Optional[RollupStore]:
+        """RollupStore reutilizado entre relatórios (None sem o log segmentado)"""
+        if self._rollups is None and (self.data_path / "segments").is_dir():
+            self._rollups = RollupStore(self.data_path)
+        return self._rollups
+    
+    def _calculate_percentiles(self, days: int) -> Dict:
+        """Percentis de latência e tokens a partir dos sketches diários (sem varrer dados brutos)"""
+        if self.collector is not None:
+            window = self.collector.window_rollup(days)
+        else:
+            since = datetime.now() - timedelta(days=days)
+            rollups = self._rollup_store()
+            if rollups is not None:
+                window = rollups.window(since)
+            else:
+                window = InteractionRollup.from_records(iter_stored_interactions(self.data_path, since=since))
         return {
-            "quality_trend": {
-                "slope": quality_trend.slope,
-                "r_squared": quality_trend.rvalue ** 2,
-                "direction": "improving" if quality_trend.slope > 0 else "declining"
-            },
-            "response_time_trend": {
-                "slope": response_trend.slope,
-                "r_squared": response_trend.rvalue ** 2,
-                "direction": "faster" if response_trend.slope < 0 else "slower"
-            },
-            "iteration_trend": {
-                "slope": iteration_trend.slope,
-                "r_squared": iteration_trend.rvalue ** 2,
-                "direction": "fewer" if iteration_trend.slope < 0 else "more"
+            "overall": window.percentiles(),
+            "by_pattern": window.percentiles_by("pattern"),
+            "by_context": window.percentiles_by("context")
+        }
+    
+    def _calculate_rolling_trends(self) -> Dict:
+        """Médias móveis 7/14/30 dias, EWMA e alertas; só dias novos são processados"""
+        if self.collector is not None:
+            return self.collector.trend_report()
+        rollups = self._rollup_store()
+        if rollups is None:
+            return {"error": "Trends require the segmented storage backend"}
+        rollups.refresh()
+        engine = TrendEngine(self.data_path)
+        engine.update(rollups)
+        return engine.report()
+    
+    def _context_statistics_dict(self, context_stats: pd.DataFrame) -> Dict:
+        """Estatísticas por contexto em tipos nativos (serializáveis em JSON)"""
+        return {
+            context: {
+                name: (int(value) if name == "count" else (None if pd.isna(value) else float(value)))
+                for name, value in row.items()
             }
+            for context, row in context_stats.iterrows()
         }
     
-    def _analyze_patterns(self, df: pd.DataFrame) -> Dict:
+    def _analyze_patterns(self, df: pd.DataFrame, ctx: Optional[ReportContext] = None) -> Dict:
         """Analisa padrões de uso e efetividade"""
+        ctx = ctx or ReportContext(df)
         pattern_stats = {}
         
         if 'pattern_applied' in df.columns:
-            pattern_counts = df['pattern_applied'].value_counts()
-            pattern_quality = df.groupby('pattern_applied')['quality_score'].mean()
-            
+            groups = ctx.pattern_groups
+            pattern_quality = groups["quality"].sort_index()
             pattern_stats = {
-                "most_used": pattern_counts.index[0] if len(pattern_counts) > 0 else None,
-                "best_performing": pattern_quality.idxmax() if len(pattern_quality) > 0 else None,
-                "pattern_distribution": pattern_counts.to_dict(),
+                "most_used": groups.index[0] if len(groups) > 0 else None,
+                "best_performing": pattern_quality.idxmax() if pattern_quality.notna().any() else None,
+                "pattern_distribution": {pattern: int(n) for pattern, n in groups["count"].items()},
                 "pattern_quality": pattern_quality.to_dict()
             }
             
         # Análise de contexto
         if 'context_used' in df.columns:
-            all_contexts = []
-            for contexts in df['context_used'].dropna():
-                if isinstance(contexts, list):
-                    all_contexts.extend(contexts)
-                    
-            context_counts = pd.Series(all_contexts).value_counts()
-            pattern_stats["context_distribution"] = context_counts.to_dict()
+            context_counts = ctx.context_stats["count"].sort_values(ascending=False, kind="stable")
+            pattern_stats["context_distribution"] = {context: int(n) for context, n in context_counts.items()}
             
         return pattern_stats
     
-    def _analyze_context_performance(self, df: pd.DataFrame) -> Dict:
+    def _analyze_context_performance(self, df: pd.DataFrame, ctx: Optional[ReportContext] = None) -> Dict:
         """Analisa performance por tipo de contexto"""
         if 'context_used' not in df.columns:
             return {}
-            
-        context_performance = {}
-        
-        for idx, contexts in df['context_used'].dropna().items():
-            if isinstance(contexts, list):
-                quality = df.loc[idx, 'quality_score']
-                for context in contexts:
-                    if context not in context_performance:
-                        context_performance[context] = []
-                    context_performance[context].append(quality)
-        
-        # Calcula médias
-        avg_performance = {
-            context: np.mean(scores) 
-            for context, scores in context_performance.items() 
-            if len(scores) > 0
-        }
+        context_stats = (ctx or ReportContext(df)).context_stats
         
-        return avg_performance
+        return {context: float(mean) for context, mean in context_stats["mean"].dropna().items()}
     
-    def _generate_recommendations(self, df: pd.DataFrame) -> List[str]:
+    def _generate_recommendations(self, df: pd.DataFrame, ctx: Optional[ReportContext] = None) -> List[str]:
         """Gera recomendações baseadas nos dados"""
         recommendations = []
         
@@ -185,14 +316,23 @@ class PerformanceDashboard:
             
         # Análise de padrões
         if 'pattern_applied' in df.columns:
-            pattern_quality = df.groupby('pattern_applied')['quality_score'].mean()
+            pattern_quality = (ctx or ReportContext(df)).pattern_groups["quality"].sort_index()
             low_performing = pattern_quality[pattern_quality < 0.7]
             if len(low_performing) > 0:
                 patterns = ", ".join(low_performing.index)
                 recommendations.append(f"Low-performing patterns detected: {patterns}")
+        
+        # Análise de contextos (só os com amostra mínima)
+        if 'context_used' in df.columns:
+            context_stats = (ctx or ReportContext(df)).context_stats
+            frequent = context_stats[context_stats["count"] >= 5]
+            weak = frequent[frequent["mean"] < 0.6]
+            if len(weak) > 0:
+                contexts = ", ".join(str(c) for c in weak.index)
+                recommendations.append(f"Low-performing contexts detected: {contexts}")
                 
-        # Análise de tendências
-        trends = self._calculate_trends(df, 30)
+        # Análise de tendências (já calculadas para o relatório, quando houver contexto)
+        trends = ctx.trends if ctx is not None else self._calculate_trends(df, 30)
         if "quality_trend" in trends and trends["quality_trend"]["direction"] == "declining":
             recommendations.append("Quality trend is declining - investigate recent changes")
             
@@ -206,25 +346,28 @@ class PerformanceDashboard:
             
         return recommendations
     
-    def _create_visualizations(self, df: pd.DataFrame, days: int):
-        """Cria visualizações dos dados"""
-        # Prepara dados temporais
-        df['date'] = pd.to_datetime(df['timestamp']).dt.date
-        df['hour'] = pd.to_datetime(df['timestamp']).dt.hour
+    def _create_visualizations(self, df: pd.DataFrame, days: int, ctx: Optional[ReportContext] = None,
+                               tag: Optional[str] = None) -> List[Path]:
+        """Cria visualizações dos dados; retorna os arquivos gravados"""
+        _load_plotting()
+        tag = tag or datetime.now().strftime('%Y%m%d')
+        # Dados temporais já agregados no contexto do relatório
+        ctx = ctx or ReportContext(df)
+        daily = ctx.daily
         
         # Figura 1: Tendências ao longo do tempo
         fig, axes = plt.subplots(2, 2, figsize=(15, 10))
         fig.suptitle(f'Performance Dashboard - Last {days} Days', fontsize=16)
         
         # Qualidade ao longo do tempo
-        daily_quality = df.groupby('date')['quality_score'].mean()
+        daily_quality = daily['quality_score']
         axes[0, 0].plot(daily_quality.index, daily_quality.values, marker='o')
         axes[0, 0].set_title('Quality Score Trend')
         axes[0, 0].set_ylabel('Average Quality Score')
         axes[0, 0].tick_params(axis='x', rotation=45)
         
         # Tempo de resposta
-        daily_response = df.groupby('date')['response_time_ms'].mean()
+        daily_response = daily['response_time_ms']
         axes[0, 1].plot(daily_response.index, daily_response.values, marker='o', color='orange')
         axes[0, 1].set_title('Response Time Trend')
         axes[0, 1].set_ylabel('Average Response Time (ms)')
@@ -238,7 +381,7 @@ class PerformanceDashboard:
         
         # Padrões mais usados
         if 'pattern_applied' in df.columns:
-            pattern_counts = df['pattern_applied'].value_counts().head(5)
+            pattern_counts = ctx.pattern_groups["count"].head(5)
             axes[1, 1].bar(range(len(pattern_counts)), pattern_counts.values)
             axes[1, 1].set_title('Most Used Patterns')
             axes[1, 1].set_xticks(range(len(pattern_counts)))
@@ -252,18 +395,24 @@ class PerformanceDashboard:
         plt.tight_layout()
         
         # Salva figura
-        fig_path = self.reports_path / f"dashboard_{days}days_{datetime.now().strftime('%Y%m%d')}.png"
+        fig_path = self.reports_path / f"dashboard_{days}days_{tag}.png"
         plt.savefig(fig_path, dpi=300, bbox_inches='tight')
         plt.close()
+        paths = [fig_path]
         
         # Figura 2: Análise de contexto
         if 'context_used' in df.columns:
-            self._create_context_visualization(df)
+            context_path = self._create_context_visualization(df, ctx, tag=f"{days}days_{tag}")
+            if context_path is not None:
+                paths.append(context_path)
+        return paths
     
-    def _create_context_visualization(self, df: pd.DataFrame):
+    def _create_context_visualization(self, df: pd.DataFrame, ctx: Optional[ReportContext] = None,
+                                      tag: Optional[str] = None) -> Optional[Path]:
         """Cria visualização de performance por contexto"""
+        _load_plotting()
         # Analisa performance por contexto
-        context_performance = self._analyze_context_performance(df)
+        context_performance = self._analyze_context_performance(df, ctx)
         
         if context_performance:
             fig, ax = plt.subplots(figsize=(12, 6))
@@ -289,9 +438,11 @@ class PerformanceDashboard:
             plt.tight_layout()
             
             # Salva figura
-            fig_path = self.reports_path / f"context_performance_{datetime.now().strftime('%Y%m%d')}.png"
+            fig_path = self.reports_path / f"context_performance_{tag or datetime.now().strftime('%Y%m%d')}.png"
             plt.savefig(fig_path, dpi=300, bbox_inches='tight')
             plt.close()
+            return fig_path
+        return None
     
     def _save_report(self, metrics: Dict, days: int):
         """Salva relatório em formato JSON e Markdown"""
@@ -337,6 +488,16 @@ Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
             report += f"""
 - **Most Used Pattern:** {patterns['most_used']}
 - **Best Performing Pattern:** {patterns['best_performing']}
+"""
+        
+        latency = metrics.get("percentiles", {}).get("overall", {}).get("response_time_ms")
+        if latency:
+            report += f"""
+## Latency Percentiles
+
+- **p50:** {latency['p50']:.0f}ms
+- **p90:** {latency['p90']:.0f}ms
+- **p99:** {latency['p99']:.0f}ms
 """
         
         report += f"""
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Feature Store
+Cache persistente de features por ID de interação e versão do esquema
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from src.core.calibration.model_registry import schema_hash
+from src.core.metrics.locking import file_lock
+
+PARTS = ("indptr", "indices", "data", "numeric")
+MAX_CHUNKS = 8
+LOAD_ATTEMPTS = 3
+
+
+class FeatureChunk:
+    """Um bloco imutável de linhas em cache (arrays mapeados em memória)"""
+
+    def __init__(self, ids: np.ndarray, text: sparse.csr_matrix, numeric: np.ndarray):
+        self.ids = ids
+        self.text = text
+        self.numeric = numeric
+
+    @classmethod
+    def load(cls, directory: Path, name: str, n_features: int) -> "FeatureChunk":
+        ids = np.load(directory / f"{name}.ids.npy", mmap_mode="r")
+        indptr, indices, data, numeric = (np.load(directory / f"{name}.{part}.npy", mmap_mode="r") for part in PARTS)
+        text = sparse.csr_matrix((data, indices, indptr), shape=(len(ids), n_features))
+        return cls(ids, text, numeric)
+
+
+class FeatureStore:
+    """Linhas de features já calculadas, por ID de interação"""
+
+    def __init__(self, root: Path, schema: Dict, n_features: int, max_chunks: int = MAX_CHUNKS):
+        self.schema_hash = schema_hash(schema)
+        self.path = root / self.schema_hash
+        self.n_features = n_features
+        self.max_chunks = max_chunks
+
+    def __len__(self) -> int:
+        return sum(len(chunk.ids) for chunk in self._chunks())
+
+    def _chunk_names(self) -> List[str]:
+        if not self.path.exists():
+            return []
+        return sorted(p.name[:-len(".ids.npy")] for p in self.path.glob("chunk-*.ids.npy"))
+
+    def _chunks(self) -> List[FeatureChunk]:
+        """Blocos completos; uma compactação concorrente pode removê-los no meio da leitura"""
+        for attempt in range(LOAD_ATTEMPTS):
+            try:
+                return [FeatureChunk.load(self.path, name, self.n_features) for name in self._chunk_names()]
+            except FileNotFoundError:
+                if attempt == LOAD_ATTEMPTS - 1:
+                    raise
+        return []
+
+    def lookup(self, ids: np.ndarray) -> Tuple[np.ndarray, sparse.csr_matrix, np.ndarray]:
+        """Linhas em cache para ``ids``: (máscara de encontrados, texto, numéricas) na ordem dos encontrados"""
+        ids = np.asarray(ids, dtype=str)
+        found = np.zeros(len(ids), dtype=bool)
+        # IDs vazios (registros legados) nunca são cacheados
+        pending = ids != ""
+        rows, texts, numerics = [], [], []
+        for chunk in self._chunks():
+            if not pending.any() or not len(chunk.ids):
+                continue
+            positions = np.searchsorted(chunk.ids, ids)
+            clipped = np.minimum(positions, len(chunk.ids) - 1)
+            hit = pending & (np.asarray(chunk.ids)[clipped] == ids)
+            hit_rows = np.flatnonzero(hit)
+            if len(hit_rows):
+                rows.append(hit_rows)
+                texts.append(chunk.text[clipped[hit_rows]])
+                numerics.append(np.asarray(chunk.numeric[clipped[hit_rows]]))
+                found[hit_rows] = True
+                pending[hit_rows] = False
+
+        if not rows:
+            return found, sparse.csr_matrix((0, self.n_features)), np.empty((0, 0))
+        # Reordena para a ordem original das linhas encontradas
+        order = np.argsort(np.concatenate(rows), kind="stable")
+        return found, sparse.vstack(texts, format="csr")[order], np.vstack(numerics)[order]
+
+    def add(self, ids: np.ndarray, text: sparse.csr_matrix, numeric: np.ndarray):
+        """Grava as linhas novas como um bloco; IDs vazios ou repetidos são ignorados"""
+        ids = np.asarray(ids, dtype=str)
+        ids, first = np.unique(ids, return_index=True)
+        keep = ids != ""
+        ids, first = ids[keep], first[keep]
+        if not len(ids):
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.path / ".lock"):
+            self._write_chunk(ids, sparse.csr_matrix(text)[first], np.asarray(numeric)[first])
+            if len(self._chunk_names()) > self.max_chunks:
+                self._compact()
+
+    def _write_chunk(self, ids: np.ndarray, text: sparse.csr_matrix, numeric: np.ndarray):
+        name = f"chunk-{time.time_ns():020d}-{os.getpid()}"
+        text.sort_indices()
+        arrays = {"indptr": text.indptr, "indices": text.indices, "data": text.data, "numeric": numeric, "ids": ids}
+        # O arquivo de IDs por último: é ele que torna o bloco visível
+        for part, array in arrays.items():
+            tmp = self.path / f".{name}.{part}.{os.getpid()}.tmp.npy"
+            np.save(tmp, np.ascontiguousarray(array))
+            tmp.replace(self.path / f"{name}.{part}.npy")
+
+    def _compact(self):
+        """Funde todos os blocos em um, ordenado por ID (chamado com o lock)"""
+        names = self._chunk_names()
+        chunks = [FeatureChunk.load(self.path, name, self.n_features) for name in names]
+        ids = np.concatenate([np.asarray(chunk.ids) for chunk in chunks])
+        ids, first = np.unique(ids, return_index=True)
+        text = sparse.vstack([chunk.text for chunk in chunks], format="csr")[first]
+        numeric = np.vstack([np.asarray(chunk.numeric) for chunk in chunks])[first]
+        self._write_chunk(ids, text, numeric)
+        for name in names:
+            # IDs primeiro: leitores deixam de ver o bloco antes que os dados sumam
+            for part in ("ids",) + PARTS:
+                (self.path / f"{name}.{part}.npy").unlink(missing_ok=True)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+HTML Dashboard Export
+Dashboard HTML autocontido gerado a partir dos agregados diários
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.core.metrics.rollups import InteractionRollup, RollupStore
+
+CACHE_FILE = "html_cache.json"
+CACHE_VERSION = 1
+
+
+def _round(value: Optional[float], digits: int) -> Optional[float]:
+    return None if value is None else round(value, digits)
+
+
+def _group_rows(counts, quality: Dict, sketches: Dict) -> Dict:
+    rows = {}
+    for key, count in sorted(counts.items()):
+        stat = quality.get(key)
+        latency = sketches.get(key, {}).get("response_time_ms")
+        rows[key] = [
+            count,
+            _round(stat["sum"] / stat["n"], 4) if stat and stat["n"] else None,
+            _round(latency.quantile(0.9), 1) if latency is not None and latency.count else None,
+        ]
+    return rows
+
+
+def day_payload(rollup: InteractionRollup) -> Dict:
+    """Fragmento de um dia: totais, percentis de latência e linhas por padrão/contexto"""
+    latency = rollup.sketches["response_time_ms"]
+    quality = rollup.stats["quality_score"]
+    return {
+        "n": rollup.count,
+        "q": _round(quality["sum"] / quality["n"], 4) if quality["n"] else None,
+        "l": [_round(latency.quantile(q), 1) for q in (0.5, 0.9, 0.99)],
+        "p": _group_rows(rollup.patterns, rollup.pattern_quality, rollup.pattern_sketches),
+        "c": _group_rows(rollup.contexts, rollup.context_quality, rollup.context_sketches),
+    }
+
+
+def day_signature(rollup: InteractionRollup) -> str:
+    """Muda sempre que o agregado do dia muda (novos registros ou rebuild)"""
+    stats = rollup.stats
+    return (f"{rollup.count}:{stats['quality_score']['sum']!r}:{stats['response_time_ms']['sum']!r}:"
+            f"{len(rollup.pattern_quality)}:{len(rollup.context_quality)}")
+
+
+class HtmlDashboardExporter:
+    """Gera o HTML reaproveitando os fragmentos dos dias que não mudaram"""
+
+    def __init__(self, data_path: Path, reports_path: Path):
+        self.data_path = data_path
+        self.reports_path = reports_path
+        self.cache_path = reports_path / CACHE_FILE
+
+    def _load_cache(self) -> Dict:
+        try:
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            cache = {}
+        if cache.get("version") != CACHE_VERSION:
+            cache = {"version": CACHE_VERSION, "days": {}, "outputs": {}}
+        return cache
+
+    def _write_atomic(self, path: Path, text: str):
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        tmp.replace(path)
+
+    def export(self, days: int = 365, output: Optional[Path] = None) -> Dict:
+        """Escreve o dashboard dos últimos ``days`` dias; retorna caminho e dias reemitidos"""
+        output = output or self.reports_path / f"dashboard_{days}days.html"
+        rollups = RollupStore(self.data_path)
+        rollups.refresh()
+        cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        wanted = sorted(day for day in rollups.days if day[:1].isdigit() and day > cutoff)
+
+        cache = self._load_cache()
+        fragments = cache["days"]
+        reemitted = []
+        for day in wanted:
+            signature = day_signature(rollups.days[day])
+            entry = fragments.get(day)
+            if entry is None or entry["sig"] != signature:
+                payload = json.dumps(day_payload(rollups.days[day]), ensure_ascii=False, separators=(",", ":"))
+                fragments[day] = {"sig": signature, "json": payload}
+                reemitted.append(day)
+        # Dias que saíram dos agregados (retenção) deixam o cache
+        for day in set(fragments) - set(rollups.days):
+            del fragments[day]
+
+        digest = hashlib.blake2b("|".join(f"{d}={fragments[d]['sig']}" for d in wanted).encode(),
+                                 digest_size=12).hexdigest()
+        unchanged = cache["outputs"].get(str(output)) == digest and output.exists()
+        if not unchanged:
+            days_json = ",".join(f'["{day}",{fragments[day]["json"]}]' for day in wanted)
+            data = (f'{{"generated_at":{json.dumps(datetime.now().isoformat(timespec="seconds"))},'
+                    f'"window_days":{days},"days":[{days_json}]}}')
+            # Impede que um nome de padrão/contexto feche o <script>
+            html = HTML_TEMPLATE.replace("__DATA__", data.replace("</", "<\\/"))
+            output.parent.mkdir(parents=True, exist_ok=True)
+            self._write_atomic(output, html)
+            cache["outputs"][str(output)] = digest
+        if reemitted or not unchanged:
+            self._write_atomic(self.cache_path, json.dumps(cache, ensure_ascii=False, separators=(",", ":")))
+
+        return {
+            "status": "unchanged" if unchanged else "written",
+            "path": str(output),
+            "days": len(wanted),
+            "reemitted_days": len(reemitted),
+            "bytes": output.stat().st_size if output.exists() else 0,
+        }
+
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Prompt Engineering Performance Dashboard</title>
+<style>
+  body { font-family: system-ui, sans-serif; margin: 24px; color: #222; background: #fafafa; }
+  h1 { font-size: 20px; margin: 0 0 4px; }
+  .muted { color: #777; font-size: 12px; }
+  .controls { display: flex; gap: 16px; margin: 16px 0; flex-wrap: wrap; }
+  .controls label { font-size: 13px; }
+  .cards { display: flex; gap: 12px; margin-bottom: 16px; flex-wrap: wrap; }
+  .card { background: #fff; border: 1px solid #ddd; border-radius: 6px; padding: 10px 14px; min-width: 150px; }
+  .card b { display: block; font-size: 20px; }
+  .charts { display: grid; grid-template-columns: repeat(auto-fit, minmax(360px, 1fr)); gap: 12px; }
+  .chart { background: #fff; border: 1px solid #ddd; border-radius: 6px; padding: 8px; }
+  .chart h2, .tables h2 { font-size: 14px; margin: 4px 0 6px; }
+  svg { width: 100%; height: 180px; }
+  .tables { display: grid; grid-template-columns: repeat(auto-fit, minmax(360px, 1fr)); gap: 12px; margin-top: 16px; }
+  table { width: 100%; border-collapse: collapse; background: #fff; font-size: 13px; }
+  th, td { text-align: left; padding: 4px 8px; border-bottom: 1px solid #eee; }
+  tr.row { cursor: pointer; }
+  tr.row:hover { background: #f0f4ff; }
+</style>
+</head>
+<body>
+<h1>Performance Dashboard</h1>
+<div class="muted" id="meta"></div>
+<div class="controls">
+  <label>Range <select id="range">
+    <option value="7">7 days</option><option value="30">30 days</option>
+    <option value="90">90 days</option><option value="0" selected>All</option>
+  </select></label>
+  <label>Pattern <select id="pattern"></select></label>
+  <label>Context <select id="context"></select></label>
+  <span class="muted">Pattern and context filters apply one at a time (aggregates are kept per dimension).</span>
+</div>
+<div class="cards" id="cards"></div>
+<div class="charts">
+  <div class="chart"><h2>Interactions per day</h2><svg id="chart-n"></svg></div>
+  <div class="chart"><h2>Average quality</h2><svg id="chart-q"></svg></div>
+  <div class="chart"><h2>Response time p90 (ms)</h2><svg id="chart-l"></svg></div>
+</div>
+<div class="tables">
+  <div><h2>Patterns</h2><table id="table-p"></table></div>
+  <div><h2>Contexts</h2><table id="table-c"></table></div>
+</div>
+<script id="dashboard-data" type="application/json">__DATA__</script>
+<script>
+(function () {
+  "use strict";
+  var DATA = JSON.parse(document.getElementById("dashboard-data").textContent);
+  var SVG = "http://www.w3.org/2000/svg";
+  var rangeSel = document.getElementById("range");
+  var patternSel = document.getElementById("pattern");
+  var contextSel = document.getElementById("context");
+
+  function names(key) {
+    var seen = {};
+    DATA.days.forEach(function (d) { Object.keys(d[1][key]).forEach(function (k) { seen[k] = true; }); });
+    return Object.keys(seen).sort();
+  }
+
+  function fill(select, values) {
+    select.appendChild(new Option("All", ""));
+    values.forEach(function (v) { select.appendChild(new Option(v, v)); });
+  }
+
+  function visibleDays() {
+    var range = Number(rangeSel.value);
+    return range ? DATA.days.slice(-range) : DATA.days;
+  }
+
+  // [dia, n, qualidade, p90] conforme o filtro ativo
+  function series() {
+    return visibleDays().map(function (d) {
+      var day = d[1], row;
+      if (patternSel.value) row = day.p[patternSel.value] || [0, null, null];
+      else if (contextSel.value) row = day.c[contextSel.value] || [0, null, null];
+      else row = [day.n, day.q, day.l[1]];
+      return [d[0], row[0], row[1], row[2]];
+    });
+  }
+
+  function el(tag, attrs, text) {
+    var node = document.createElementNS(SVG, tag);
+    Object.keys(attrs).forEach(function (k) { node.setAttribute(k, attrs[k]); });
+    if (text !== undefined) node.textContent = text;
+    return node;
+  }
+
+  function lineChart(svg, points, color, digits) {
+    while (svg.firstChild) svg.removeChild(svg.firstChild);
+    var width = svg.clientWidth || 400, height = 180, pad = 36;
+    var values = points.filter(function (p) { return p[1] !== null; });
+    if (!values.length) {
+      svg.appendChild(el("text", {x: pad, y: height / 2, fill: "#999"}, "No data"));
+      return;
+    }
+    var min = Math.min.apply(null, values.map(function (p) { return p[1]; }));
+    var max = Math.max.apply(null, values.map(function (p) { return p[1]; }));
+    if (min === max) { min -= 1; max += 1; }
+    var x = function (i) { return pad + (points.length > 1 ? i * (width - 2 * pad) / (points.length - 1) : 0); };
+    var y = function (v) { return height - pad + 10 - (v - min) * (height - pad) / (max - min); };
+    svg.appendChild(el("text", {x: 2, y: y(max) + 4, "font-size": 10, fill: "#777"}, max.toFixed(digits)));
+    svg.appendChild(el("text", {x: 2, y: y(min) + 4, "font-size": 10, fill: "#777"}, min.toFixed(digits)));
+    svg.appendChild(el("text", {x: pad, y: height - 4, "font-size": 10, fill: "#777"}, points[0][0]));
+    svg.appendChild(el("text", {x: width - pad, y: height - 4, "font-size": 10, fill: "#777", "text-anchor": "end"},
+                       points[points.length - 1][0]));
+    var path = "";
+    points.forEach(function (p, i) {
+      if (p[1] === null) return;
+      path += (path ? "L" : "M") + x(i).toFixed(1) + "," + y(p[1]).toFixed(1);
+    });
+    svg.appendChild(el("path", {d: path, fill: "none", stroke: color, "stroke-width": 1.5}));
+    points.forEach(function (p, i) {
+      if (p[1] === null) return;
+      var dot = el("circle", {cx: x(i), cy: y(p[1]), r: 2.5, fill: color});
+      dot.appendChild(el("title", {}, p[0] + ": " + p[1].toFixed(digits)));
+      svg.appendChild(dot);
+    });
+  }
+
+  function card(label, value) {
+    var div = document.createElement("div");
+    div.className = "card";
+    div.appendChild(document.createTextNode(label));
+    var b = document.createElement("b");
+    b.textContent = value;
+    div.appendChild(b);
+    return div;
+  }
+
+  function groupTable(table, key, select, other) {
+    var totals = {};
+    visibleDays().forEach(function (d) {
+      var rows = d[1][key];
+      Object.keys(rows).forEach(function (name) {
+        var t = totals[name] || (totals[name] = {n: 0, qn: 0, qs: 0});
+        t.n += rows[name][0];
+        if (rows[name][1] !== null) { t.qn += rows[name][0]; t.qs += rows[name][0] * rows[name][1]; }
+      });
+    });
+    table.innerHTML = "<tr><th>Name</th><th>Interactions</th><th>Avg quality</th></tr>";
+    Object.keys(totals).sort(function (a, b) { return totals[b].n - totals[a].n; }).forEach(function (name) {
+      var t = totals[name], tr = document.createElement("tr");
+      tr.className = "row";
+      [name, String(t.n), t.qn ? (t.qs / t.qn).toFixed(3) : "-"].forEach(function (text) {
+        var td = document.createElement("td");
+        td.textContent = text;
+        tr.appendChild(td);
+      });
+      tr.addEventListener("click", function () { select.value = name; other.value = ""; render(); });
+      table.appendChild(tr);
+    });
+  }
+
+  function render() {
+    var points = series();
+    var total = 0, qn = 0, qs = 0, worst = null;
+    points.forEach(function (p) {
+      total += p[1];
+      if (p[2] !== null) { qn += p[1]; qs += p[1] * p[2]; }
+      if (p[3] !== null && (worst === null || p[3] > worst)) worst = p[3];
+    });
+    var cards = document.getElementById("cards");
+    cards.innerHTML = "";
+    cards.appendChild(card("Interactions", String(total)));
+    cards.appendChild(card("Avg quality", qn ? (qs / qn).toFixed(3) : "-"));
+    cards.appendChild(card("Worst daily p90 (ms)", worst === null ? "-" : worst.toFixed(0)));
+    cards.appendChild(card("Days", String(points.length)));
+    lineChart(document.getElementById("chart-n"), points.map(function (p) { return [p[0], p[1]]; }), "#4c72b0", 0);
+    lineChart(document.getElementById("chart-q"), points.map(function (p) { return [p[0], p[2]]; }), "#55a868", 3);
+    lineChart(document.getElementById("chart-l"), points.map(function (p) { return [p[0], p[3]]; }), "#c44e52", 0);
+    groupTable(document.getElementById("table-p"), "p", patternSel, contextSel);
+    groupTable(document.getElementById("table-c"), "c", contextSel, patternSel);
+  }
+
+  document.getElementById("meta").textContent =
+    "Generated " + DATA.generated_at + " from daily rollups - last " + DATA.window_days + " days";
+  fill(patternSel, names("p"));
+  fill(contextSel, names("c"));
+  rangeSel.addEventListener("change", render);
+  patternSel.addEventListener("change", function () { if (patternSel.value) contextSel.value = ""; render(); });
+  contextSel.addEventListener("change", function () { if (contextSel.value) patternSel.value = ""; render(); });
+  window.addEventListener("resize", render);
+  render();
+})();
+</script>
+</body>
+</html>
+"""
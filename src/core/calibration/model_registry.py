@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Model Registry
+Versões de modelos de calibração com promoção atômica e cache quente
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import joblib
+
+from src.core.metrics.locking import file_lock
+
+ARTIFACTS = ("success_predictor", "pattern_clusterer", "vectorizer")
+ACTIVE_FILE = "active.json"
+METADATA_FILE = "metadata.json"
+DEFAULT_KEEP = 5
+
+
+def feature_schema(vectorizer, numeric_features: List[str]) -> Dict:
+    """Descrição do espaço de features: tipo de vetorizador, vocabulário/dimensão e colunas numéricas"""
+    schema = {"vectorizer": type(vectorizer).__name__, "numeric_features": list(numeric_features)}
+    vocabulary = getattr(vectorizer, "vocabulary_", None)
+    if vocabulary is not None:
+        schema["vocabulary"] = sorted(vocabulary, key=vocabulary.get)
+    n_features = getattr(vectorizer, "n_features", None)
+    if n_features is not None:
+        schema["n_features"] = n_features
+    if vocabulary is None and hasattr(vectorizer, "get_params"):
+        # Sem vocabulário, as features dependem só dos parâmetros (ex.: HashingVectorizer)
+        schema["params"] = {name: repr(value) for name, value in sorted(vectorizer.get_params().items())}
+    return schema
+
+
+def schema_hash(schema: Dict) -> str:
+    encoded = json.dumps(schema, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+@dataclass
+class ModelBundle:
+    """Modelos de uma versão, carregados juntos"""
+    version: Optional[str]
+    success_predictor: Any
+    pattern_clusterer: Any
+    vectorizer: Any
+    metadata: Dict = field(default_factory=dict)
+
+
+class ModelRegistry:
+    """Versões de modelos em disco e o ponteiro da versão ativa"""
+
+    def __init__(self, path: Path, keep: int = DEFAULT_KEEP):
+        self.path = path
+        self.versions_path = path / "versions"
+        self.keep = keep
+
+    def _write_json(self, path: Path, data: Dict):
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=2)
+        tmp.replace(path)
+
+    def register(self, bundle: ModelBundle, metadata: Dict) -> str:
+        """Grava uma nova versão completa; retorna o identificador"""
+        now = datetime.datetime.now()
+        version = f"{now.strftime('%Y%m%dT%H%M%S%f')}-{metadata.get('kind', 'model')}-{uuid.uuid4().hex[:6]}"
+        self.versions_path.mkdir(parents=True, exist_ok=True)
+        staging = self.versions_path / f".{version}.tmp"
+        staging.mkdir()
+        for name in ARTIFACTS:
+            # Sem compressão: arrays ficam mapeáveis com mmap_mode
+            joblib.dump(getattr(bundle, name), staging / f"{name}.joblib", compress=0)
+
+        start = time.perf_counter()
+        for name in ARTIFACTS:
+            joblib.load(staging / f"{name}.joblib", mmap_mode="r")
+        metadata = {
+            **metadata,
+            "version": version,
+            "created_at": now.isoformat(),
+            "load_seconds": round(time.perf_counter() - start, 4),
+            "size_bytes": sum(f.stat().st_size for f in staging.iterdir()),
+        }
+        if "feature_schema" in metadata:
+            metadata["feature_schema_hash"] = schema_hash(metadata["feature_schema"])
+        self._write_json(staging / METADATA_FILE, metadata)
+        staging.rename(self.versions_path / version)
+        bundle.version = version
+        bundle.metadata = metadata
+        return version
+
+    def promote(self, version: str):
+        """Torna ``version`` a versão ativa (troca atômica do ponteiro)"""
+        if not (self.versions_path / version / METADATA_FILE).exists():
+            raise ValueError(f"Unknown model version: {version}")
+        self.path.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.path / ".lock"):
+            previous = self.active_version()
+            self._write_json(self.path / ACTIVE_FILE, {
+                "version": version,
+                "previous": previous,
+                "promoted_at": datetime.datetime.now().isoformat()
+            })
+            self._prune(keep={version, previous})
+
+    def active_version(self) -> Optional[str]:
+        try:
+            with open(self.path / ACTIVE_FILE) as f:
+                return json.load(f).get("version")
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def metadata(self, version: str) -> Dict:
+        with open(self.versions_path / version / METADATA_FILE) as f:
+            return json.load(f)
+
+    def versions(self) -> List[str]:
+        """Versões completas, da mais antiga para a mais recente"""
+        if not self.versions_path.exists():
+            return []
+        return sorted(p.name for p in self.versions_path.iterdir()
+                      if p.is_dir() and not p.name.startswith(".") and (p / METADATA_FILE).exists())
+
+    def load(self, version: str) -> ModelBundle:
+        """Carrega os artefatos de uma versão (arrays mapeados em memória)"""
+        directory = self.versions_path / version
+        start = time.perf_counter()
+        models = {name: joblib.load(directory / f"{name}.joblib", mmap_mode="r") for name in ARTIFACTS}
+        metadata = self.metadata(version)
+        metadata["loaded_in_seconds"] = round(time.perf_counter() - start, 4)
+        return ModelBundle(version=version, metadata=metadata, **models)
+
+    def _prune(self, keep: set):
+        """Remove versões antigas além das ``self.keep`` mais recentes (nunca a ativa ou a anterior)"""
+        versions = self.versions()
+        for version in versions[:-self.keep] if self.keep else versions:
+            if version not in keep:
+                shutil.rmtree(self.versions_path / version, ignore_errors=True)
+
+
+class ModelCache:
+    """Versão ativa em memória, trocada sem bloquear predições em andamento"""
+
+    def __init__(self, registry: ModelRegistry, check_interval: float = 1.0):
+        self.registry = registry
+        self.check_interval = check_interval
+        self._bundle: Optional[ModelBundle] = None
+        self._checked_at = float("-inf")
+        self._loading = threading.Lock()
+
+    def put(self, bundle: ModelBundle):
+        """Instala um bundle já em memória (ex.: recém-treinado e promovido)"""
+        self._bundle = bundle
+        self._checked_at = time.monotonic()
+
+    def get(self) -> Optional[ModelBundle]:
+        """Bundle da versão ativa; recarrega quando outra versão foi promovida"""
+        bundle = self._bundle
+        if bundle is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return bundle
+        # Com um bundle em mãos, não espera outro thread terminar de carregar
+        if not self._loading.acquire(blocking=bundle is None):
+            return bundle
+        try:
+            bundle = self._bundle
+            active = self.registry.active_version()
+            if active is not None and (bundle is None or bundle.version != active):
+                self._bundle = bundle = self.registry.load(active)
+            self._checked_at = time.monotonic()
+            return bundle
+        finally:
+            self._loading.release()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Model Selection
+Validação cruzada temporal e busca de hiperparâmetros em paralelo
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, log_loss, roc_auc_score, silhouette_score
+
+DEFAULT_GRID = {
+    "n_estimators": [50, 100, 200],
+    "max_depth": [None, 12],
+    "n_clusters": [3, 5, 8],
+}
+DEFAULT_SPLITS = 4
+SILHOUETTE_SAMPLE = 2000
+
+# Arrays mapeados no processo trabalhador: nome -> (SharedMemory, ndarray)
+_SHARED: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+
+def time_splits(n_samples: int, n_splits: int = DEFAULT_SPLITS) -> List[Tuple[int, int]]:
+    """Folds de janela crescente como (fim do treino, fim do teste) sobre linhas em ordem temporal"""
+    block = n_samples // (n_splits + 1)
+    if block < 1:
+        raise ValueError(f"Need more than {n_splits} samples for {n_splits} time-ordered folds")
+    return [(block * k, block * (k + 1) if k < n_splits else n_samples) for k in range(1, n_splits + 1)]
+
+
+class SharedArrays:
+    """Copia arrays para memória compartilhada; ``spec`` permite mapeá-los em outro processo"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.segments: List[shared_memory.SharedMemory] = []
+        self.spec: Dict[str, Tuple[str, Tuple[int, ...], str]] = {}
+        try:
+            for key, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self.segments.append(segment)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+                self.spec[key] = (segment.name, array.shape, array.dtype.str)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+            segment.unlink()
+        self.segments = []
+
+
+def _attach(spec: Dict[str, Tuple[str, Tuple[int, ...], str]]):
+    """Inicializador do trabalhador: mapeia os arrays compartilhados, sem copiá-los"""
+    for key, (name, shape, dtype) in spec.items():
+        segment = shared_memory.SharedMemory(name=name)
+        _SHARED[key] = (segment, np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf))
+
+
+def _evaluate(task: Dict) -> Dict:
+    """Treina um candidato em um fold e mede no bloco seguinte"""
+    X, y = _SHARED["X"][1], _SHARED["y"][1]
+    train_end, test_end = task["fold"]
+    X_train, X_test = X[:train_end], X[train_end:test_end]
+    y_train, y_test = y[:train_end], y[train_end:test_end]
+    result = {"kind": task["kind"], "params": task["params"], "fold": task["fold"]}
+
+    if task["kind"] == "clusters":
+        model = KMeans(random_state=task["random_state"], n_init=3, **task["params"]).fit(X_train)
+        labels = model.predict(X_test)
+        result["silhouette"] = (
+            float(silhouette_score(X_test, labels, sample_size=min(SILHOUETTE_SAMPLE, len(X_test)),
+                                   random_state=task["random_state"]))
+            if 1 < len(set(labels)) < len(X_test) else np.nan
+        )
+        return result
+
+    model = RandomForestClassifier(random_state=task["random_state"], n_jobs=1, **task["params"])
+    model.fit(X_train, y_train)
+    proba = np.zeros(len(X_test))
+    if 1 in model.classes_:
+        proba = model.predict_proba(X_test)[:, list(model.classes_).index(1)]
+    result["accuracy"] = float(accuracy_score(y_test, (proba > 0.5).astype(int)))
+    # AUC só existe com as duas classes no bloco de teste
+    result["roc_auc"] = float(roc_auc_score(y_test, proba)) if len(set(y_test)) == 2 else np.nan
+    result["log_loss"] = float(log_loss(y_test, np.clip(proba, 1e-6, 1 - 1e-6), labels=[0, 1]))
+    return result
+
+
+def _tasks(n_samples: int, grid: Dict, n_splits: int, random_state: int) -> List[Dict]:
+    folds = time_splits(n_samples, n_splits)
+    forest = [{"n_estimators": n, "max_depth": d} for n in grid["n_estimators"] for d in grid["max_depth"]]
+    clusters = [{"n_clusters": k} for k in grid["n_clusters"]]
+    tasks = [{"kind": "forest", "params": p, "fold": f, "random_state": random_state} for p in forest for f in folds]
+    tasks += [{"kind": "clusters", "params": p, "fold": f, "random_state": random_state} for p in clusters for f in folds]
+    # As florestas maiores primeiro: o pool termina mais equilibrado
+    tasks.sort(key=lambda task: -task["params"].get("n_estimators", 0))
+    return tasks
+
+
+def _summarize(results: List[Dict], kind: str, metrics: Sequence[str]) -> List[Dict]:
+    """Média e desvio por candidato (folds sem métrica definida são ignorados)"""
+    candidates: Dict[str, Dict] = {}
+    for result in results:
+        if result["kind"] != kind:
+            continue
+        entry = candidates.setdefault(repr(sorted(result["params"].items())), {"params": result["params"], "values": []})
+        entry["values"].append(result)
+    summary = []
+    for entry in candidates.values():
+        row = {"params": entry["params"], "folds": len(entry["values"])}
+        for metric in metrics:
+            values = np.array([r[metric] for r in entry["values"]], dtype=float)
+            values = values[~np.isnan(values)]
+            row[f"{metric}_mean"] = float(values.mean()) if len(values) else None
+            row[f"{metric}_std"] = float(values.std()) if len(values) else None
+        summary.append(row)
+    return summary
+
+
+def search(X: np.ndarray, y: np.ndarray, grid: Optional[Dict] = None, n_splits: int = DEFAULT_SPLITS,
+           workers: Optional[int] = None, random_state: int = 42) -> Dict:
+    """Busca em grade com validação temporal; ``X``/``y`` devem estar em ordem de tempo.
+
+    The forest is ranked by mean held-out ROC AUC (accuracy when no fold
+    has both classes), the cluster count by mean held-out silhouette.
+    """
+    grid = {**DEFAULT_GRID, **(grid or {})}
+    workers = workers or os.cpu_count() or 1
+    tasks = _tasks(len(X), grid, n_splits, random_state)
+
+    start = time.perf_counter()
+    arrays = {"X": np.asarray(X, dtype=np.float64), "y": np.asarray(y)}
+    if workers == 1:
+        # Sem pool: mesmo código, arrays do próprio processo
+        _SHARED.update({key: (None, array) for key, array in arrays.items()})
+        try:
+            results = [_evaluate(task) for task in tasks]
+        finally:
+            _SHARED.clear()
+    else:
+        with SharedArrays(arrays) as shared:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(shared.spec,)) as pool:
+                results = list(pool.map(_evaluate, tasks))
+    seconds = time.perf_counter() - start
+
+    forest = _summarize(results, "forest", ("roc_auc", "accuracy", "log_loss"))
+    forest.sort(key=lambda row: -(row["roc_auc_mean"] if row["roc_auc_mean"] is not None else row["accuracy_mean"] or 0))
+    clusters = _summarize(results, "clusters", ("silhouette",))
+    clusters.sort(key=lambda row: -(row["silhouette_mean"] if row["silhouette_mean"] is not None else -1))
+
+    return {
+        "n_samples": len(X),
+        "n_splits": n_splits,
+        "workers": workers,
+        "tasks": len(tasks),
+        "seconds": round(seconds, 4),
+        "best_params": {**forest[0]["params"], **clusters[0]["params"]},
+        "held_out": {k: v for k, v in forest[0].items() if k != "params"},
+        "forest": forest,
+        "clusters": clusters,
+    }
+
+
+def scaling_report(X: np.ndarray, y: np.ndarray, worker_counts: Optional[Sequence[int]] = None, **kwargs) -> Dict:
+    """Tempo da mesma busca com 1..N processos (padrão: potências de 2 até os núcleos da máquina)"""
+    cores = os.cpu_count() or 1
+    if worker_counts is None:
+        worker_counts = sorted({min(2 ** i, cores) for i in range(cores.bit_length() + 1)})
+    runs = []
+    for workers in worker_counts:
+        result = search(X, y, workers=workers, **kwargs)
+        runs.append({"workers": workers, "seconds": result["seconds"]})
+    # Relativo à primeira contagem (normalmente 1 processo)
+    first = runs[0]
+    for run in runs:
+        run["speedup"] = round(first["seconds"] / run["seconds"], 2)
+        run["efficiency"] = round(run["speedup"] * first["workers"] / run["workers"], 2)
+    return {"cpu_count": cores, "n_samples": len(X), "best_params": result["best_params"], "runs": runs}
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Report Context
+Cálculos compartilhados entre as seções de um relatório de performance
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import time
+from contextlib import contextmanager
+from functools import cached_property
+from itertools import chain
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+CONTEXT_QUANTILES = (0.5, 0.9)
+DAILY_FIELDS = ("quality_score", "response_time_ms", "iteration_count")
+
+
+def context_statistics(df: pd.DataFrame) -> pd.DataFrame:
+    """Média, contagem e percentis de qualidade por contexto, em uma passada agrupada.
+
+    ``context_used`` is exploded once into a long format (one row per
+    context mention) with integer context codes; contexts keep the order
+    of their first appearance.
+    """
+    columns = ["count", "mean"] + [f"p{q * 100:g}" for q in CONTEXT_QUANTILES]
+    empty = pd.DataFrame(columns=columns, index=pd.Index([], name="context"))
+    if 'context_used' not in df.columns:
+        return empty
+
+    lists = [c if isinstance(c, list) else [] for c in df['context_used'].tolist()]
+    lengths = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+    if not lengths.sum():
+        return empty
+    codes, contexts = pd.factorize(np.array(list(chain.from_iterable(lists)), dtype=object))
+    if 'quality_score' in df.columns:
+        quality = pd.to_numeric(df['quality_score'], errors='coerce').to_numpy(dtype=float)
+    else:
+        quality = np.full(len(df), np.nan)
+    long = pd.DataFrame({"context": codes, "quality_score": np.repeat(quality, lengths)})
+
+    grouped = long.groupby("context", sort=True)["quality_score"]
+    stats = grouped.agg(["size", "mean"]).rename(columns={"size": "count"})
+    quantiles = grouped.quantile(list(CONTEXT_QUANTILES)).unstack()
+    quantiles.columns = columns[2:]
+    stats = stats.join(quantiles)
+    stats.index = pd.Index(contexts[stats.index], name="context")
+    return stats[columns]
+
+
+def linear_trends(daily: pd.DataFrame) -> Dict:
+    """Tendências lineares das médias diárias de qualidade, latência e iterações"""
+    from scipy import stats
+
+    if len(daily) < 2:
+        return {"insufficient_data": True}
+
+    x = range(len(daily))
+
+    quality_trend = stats.linregress(x, daily['quality_score'])
+    response_trend = stats.linregress(x, daily['response_time_ms'])
+    iteration_trend = stats.linregress(x, daily['iteration_count'])
+
+    return {
+        "quality_trend": {
+            "slope": quality_trend.slope,
+            "r_squared": quality_trend.rvalue ** 2,
+            "direction": "improving" if quality_trend.slope > 0 else "declining"
+        },
+        "response_time_trend": {
+            "slope": response_trend.slope,
+            "r_squared": response_trend.rvalue ** 2,
+            "direction": "faster" if response_trend.slope < 0 else "slower"
+        },
+        "iteration_trend": {
+            "slope": iteration_trend.slope,
+            "r_squared": iteration_trend.rvalue ** 2,
+            "direction": "fewer" if iteration_trend.slope < 0 else "more"
+        }
+    }
+
+
+class ReportContext:
+    """Valores derivados de um DataFrame, calculados uma vez por relatório"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.timings: Dict[str, float] = {}
+        self._open: List[float] = []
+
+    @contextmanager
+    def timed(self, section: str):
+        """Mede o tempo próprio de uma seção (sem as seções aninhadas)"""
+        start = time.perf_counter()
+        self._open.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._open.pop()
+            if self._open:
+                self._open[-1] += elapsed
+            self.timings[section] = self.timings.get(section, 0.0) + elapsed - nested
+
+    def timings_ms(self) -> Dict[str, float]:
+        return {section: round(seconds * 1000, 2) for section, seconds in self.timings.items()}
+
+    # -- valores compartilhados ---------------------------------------------
+
+    @cached_property
+    def timestamps(self) -> pd.Series:
+        with self.timed("parse_timestamps"):
+            return pd.to_datetime(self.df['timestamp'])
+
+    @cached_property
+    def dates(self) -> pd.Series:
+        timestamps = self.timestamps
+        with self.timed("parse_timestamps"):
+            return timestamps.dt.date
+
+    @cached_property
+    def daily(self) -> pd.DataFrame:
+        """Médias diárias de qualidade, latência e iterações, indexadas pela data"""
+        dates = self.dates
+        with self.timed("daily_aggregates"):
+            fields = [f for f in DAILY_FIELDS if f in self.df.columns]
+            return self.df[fields].groupby(dates.rename('date')).mean()
+
+    @cached_property
+    def pattern_groups(self) -> pd.DataFrame:
+        """Contagem e qualidade média por padrão, ordenado do mais usado"""
+        with self.timed("pattern_groupby"):
+            if 'pattern_applied' not in self.df.columns:
+                return pd.DataFrame(columns=["count", "quality"])
+            grouped = self.df.groupby('pattern_applied')['quality_score']
+            groups = grouped.agg(["size", "mean"]).rename(columns={"size": "count", "mean": "quality"})
+            return groups.sort_values("count", ascending=False, kind="stable")
+
+    @cached_property
+    def context_stats(self) -> pd.DataFrame:
+        with self.timed("context_groupby"):
+            return context_statistics(self.df)
+
+    @cached_property
+    def trends(self) -> Dict:
+        daily = self.daily
+        with self.timed("trends"):
+            return linear_trends(daily.reset_index())
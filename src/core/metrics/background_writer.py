@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Background Capture Writer
+Escritor em segundo plano para ingestão de interações em alta taxa
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class BackgroundCaptureWriter:
+    """Fila limitada + thread de escrita em lotes para um MetricsCollector"""
+
+    def __init__(self,
+                 collector,
+                 max_queue: int = 10000,
+                 flush_interval: float = 0.2,
+                 max_batch: int = 500):
+        self.collector = collector
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self.errors = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue(self, record: Dict, timeout: float = None, idempotency_key: Optional[str] = None):
+        """Enfileira um registro pronto; bloqueia se a fila estiver cheia"""
+        if self._closed:
+            raise RuntimeError("Background writer is closed")
+        self.queue.put((record, idempotency_key), timeout=timeout)
+
+    def flush(self):
+        """Aguarda até que todos os registros enfileirados tenham sido gravados"""
+        self.queue.join()
+
+    def close(self, timeout: float = None):
+        """Drena a fila e encerra a thread de escrita"""
+        if self._closed:
+            return
+        self._closed = True
+        self.queue.put(_STOP)
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+
+    def _next_batch(self) -> Tuple[List[Tuple[Dict, Optional[str]]], bool]:
+        """Coleta até max_batch registros ou até flush_interval após o primeiro"""
+        first = self.queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            try:
+                if batch:
+                    self.collector.write_records([record for record, _ in batch])
+            except Exception:
+                logger.exception("Failed to write %d queued interactions", len(batch))
+                self.errors += len(batch)
+                # Retentativas com a mesma chave devem gravar de novo
+                self.collector.release_keys([(key, record["id"]) for record, key in batch])
+            finally:
+                for _ in range(len(batch) + (1 if stop else 0)):
+                    self.queue.task_done()
+        self.collector.flush()
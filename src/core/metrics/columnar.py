@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Columnar Interaction Snapshot
+Snapshot colunar (NumPy) das interações para leituras analíticas
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import datetime
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.core.metrics.locking import LOCK_FILE, file_lock
+from src.core.metrics.storage import iter_legacy_files, iter_unseen_records, parse_timestamp
+
+SNAPSHOT_DIR = "snapshot"
+CURRENT_FILE = "CURRENT"
+META_FILE = "meta.json"
+LOAD_ATTEMPTS = 3
+
+INT_COLUMNS = ("prompt_tokens", "response_tokens")
+FLOAT_COLUMNS = ("response_time_ms", "quality_score", "iteration_count")
+# Colunas lógicas -> arrays físicos
+COLUMN_ARRAYS = {
+    "id": ("id",),
+    "timestamp": ("timestamp",),
+    **{name: (name,) for name in INT_COLUMNS + FLOAT_COLUMNS},
+    "pattern_applied": ("pattern_code",),
+    "context_used": ("context_offsets", "context_codes"),
+}
+ALL_COLUMNS = tuple(COLUMN_ARRAYS)
+
+
+def _number(value, default):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    return default
+
+
+class InteractionColumns:
+    """Interações em formato colunar (arrays NumPy + dicionários)"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], patterns: Sequence[str], contexts: Sequence[str]):
+        self.arrays = arrays
+        self.patterns = list(patterns)
+        self.contexts = list(contexts)
+
+    def __len__(self) -> int:
+        for name, array in self.arrays.items():
+            if name == "context_offsets":
+                return len(array) - 1
+            if name != "context_codes":
+                return len(array)
+        return 0
+
+    @property
+    def columns(self) -> List[str]:
+        return [name for name, parts in COLUMN_ARRAYS.items() if all(p in self.arrays for p in parts)]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict], columns: Sequence[str] = ALL_COLUMNS) -> "InteractionColumns":
+        """Codifica registros em colunas numa única passada"""
+        ids, timestamps = [], []
+        ints = {name: [] for name in INT_COLUMNS}
+        floats = {name: [] for name in FLOAT_COLUMNS}
+        pattern_codes, context_codes, context_offsets = [], [], [0]
+        patterns: Dict[str, int] = {}
+        contexts: Dict[str, int] = {}
+
+        for record in records:
+            ids.append(str(record.get("id", "")))
+            timestamps.append(parse_timestamp(record.get("timestamp")))
+            for name in INT_COLUMNS:
+                ints[name].append(_number(record.get(name), 0))
+            for name in FLOAT_COLUMNS:
+                floats[name].append(_number(record.get(name), np.nan))
+            pattern = record.get("pattern_applied")
+            pattern_codes.append(patterns.setdefault(pattern, len(patterns)) if isinstance(pattern, str) and pattern else -1)
+            used = record.get("context_used")
+            if isinstance(used, list):
+                context_codes.extend(contexts.setdefault(c, len(contexts)) for c in used if isinstance(c, str))
+            context_offsets.append(len(context_codes))
+
+        arrays = {
+            "id": np.array(ids, dtype=str),
+            "timestamp": np.array([np.datetime64(ts, "ms") if ts is not None else np.datetime64("NaT", "ms")
+                                   for ts in timestamps], dtype="datetime64[ms]"),
+            **{name: np.array(values, dtype=np.int32) for name, values in ints.items()},
+            **{name: np.array(values, dtype=np.float64) for name, values in floats.items()},
+            "pattern_code": np.array(pattern_codes, dtype=np.int32),
+            "context_offsets": np.array(context_offsets, dtype=np.int64),
+            "context_codes": np.array(context_codes, dtype=np.int32),
+        }
+        wanted = {part for column in columns for part in COLUMN_ARRAYS[column]}
+        return cls({k: v for k, v in arrays.items() if k in wanted}, list(patterns), list(contexts))
+
+    @classmethod
+    def concat(cls, parts: List["InteractionColumns"]) -> "InteractionColumns":
+        """Concatena blocos, unificando os dicionários de padrões e contextos"""
+        parts = [p for p in parts if len(p) or p.arrays]
+        if len(parts) == 1:
+            return parts[0]
+        names = set.intersection(*(set(p.arrays) for p in parts)) if parts else set()
+        patterns: Dict[str, int] = {}
+        contexts: Dict[str, int] = {}
+        for part in parts:
+            for value in part.patterns:
+                patterns.setdefault(value, len(patterns))
+            for value in part.contexts:
+                contexts.setdefault(value, len(contexts))
+
+        arrays = {}
+        for name in sorted(names):
+            if name == "context_offsets":
+                chunks, base = [np.zeros(1, dtype=np.int64)], 0
+                for part in parts:
+                    offsets = np.asarray(part.arrays[name])
+                    chunks.append(offsets[1:] - offsets[0] + base)
+                    base += int(offsets[-1] - offsets[0])
+                arrays[name] = np.concatenate(chunks)
+            elif name in ("pattern_code", "context_codes"):
+                chunks = []
+                for part in parts:
+                    dictionary, target = (part.patterns, patterns) if name == "pattern_code" else (part.contexts, contexts)
+                    # Código -1 (sem padrão) mapeia para a última posição da tabela
+                    remap = np.array([target[v] for v in dictionary] + [-1], dtype=np.int32)
+                    codes = np.asarray(part.arrays[name])
+                    if name == "context_codes" and "context_offsets" in part.arrays:
+                        offsets = part.arrays["context_offsets"]
+                        codes = codes[offsets[0]:offsets[-1]]
+                    chunks.append(remap[codes])
+                arrays[name] = np.concatenate(chunks)
+            else:
+                arrays[name] = np.concatenate([np.asarray(part.arrays[name]) for part in parts])
+        return cls(arrays, list(patterns), list(contexts))
+
+    def take(self, rows) -> "InteractionColumns":
+        """Seleciona linhas por máscara booleana, índices ou slice"""
+        if isinstance(rows, slice):
+            start, stop, step = rows.indices(len(self))
+            if step == 1:
+                # Slice contíguo: views sobre o mmap, sem cópia
+                arrays = {}
+                for name, array in self.arrays.items():
+                    if name == "context_offsets":
+                        arrays[name] = array[start:stop + 1]
+                    elif name != "context_codes":
+                        arrays[name] = array[start:stop]
+                if "context_codes" in self.arrays:
+                    arrays["context_codes"] = self.arrays["context_codes"]
+                return InteractionColumns(arrays, self.patterns, self.contexts)
+            rows = np.arange(start, stop, step)
+
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        arrays = {name: np.asarray(array)[rows] for name, array in self.arrays.items()
+                  if name not in ("context_offsets", "context_codes")}
+        if "context_offsets" in self.arrays:
+            offsets = np.asarray(self.arrays["context_offsets"])
+            starts, lengths = offsets[:-1][rows], np.diff(offsets)[rows]
+            new_offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+            gather = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+            arrays["context_offsets"] = new_offsets
+            arrays["context_codes"] = np.asarray(self.arrays["context_codes"])[gather]
+        return InteractionColumns(arrays, self.patterns, self.contexts)
+
+    def since(self, moment: datetime.datetime) -> "InteractionColumns":
+        """Linhas com timestamp estritamente posterior a ``moment``"""
+        return self.take(self.arrays["timestamp"] > np.datetime64(moment, "ms"))
+
+    # -- decodificação ------------------------------------------------------
+
+    def pattern_values(self) -> np.ndarray:
+        """``pattern_applied`` decodificado (objeto; None quando ausente)"""
+        table = np.array(self.patterns + [None], dtype=object)
+        return table[np.asarray(self.arrays["pattern_code"])]
+
+    def context_values(self) -> np.ndarray:
+        """Nomes de contexto de todas as linhas, achatados na ordem das linhas"""
+        offsets = self.arrays["context_offsets"]
+        codes = np.asarray(self.arrays["context_codes"])[offsets[0]:offsets[-1]]
+        return np.array(self.contexts, dtype=object)[codes] if len(codes) else np.array([], dtype=object)
+
+    def context_lists(self) -> List[List[str]]:
+        """``context_used`` como uma lista de nomes por linha"""
+        offsets = np.asarray(self.arrays["context_offsets"]) - self.arrays["context_offsets"][0]
+        flat = self.context_values().tolist()
+        return [flat[a:b] for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+    def to_dataframe(self, columns: Optional[Sequence[str]] = None):
+        """Monta um DataFrame direto das colunas, sem dicts por linha"""
+        import pandas as pd
+
+        data = {}
+        for column in columns or self.columns:
+            if column == "pattern_applied":
+                data[column] = self.pattern_values()
+            elif column == "context_used":
+                data[column] = pd.Series(self.context_lists(), dtype=object)
+            else:
+                data[column] = np.asarray(self.arrays[column])
+        return pd.DataFrame(data)
+
+
+# -- snapshot em disco -----------------------------------------------------------
+
+def current_generation(storage_path: Path) -> Optional[Path]:
+    snapshot_path = storage_path / SNAPSHOT_DIR
+    try:
+        name = (snapshot_path / CURRENT_FILE).read_text().strip()
+    except OSError:
+        return None
+    generation = snapshot_path / name
+    return generation if (generation / META_FILE).exists() else None
+
+
+def write_snapshot(storage_path: Path) -> Dict:
+    """Compacta todos os segmentos em um novo snapshot colunar"""
+    # Um escritor de snapshot por vez; leitores nunca esperam
+    with file_lock(storage_path / SNAPSHOT_DIR / LOCK_FILE):
+        return _write_snapshot(storage_path)
+
+
+def _write_snapshot(storage_path: Path) -> Dict:
+    watermark: Dict[str, int] = {}
+    records = []
+    for segment, end, record in iter_unseen_records(storage_path, {}):
+        records.append(record)
+        watermark[segment] = end
+
+    columns = InteractionColumns.from_records(records)
+    del records
+    order = np.argsort(columns["timestamp"], kind="stable")
+    columns = columns.take(order)
+
+    snapshot_path = storage_path / SNAPSHOT_DIR
+    generation = snapshot_path / f"gen-{time.time_ns()}-{os.getpid()}"
+    generation.mkdir(parents=True)
+    for name, array in columns.arrays.items():
+        np.save(generation / f"{name}.npy", array)
+    meta = {
+        "version": 1,
+        "rows": len(columns),
+        "patterns": columns.patterns,
+        "contexts": columns.contexts,
+        "watermark": watermark,
+        "created_at": datetime.datetime.now().isoformat(),
+    }
+    with open(generation / META_FILE, 'w') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    tmp = snapshot_path / f".{CURRENT_FILE}.{os.getpid()}.tmp"
+    tmp.write_text(generation.name)
+    tmp.replace(snapshot_path / CURRENT_FILE)
+
+    # Gerações antigas ficam órfãs após a troca do CURRENT
+    for old in snapshot_path.glob("gen-*"):
+        if old != generation:
+            shutil.rmtree(old, ignore_errors=True)
+
+    return {"rows": meta["rows"], "generation": generation.name,
+            "bytes": sum(f.stat().st_size for f in generation.iterdir())}
+
+
+def load_snapshot(storage_path: Path, columns: Sequence[str] = ALL_COLUMNS) -> Tuple[InteractionColumns, Dict[str, int]]:
+    """Mapeia em memória as colunas pedidas do snapshot atual; retorna (colunas, watermark)"""
+    for _ in range(LOAD_ATTEMPTS):
+        generation = current_generation(storage_path)
+        if generation is None:
+            break
+        try:
+            with open(generation / META_FILE) as f:
+                meta = json.load(f)
+            arrays = {}
+            for column in columns:
+                for name in COLUMN_ARRAYS[column]:
+                    arrays[name] = np.load(generation / f"{name}.npy", mmap_mode="r")
+        except FileNotFoundError:
+            # Outro processo publicou uma geração nova e removeu esta
+            continue
+        return InteractionColumns(arrays, meta["patterns"], meta["contexts"]), meta["watermark"]
+    return InteractionColumns.from_records([], columns), {}
+
+
+def load_columns(storage_path: Path,
+                 since: Optional[datetime.datetime] = None,
+                 columns: Sequence[str] = ALL_COLUMNS) -> InteractionColumns:
+    """Snapshot + registros gravados depois dele, opcionalmente a partir de ``since``"""
+    needed = tuple(columns) if since is None or "timestamp" in columns else tuple(columns) + ("timestamp",)
+    snapshot, watermark = load_snapshot(storage_path, needed)
+    if since is not None and len(snapshot):
+        # Snapshot ordenado por timestamp: o corte é uma busca binária
+        timestamps = snapshot["timestamp"]
+        start = int(np.searchsorted(timestamps, np.datetime64(since, "ms"), side="right"))
+        end = int(np.searchsorted(timestamps, np.datetime64("NaT", "ms"), side="left"))  # NaT ordena por último
+        snapshot = snapshot.take(slice(start, end))
+
+    # Com ``since``, só as partições que podem ter registros mais novos são lidas
+    tail = [record for _, _, record in iter_unseen_records(storage_path, watermark, since=since)]
+    tail.extend(iter_legacy_files(storage_path, since=since))
+    fresh = InteractionColumns.from_records(tail, needed)
+    if since is not None:
+        fresh = fresh.since(since)
+
+    combined = InteractionColumns.concat([snapshot, fresh])
+    if needed != tuple(columns):
+        combined.arrays.pop("timestamp", None)
+    return combined
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Interaction IDs
+IDs ordenáveis por tempo (estilo ULID) e deduplicação por chave de idempotência
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import datetime
+import hashlib
+import os
+import secrets
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.core.metrics.locking import file_lock
+
+CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_DECODE = {c: i for i, c in enumerate(CROCKFORD)}
+ID_LENGTH = 26
+RANDOM_BITS = 80
+MAX_TIMESTAMP_MS = (1 << 48) - 1
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(CROCKFORD[digit])
+    return "".join(reversed(chars))
+
+
+def _to_millis(moment: datetime.datetime) -> int:
+    return min(max(int(moment.timestamp() * 1000), 0), MAX_TIMESTAMP_MS)
+
+
+class InteractionIdGenerator:
+    """Gerador de IDs monotônicos, seguro entre threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def new_id(self, moment: Optional[datetime.datetime] = None) -> str:
+        """Gera um ID para ``moment`` (padrão: agora)"""
+        if moment is not None:
+            # Instante explícito (importação, teste): não afeta a sequência do relógio
+            return _encode((_to_millis(moment) << RANDOM_BITS) | secrets.randbits(RANDOM_BITS), ID_LENGTH)
+        with self._lock:
+            # Relógio que volta (NTP) não pode quebrar a ordem dos IDs
+            ms = max(int(time.time() * 1000), self._last_ms)
+            if ms == self._last_ms and self._last_random < (1 << RANDOM_BITS) - 1:
+                randomness = self._last_random + 1
+            else:
+                randomness = secrets.randbits(RANDOM_BITS)
+            self._last_ms = ms
+            self._last_random = randomness
+        return _encode((ms << RANDOM_BITS) | randomness, ID_LENGTH)
+
+
+_default_generator = InteractionIdGenerator()
+
+
+def new_interaction_id(moment: Optional[datetime.datetime] = None) -> str:
+    """Gera um ID ordenável pelo tempo com o gerador do processo"""
+    return _default_generator.new_id(moment)
+
+
+def is_interaction_id(value: str) -> bool:
+    return isinstance(value, str) and len(value) == ID_LENGTH and all(c in _DECODE for c in value)
+
+
+def id_timestamp(interaction_id: str) -> datetime.datetime:
+    """Extrai o instante (hora local) codificado em um ID"""
+    if not is_interaction_id(interaction_id):
+        raise ValueError(f"Not an interaction ID: {interaction_id!r}")
+    value = 0
+    for c in interaction_id:
+        value = value * 32 + _DECODE[c]
+    return datetime.datetime.fromtimestamp((value >> RANDOM_BITS) / 1000)
+
+
+def id_lower_bound(moment: datetime.datetime) -> str:
+    """Menor ID possível em ``moment``; IDs >= este valor são posteriores"""
+    return _encode(_to_millis(moment) << RANDOM_BITS, ID_LENGTH)
+
+
+class IdempotencyIndex:
+    """Conjunto de chaves de idempotência já vistas (memória + arquivo append-only)
+
+    Several processes may share the log: ``claim`` takes a file lock, reads
+    lines appended by others since the last read and only then decides.
+    ``release`` appends a ``RELEASED`` line for a claim whose write failed.
+    """
+
+    LOG_FILE = "keys.log"
+    LOCK_FILE = "keys.lock"
+    RELEASED = "-"
+
+    def __init__(self, storage_path: Path):
+        self.path = storage_path / "idempotency"
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._keys: Dict[str, str] = {}
+        self._offset = 0
+        self._lock = threading.Lock()
+        with file_lock(self.path / self.LOCK_FILE):
+            torn = self._catch_up()
+            self._handle = open(self.path / self.LOG_FILE, 'a', encoding='utf-8')
+            if torn:
+                # Linha incompleta de uma escrita interrompida: começa uma nova
+                self._handle.write("\n")
+                self._handle.flush()
+                self._catch_up()
+
+    @staticmethod
+    def digest(key: str) -> str:
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _catch_up(self) -> bool:
+        """Lê as linhas novas do disco; retorna True se a última estiver incompleta"""
+        try:
+            with open(self.path / self.LOG_FILE, 'rb') as f:
+                f.seek(self._offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        return True
+                    self._offset += len(line)
+                    parts = line.decode("utf-8", "replace").split()
+                    if len(parts) == 2 and parts[1] == self.RELEASED:
+                        self._keys.pop(parts[0], None)
+                    elif len(parts) == 2:
+                        self._keys[parts[0]] = parts[1]
+        except FileNotFoundError:
+            pass
+        return False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def get(self, key: str) -> Optional[str]:
+        """ID da interação registrada para a chave, se já vista"""
+        return self._keys.get(self.digest(key))
+
+    def claim(self, key: str, interaction_id: str) -> Optional[str]:
+        """Registra a chave para ``interaction_id``.
+
+        Returns the previously registered ID if the key was already claimed,
+        otherwise None (the caller owns the write).
+        """
+        digest = self.digest(key)
+        with self._lock:
+            existing = self._keys.get(digest)
+            if existing is not None:
+                return existing
+            with file_lock(self.path / self.LOCK_FILE):
+                self._catch_up()
+                existing = self._keys.get(digest)
+                if existing is not None:
+                    return existing
+                self._keys[digest] = interaction_id
+                self._append(f"{digest} {interaction_id}\n")
+        return None
+
+    def release(self, key: str, interaction_id: str):
+        """Libera a chave cuja gravação falhou (só se ainda aponta para ``interaction_id``)"""
+        digest = self.digest(key)
+        with self._lock:
+            with file_lock(self.path / self.LOCK_FILE):
+                self._catch_up()
+                if self._keys.get(digest) != interaction_id:
+                    return
+                del self._keys[digest]
+                self._append(f"{digest} {self.RELEASED}\n")
+
+    def _append(self, line: str):
+        self._handle.write(line)
+        self._handle.flush()
+        self._offset += len(line.encode("utf-8"))
+
+    def close(self):
+        with self._lock:
+            if not self._handle.closed:
+                self._handle.flush()
+                os.fsync(self._handle.fileno())
+                self._handle.close()
@@ -9,11 +9,20 @@ Location: Minas Gerais, Brazil
 
 import json
 import datetime
-import hashlib
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence
 from dataclasses import dataclass
 
+from src.core.metrics.background_writer import BackgroundCaptureWriter
+from src.core.metrics.columnar import ALL_COLUMNS, InteractionColumns, load_columns, write_snapshot
+from src.core.metrics.ids import IdempotencyIndex, new_interaction_id
+from src.core.metrics.retention import RetentionEngine, RetentionPolicy
+from src.core.metrics.rollups import InteractionRollup, RollupStore
+from src.core.metrics.sketches import DEFAULT_QUANTILES
+from src.core.metrics.storage import SegmentedLogStore, create_store
+from src.core.metrics.trends import TrendEngine
+
 @dataclass
 class InteractionMetrics:
     timestamp: str
@@ -27,68 +36,264 @@ class InteractionMetrics:
     success_indicators: List[str] = None
 
 class MetricsCollector:
-    def __init__(self, storage_path: Path = Path("data/metrics/data")):
+    def __init__(self,
+                 storage_path: Path = Path("data/metrics/data"),
+                 backend: str = "segmented",
+                 **store_options):
         self.storage_path = storage_path
         self.storage_path.mkdir(exist_ok=True)
+        self.store = create_store(backend, storage_path, **store_options)
+        # Agregados diários só existem para o log segmentado
+        self.rollups = RollupStore(storage_path) if isinstance(self.store, SegmentedLogStore) else None
+        self.writer: Optional[BackgroundCaptureWriter] = None
+        self._idempotency: Optional[IdempotencyIndex] = None
+        self.retention: Optional[RetentionEngine] = None
+        self._lock = threading.RLock()
+        
+    @property
+    def idempotency(self) -> IdempotencyIndex:
+        """Índice de chaves de idempotência, aberto no primeiro uso"""
+        with self._lock:
+            if self._idempotency is None:
+                self._idempotency = IdempotencyIndex(self.storage_path)
+        return self._idempotency
         
-    def capture_interaction(self, metrics: InteractionMetrics) -> str:
-        """Captura uma interação e retorna hash único"""
-        interaction_id = hashlib.md5(
-            f"{metrics.timestamp}{metrics.prompt_tokens}".encode()
-        ).hexdigest()[:8]
+    def _new_record(self, metrics: InteractionMetrics) -> Dict:
+        """Monta o registro armazenado, com um ID ordenável pelo tempo de captura"""
+        return {"id": new_interaction_id(), **metrics.__dict__}
+    
+    def write_records(self, records: List[Dict]):
+        """Grava registros prontos em um único append e atualiza os agregados"""
+        with self._lock:
+            positions = self.store.append_many(records)
+            if self.rollups is not None:
+                for record, position in zip(records, positions):
+                    self.rollups.observe(record, position)
         
-        file_path = self.storage_path / f"{interaction_id}.json"
-        with open(file_path, 'w') as f:
-            json.dump(metrics.__dict__, f, indent=2, ensure_ascii=False)
+    def capture_interaction(self, metrics: InteractionMetrics,
+                            idempotency_key: Optional[str] = None) -> str:
+        """Captura uma interação e retorna seu ID único.
+
+        With an ``idempotency_key`` already seen, nothing is written and the
+        ID of the original interaction is returned. If the write fails the
+        key is released, so a retry stores the interaction.
+        """
+        record = self._new_record(metrics)
+        with self._lock:
+            if idempotency_key is not None:
+                existing = self.idempotency.claim(idempotency_key, record["id"])
+                if existing is not None:
+                    return existing
+            try:
+                position = self.store.append(record)
+            except Exception:
+                self.release_keys([(idempotency_key, record["id"])])
+                raise
+            if self.rollups is not None:
+                self.rollups.observe(record, position)
             
-        return interaction_id
+        return record["id"]
+    
+    def capture_many(self, metrics_list: List[InteractionMetrics]) -> List[str]:
+        """Captura um lote de interações com uma única sincronização"""
+        records = [self._new_record(metrics) for metrics in metrics_list]
+        self.write_records(records)
+        return [record["id"] for record in records]
+    
+    def start_background_writer(self, **options) -> BackgroundCaptureWriter:
+        """Inicia (uma vez) o escritor em segundo plano usado por enqueue_interaction"""
+        with self._lock:
+            if self.writer is None:
+                self.writer = BackgroundCaptureWriter(self, **options)
+        return self.writer
+    
+    def enqueue_interaction(self, metrics: InteractionMetrics,
+                            idempotency_key: Optional[str] = None) -> str:
+        """Enfileira a interação para gravação em segundo plano e retorna o ID"""
+        writer = self.writer or self.start_background_writer()
+        record = self._new_record(metrics)
+        if idempotency_key is not None:
+            existing = self.idempotency.claim(idempotency_key, record["id"])
+            if existing is not None:
+                return existing
+        try:
+            # Se o lote falhar, o escritor libera a chave
+            writer.enqueue(record, idempotency_key=idempotency_key)
+        except Exception:
+            self.release_keys([(idempotency_key, record["id"])])
+            raise
+        return record["id"]
+    
+    def release_keys(self, claims: Sequence):
+        """Libera as chaves (chave, ID) de interações que não chegaram a ser gravadas"""
+        for key, interaction_id in claims:
+            if key is not None:
+                self.idempotency.release(key, interaction_id)
+    
+    def iter_interactions(self, days: Optional[int] = None, since_id: Optional[str] = None):
+        """Itera sobre as interações armazenadas (opcionalmente dos últimos N dias).
+
+        ``since_id`` restricts the scan to IDs >= it; since IDs are ordered by
+        capture time, ``id_lower_bound(moment)`` gives a capture-time cursor.
+        """
+        if self.writer is not None:
+            self.writer.flush()
+        since = None
+        if days is not None:
+            since = datetime.datetime.now() - datetime.timedelta(days=days)
+        return self.store.iter_records(since=since, since_id=since_id)
+    
+    def load_columns(self, days: Optional[int] = None, columns: Sequence[str] = ALL_COLUMNS) -> InteractionColumns:
+        """Lê as interações em formato colunar (snapshot mapeado + cauda recente)"""
+        if self.writer is not None:
+            self.writer.flush()
+        self.store.flush()
+        since = None
+        if days is not None:
+            since = datetime.datetime.now() - datetime.timedelta(days=days)
+        return load_columns(self.storage_path, since=since, columns=columns)
+    
+    def build_snapshot(self) -> Dict:
+        """Compacta os segmentos em um novo snapshot colunar"""
+        if not isinstance(self.store, SegmentedLogStore):
+            return {"error": "Snapshots require the segmented storage backend"}
+        if self.writer is not None:
+            self.writer.flush()
+        with self._lock:
+            self.store.flush()
+            return write_snapshot(self.storage_path)
+    
+    def apply_retention(self, policy: Optional[RetentionPolicy] = None, measure_scan: bool = False) -> Dict:
+        """Executa uma passada de retenção/compactação agora"""
+        if not isinstance(self.store, SegmentedLogStore):
+            return {"error": "Retention requires the segmented storage backend"}
+        if self.retention is None or policy is not None:
+            self.retention = RetentionEngine(self, policy)
+        return self.retention.run(measure_scan=measure_scan)
+    
+    def start_retention(self, policy: Optional[RetentionPolicy] = None, interval: float = 3600.0) -> RetentionEngine:
+        """Agenda passadas periódicas de retenção em segundo plano"""
+        if self.retention is None or policy is not None:
+            self.retention = RetentionEngine(self, policy)
+        self.retention.start(interval)
+        return self.retention
+    
+    def flush(self):
+        """Força a persistência das escritas pendentes"""
+        with self._lock:
+            self.store.flush()
+            if self.rollups is not None:
+                self.rollups.save()
+    
+    def close(self):
+        """Drena a fila em segundo plano, descarrega e fecha o armazenamento"""
+        if self.retention is not None:
+            self.retention.stop()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        with self._lock:
+            self.flush()
+            self.store.close()
+            if self._idempotency is not None:
+                self._idempotency.close()
+                self._idempotency = None
+    
+    def rebuild_rollups(self) -> Dict:
+        """Recalcula os agregados diários a partir dos dados brutos"""
+        if self.rollups is None:
+            return {"error": "Rollups require the segmented storage backend"}
+        with self._lock:
+            self.store.flush()
+            return self.rollups.rebuild()
+    
+    def window_rollup(self, days: int) -> InteractionRollup:
+        """Agrega a janela: dias inteiros pelos rollups, dia de corte pelos dados brutos"""
+        since = datetime.datetime.now() - datetime.timedelta(days=days)
+        
+        if self.writer is not None:
+            self.writer.flush()
+        
+        with self._lock:
+            if self.rollups is None:
+                return InteractionRollup.from_records(self.store.iter_records(since=since))
+            
+            self.store.flush()
+            return self.rollups.window(since)
     
     def generate_report(self, days: int = 7) -> Dict:
         """Gera relatório de métricas do período"""
-        interactions = []
-        cutoff_date = datetime.datetime.now() - datetime.timedelta(days=days)
-        
-        for file in self.storage_path.glob("*.json"):
-            with open(file) as f:
-                data = json.load(f)
-                if datetime.datetime.fromisoformat(data['timestamp']) > cutoff_date:
-                    interactions.append(data)
+        window = self.window_rollup(days)
         
-        if not interactions:
+        if window.count == 0:
             return {"error": "No interactions found"}
             
         return {
             "period_days": days,
-            "total_interactions": len(interactions),
-            "avg_quality_score": sum(i['quality_score'] for i in interactions) / len(interactions),
-            "avg_response_time": sum(i['response_time_ms'] for i in interactions) / len(interactions),
-            "avg_iterations": sum(i['iteration_count'] for i in interactions) / len(interactions),
-            "top_patterns": self._extract_top_patterns(interactions),
-            "quality_distribution": self._quality_distribution(interactions),
-            "recommendations": self._generate_recommendations(interactions)
+            "total_interactions": window.count,
+            "avg_quality_score": window.mean("quality_score"),
+            "avg_response_time": window.mean("response_time_ms"),
+            "avg_iterations": window.mean("iteration_count"),
+            "std_quality_score": window.std("quality_score"),
+            "std_response_time": window.std("response_time_ms"),
+            "top_patterns": self._extract_top_patterns(window),
+            "top_contexts": [context for context, _ in window.contexts.most_common(5)],
+            "quality_distribution": self._quality_distribution(window),
+            "percentiles": window.percentiles(),
+            "percentiles_by_pattern": window.percentiles_by("pattern"),
+            "recommendations": self._generate_recommendations(window)
         }
     
-    def _extract_top_patterns(self, interactions: List[Dict]) -> List[str]:
-        patterns = [i.get('pattern_applied') for i in interactions if i.get('pattern_applied')]
-        return list(set(patterns))[:5] if patterns else []
+    def percentile_report(self, days: int = 7, group_by: Optional[str] = None,
+                          quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Dict:
+        """Percentis de latência e tokens na janela, opcionalmente por padrão ou contexto"""
+        window = self.window_rollup(days)
+        
+        if window.count == 0:
+            return {"error": "No interactions found"}
+        
+        report = {
+            "period_days": days,
+            "total_interactions": window.count,
+            "percentiles": window.percentiles(quantiles),
+        }
+        if group_by is not None:
+            report["group_by"] = group_by
+            report["groups"] = window.percentiles_by(group_by, quantiles)
+        return report
+    
+    def trend_report(self, rebuild: bool = False) -> Dict:
+        """Médias móveis, EWMA e alertas de anomalia sobre os dias completos"""
+        if self.rollups is None:
+            return {"error": "Trends require the segmented storage backend"}
+        if self.writer is not None:
+            self.writer.flush()
+        with self._lock:
+            self.store.flush()
+            self.rollups.refresh()
+            engine = TrendEngine(self.storage_path)
+            if rebuild:
+                engine.rebuild(self.rollups)
+            else:
+                engine.update(self.rollups)
+        if engine.last_day is None:
+            return {"error": "No complete days of data yet"}
+        return engine.report()
+    
+    def _extract_top_patterns(self, window: InteractionRollup) -> List[str]:
+        return [pattern for pattern, _ in window.patterns.most_common(5)]
     
-    def _quality_distribution(self, interactions: List[Dict]) -> Dict[str, int]:
-        distribution = {"high": 0, "medium": 0, "low": 0}
-        for i in interactions:
-            score = i['quality_score']
-            if score >= 0.8: distribution["high"] += 1
-            elif score >= 0.5: distribution["medium"] += 1
-            else: distribution["low"] += 1
-        return distribution
+    def _quality_distribution(self, window: InteractionRollup) -> Dict[str, int]:
+        return dict(window.quality_levels)
     
-    def _generate_recommendations(self, interactions: List[Dict]) -> List[str]:
+    def _generate_recommendations(self, window: InteractionRollup) -> List[str]:
         recommendations = []
         
-        avg_quality = sum(i['quality_score'] for i in interactions) / len(interactions)
+        avg_quality = window.mean("quality_score")
         if avg_quality < 0.7:
             recommendations.append("Consider reviewing prompt composition strategy")
             
-        avg_iterations = sum(i['iteration_count'] for i in interactions) / len(interactions)
+        avg_iterations = window.mean("iteration_count")
         if avg_iterations > 2:
             recommendations.append("High iteration count suggests need for clearer initial prompts")
             
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+File Locking
+Travas de arquivo entre processos para o armazenamento de métricas
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+LOCK_FILE = ".lock"
+
+
+def try_lock(handle, shared: bool = False) -> bool:
+    """Tenta travar um arquivo aberto sem bloquear; True se conseguiu"""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(handle.fileno(), (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False, blocking: bool = True):
+    """Trava ``path`` (criado se preciso) durante o bloco.
+
+    Yields True when the lock is held; with ``blocking=False`` it yields
+    False instead of waiting when another process holds it.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is None:
+            yield True
+            return
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            yield False
+            return
+        yield True
+    finally:
+        os.close(fd)
+
+
+def partition_lock(partition_dir: Path, shared: bool = False, blocking: bool = True):
+    """Trava de uma partição: leitores compartilham, manutenção é exclusiva"""
+    return file_lock(partition_dir / LOCK_FILE, shared=shared, blocking=blocking)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Metrics Retention
+Retenção, downsampling e compactação do armazenamento de métricas
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.core.metrics.columnar import current_generation, write_snapshot
+from src.core.metrics.storage import (
+    SegmentedLogStore,
+    iter_stored_interactions,
+    list_partitions,
+    partition_bytes,
+    partition_segments,
+)
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "retention.json"
+
+
+@dataclass
+class RetentionPolicy:
+    raw_days: int = 90
+    target_segment_bytes: Optional[int] = None  # padrão: max_segment_bytes do store
+    compact: bool = True
+
+
+def _storage_bytes(storage_path: Path) -> int:
+    return sum(f.stat().st_size for f in (storage_path / "segments").rglob("*.jsonl"))
+
+
+def _timed_scan(storage_path: Path) -> float:
+    start = time.perf_counter()
+    for _ in iter_stored_interactions(storage_path):
+        pass
+    return time.perf_counter() - start
+
+
+class RetentionEngine:
+    """Aplica uma RetentionPolicy a um MetricsCollector"""
+
+    def __init__(self, collector, policy: Optional[RetentionPolicy] = None):
+        if not isinstance(collector.store, SegmentedLogStore):
+            raise ValueError("Retention requires the segmented storage backend")
+        self.collector = collector
+        self.policy = policy or RetentionPolicy()
+        self.state_path = collector.storage_path / "segments" / STATE_FILE
+        self._compacted: Dict[str, int] = self._load_state()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load_state(self) -> Dict[str, int]:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f).get("compacted", {})
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self):
+        tmp = self.state_path.with_name(f".{STATE_FILE}.{os.getpid()}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump({"version": 1, "compacted": self._compacted}, f, indent=1, sort_keys=True)
+        tmp.replace(self.state_path)
+
+    def run(self, now: Optional[datetime.datetime] = None, measure_scan: bool = False) -> Dict:
+        """Executa uma passada de retenção; retorna o que foi feito"""
+        collector = self.collector
+        store, rollups = collector.store, collector.rollups
+        storage_path = collector.storage_path
+        cutoff_day = ((now or datetime.datetime.now()) - datetime.timedelta(days=self.policy.raw_days)).strftime("%Y-%m-%d")
+
+        if collector.writer is not None:
+            collector.writer.flush()
+        scan_before = _timed_scan(storage_path) if measure_scan else None
+
+        with collector._lock:
+            store.flush()
+            bytes_before = _storage_bytes(storage_path)
+            segments_before = len(store.segment_files())
+            # Downsampling: tudo que será expirado já está nos agregados diários
+            rollups.refresh()
+
+            expired = []
+            for partition in list_partitions(storage_path):
+                if partition < cutoff_day and partition[:1].isdigit():
+                    if store.drop_partition(partition, before=partial(rollups.fold_segments, partition)) is None:
+                        continue  # em uso por outro processo; fica para a próxima passada
+                    rollups.archive_partition(partition)
+                    self._compacted.pop(partition, None)
+                    expired.append(partition)
+
+            compacted_segments = 0
+            if self.policy.compact:
+                for partition in list_partitions(storage_path):
+                    size = partition_bytes(storage_path, partition)
+                    if self._compacted.get(partition) == size or len(partition_segments(storage_path, partition)) < 2:
+                        continue
+                    merged = store.compact_partition(
+                        partition,
+                        self.policy.target_segment_bytes,
+                        before=partial(rollups.fold_segments, partition),
+                        after=partial(rollups.mark_partition_folded, partition),
+                    )
+                    compacted_segments += merged
+                    self._compacted[partition] = size
+
+            # Outros processos recarregam os agregados ao ver a nova época
+            rollups.save(bump_epoch=bool(expired or compacted_segments))
+            self._save_state()
+            bytes_after = _storage_bytes(storage_path)
+            segments_after = len(store.segment_files())
+
+            # O snapshot colunar ainda contém as linhas expiradas, e seu
+            # watermark aponta para segmentos que a compactação reescreveu
+            if (expired or compacted_segments) and current_generation(storage_path) is not None:
+                write_snapshot(storage_path)
+
+        result = {
+            "cutoff_day": cutoff_day,
+            "partitions_expired": len(expired),
+            "segments_before": segments_before,
+            "segments_after": segments_after,
+            "segments_merged": compacted_segments,
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "bytes_reclaimed": bytes_before - bytes_after,
+        }
+        if measure_scan:
+            scan_after = _timed_scan(storage_path)
+            result["scan_seconds_before"] = round(scan_before, 4)
+            result["scan_seconds_after"] = round(scan_after, 4)
+            result["scan_seconds_change"] = round(scan_after - scan_before, 4)
+        return result
+
+    # -- execução em segundo plano -----------------------------------------
+
+    def start(self, interval: float = 3600.0):
+        """Executa passadas periódicas em uma thread daemon"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval,), name="metrics-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.run()
+            except Exception:
+                # Uma passada com falha não derruba a thread; tenta de novo no próximo ciclo
+                logger.exception("Retention pass failed")
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Interaction Rollups
+Agregados diários mantidos incrementalmente para os relatórios de métricas
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import datetime
+import json
+import math
+import os
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.core.metrics.locking import file_lock
+from src.core.metrics.sketches import DEFAULT_QUANTILES, QuantileSketch
+from src.core.metrics.storage import (
+    iter_legacy_files,
+    iter_partition,
+    iter_segment_from,
+    iter_unseen_records,
+    partition_key,
+)
+
+NUMERIC_FIELDS = ("quality_score", "response_time_ms", "iteration_count")
+SKETCH_FIELDS = ("response_time_ms", "prompt_tokens", "response_tokens")
+QUALITY_BINS = 10
+STATE_FILE = "state.json"
+STATE_VERSION = 2
+EPOCH_FILE = "epoch"
+LOCK_FILE = ".lock"
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _dump(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _new_sketches() -> Dict[str, QuantileSketch]:
+    return {field: QuantileSketch() for field in SKETCH_FIELDS}
+
+
+def _merge_sketches(target: Dict[str, QuantileSketch], source: Dict[str, QuantileSketch]):
+    for field, sketch in source.items():
+        target.setdefault(field, QuantileSketch()).merge(sketch)
+
+
+class InteractionRollup:
+    """Agregado mesclável de um conjunto de interações"""
+
+    def __init__(self):
+        self.count = 0
+        self.stats = {field: {"n": 0, "sum": 0.0, "sumsq": 0.0} for field in NUMERIC_FIELDS}
+        self.quality_levels = {"high": 0, "medium": 0, "low": 0}
+        self.quality_histogram = [0] * QUALITY_BINS
+        self.patterns = Counter()
+        self.contexts = Counter()
+        self.sketches = _new_sketches()
+        self.pattern_sketches: Dict[str, Dict[str, QuantileSketch]] = {}
+        self.context_sketches: Dict[str, Dict[str, QuantileSketch]] = {}
+        # Qualidade por padrão/contexto: {"n", "sum"}
+        self.pattern_quality: Dict[str, Dict[str, float]] = {}
+        self.context_quality: Dict[str, Dict[str, float]] = {}
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "InteractionRollup":
+        rollup = cls()
+        for record in records:
+            rollup.add(record)
+        return rollup
+
+    def add(self, record: Dict):
+        """Incorpora uma interação ao agregado"""
+        self.count += 1
+        for field in NUMERIC_FIELDS:
+            value = record.get(field)
+            if _is_number(value):
+                stat = self.stats[field]
+                stat["n"] += 1
+                stat["sum"] += value
+                stat["sumsq"] += value * value
+
+        score = record.get("quality_score")
+        if _is_number(score):
+            if score >= 0.8:
+                self.quality_levels["high"] += 1
+            elif score >= 0.5:
+                self.quality_levels["medium"] += 1
+            else:
+                self.quality_levels["low"] += 1
+            self.quality_histogram[min(max(int(score * QUALITY_BINS), 0), QUALITY_BINS - 1)] += 1
+
+        pattern = record.get("pattern_applied")
+        if pattern:
+            self.patterns[pattern] += 1
+        contexts = record.get("context_used")
+        contexts = [c for c in contexts if isinstance(c, str)] if isinstance(contexts, list) else []
+        self.contexts.update(contexts)
+        if _is_number(score):
+            keyed = [(self.pattern_quality, pattern)] if pattern else []
+            keyed += [(self.context_quality, context) for context in set(contexts)]
+            for groups, key in keyed:
+                stat = groups.get(key)
+                if stat is None:
+                    stat = groups[key] = {"n": 0, "sum": 0.0}
+                stat["n"] += 1
+                stat["sum"] += score
+
+        values = [(field, record.get(field)) for field in SKETCH_FIELDS if _is_number(record.get(field))]
+        if not values:
+            return
+        groups = [self.sketches]
+        if pattern:
+            if pattern not in self.pattern_sketches:
+                self.pattern_sketches[pattern] = _new_sketches()
+            groups.append(self.pattern_sketches[pattern])
+        for context in set(contexts):
+            if context not in self.context_sketches:
+                self.context_sketches[context] = _new_sketches()
+            groups.append(self.context_sketches[context])
+        for field, value in values:
+            for sketches in groups:
+                sketches[field].add(value)
+
+    def merge(self, other: "InteractionRollup") -> "InteractionRollup":
+        """Soma outro agregado a este (in-place)"""
+        self.count += other.count
+        for field in NUMERIC_FIELDS:
+            for key in ("n", "sum", "sumsq"):
+                self.stats[field][key] += other.stats[field][key]
+        for level, value in other.quality_levels.items():
+            self.quality_levels[level] += value
+        self.quality_histogram = [a + b for a, b in zip(self.quality_histogram, other.quality_histogram)]
+        self.patterns.update(other.patterns)
+        self.contexts.update(other.contexts)
+        _merge_sketches(self.sketches, other.sketches)
+        for mine, theirs in ((self.pattern_sketches, other.pattern_sketches),
+                             (self.context_sketches, other.context_sketches)):
+            for key, sketches in theirs.items():
+                _merge_sketches(mine.setdefault(key, {}), sketches)
+        for mine, theirs in ((self.pattern_quality, other.pattern_quality),
+                             (self.context_quality, other.context_quality)):
+            for key, stat in theirs.items():
+                target = mine.setdefault(key, {"n": 0, "sum": 0.0})
+                target["n"] += stat["n"]
+                target["sum"] += stat["sum"]
+        return self
+
+    def mean(self, field: str) -> float:
+        stat = self.stats[field]
+        return stat["sum"] / stat["n"] if stat["n"] else 0.0
+
+    def std(self, field: str) -> float:
+        stat = self.stats[field]
+        if stat["n"] < 2:
+            return 0.0
+        variance = (stat["sumsq"] - stat["sum"] ** 2 / stat["n"]) / (stat["n"] - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def percentiles(self, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> Dict[str, Dict]:
+        """Percentis de latência e tokens do agregado"""
+        return {field: sketch.quantiles(quantiles) for field, sketch in self.sketches.items() if sketch.count}
+
+    def percentiles_by(self, dimension: str, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> Dict[str, Dict]:
+        """Percentis por padrão (``"pattern"``) ou por contexto (``"context"``)"""
+        groups = {"pattern": self.pattern_sketches, "context": self.context_sketches}.get(dimension)
+        if groups is None:
+            raise ValueError(f"Unknown dimension: {dimension}")
+        return {
+            key: {field: sketch.quantiles(quantiles) for field, sketch in sketches.items() if sketch.count}
+            for key, sketches in sorted(groups.items())
+        }
+
+    def to_dict(self) -> Dict:
+        def dump(groups):
+            return {key: {f: s.to_dict() for f, s in sketches.items()} for key, sketches in groups.items()}
+
+        return {
+            "count": self.count,
+            "stats": self.stats,
+            "quality_levels": self.quality_levels,
+            "quality_histogram": self.quality_histogram,
+            "patterns": dict(self.patterns),
+            "contexts": dict(self.contexts),
+            "sketches": {field: sketch.to_dict() for field, sketch in self.sketches.items()},
+            "pattern_sketches": dump(self.pattern_sketches),
+            "context_sketches": dump(self.context_sketches),
+            "pattern_quality": self.pattern_quality,
+            "context_quality": self.context_quality,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "InteractionRollup":
+        rollup = cls()
+        rollup.count = data.get("count", 0)
+        for field in NUMERIC_FIELDS:
+            rollup.stats[field].update(data.get("stats", {}).get(field, {}))
+        rollup.quality_levels.update(data.get("quality_levels", {}))
+        rollup.quality_histogram = list(data.get("quality_histogram", rollup.quality_histogram))
+        rollup.patterns = Counter(data.get("patterns", {}))
+        rollup.contexts = Counter(data.get("contexts", {}))
+
+        def load(sketches):
+            return {field: QuantileSketch.from_dict(sketch) for field, sketch in sketches.items()}
+
+        rollup.sketches.update(load(data.get("sketches", {})))
+        rollup.pattern_sketches = {k: load(v) for k, v in data.get("pattern_sketches", {}).items()}
+        rollup.context_sketches = {k: load(v) for k, v in data.get("context_sketches", {}).items()}
+        # Ausente em estados anteriores; rebuild recalcula a partir dos dados brutos
+        rollup.pattern_quality = {k: dict(v) for k, v in data.get("pattern_quality", {}).items()}
+        rollup.context_quality = {k: dict(v) for k, v in data.get("context_quality", {}).items()}
+        return rollup
+
+
+class RollupStore:
+    """Agregados diários em memória e em disco, com watermark por segmento"""
+
+    def __init__(self, storage_path: Path, persist_every: int = 500, persist_interval: float = 1.0):
+        self.storage_path = storage_path
+        self.rollups_path = storage_path / "rollups"
+        self.rollups_path.mkdir(parents=True, exist_ok=True)
+        # Salva após persist_every registros, no máximo uma vez por persist_interval
+        # segundos; o que não foi salvo é reincorporado pelo watermark
+        self.persist_every = persist_every
+        self.persist_interval = persist_interval
+        self._last_save = time.monotonic()
+
+        self.days: Dict[str, InteractionRollup] = {}
+        self.watermark: Dict[str, int] = {}
+        # Dias cujos dados brutos foram expirados: só existem como agregados
+        self.archived: set = set()
+        self.epoch = 0
+        self._pending = 0
+        # JSON já codificado por dia: só dias alterados são recodificados ao salvar
+        self._encoded: Dict[str, str] = {}
+        self._load()
+
+    # -- persistência -------------------------------------------------------
+
+    def _disk_epoch(self) -> int:
+        try:
+            return int((self.rollups_path / EPOCH_FILE).read_text())
+        except (OSError, ValueError):
+            return 0
+
+    def _reload(self):
+        self.days, self.watermark, self.archived, self.epoch = {}, {}, set(), 0
+        self._pending = 0
+        self._encoded = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.rollups_path / STATE_FILE) as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if state.get("version") != STATE_VERSION:
+            # Formato antigo (sem sketches): refresh recalcula a partir do zero
+            return
+        self.days = {day: InteractionRollup.from_dict(data) for day, data in state.get("days", {}).items()}
+        self.watermark = state.get("watermark", {})
+        self.archived = set(state.get("archived", []))
+        self.epoch = state.get("epoch", 0)
+
+    def save(self, bump_epoch: bool = False):
+        """Grava agregados e watermark juntos, de forma atômica.
+
+        If another process changed the segment layout since this state was
+        loaded, the state is discarded and reloaded instead. ``bump_epoch``
+        is for the process that just changed the layout.
+        """
+        with file_lock(self.rollups_path / LOCK_FILE):
+            disk_epoch = self._disk_epoch()
+            if disk_epoch > self.epoch and not bump_epoch:
+                self._reload()
+                return
+            if bump_epoch:
+                self.epoch = max(disk_epoch, self.epoch) + 1
+            self._write_state()
+            if bump_epoch:
+                tmp = self.rollups_path / f".{EPOCH_FILE}.{os.getpid()}.tmp"
+                tmp.write_text(str(self.epoch))
+                tmp.replace(self.rollups_path / EPOCH_FILE)
+
+    def _encode_day(self, day: str) -> str:
+        encoded = self._encoded.get(day)
+        if encoded is None:
+            encoded = _dump(self.days[day].to_dict())
+            self._encoded[day] = encoded
+        return encoded
+
+    def _write_state(self):
+        days = ",".join(f"{_dump(day)}:{self._encode_day(day)}" for day in sorted(self.days))
+        state = (f'{{"version":{STATE_VERSION},"epoch":{self.epoch},"days":{{{days}}},'
+                 f'"watermark":{_dump(self.watermark)},"archived":{_dump(sorted(self.archived))}}}')
+        tmp = self.rollups_path / f".{STATE_FILE}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(state)
+        tmp.replace(self.rollups_path / STATE_FILE)
+        self._pending = 0
+        self._last_save = time.monotonic()
+
+    # -- atualização --------------------------------------------------------
+
+    def _fold(self, record: Dict):
+        day = partition_key(record)
+        self.days.setdefault(day, InteractionRollup()).add(record)
+        self._encoded.pop(day, None)
+        self._pending += 1
+
+    def observe(self, record: Dict, position: Optional[Tuple[str, int, int]]):
+        """Incorpora uma interação recém-gravada em (segmento, início, fim).
+
+        If the write is not contiguous with the watermark (another writer
+        appended in between) it is left for ``refresh`` to fold in.
+        """
+        if position is None:
+            return
+        segment, start, end = position
+        if self.watermark.get(segment, 0) != start:
+            return
+        self._fold(record)
+        self.watermark[segment] = end
+        if self._pending >= self.persist_every and time.monotonic() - self._last_save >= self.persist_interval:
+            self.save()
+
+    def refresh(self) -> int:
+        """Incorpora registros gravados além do watermark; retorna quantos"""
+        if self._disk_epoch() > self.epoch:
+            self._reload()
+        folded = 0
+        for segment, end, record in iter_unseen_records(self.storage_path, self.watermark):
+            self._fold(record)
+            self.watermark[segment] = end
+            folded += 1
+        if folded:
+            self.save()
+        return folded
+
+    def rebuild(self) -> Dict[str, int]:
+        """Descarta os agregados e os recalcula a partir dos dados brutos.
+
+        Archived days have no raw data left, so their rollups are kept.
+        """
+        self.days = {day: rollup for day, rollup in self.days.items() if day in self.archived}
+        self._encoded = {}
+        self.watermark = {}
+        folded = self.refresh()
+        self.save(bump_epoch=True)
+        return {"days": len(self.days), "interactions": folded}
+
+    def archive_partition(self, partition: str):
+        """Marca o dia como só-agregado antes de seus dados brutos serem removidos"""
+        self.archived.add(partition)
+        self.forget_partition(partition)
+
+    def forget_partition(self, partition: str):
+        """Descarta o watermark dos segmentos de uma partição"""
+        prefix = f"{partition}/"
+        self.watermark = {k: v for k, v in self.watermark.items() if not k.startswith(prefix)}
+
+    def fold_segments(self, partition: str, segments: Iterable[Path]) -> int:
+        """Incorpora o que falta de segmentos que o chamador mantém travados.
+
+        Used by maintenance right before it rewrites or deletes segments, so
+        nothing appended after the last ``refresh`` is lost. Reads without
+        taking the partition lock, which the caller already holds.
+        """
+        folded = 0
+        for segment in segments:
+            key = f"{partition}/{segment.name}"
+            for end, record in iter_segment_from(segment, self.watermark.get(key, 0)):
+                self._fold(record)
+                self.watermark[key] = end
+                folded += 1
+        return folded
+
+    def mark_partition_folded(self, partition: str, segments: Iterable[Path]):
+        """Após uma compactação sem perdas, os segmentos fundidos já estão incorporados"""
+        prefix = f"{partition}/"
+        partition_dir = self.storage_path / "segments" / partition
+        self.watermark = {
+            k: v for k, v in self.watermark.items()
+            if not k.startswith(prefix) or (partition_dir / k[len(prefix):]).exists()
+        }
+        for segment in segments:
+            self.watermark[f"{prefix}{segment.name}"] = segment.stat().st_size
+
+    # -- consulta -----------------------------------------------------------
+
+    def window(self, since: datetime.datetime) -> InteractionRollup:
+        """Agrega a janela: dias inteiros pelos rollups, dia de corte pelos dados brutos.
+
+        If the cutoff day is archived its raw data is gone, so the whole
+        day's rollup is used (downsampled data has daily resolution).
+        """
+        self.refresh()
+        cutoff_day = since.strftime("%Y-%m-%d")
+        window = self.merge_days(self.days_after(cutoff_day))
+        if cutoff_day in self.archived:
+            window.merge(self.merge_days([cutoff_day]))
+        else:
+            # Só o dia que contém o corte precisa de varredura por registro
+            window.merge(InteractionRollup.from_records(iter_partition(self.storage_path, cutoff_day, since=since)))
+        # Arquivos legados ainda não migrados
+        window.merge(InteractionRollup.from_records(iter_legacy_files(self.storage_path, since=since)))
+        return window
+
+    def merge_days(self, days: Iterable[str]) -> InteractionRollup:
+        """Mescla os agregados dos dias pedidos (O(dias))"""
+        merged = InteractionRollup()
+        for day in days:
+            rollup = self.days.get(day)
+            if rollup is not None:
+                merged.merge(rollup)
+        return merged
+
+    def days_after(self, day: str) -> List[str]:
+        """Dias com agregados estritamente posteriores a ``day`` (YYYY-MM-DD)"""
+        return [d for d in self.days if d > day and d[:1].isdigit()]
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Quantile Sketches
+Sketches de quantis mescláveis (estilo DDSketch) para latência e tokens
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import math
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class QuantileSketch:
+    """Sketch de quantis com erro relativo limitado (DDSketch)"""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = Counter()
+        self.zero_count = 0
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    @classmethod
+    def from_values(cls, values: Iterable[float], **options) -> "QuantileSketch":
+        sketch = cls(**options)
+        for value in values:
+            sketch.add(value)
+        return sketch
+
+    def add(self, value: float):
+        """Incorpora um valor"""
+        if value > 0:
+            self.bins[math.ceil(math.log(value) / self._log_gamma)] += 1
+        else:
+            self.zero_count += 1
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Soma outro sketch a este (in-place); exige a mesma precisão"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        self.bins.update(other.bins)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        for bound, pick in (("min", min), ("max", max)):
+            theirs = getattr(other, bound)
+            if theirs is not None:
+                mine = getattr(self, bound)
+                setattr(self, bound, theirs if mine is None else pick(mine, theirs))
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Valor no quantil ``q`` (0-1), ou None se o sketch estiver vazio"""
+        if self.count == 0:
+            return None
+        if not 0 <= q <= 1:
+            raise ValueError("q must be in [0, 1]")
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return max(min(0.0, self.max), self.min)
+        seen = self.zero_count
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                # Ponto médio do bucket (em escala relativa), limitado por min/max
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def quantiles(self, qs: Iterable[float] = DEFAULT_QUANTILES) -> Dict[str, Optional[float]]:
+        """Quantis nomeados como p50/p90/p99"""
+        return {f"p{q * 100:g}": self.quantile(q) for q in qs}
+
+    def to_dict(self) -> Dict:
+        return {
+            "alpha": self.relative_accuracy,
+            "bins": {str(k): v for k, v in sorted(self.bins.items())},
+            "zero": self.zero_count,
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "QuantileSketch":
+        sketch = cls(data.get("alpha", DEFAULT_RELATIVE_ACCURACY))
+        sketch.bins = Counter({int(k): v for k, v in data.get("bins", {}).items()})
+        sketch.zero_count = data.get("zero", 0)
+        sketch.count = data.get("count", 0)
+        sketch.min = data.get("min")
+        sketch.max = data.get("max")
+        return sketch
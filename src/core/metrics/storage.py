@@ -0,0 +1,771 @@
+#!/usr/bin/env python3
+"""
+Interaction Storage Backends
+Backends de armazenamento para as interações capturadas pelo MetricsCollector
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.core.metrics.locking import file_lock, partition_lock, try_lock
+
+FSYNC_POLICIES = ("always", "interval", "never")
+DEFAULT_SEGMENT_BYTES = 8 * 1024 * 1024
+INDEX_FILE = "index.json"
+INDEX_LOCK_FILE = ".index.lock"
+INDEX_VERSION = 2
+UNDATED_PARTITION = "undated"
+MAX_OPEN_PARTITIONS = 4
+
+_DAY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def encode_record(record: Dict) -> bytes:
+    """Serializa um registro como uma linha JSON compacta"""
+    return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def parse_timestamp(value) -> Optional[datetime.datetime]:
+    """Converte um timestamp ISO em datetime local ingênuo (None se inválido)"""
+    try:
+        ts = datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if ts.tzinfo is not None:
+        ts = ts.astimezone().replace(tzinfo=None)
+    return ts
+
+
+def partition_key(record: Dict) -> str:
+    """Partição diária de um registro, derivada do próprio timestamp"""
+    ts = parse_timestamp(record.get("timestamp"))
+    return ts.strftime("%Y-%m-%d") if ts is not None else UNDATED_PARTITION
+
+
+def iter_legacy_files(directory: Path, since: Optional[datetime.datetime] = None) -> Iterator[Dict]:
+    """Lê arquivos JSON individuais (layout legado), ignorando os inválidos"""
+    for file in directory.glob("*.json"):
+        try:
+            with open(file) as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError, OSError):
+            continue
+        if not isinstance(data, dict):
+            continue
+        if since is not None:
+            ts = parse_timestamp(data.get("timestamp"))
+            if ts is None or ts <= since:
+                continue
+        data.setdefault("id", file.stem)
+        yield data
+
+
+def iter_segment(path: Path) -> Iterator[Dict]:
+    """Lê um segmento sequencialmente; linhas sem '\\n' final são ignoradas"""
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                yield json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+
+
+# -- índice de partições -------------------------------------------------------
+
+def new_entry() -> Dict:
+    return {"min_ts": None, "max_ts": None, "min_id": None, "max_id": None, "count": 0, "bytes": 0}
+
+
+def update_entry(entry: Dict, record: Dict):
+    """Incorpora um registro aos limites e contagem de uma entrada de índice"""
+    entry["count"] += 1
+    record_id = record.get("id")
+    if isinstance(record_id, str):
+        if entry["min_id"] is None or record_id < entry["min_id"]:
+            entry["min_id"] = record_id
+        if entry["max_id"] is None or record_id > entry["max_id"]:
+            entry["max_id"] = record_id
+    timestamp = record.get("timestamp")
+    ts = parse_timestamp(timestamp)
+    if ts is None:
+        return
+    if entry["min_ts"] is None or ts < parse_timestamp(entry["min_ts"]):
+        entry["min_ts"] = timestamp
+    if entry["max_ts"] is None or ts > parse_timestamp(entry["max_ts"]):
+        entry["max_ts"] = timestamp
+
+
+def merge_entries(entries: Iterable[Dict]) -> Dict:
+    """Combina entradas de segmentos em uma entrada de partição"""
+    merged = new_entry()
+    for entry in entries:
+        merged["count"] += entry.get("count", 0)
+        merged["bytes"] += entry.get("bytes", 0)
+        for key in ("min_id", "max_id"):
+            value = entry.get(key)
+            if value is not None and (merged[key] is None or
+                                      (value < merged[key] if key == "min_id" else value > merged[key])):
+                merged[key] = value
+        for key in ("min_ts", "max_ts"):
+            value, ts = entry.get(key), parse_timestamp(entry.get(key))
+            if ts is None:
+                continue
+            current = parse_timestamp(merged[key])
+            if current is None or (ts < current if key == "min_ts" else ts > current):
+                merged[key] = value
+    return merged
+
+
+def load_segment_index(segments_path: Path) -> Dict[str, Dict[str, Dict]]:
+    """Índice bruto {partição: {segmento: entrada}}"""
+    try:
+        with open(segments_path / INDEX_FILE) as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+        return {}
+    return {partition: value.get("segments", {}) for partition, value in data.get("partitions", {}).items()}
+
+
+def load_index(segments_path: Path) -> Dict[str, Dict]:
+    """Carrega o índice lateral {partição: {min_ts, max_ts, min_id, max_id, count, bytes}}"""
+    return {partition: merge_entries(segments.values())
+            for partition, segments in load_segment_index(segments_path).items()}
+
+
+def save_index(segments_path: Path,
+               updates: Dict[str, Dict[str, Dict]],
+               dropped: Iterable[str] = ()):
+    """Mescla entradas de segmentos no índice em disco, sob trava, de forma atômica.
+
+    Each writer owns the entries of the segments it appends to, so
+    concurrent processes only ever replace their own entries. Entries of
+    segments that no longer exist are pruned from updated partitions.
+    """
+    with file_lock(segments_path / INDEX_LOCK_FILE):
+        index = load_segment_index(segments_path)
+        for partition in dropped:
+            index.pop(partition, None)
+        for partition, segments in updates.items():
+            existing = {p.name for p in (segments_path / partition).glob("*.jsonl")}
+            merged = {name: entry for name, entry in index.get(partition, {}).items() if name in existing}
+            merged.update({name: entry for name, entry in segments.items() if name in existing})
+            index[partition] = merged
+        tmp = segments_path / f".{INDEX_FILE}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            f.write(json.dumps({"version": INDEX_VERSION,
+                                "partitions": {p: {"segments": segs} for p, segs in index.items()}},
+                               sort_keys=True))
+        tmp.replace(segments_path / INDEX_FILE)
+
+
+def list_partitions(storage_path: Path) -> List[str]:
+    """Partições existentes em ordem cronológica"""
+    segments_path = storage_path / "segments"
+    if not segments_path.exists():
+        return []
+    return sorted(p.name for p in segments_path.iterdir() if p.is_dir())
+
+
+def partition_segments(storage_path: Path, partition: str) -> List[Path]:
+    return sorted((storage_path / "segments" / partition).glob("*.jsonl"))
+
+
+def partition_bytes(storage_path: Path, partition: str) -> int:
+    return sum(s.stat().st_size for s in partition_segments(storage_path, partition))
+
+
+def data_version(storage_path: Path) -> str:
+    """Identificador do conteúdo armazenado; muda a cada escrita, compactação ou expiração.
+
+    Built from the name, size and modification time of every segment and
+    legacy file, so it costs a directory listing, not a scan.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    files = [seg for partition in list_partitions(storage_path)
+             for seg in partition_segments(storage_path, partition)]
+    files.extend(sorted(storage_path.glob("*.json")))
+    for path in files:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        digest.update(f"{path.parent.name}/{path.name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def partition_bounds(partition: str,
+                     entry: Optional[Dict] = None) -> Tuple[Optional[datetime.datetime], Optional[datetime.datetime]]:
+    """Limites [min, max] de uma partição: pelo índice se válido, senão pelo nome do dia"""
+    if entry:
+        lo, hi = parse_timestamp(entry.get("min_ts")), parse_timestamp(entry.get("max_ts"))
+        if lo is not None and hi is not None:
+            return lo, hi
+    if _DAY_RE.match(partition):
+        start = datetime.datetime.fromisoformat(partition)
+        return start, start + datetime.timedelta(days=1) - datetime.timedelta(microseconds=1)
+    return None, None
+
+
+def iter_partition(storage_path: Path, partition: str, since: Optional[datetime.datetime] = None,
+                   since_id: Optional[str] = None) -> Iterator[Dict]:
+    """Lê os registros de uma partição, filtrando por timestamp/ID apenas se necessário.
+
+    The partition is read under a shared lock, so compaction never swaps
+    segments mid-read; only newline-terminated (committed) records are
+    returned.
+    """
+    partition_dir = storage_path / "segments" / partition
+    if not partition_dir.is_dir():
+        return
+    with partition_lock(partition_dir, shared=True):
+        for segment in partition_segments(storage_path, partition):
+            try:
+                records = iter_segment(segment)
+                for record in records:
+                    if since is not None:
+                        ts = parse_timestamp(record.get("timestamp"))
+                        if ts is None or ts <= since:
+                            continue
+                    if since_id is not None and str(record.get("id", "")) < since_id:
+                        continue
+                    yield record
+            except FileNotFoundError:
+                continue  # partição expirada durante a leitura
+
+
+def iter_unseen_records(storage_path: Path, watermark: Dict[str, int],
+                        since: Optional[datetime.datetime] = None) -> Iterator[Tuple[str, int, Dict]]:
+    """Registros gravados além do watermark {"dia/segmento.jsonl": offset}.
+
+    Yields ``(segment_key, end_offset, record)``; callers advance their
+    watermark to ``end_offset`` once the record is consumed. With ``since``
+    partitions that end before it are skipped (records are not filtered).
+    """
+    index = load_index(storage_path / "segments") if since is not None else {}
+    for partition in list_partitions(storage_path):
+        if since is not None:
+            entry = index.get(partition)
+            if entry and entry.get("bytes") != partition_bytes(storage_path, partition):
+                entry = None  # índice desatualizado para esta partição
+            _, hi = partition_bounds(partition, entry)
+            if hi is not None and hi <= since:
+                continue
+        partition_dir = storage_path / "segments" / partition
+        with partition_lock(partition_dir, shared=True):
+            for segment in partition_segments(storage_path, partition):
+                key = f"{partition}/{segment.name}"
+                for end, record in iter_segment_from(segment, watermark.get(key, 0)):
+                    yield key, end, record
+
+
+def iter_segment_from(path: Path, offset: int = 0) -> Iterator[Tuple[int, Dict]]:
+    """Registros completos de um segmento a partir de ``offset``: (offset final, registro)"""
+    try:
+        if path.stat().st_size <= offset:
+            return
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+            yield offset, record
+
+
+def iter_stored_interactions(storage_path: Path, since: Optional[datetime.datetime] = None,
+                             since_id: Optional[str] = None) -> Iterator[Dict]:
+    """Leitura somente-leitura de um diretório de métricas (segmentos + legados).
+
+    With ``since`` only partitions that can hold newer records are opened;
+    timestamps are parsed per record only in the partition that straddles
+    the cutoff. ``since_id`` keeps records whose time-ordered ID is >= it
+    and skips partitions whose indexed ``max_id`` is below it.
+    """
+    segments_path = storage_path / "segments"
+    filtered = since is not None or since_id is not None
+    index = load_index(segments_path) if filtered else {}
+
+    for partition in list_partitions(storage_path):
+        if not filtered:
+            yield from iter_partition(storage_path, partition)
+            continue
+
+        entry = index.get(partition)
+        if entry and entry.get("bytes") != partition_bytes(storage_path, partition):
+            entry = None  # índice desatualizado para esta partição
+        if since_id is not None and entry and entry.get("max_id") is not None and entry["max_id"] < since_id:
+            continue
+        if since is None:
+            yield from iter_partition(storage_path, partition, since_id=since_id)
+            continue
+
+        lo, hi = partition_bounds(partition, entry)
+        if hi is not None and hi <= since:
+            continue
+        if lo is not None and lo > since:
+            yield from iter_partition(storage_path, partition, since_id=since_id)
+        else:
+            yield from iter_partition(storage_path, partition, since=since, since_id=since_id)
+
+    for record in iter_legacy_files(storage_path, since=since):
+        if since_id is None or str(record.get("id", "")) >= since_id:
+            yield record
+
+
+class InteractionStore:
+    """Interface comum dos backends de armazenamento"""
+
+    def append(self, record: Dict):
+        """Grava um registro; backends posicionais retornam onde ele foi gravado"""
+        raise NotImplementedError
+
+    def append_many(self, records: Iterable[Dict]) -> List:
+        return [self.append(record) for record in records]
+
+    def iter_records(self, since: Optional[datetime.datetime] = None,
+                     since_id: Optional[str] = None) -> Iterator[Dict]:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class LegacyFileStore(InteractionStore):
+    """Um arquivo JSON por interação (layout original)"""
+
+    def __init__(self, storage_path: Path):
+        self.storage_path = storage_path
+        self.storage_path.mkdir(exist_ok=True)
+
+    def append(self, record: Dict) -> None:
+        data = {k: v for k, v in record.items() if k != "id"}
+        with open(self.storage_path / f"{record['id']}.json", 'w') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+    def iter_records(self, since: Optional[datetime.datetime] = None,
+                     since_id: Optional[str] = None) -> Iterator[Dict]:
+        records = iter_legacy_files(self.storage_path, since=since)
+        if since_id is None:
+            return records
+        return (r for r in records if str(r.get("id", "")) >= since_id)
+
+
+class _PartitionWriter:
+    """Segmento de cauda aberto para append dentro de uma partição.
+
+    A segment has a single writer: it is held under an exclusive ``flock``
+    for as long as it is open. The writer reuses the last segment of the
+    partition when no other process holds it, otherwise it creates the next
+    sequence number with ``O_EXCL``.
+    """
+
+    def __init__(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        segments = sorted(directory.glob("*.jsonl"))
+        if segments:
+            handle = open(segments[-1], 'ab')
+            if try_lock(handle):
+                SegmentedLogStore._repair_tail(segments[-1])
+                self._use(handle)
+                return
+            handle.close()
+        self._use(self._create(int(segments[-1].stem) + 1 if segments else 1))
+
+    def _use(self, handle):
+        self.handle = handle
+        self.path = Path(handle.name)
+        self.size = os.fstat(handle.fileno()).st_size
+        self.entry: Optional[Dict] = None  # entrada de índice deste segmento
+
+    def _create(self, seq: int):
+        """Cria e trava o próximo segmento livre a partir de ``seq``"""
+        while True:
+            path = self.directory / f"{seq:08d}.jsonl"
+            try:
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+            except FileExistsError:
+                seq += 1
+                continue
+            os.close(fd)
+            handle = open(path, 'ab')
+            if try_lock(handle):
+                return handle
+            handle.close()
+            seq += 1
+
+    def rotate(self):
+        self.handle.flush()
+        os.fsync(self.handle.fileno())
+        self.handle.close()
+        self._use(self._create(int(self.path.stem) + 1))
+
+
+class SegmentedLogStore(InteractionStore):
+    """Log append-only em segmentos JSONL rotativos, particionados por dia.
+
+    Layout: ``segments/<YYYY-MM-DD>/<seq>.jsonl`` plus ``segments/index.json``
+    holding min/max timestamp, record count and byte size per segment.
+    Several processes may write to the same directory: each appends only to
+    segments it holds locked and merges its own index entries on save.
+    """
+
+    def __init__(self,
+                 storage_path: Path,
+                 max_segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+                 fsync: str = "interval",
+                 fsync_interval: float = 1.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.storage_path = storage_path
+        self.segments_path = storage_path / "segments"
+        self.segments_path.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+
+        self._writers: "OrderedDict[str, _PartitionWriter]" = OrderedDict()
+        # Entradas de índice dos segmentos escritos por este processo
+        self._dirty_entries: Dict[str, Dict[str, Dict]] = {}
+        self._last_fsync = time.monotonic()
+
+    # -- escrita ------------------------------------------------------------
+
+    def segment_files(self) -> List[Path]:
+        """Todos os segmentos, em ordem cronológica de partição e criação"""
+        return [seg for partition in list_partitions(self.storage_path)
+                for seg in partition_segments(self.storage_path, partition)]
+
+    @staticmethod
+    def _repair_tail(path: Path):
+        """Descarta um registro parcial deixado por uma escrita interrompida"""
+        with open(path, 'rb+') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+            # Procura a última quebra de linha completa
+            block = 64 * 1024
+            end = size
+            while end > 0:
+                start = max(0, end - block)
+                f.seek(start)
+                chunk = f.read(end - start)
+                idx = chunk.rfind(b"\n")
+                if idx != -1:
+                    f.truncate(start + idx + 1)
+                    return
+                end = start
+            f.truncate(0)
+
+    def _writer(self, partition: str) -> _PartitionWriter:
+        writer = self._writers.get(partition)
+        if writer is not None:
+            self._writers.move_to_end(partition)
+            return writer
+
+        if len(self._writers) >= MAX_OPEN_PARTITIONS:
+            _, oldest = self._writers.popitem(last=False)
+            self._sync_writer(oldest, force=True)
+            oldest.handle.close()
+
+        writer = _PartitionWriter(self.segments_path / partition)
+        self._writers[partition] = writer
+        self._attach_entry(partition, writer)
+        return writer
+
+    def _attach_entry(self, partition: str, writer: _PartitionWriter):
+        """Associa ao segmento aberto sua entrada de índice (reindexando se desatualizada)"""
+        entry = self._dirty_entries.get(partition, {}).get(writer.path.name)
+        if entry is None or entry.get("bytes") != writer.size:
+            entry = load_segment_index(self.segments_path).get(partition, {}).get(writer.path.name)
+        if entry is None or entry.get("bytes") != writer.size:
+            entry = new_entry()
+            entry["bytes"] = writer.size
+            for record in iter_segment(writer.path):
+                update_entry(entry, record)
+        writer.entry = entry
+        self._dirty_entries.setdefault(partition, {})[writer.path.name] = entry
+
+    def _sync_writer(self, writer: _PartitionWriter, force: bool = False):
+        writer.handle.flush()
+        if force or self.fsync == "always":
+            os.fsync(writer.handle.fileno())
+
+    def _sync(self, force: bool = False):
+        now = time.monotonic()
+        due = self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval
+        for writer in self._writers.values():
+            self._sync_writer(writer, force=force or due)
+        if force or due:
+            self._last_fsync = now
+        if self._dirty_entries and (force or due or self.fsync == "always"):
+            save_index(self.segments_path, self._dirty_entries)
+            self._dirty_entries = {}
+
+    def _write(self, record: Dict) -> Tuple[str, int, int]:
+        partition = partition_key(record)
+        payload = encode_record(record)
+        writer = self._writer(partition)
+        if writer.size and writer.size + len(payload) > self.max_segment_bytes:
+            writer.rotate()
+            self._attach_entry(partition, writer)
+        start = writer.size
+        writer.handle.write(payload)
+        writer.size += len(payload)
+
+        entry = writer.entry
+        entry["bytes"] += len(payload)
+        update_entry(entry, record)
+        self._dirty_entries.setdefault(partition, {})[writer.path.name] = entry
+        return f"{partition}/{writer.path.name}", start, writer.size
+
+    def append(self, record: Dict) -> Tuple[str, int, int]:
+        """Grava um registro; retorna (segmento relativo, offset inicial, offset final)"""
+        position = self._write(record)
+        self._sync()
+        return position
+
+    def append_many(self, records: Iterable[Dict]) -> List[Tuple[str, int, int]]:
+        """Grava um lote agrupado por partição, com uma única sincronização.
+
+        Grouping keeps a batch that spans many days from cycling the open
+        writer cache; positions are returned in the order of ``records``.
+        """
+        records = list(records)
+        by_partition: Dict[str, List[int]] = {}
+        for i, record in enumerate(records):
+            by_partition.setdefault(partition_key(record), []).append(i)
+        positions: List[Optional[Tuple[str, int, int]]] = [None] * len(records)
+        for indices in by_partition.values():
+            for i in indices:
+                positions[i] = self._write(records[i])
+        self._sync()
+        return positions
+
+    def flush(self) -> None:
+        self._sync(force=True)
+
+    def close(self) -> None:
+        self._sync(force=True)
+        for writer in self._writers.values():
+            writer.handle.close()
+        self._writers.clear()
+
+    # -- manutenção ---------------------------------------------------------
+
+    def release_partition(self, partition: str):
+        """Sincroniza e fecha o writer da partição, se estiver aberto"""
+        writer = self._writers.pop(partition, None)
+        if writer is not None:
+            self._sync_writer(writer, force=True)
+            writer.handle.close()
+
+    def drop_partition(self, partition: str, before: Optional[Callable[[List[Path]], None]] = None) -> Optional[int]:
+        """Remove uma partição inteira; retorna os bytes liberados.
+
+        Returns None without touching anything when a reader or another
+        process's writer is using the partition. ``before`` is called with
+        the segments while they are locked, just before deletion.
+        """
+        self.release_partition(partition)
+        self._dirty_entries.pop(partition, None)
+        partition_dir = self.segments_path / partition
+        with partition_lock(partition_dir, blocking=False) as locked:
+            if not locked:
+                return None
+            with _SegmentLocks(partition_segments(self.storage_path, partition)) as held:
+                if held is None:
+                    return None
+                if before is not None:
+                    before(held)
+                reclaimed = sum(segment.stat().st_size for segment in held)
+                shutil.rmtree(partition_dir, ignore_errors=True)
+        save_index(self.segments_path, {}, dropped=[partition])
+        return reclaimed
+
+    def compact_partition(self, partition: str, target_bytes: Optional[int] = None,
+                          before: Optional[Callable[[List[Path]], None]] = None,
+                          after: Optional[Callable[[List[Path]], None]] = None) -> int:
+        """Funde segmentos pequenos consecutivos em segmentos de até ``target_bytes``.
+
+        Runs under the exclusive partition lock (readers hold it shared) and
+        skips segments another process is still writing. Each run is
+        concatenated into a temporary file that atomically replaces the first
+        segment of the run; the rest of the run is then removed. ``before``
+        and ``after`` are called with the locked segments around the merge.
+        Returns the number of segments removed.
+        """
+        target_bytes = target_bytes or self.max_segment_bytes
+        self.release_partition(partition)
+        partition_dir = self.segments_path / partition
+        removed, updates = 0, {}
+        with partition_lock(partition_dir, blocking=False) as locked:
+            if not locked:
+                return 0
+            segments = partition_segments(self.storage_path, partition)
+            with _SegmentLocks(segments, skip_busy=True) as held:
+                # Segmentos em uso por outro processo interrompem a sequência
+                runs, current, size = [], [], 0
+                for segment in segments:
+                    segment_size = segment.stat().st_size
+                    if current and (segment not in held or size + segment_size > target_bytes):
+                        runs.append(current)
+                        current, size = [], 0
+                    if segment in held:
+                        current.append(segment)
+                        size += segment_size
+                runs.append(current)
+                runs = [run for run in runs if len(run) > 1]
+                if before is not None and runs:
+                    before([segment for run in runs for segment in run])
+
+                index = load_segment_index(self.segments_path).get(partition, {})
+                for run in runs:
+                    tmp = run[0].with_name(f".{run[0].name}.compact.tmp")
+                    entries = []
+                    with open(tmp, 'wb') as out:
+                        for segment in run:
+                            entry = index.get(segment.name)
+                            if entry is None or entry.get("bytes") != segment.stat().st_size:
+                                entry = new_entry()
+                                entry["bytes"] = segment.stat().st_size
+                                for record in iter_segment(segment):
+                                    update_entry(entry, record)
+                            entries.append(entry)
+                            with open(segment, 'rb') as f:
+                                shutil.copyfileobj(f, out)
+                        out.flush()
+                        os.fsync(out.fileno())
+                    tmp.replace(run[0])
+                    for segment in run[1:]:
+                        segment.unlink()
+                        removed += 1
+                    updates[run[0].name] = merge_entries(entries)
+                if after is not None and runs:
+                    after([run[0] for run in runs])
+        if updates:
+            save_index(self.segments_path, {partition: updates})
+        return removed
+
+    # -- leitura ------------------------------------------------------------
+
+    def iter_records(self, since: Optional[datetime.datetime] = None,
+                     since_id: Optional[str] = None) -> Iterator[Dict]:
+        for writer in self._writers.values():
+            writer.handle.flush()
+        return iter_stored_interactions(self.storage_path, since=since, since_id=since_id)
+
+
+class _SegmentLocks:
+    """Trava exclusivamente um conjunto de segmentos durante a manutenção.
+
+    With ``skip_busy`` segments held by a writer are left out; otherwise a
+    single busy segment makes the whole set unavailable (None).
+    """
+
+    def __init__(self, segments: List[Path], skip_busy: bool = False):
+        self.segments = segments
+        self.skip_busy = skip_busy
+        self._handles = []
+
+    def __enter__(self) -> Optional[List[Path]]:
+        held = []
+        for segment in self.segments:
+            handle = open(segment, 'rb')
+            if try_lock(handle):
+                self._handles.append(handle)
+                held.append(segment)
+                continue
+            handle.close()
+            if not self.skip_busy:
+                return None
+        return held
+
+    def __exit__(self, *exc):
+        for handle in self._handles:
+            handle.close()
+        self._handles = []
+        return False
+
+
+def create_store(backend: str, storage_path: Path, **options) -> InteractionStore:
+    """Instancia o backend pelo nome ('segmented' ou 'legacy')"""
+    if backend == "segmented":
+        return SegmentedLogStore(storage_path, **options)
+    if backend == "legacy":
+        return LegacyFileStore(storage_path)
+    raise ValueError(f"Unknown storage backend: {backend!r}")
+
+
+def migrate_legacy_files(storage_path: Path,
+                         archive_path: Optional[Path] = None,
+                         **options) -> Dict[str, int]:
+    """Move arquivos JSON individuais para o log segmentado.
+
+    Records are appended in timestamp order and fsynced before the original
+    files are removed (or moved to ``archive_path`` when given).
+    """
+    files = sorted(storage_path.glob("*.json"))
+    records, migrated_files, skipped = [], [], 0
+
+    for file in files:
+        try:
+            with open(file) as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError, OSError):
+            skipped += 1
+            continue
+        if not isinstance(data, dict):
+            skipped += 1
+            continue
+        data.setdefault("id", file.stem)
+        records.append(data)
+        migrated_files.append(file)
+
+    records.sort(key=lambda r: str(r.get("timestamp", "")))
+
+    store = SegmentedLogStore(storage_path, **options)
+    try:
+        store.append_many(records)
+        store.flush()
+    finally:
+        store.close()
+
+    if archive_path is not None:
+        archive_path.mkdir(parents=True, exist_ok=True)
+    for file in migrated_files:
+        if archive_path is not None:
+            file.replace(archive_path / file.name)
+        else:
+            file.unlink()
+
+    return {"migrated": len(records), "skipped": skipped}
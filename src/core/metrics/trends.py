@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Trend Engine
+Médias móveis, EWMA e alertas de anomalia sobre os agregados diários
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import datetime
+import json
+import math
+import os
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Iterable, List, Optional
+
+from src.core.metrics.rollups import QUALITY_BINS, InteractionRollup, RollupStore
+from src.core.metrics.sketches import QuantileSketch
+
+STATE_FILE = "trends.json"
+STATE_VERSION = 1
+DEFAULT_WINDOWS = (7, 14, 30)
+MAX_FLAGS = 100
+
+# Série monitorada -> direção ruim ("down": queda é ruim, "up": alta é ruim)
+MONITORED = {"quality_score": "down", "response_time_p90": "up"}
+
+
+def histogram_quantile(histogram: List[int], q: float) -> Optional[float]:
+    """Quantil aproximado de um histograma de qualidade (bins iguais em [0, 1])"""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            # Interpolação linear dentro do bin
+            return (index + (rank - seen) / count) / len(histogram)
+        seen += count
+    return 1.0
+
+
+def daily_summary(day: str, rollup: InteractionRollup) -> Dict:
+    """Resumo compacto de um dia, o suficiente para janelas móveis e alertas"""
+    latency = rollup.sketches.get("response_time_ms") or QuantileSketch()
+    return {
+        "day": day,
+        "count": rollup.count,
+        "quality": dict(rollup.stats["quality_score"]),
+        "latency": dict(rollup.stats["response_time_ms"]),
+        "quality_histogram": list(rollup.quality_histogram),
+        "latency_sketch": latency.to_dict(),
+    }
+
+
+class TrendEngine:
+    """Estado incremental de tendências sobre dias completos"""
+
+    def __init__(self,
+                 storage_path: Path,
+                 windows: Iterable[int] = DEFAULT_WINDOWS,
+                 span: int = 7,
+                 threshold: float = 3.0,
+                 cusum_k: float = 0.5,
+                 cusum_h: float = 5.0,
+                 warmup_days: int = 7,
+                 min_count: int = 5,
+                 min_relative_std: float = 0.02):
+        self.state_path = storage_path / "rollups" / STATE_FILE
+        self.windows = tuple(sorted(windows))
+        self.params = {
+            "windows": list(self.windows),
+            "span": span,
+            "threshold": threshold,
+            "cusum_k": cusum_k,
+            "cusum_h": cusum_h,
+            "warmup_days": warmup_days,
+            "min_count": min_count,
+            "min_relative_std": min_relative_std,
+        }
+        self.alpha = 2 / (span + 1)
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.last_day: Optional[str] = None
+        self.recent: Deque[Dict] = deque()
+        self.series: Dict[str, Dict] = {
+            name: {"mean": None, "var": 0.0, "days": 0, "cusum_pos": 0.0, "cusum_neg": 0.0, "last": None}
+            for name in MONITORED
+        }
+        self.flags: List[Dict] = []
+
+    # -- persistência -------------------------------------------------------
+
+    def _load(self):
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        # Parâmetros diferentes invalidam o estado: update recomeça do zero
+        if state.get("version") != STATE_VERSION or state.get("params") != self.params:
+            return
+        self.last_day = state.get("last_day")
+        self.recent = deque(state.get("recent", []))
+        self.series.update(state.get("series", {}))
+        self.flags = state.get("flags", [])
+
+    def save(self):
+        state = {
+            "version": STATE_VERSION,
+            "params": self.params,
+            "last_day": self.last_day,
+            "recent": list(self.recent),
+            "series": self.series,
+            "flags": self.flags,
+        }
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_name(f".{STATE_FILE}.{os.getpid()}.tmp")
+        with open(tmp, 'w') as f:
+            f.write(json.dumps(state, separators=(",", ":")))
+        tmp.replace(self.state_path)
+
+    # -- atualização --------------------------------------------------------
+
+    def update(self, rollups: RollupStore, today: Optional[datetime.date] = None) -> int:
+        """Incorpora os dias completos (anteriores a hoje) ainda não vistos; retorna quantos"""
+        today_key = (today or datetime.date.today()).strftime("%Y-%m-%d")
+        pending = sorted(day for day in rollups.days
+                         if day[:1].isdigit() and day < today_key and (self.last_day is None or day > self.last_day))
+        for day in pending:
+            self.observe_day(day, rollups.days[day])
+        if pending:
+            self.save()
+        return len(pending)
+
+    def rebuild(self, rollups: RollupStore, today: Optional[datetime.date] = None) -> int:
+        """Descarta o estado e reprocessa todo o histórico dos agregados"""
+        self._reset()
+        return self.update(rollups, today)
+
+    def observe_day(self, day: str, rollup: InteractionRollup):
+        """Incorpora um dia completo: O(1) em relação ao tamanho do histórico"""
+        summary = daily_summary(day, rollup)
+        self.recent.append(summary)
+        horizon = (datetime.date.fromisoformat(day) - datetime.timedelta(days=self.windows[-1])).isoformat()
+        while self.recent and self.recent[0]["day"] <= horizon:
+            self.recent.popleft()
+        self.last_day = day
+
+        if rollup.count < self.params["min_count"]:
+            return
+        values = {
+            "quality_score": rollup.mean("quality_score") if rollup.stats["quality_score"]["n"] else None,
+            "response_time_p90": rollup.sketches["response_time_ms"].quantile(0.9),
+        }
+        for name, value in values.items():
+            if value is not None:
+                self._observe_value(day, name, value)
+
+    def _observe_value(self, day: str, name: str, value: float):
+        series = self.series[name]
+        series["last"] = value
+        if series["mean"] is None:
+            series.update(mean=value, var=0.0, days=1)
+            return
+
+        mean = series["mean"]
+        std = max(math.sqrt(series["var"]), self.params["min_relative_std"] * abs(mean), 1e-9)
+        z = (value - mean) / std
+        if series["days"] >= self.params["warmup_days"]:
+            if abs(z) >= self.params["threshold"]:
+                self._flag(day, name, "anomaly", value, mean, z)
+            k, h = self.params["cusum_k"], self.params["cusum_h"]
+            series["cusum_pos"] = max(0.0, series["cusum_pos"] + z - k)
+            series["cusum_neg"] = max(0.0, series["cusum_neg"] - z - k)
+            if series["cusum_pos"] > h or series["cusum_neg"] > h:
+                self._flag(day, name, "changepoint", value, mean, z)
+                series["cusum_pos"] = series["cusum_neg"] = 0.0
+
+        # EWMA da média e da variância
+        diff = value - mean
+        increment = self.alpha * diff
+        series["mean"] = mean + increment
+        series["var"] = (1 - self.alpha) * (series["var"] + diff * increment)
+        series["days"] += 1
+
+    def _flag(self, day: str, name: str, kind: str, value: float, expected: float, z: float):
+        up = value > expected
+        self.flags.append({
+            "day": day,
+            "metric": name,
+            "kind": kind,
+            "value": round(value, 4),
+            "expected": round(expected, 4),
+            "z": round(z, 2),
+            "direction": "up" if up else "down",
+            "regression": up == (MONITORED[name] == "up"),
+        })
+        del self.flags[:-MAX_FLAGS]
+
+    # -- consulta -----------------------------------------------------------
+
+    def rolling(self, window: int) -> Dict:
+        """Médias e percentis dos últimos ``window`` dias completos"""
+        if self.last_day is None:
+            return {"days": 0, "count": 0}
+        horizon = (datetime.date.fromisoformat(self.last_day) - datetime.timedelta(days=window)).isoformat()
+        days = [summary for summary in self.recent if summary["day"] > horizon]
+        quality = {"n": 0, "sum": 0.0}
+        latency = {"n": 0, "sum": 0.0}
+        histogram = [0] * QUALITY_BINS
+        sketch = QuantileSketch()
+        for summary in days:
+            for total, part in ((quality, summary["quality"]), (latency, summary["latency"])):
+                total["n"] += part["n"]
+                total["sum"] += part["sum"]
+            histogram = [a + b for a, b in zip(histogram, summary["quality_histogram"])]
+            sketch.merge(QuantileSketch.from_dict(summary["latency_sketch"]))
+        return {
+            "days": len(days),
+            "count": sum(summary["count"] for summary in days),
+            "quality_mean": quality["sum"] / quality["n"] if quality["n"] else None,
+            "quality_p10": histogram_quantile(histogram, 0.1),
+            "quality_p50": histogram_quantile(histogram, 0.5),
+            "latency_mean": latency["sum"] / latency["n"] if latency["n"] else None,
+            "latency_percentiles": sketch.quantiles() if sketch.count else {},
+        }
+
+    def report(self, flag_days: int = 30) -> Dict:
+        """Janelas móveis, EWMA, série diária recente e alertas"""
+        since = None
+        if self.last_day is not None:
+            since = (datetime.date.fromisoformat(self.last_day) - datetime.timedelta(days=flag_days)).isoformat()
+        return {
+            "as_of": self.last_day,
+            "rolling": {f"{window}d": self.rolling(window) for window in self.windows},
+            "ewma": {
+                name: {
+                    "mean": series["mean"],
+                    "std": math.sqrt(series["var"]) if series["mean"] is not None else None,
+                    "last": series["last"],
+                    "days": series["days"],
+                }
+                for name, series in self.series.items()
+            },
+            "daily": [
+                {
+                    "day": summary["day"],
+                    "count": summary["count"],
+                    "quality_mean": summary["quality"]["sum"] / summary["quality"]["n"] if summary["quality"]["n"] else None,
+                    "latency_mean": summary["latency"]["sum"] / summary["latency"]["n"] if summary["latency"]["n"] else None,
+                    "latency_p90": QuantileSketch.from_dict(summary["latency_sketch"]).quantile(0.9),
+                }
+                for summary in self.recent
+            ],
+            "flags": [flag for flag in self.flags if since is None or flag["day"] > since],
+        }
@@ -10,27 +10,39 @@ Complete pipeline that connects all components with real interaction data.
 import json
 import argparse
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, List, Optional
+from dataclasses import asdict
 import sys
 
 # Add project root to path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.core.metrics.interaction_analyzer import MetricsCollector, InteractionMetrics
+from src.core.metrics.retention import RetentionPolicy
+from src.core.metrics.storage import migrate_legacy_files
 from src.experiments.experiment_runner import ExperimentRunner, Experiment, ExperimentVariant
 from src.core.calibration.auto_calibration import AutoCalibrationEngine
 from src.core.calibration.dashboard import PerformanceDashboard
 from src.core.versioning.version_manager import VersionManager
 
+DEFAULT_ANALYSIS_DAYS = 30
+DEFAULT_HTML_DAYS = 365
+
+
 class IntegrationPipeline:
     """Main integration pipeline for the prompt engineering system"""
     
-    def __init__(self):
+    def __init__(self, async_capture: bool = False):
         self.metrics_collector = MetricsCollector()
-        self.experiment_runner = ExperimentRunner()
+        # Queue interactions for a background writer instead of writing inline
+        self.async_capture = async_capture
+        # Experiments are measured on the interactions this collector records
+        self.experiment_runner = ExperimentRunner(collector=self.metrics_collector)
         self.calibration_engine = AutoCalibrationEngine()
-        self.dashboard = PerformanceDashboard()
+        # Reports reuse the collector's daily rollups
+        self.dashboard = PerformanceDashboard(data_path=self.metrics_collector.storage_path,
+                                              collector=self.metrics_collector)
         self.version_manager = VersionManager()
         
         # Configuration
@@ -46,8 +58,15 @@ class IntegrationPipeline:
                           iteration_count: int,
                           context_used: List[str],
                           pattern_applied: Optional[str] = None,
-                          success_indicators: Optional[List[str]] = None) -> str:
-        """Collect a single interaction and return interaction ID"""
+                          success_indicators: Optional[List[str]] = None,
+                          idempotency_key: Optional[str] = None) -> str:
+        """Collect a single interaction and return interaction ID.
+
+        Repeating a call with the same ``idempotency_key`` stores nothing new
+        and returns the ID of the first interaction. The interaction also
+        updates the sequential tests of running experiments it belongs to;
+        those are kept in memory and saved periodically and on ``close``.
+        """
         
         if success_indicators is None:
             success_indicators = self._determine_success_indicators(quality_score)
@@ -64,7 +83,64 @@ class IntegrationPipeline:
             success_indicators=success_indicators
         )
         
-        return self.metrics_collector.capture_interaction(metrics)
+        if self.async_capture:
+            interaction_id = self.metrics_collector.enqueue_interaction(metrics, idempotency_key=idempotency_key)
+        else:
+            interaction_id = self.metrics_collector.capture_interaction(metrics, idempotency_key=idempotency_key)
+        # A repeated ID (idempotent retry) is counted once by sequential tests and bandits
+        self.experiment_runner.record_interaction(asdict(metrics), interaction_id)
+        return interaction_id
+    
+    def assign_variant(self, experiment_id: str, context_used: Optional[List[str]] = None) -> Optional[Dict]:
+        """Pick the variant for the next request of a running experiment.
+
+        Returns the variant and the tag to add to ``context_used`` when the
+        interaction is collected, so its quality rewards that variant.
+        """
+        variant_id = self.experiment_runner.assign_variant(experiment_id, context_used)
+        if variant_id is None:
+            return None
+        return {"variant_id": variant_id, "tag": self.experiment_runner.variant_tag(experiment_id, variant_id)}
+    
+    def list_experiments(self, status: Optional[str] = None, days: Optional[int] = None,
+                         metric: Optional[str] = None, limit: Optional[int] = None) -> Dict:
+        """List registered experiments by status, creation in the last ``days`` days and tracked metric"""
+        since = (datetime.now() - timedelta(days=days)).isoformat() if days else None
+        experiments = self.experiment_runner.list_experiments(status=status, since=since, metric=metric, limit=limit)
+        return {"status": "success", "count": len(experiments), "experiments": experiments}
+    
+    def close(self):
+        """Flush pending bandit rewards and captures, then release the registry and stores"""
+        self.experiment_runner.close()
+        self.metrics_collector.close()
+    
+    def migrate_metrics_storage(self, archive_path: Optional[Path] = None) -> Dict:
+        """Move legacy per-file interactions into the segmented log store"""
+        self.metrics_collector.flush()
+        result = migrate_legacy_files(self.metrics_collector.storage_path, archive_path=archive_path)
+        return {"status": "success", **result}
+    
+    def rebuild_metrics_rollups(self) -> Dict:
+        """Regenerate the daily report rollups from raw interaction data"""
+        result = self.metrics_collector.rebuild_rollups()
+        if 'error' in result:
+            return {"status": "failed", "error": result['error']}
+        return {"status": "success", **result}
+    
+    def apply_metrics_retention(self, raw_days: int = 90, compact: bool = True) -> Dict:
+        """Expire raw interactions older than raw_days (keeping daily rollups) and compact segments"""
+        policy = RetentionPolicy(raw_days=raw_days, compact=compact)
+        result = self.metrics_collector.apply_retention(policy, measure_scan=True)
+        if 'error' in result:
+            return {"status": "failed", "error": result['error']}
+        return {"status": "success", **result}
+    
+    def compact_metrics_snapshot(self) -> Dict:
+        """Compact interaction segments into the columnar snapshot used by analytics reads"""
+        result = self.metrics_collector.build_snapshot()
+        if 'error' in result:
+            return {"status": "failed", "error": result['error']}
+        return {"status": "success", **result}
     
     def _determine_success_indicators(self, quality_score: float) -> List[str]:
         """Determine success indicators based on quality score"""
@@ -109,22 +185,14 @@ class IntegrationPipeline:
             }
             health_status["overall_status"] = "degraded"
         
-        # Check experiment system
+        # Check experiment system (a read-only registry query)
         try:
-            # Try to create a test experiment
-            test_exp = Experiment(
-                id="health-check",
-                name="Health Check Test",
-                hypothesis="System health validation",
-                variants=[],
-                control_variant="",
-                metrics_to_track=[],
-                sample_size=1
-            )
-            self.experiment_runner.create_experiment(test_exp)
-            
+            experiments = self.experiment_runner.list_experiments()
+            statuses = [experiment["status"] for experiment in experiments]
             health_status["components"]["experiment_system"] = {
-                "status": "operational"
+                "status": "operational",
+                "experiments": len(statuses),
+                "running": statuses.count("running")
             }
         except Exception as e:
             health_status["components"]["experiment_system"] = {
@@ -135,12 +203,15 @@ class IntegrationPipeline:
         
         # Check calibration system
         try:
-            # Check if models exist
-            model_path = Path("evidence/models/success_predictor.pkl")
-            if model_path.exists():
+            # Check the registry's active version (or legacy fixed-name models)
+            model_status = self.calibration_engine.model_status()
+            if model_status.get("active_version") or model_status.get("legacy_models"):
                 health_status["components"]["calibration_system"] = {
                     "status": "trained",
-                    "models_available": True
+                    "models_available": True,
+                    "active_version": model_status.get("active_version"),
+                    "model_kind": model_status.get("kind"),
+                    "trained_at": model_status.get("created_at")
                 }
             else:
                 health_status["components"]["calibration_system"] = {
@@ -176,13 +247,26 @@ class IntegrationPipeline:
         
         return health_status
     
-    def train_calibration_models(self, force_retrain: bool = False) -> Dict:
-        """Train calibration models if sufficient data is available"""
+    def train_calibration_models(self, force_retrain: bool = False, incremental: bool = False,
+                                 select: bool = False, workers: Optional[int] = None) -> Dict:
+        """Train calibration models if sufficient data is available.
+        
+        With ``incremental`` the online models are updated with the
+        interactions captured since the last checkpoint (``force_retrain``
+        restarts them from all stored history). With ``select`` the batch
+        hyperparameters are chosen by time-ordered cross-validation over
+        ``workers`` processes on hashed text features (no vocabulary fitted
+        on future folds) and the held-out metrics are reported.
+        """
         
         print("🤖 Training calibration models...")
         
+        if incremental:
+            return self._train_calibration_incremental(reset=force_retrain)
+        
         # Check current data volume
-        report = self.metrics_collector.generate_report(days=90)  # Use 90 days for more data
+        training_window_days = 90  # Use 90 days for more data
+        report = self.metrics_collector.generate_report(days=training_window_days)
         
         if 'error' in report:
             return {
@@ -201,16 +285,7 @@ class IntegrationPipeline:
             }
         
         # Load interaction data for training
-        interaction_files = list(Path("evidence/metrics/data").glob("*.json"))
-        interactions = []
-        
-        for file in interaction_files:
-            try:
-                with open(file) as f:
-                    data = json.load(f)
-                    interactions.append(data)
-            except (json.JSONDecodeError, KeyError):
-                continue
+        interactions = self.metrics_collector.load_columns(days=training_window_days)
         
         if len(interactions) < 10:  # Minimum for basic training
             return {
@@ -222,7 +297,7 @@ class IntegrationPipeline:
         
         # Train models
         try:
-            training_result = self.calibration_engine.train_models(interactions)
+            training_result = self.calibration_engine.train_models(interactions, select=select, workers=workers)
             
             if 'error' in training_result:
                 return {
@@ -235,6 +310,9 @@ class IntegrationPipeline:
                 "model_accuracy": training_result.get('model_accuracy', 0),
                 "clusters_found": training_result.get('clusters_found', 0),
                 "samples_used": training_result.get('samples_used', 0),
+                "model_version": training_result.get('model_version'),
+                **({"model_selection": training_result['model_selection']}
+                   if 'model_selection' in training_result else {}),
                 "message": "Models trained successfully"
             }
             
@@ -244,36 +322,89 @@ class IntegrationPipeline:
                 "error": str(e)
             }
     
+    def _train_calibration_incremental(self, reset: bool = False) -> Dict:
+        """Fold new interactions into the online calibration models"""
+        try:
+            training_result = self.calibration_engine.train_since_checkpoint(self.metrics_collector, reset=reset)
+            
+            checkpoint_samples = training_result.get('samples_seen', 0)
+            if checkpoint_samples < self.min_interactions_for_training:
+                status = "warming_up"
+                message = f"Online models have seen {checkpoint_samples} of {self.min_interactions_for_training} interactions"
+            else:
+                status = "success"
+                message = f"Online models updated with {training_result.get('new_samples', 0)} new interactions"
+            
+            return {
+                "status": status,
+                "mode": "online",
+                "model_accuracy": training_result.get('model_accuracy'),
+                "new_samples": training_result.get('new_samples', 0),
+                "samples_seen": checkpoint_samples,
+                "last_id": training_result.get('last_id'),
+                "model_version": training_result.get('model_version'),
+                "message": message
+            }
+            
+        except Exception as e:
+            return {
+                "status": "training_error",
+                "error": str(e)
+            }
+    
     def suggest_prompt_optimizations(self, context: Dict) -> Dict:
         """Suggest optimizations based on calibration models"""
         
         try:
             prediction = self.calibration_engine.predict_optimal_config(context)
+            return self._format_suggestion(context, prediction)
             
-            suggestions = self.calibration_engine.suggest_context_improvements(
-                " ".join(context.get('context_elements', [])),
-                context.get('target_outcome', 'improve quality')
-            )
-            
+        except Exception as e:
+            return self._prediction_failed(e)
+    
+    def suggest_prompt_optimizations_batch(self, contexts: List[Dict]) -> Dict:
+        """Suggest optimizations for several contexts with one model call per model"""
+        
+        try:
+            predictions = self.calibration_engine.predict_batch(contexts)
             return {
                 "status": "success",
-                "predicted_success_rate": prediction.confidence,
-                "recommendations": prediction.recommended_adjustments,
-                "context_suggestions": suggestions,
-                "prompt_characteristics": prediction.prompt_characteristics,
-                "confidence": prediction.confidence
+                "count": len(predictions),
+                "results": [
+                    self._format_suggestion(context, prediction)
+                    for context, prediction in zip(contexts, predictions)
+                ]
             }
             
         except Exception as e:
-            return {
-                "status": "prediction_failed",
-                "error": str(e),
-                "fallback_recommendations": [
-                    "Add specific examples to context",
-                    "Include success criteria",
-                    "Specify constraints and requirements"
-                ]
-            }
+            return self._prediction_failed(e)
+    
+    def _format_suggestion(self, context: Dict, prediction) -> Dict:
+        """Combine a model prediction with the rule-based context suggestions"""
+        suggestions = self.calibration_engine.suggest_context_improvements(
+            " ".join(context.get('context_elements', [])),
+            context.get('target_outcome', 'improve quality')
+        )
+        
+        return {
+            "status": "success",
+            "predicted_success_rate": prediction.confidence,
+            "recommendations": prediction.recommended_adjustments,
+            "context_suggestions": suggestions,
+            "prompt_characteristics": prediction.prompt_characteristics,
+            "confidence": prediction.confidence
+        }
+    
+    def _prediction_failed(self, error: Exception) -> Dict:
+        return {
+            "status": "prediction_failed",
+            "error": str(error),
+            "fallback_recommendations": [
+                "Add specific examples to context",
+                "Include success criteria",
+                "Specify constraints and requirements"
+            ]
+        }
     
     def run_experiment(self, experiment_config: Dict) -> Dict:
         """Run an experiment with the given configuration"""
@@ -290,12 +421,14 @@ class IntegrationPipeline:
                 ],
                 control_variant=experiment_config["control_variant"],
                 metrics_to_track=experiment_config["metrics_to_track"],
-                sample_size=experiment_config["sample_size"]
+                sample_size=experiment_config["sample_size"],
+                allocation=experiment_config.get("allocation", "fixed"),
+                contextual=experiment_config.get("contextual", False)
             )
             
             # Create and run experiment
             self.experiment_runner.create_experiment(experiment)
-            results = self.experiment_runner.run_experiment(experiment.id)
+            results = self.experiment_runner.run_experiment(experiment.id, days=experiment_config.get("days"))
             
             # Generate report
             report = self.experiment_runner.generate_experiment_report(experiment.id)
@@ -316,11 +449,11 @@ class IntegrationPipeline:
                 "error": str(e)
             }
     
-    def generate_performance_report(self, days: int = 30) -> Dict:
-        """Generate comprehensive performance report"""
+    def generate_performance_report(self, days: int = 30, render_charts: bool = False) -> Dict:
+        """Generate comprehensive performance report (charts only when asked for)"""
         
         try:
-            report = self.dashboard.generate_comprehensive_report(days)
+            report = self.dashboard.generate_comprehensive_report(days, render_charts=render_charts)
             
             if 'error' in report:
                 return {
@@ -344,6 +477,41 @@ class IntegrationPipeline:
                 "error": str(e)
             }
     
+    def render_performance_charts(self, days: int = 30, wait: bool = False) -> Dict:
+        """Render dashboard charts into data/metrics/reports.
+
+        Charts cached for the current data are returned immediately. Otherwise
+        rendering is queued on the dashboard's background worker, unless
+        ``wait`` is set.
+        """
+        try:
+            if wait:
+                return self.dashboard.render_charts(days)
+            cached = self.dashboard.cached_charts(days)
+            if cached is not None:
+                return cached
+            self.dashboard.render_charts_async(days)
+            return {
+                "status": "queued",
+                "days": days,
+                "reports_path": str(self.dashboard.reports_path)
+            }
+        except Exception as e:
+            return {
+                "status": "render_error",
+                "error": str(e)
+            }
+    
+    def export_html_dashboard(self, days: int = DEFAULT_HTML_DAYS) -> Dict:
+        """Write a self-contained interactive HTML dashboard built from the daily rollups"""
+        try:
+            return self.dashboard.export_html(days)
+        except Exception as e:
+            return {
+                "status": "export_error",
+                "error": str(e)
+            }
+    
     def _generate_insights(self, report: Dict) -> List[str]:
         """Generate additional insights from the report"""
         insights = []
@@ -430,9 +598,9 @@ class IntegrationPipeline:
         ]
         
         optimizations = []
-        for context in contexts_to_optimize:
-            suggestions = self.suggest_prompt_optimizations(context)
-            if suggestions['status'] == 'success':
+        batch = self.suggest_prompt_optimizations_batch(contexts_to_optimize)
+        if batch['status'] == 'success':
+            for context, suggestions in zip(contexts_to_optimize, batch['results']):
                 optimizations.append({
                     "context": context['type'],
                     "suggestions": suggestions['recommendations'],
@@ -473,15 +641,16 @@ def main():
     
     parser.add_argument(
         "action",
-        choices=["health", "collect", "experiment", "train", "optimize", "report"],
+        choices=["health", "collect", "experiment", "train", "optimize", "report", "html", "migrate", "rebuild-rollups", "snapshot", "retention", "experiments"],
         help="Action to perform"
     )
     
     parser.add_argument(
         "--days", 
         type=int, 
-        default=30,
-        help="Number of days for analysis (default: 30)"
+        default=None,
+        help="Number of days for analysis (default: 30; html: 365); experiments: only those "
+             "created in the last N days (default: all)"
     )
     
     parser.add_argument(
@@ -491,6 +660,67 @@ def main():
         help="Target metric for optimization (default: quality_score)"
     )
     
+    parser.add_argument(
+        "--archive",
+        type=Path,
+        default=None,
+        help="Move migrated legacy files here instead of deleting them (migrate only)"
+    )
+    
+    parser.add_argument(
+        "--raw-days",
+        type=int,
+        default=90,
+        help="Keep raw interactions for this many days; older days survive as rollups (retention only)"
+    )
+    
+    parser.add_argument(
+        "--no-compact",
+        action="store_true",
+        help="Skip merging small segments (retention only)"
+    )
+    
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Update the online models with interactions since the last checkpoint (train only)"
+    )
+    
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Retrain from scratch; with --incremental, restart the online models (train only)"
+    )
+    
+    parser.add_argument(
+        "--select",
+        action="store_true",
+        help="Choose hyperparameters by time-ordered cross-validation (train only)"
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Processes for --select (default: all cores)"
+    )
+    
+    parser.add_argument(
+        "--charts",
+        action="store_true",
+        help="Also render dashboard charts into data/metrics/reports (report only)"
+    )
+    
+    parser.add_argument(
+        "--status",
+        choices=["draft", "running", "completed"],
+        help="Only experiments with this status (experiments only)"
+    )
+    
+    parser.add_argument(
+        "--metric",
+        help="Only experiments tracking this metric (experiments only)"
+    )
+    
     parser.add_argument(
         "--interactive",
         action="store_true",
@@ -498,6 +728,8 @@ def main():
     )
     
     args = parser.parse_args()
+    # Only the analysis actions default to a window; "experiments" lists all unless --days is given
+    analysis_days = DEFAULT_ANALYSIS_DAYS if args.days is None else args.days
     
     pipeline = IntegrationPipeline()
     
@@ -574,7 +806,8 @@ def main():
         print(json.dumps(result, indent=2, ensure_ascii=False))
     
     elif args.action == "train":
-        result = pipeline.train_calibration_models()
+        result = pipeline.train_calibration_models(force_retrain=args.force, incremental=args.incremental,
+                                                   select=args.select, workers=args.workers)
         print(json.dumps(result, indent=2, ensure_ascii=False))
     
     elif args.action == "optimize":
@@ -582,8 +815,34 @@ def main():
         print(json.dumps(result, indent=2, ensure_ascii=False))
     
     elif args.action == "report":
-        result = pipeline.generate_performance_report(args.days)
+        result = pipeline.generate_performance_report(analysis_days, render_charts=args.charts)
         print(json.dumps(result, indent=2, ensure_ascii=False))
+    
+    elif args.action == "html":
+        result = pipeline.export_html_dashboard(DEFAULT_HTML_DAYS if args.days is None else args.days)
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    
+    elif args.action == "migrate":
+        result = pipeline.migrate_metrics_storage(archive_path=args.archive)
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    
+    elif args.action == "rebuild-rollups":
+        result = pipeline.rebuild_metrics_rollups()
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    
+    elif args.action == "retention":
+        result = pipeline.apply_metrics_retention(raw_days=args.raw_days, compact=not args.no_compact)
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    
+    elif args.action == "snapshot":
+        result = pipeline.compact_metrics_snapshot()
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    
+    elif args.action == "experiments":
+        result = pipeline.list_experiments(status=args.status, days=args.days, metric=args.metric)
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    
+    pipeline.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
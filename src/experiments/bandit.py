@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Bandit Allocation
+Alocação adaptativa de tráfego entre variantes (Thompson sampling / UCB)
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import datetime
+import json
+import math
+import os
+import random
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.core.metrics.locking import file_lock
+from src.experiments.execution import VARIANT_TAG_PREFIX
+
+POLICIES = ("thompson", "ucb")
+PRIOR_WEIGHT = 20.0
+MAX_CONTEXTS = 1024
+PERSIST_EVERY = 100
+PERSIST_SECONDS = 5.0
+RECENT_IDS = 256
+
+
+def context_key(context: Optional[Sequence[str]]) -> str:
+    """Chave de contexto: elementos distintos e ordenados, sem tags de variante"""
+    if not context:
+        return ""
+    return "|".join(sorted({c for c in context if not c.startswith(VARIANT_TAG_PREFIX)}))
+
+
+class BanditAllocator:
+    """Posteriores Beta por variante (e por contexto) com persistência periódica"""
+
+    def __init__(self, path: Path, variants: List[str], policy: str = "thompson", contextual: bool = False,
+                 seed: Optional[int] = None, persist_every: int = PERSIST_EVERY,
+                 persist_seconds: float = PERSIST_SECONDS):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown bandit policy: {policy}")
+        self.path = path
+        self.lock_path = path.with_name(f".{path.stem}.lock")
+        self.variants = list(variants)
+        self.policy = policy
+        self.contextual = contextual
+        self.persist_every = persist_every
+        self.persist_seconds = persist_seconds
+        self._random = random.Random(seed)
+        self.arms: Dict[str, List[float]] = {}
+        self.contexts: Dict[str, Dict[str, List[float]]] = {}
+        self._pending = []
+        self._recent: List[str] = []
+        self._recent_set = set()
+        self._synced = time.monotonic()
+        self._reset()
+        disk = self._read()
+        if disk is not None:
+            self._adopt(disk)
+
+    def _reset(self):
+        self.arms = {v: [0.0, 0.0] for v in self.variants}
+        self.contexts = {}
+        self._set_recent([])
+
+    def _set_recent(self, ids: List[str]):
+        self._recent = ids[-RECENT_IDS:]
+        self._recent_set = set(self._recent)
+
+    def _read(self) -> Optional[Dict]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _adopt(self, state: Dict):
+        self._reset()
+        for variant, counts in state.get("arms", {}).items():
+            if variant in self.arms:
+                self.arms[variant] = list(counts)
+        self.contexts = {key: {v: list(c) for v, c in counts.items()}
+                         for key, counts in state.get("contexts", {}).items()}
+        self._set_recent(list(state.get("recent_ids", [])))
+
+    def _apply(self, variant: str, reward: float, key: str):
+        arm = self.arms[variant]
+        arm[0] += reward
+        arm[1] += 1.0 - reward
+        if self.contextual and key:
+            counts = self.contexts.get(key)
+            if counts is None:
+                if len(self.contexts) >= MAX_CONTEXTS:
+                    return
+                counts = self.contexts[key] = {}
+            arm = counts.setdefault(variant, [0.0, 0.0])
+            arm[0] += reward
+            arm[1] += 1.0 - reward
+
+    def _posterior(self, variant: str, counts: Optional[Dict[str, List[float]]]):
+        """(sucessos, falhas) da variante; no contexto, o global entra como prior limitado"""
+        successes, failures = self.arms[variant]
+        if counts is None:
+            return successes, failures
+        context_successes, context_failures = counts.get(variant, (0.0, 0.0))
+        n = successes + failures
+        weight = min(n, PRIOR_WEIGHT) / n if n else 0.0
+        return context_successes + successes * weight, context_failures + failures * weight
+
+    def assign(self, context: Optional[Sequence[str]] = None) -> str:
+        """Variante para a próxima interação"""
+        if time.monotonic() - self._synced > self.persist_seconds:
+            self.sync()
+        counts = self.contexts.get(context_key(context)) if self.contextual and context else None
+        if self.policy == "thompson":
+            best, best_draw = self.variants[0], -1.0
+            for variant in self.variants:
+                successes, failures = self._posterior(variant, counts)
+                draw = self._random.betavariate(successes + 1.0, failures + 1.0)
+                if draw > best_draw:
+                    best, best_draw = variant, draw
+            return best
+
+        posteriors = [(variant, *self._posterior(variant, counts)) for variant in self.variants]
+        total = sum(s + f for _, s, f in posteriors)
+        best, best_score = self.variants[0], -1.0
+        for variant, successes, failures in posteriors:
+            n = successes + failures
+            if n < 1e-9:
+                return variant
+            score = successes / n + math.sqrt(2 * math.log(max(total, 1.0)) / n)
+            if score > best_score:
+                best, best_score = variant, score
+        return best
+
+    def update(self, variant: str, reward: float, context: Optional[Sequence[str]] = None,
+               interaction_id: Optional[str] = None):
+        """Registra a recompensa (qualidade em [0, 1]) de uma interação atribuída (uma vez por ID)"""
+        if variant not in self.arms or reward is None or math.isnan(reward):
+            return
+        if interaction_id is not None:
+            if interaction_id in self._recent_set:
+                return
+            self._set_recent(self._recent + [interaction_id])
+        reward = min(max(float(reward), 0.0), 1.0)
+        key = context_key(context) if self.contextual else ""
+        self._apply(variant, reward, key)
+        self._pending.append((variant, reward, key, interaction_id))
+        if len(self._pending) >= self.persist_every or time.monotonic() - self._synced > self.persist_seconds:
+            self.sync()
+
+    def sync(self):
+        """Soma as atualizações pendentes ao estado em disco e adota o resultado"""
+        with file_lock(self.lock_path):
+            disk = self._read()
+            if disk is not None:
+                self._adopt(disk)
+            else:
+                self._reset()
+            for variant, reward, key, interaction_id in self._pending:
+                if interaction_id is not None:
+                    # Já contada por outro processo
+                    if interaction_id in self._recent_set:
+                        continue
+                    self._set_recent(self._recent + [interaction_id])
+                self._apply(variant, reward, key)
+            self._pending = []
+            state = {
+                "policy": self.policy,
+                "contextual": self.contextual,
+                "arms": self.arms,
+                "contexts": self.contexts,
+                "recent_ids": self._recent,
+                "updated_at": datetime.datetime.now().isoformat(),
+            }
+            tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp, 'w') as f:
+                json.dump(state, f)
+            tmp.replace(self.path)
+        self._synced = time.monotonic()
+
+    def reset(self):
+        """Descarta todo o estado (início de um novo experimento)"""
+        self._pending = []
+        self._reset()
+        if self.path.exists():
+            self.path.unlink()
+        self.sync()
+
+    def summary(self, draws: int = 2000) -> Dict:
+        """Por variante: observações, recompensa média e fração do tráfego.
+
+        ``allocation`` is the probability that Thompson sampling picks the
+        variant now. For UCB, which is deterministic, it is the share of
+        the observations so far.
+        """
+        counts = np.array([self.arms[v] for v in self.variants])
+        observations = counts.sum(axis=1)
+        if self.policy == "thompson":
+            rng = np.random.default_rng(0)
+            posterior = counts + 1.0
+            samples = rng.beta(posterior[:, :1], posterior[:, 1:], size=(len(self.variants), draws))
+            share = np.bincount(samples.argmax(axis=0), minlength=len(self.variants)) / draws
+        else:
+            share = observations / observations.sum() if observations.sum() else np.full(len(self.variants), 1 / len(self.variants))
+        return {
+            "policy": self.policy,
+            "contextual": self.contextual,
+            "contexts": len(self.contexts),
+            "variants": {
+                variant: {
+                    "observations": round(float(observations[index]), 6),
+                    "mean_reward": float(counts[index, 0] / observations[index]) if observations[index] else None,
+                    "allocation": float(share[index]),
+                }
+                for index, variant in enumerate(self.variants)
+            },
+        }
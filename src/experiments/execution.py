@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Experiment Execution
+Mede variantes de experimentos nas interações registradas
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import operator
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.core.metrics.columnar import InteractionColumns
+
+VARIANT_TAG_PREFIX = "variant:"
+UNASSIGNED = -1
+AMBIGUOUS = -2
+DEFAULT_SUCCESS = ("quality_score", operator.gt, 0.7)
+COLUMNS = ("timestamp", "quality_score", "response_time_ms", "iteration_count",
+           "prompt_tokens", "response_tokens", "pattern_applied", "context_used")
+
+# Nomes aceitos nos critérios -> coluna armazenada
+METRIC_COLUMNS = {
+    "quality_score": "quality_score",
+    "quality": "quality_score",
+    "response_time": "response_time_ms",
+    "response_time_ms": "response_time_ms",
+    "iteration_count": "iteration_count",
+    "iterations": "iteration_count",
+    "prompt_tokens": "prompt_tokens",
+    "response_tokens": "response_tokens",
+}
+OPERATORS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+             "==": operator.eq, "!=": operator.ne}
+CRITERION = re.compile(r"^\s*(\w+)\s*(>=|<=|==|!=|>|<)\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+def variant_tag(experiment_id: str, variant_id: str) -> str:
+    """Elemento de contexto que atribui uma interação a uma variante"""
+    return f"{VARIANT_TAG_PREFIX}{experiment_id}/{variant_id}"
+
+
+def parse_criteria(criteria: List[str]) -> Tuple[List[Tuple[str, object, float]], List[str]]:
+    """Critérios de sucesso avaliáveis (coluna, operador, valor) e os ignorados"""
+    parsed, ignored = [], []
+    for criterion in criteria or []:
+        match = CRITERION.match(criterion)
+        if match and match.group(1) in METRIC_COLUMNS:
+            parsed.append((METRIC_COLUMNS[match.group(1)], OPERATORS[match.group(2)], float(match.group(3))))
+        else:
+            ignored.append(criterion)
+    return parsed, ignored
+
+
+def _mean(values: np.ndarray) -> Optional[float]:
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if len(values) else None
+
+
+class ExperimentExecutor:
+    """Atribui interações registradas às variantes e mede cada uma"""
+
+    def __init__(self, collector):
+        self.collector = collector
+
+    def load(self, days: Optional[int] = None) -> InteractionColumns:
+        return self.collector.load_columns(days=days, columns=COLUMNS)
+
+    def assign(self, experiment: Dict, interactions: InteractionColumns) -> Tuple[np.ndarray, int]:
+        """Índice da variante por linha (UNASSIGNED/AMBIGUOUS) e quantas vieram de tag explícita"""
+        n = len(interactions)
+        variants = experiment["variants"]
+        offsets = np.asarray(interactions["context_offsets"])
+        codes = np.asarray(interactions["context_codes"])[offsets[0]:offsets[-1]]
+        row_of_code = np.repeat(np.arange(n), np.diff(offsets))
+        context_index = {name: code for code, name in enumerate(interactions.contexts)}
+        pattern_index = {name: code for code, name in enumerate(interactions.patterns)}
+        pattern_codes = np.asarray(interactions["pattern_code"])
+
+        def rows_with(code: Optional[int]) -> np.ndarray:
+            mask = np.zeros(n, dtype=bool)
+            if code is not None:
+                mask[row_of_code[codes == code]] = True
+            return mask
+
+        # Tags explícitas: deste experimento atribuem; de outro, excluem a linha
+        tag_codes = np.array([code for name, code in context_index.items()
+                              if name.startswith(VARIANT_TAG_PREFIX)], dtype=codes.dtype)
+        foreign = np.zeros(n, dtype=bool)
+        foreign[row_of_code[np.isin(codes, tag_codes)]] = True
+        tagged = np.full(n, UNASSIGNED)
+        for index, variant in enumerate(variants):
+            mask = rows_with(context_index.get(variant_tag(experiment["id"], variant["id"])))
+            tagged[mask] = np.where(tagged[mask] == UNASSIGNED, index, AMBIGUOUS)
+        foreign &= tagged == UNASSIGNED
+
+        # Critérios: número de critérios atendidos, ou -1 quando algum falha
+        scores = np.empty((len(variants), n), dtype=np.int32)
+        for index, variant in enumerate(variants):
+            match = np.ones(n, dtype=bool)
+            modifiers = variant.get("context_modifiers") or []
+            for modifier in modifiers:
+                match &= rows_with(context_index.get(modifier))
+            pattern = variant.get("pattern")
+            if pattern:
+                match &= pattern_codes == pattern_index.get(pattern, -2)
+            elif not modifiers and variant["id"] != experiment.get("control_variant"):
+                # Sem critérios e sem ser o controle: só linhas com tag
+                match[:] = False
+            scores[index] = np.where(match, len(modifiers) + bool(pattern), -1)
+
+        assignment = np.full(n, UNASSIGNED)
+        if len(variants) and n:
+            best = scores.max(axis=0)
+            ties = (scores == best).sum(axis=0)
+            assignment = np.where(best < 0, UNASSIGNED, np.where(ties > 1, AMBIGUOUS, scores.argmax(axis=0)))
+        assignment[foreign] = UNASSIGNED
+        explicit = tagged != UNASSIGNED
+        assignment[explicit] = tagged[explicit]
+        return assignment, int((tagged >= 0).sum())
+
+    def measure(self, experiment: Dict, days: Optional[int] = None) -> Dict:
+        """Resultados por variante calculados a partir das interações registradas"""
+        return self.collect(experiment, days)[0]
+
+    def collect(self, experiment: Dict, days: Optional[int] = None) -> Tuple[Dict, Dict[str, Dict[str, np.ndarray]]]:
+        """Resultados por variante e as amostras por linha (variante -> métrica -> valores)"""
+        start = time.perf_counter()
+        interactions = self.load(days)
+        assignment, explicit = self.assign(experiment, interactions)
+
+        # Um critério de sucesso comum para as comparações entre variantes
+        control = next((v for v in experiment["variants"] if v["id"] == experiment.get("control_variant")), {})
+        variant_results, samples = {}, {}
+        for index, variant in enumerate(experiment["variants"]):
+            rows = interactions.take(assignment == index)
+            variant_results[variant["id"]] = self.summarize(variant, rows, experiment.get("sample_size", 0))
+            samples[variant["id"]] = self.samples(control, rows)
+
+        return {
+            "mode": "measured",
+            "interactions_scanned": len(interactions),
+            "explicitly_tagged": explicit,
+            "unassigned": int((assignment == UNASSIGNED).sum()),
+            "ambiguous": int((assignment == AMBIGUOUS).sum()),
+            "variant_results": variant_results,
+            "measurement_seconds": round(time.perf_counter() - start, 4),
+        }, samples
+
+    def success(self, variant: Dict, rows: InteractionColumns) -> np.ndarray:
+        """Linhas que atendem a todos os critérios de sucesso da variante"""
+        criteria, _ = parse_criteria(variant.get("success_criteria"))
+        success = np.ones(len(rows), dtype=bool)
+        # Comparações com NaN (valor ausente) falham, como devem
+        with np.errstate(invalid="ignore"):
+            for column, compare, value in criteria or [DEFAULT_SUCCESS]:
+                success &= compare(np.asarray(rows[column], dtype=float), value)
+        return success
+
+    def samples(self, criteria_variant: Dict, rows: InteractionColumns) -> Dict[str, np.ndarray]:
+        """Valores por interação de cada métrica comparável entre variantes.
+
+        ``success`` uses the criteria of ``criteria_variant`` (the control,
+        for every arm), not those of the variant the rows belong to.
+        """
+        return {
+            "success": self.success(criteria_variant, rows).astype(float),
+            "quality_score": np.asarray(rows["quality_score"], dtype=float),
+            "response_time": np.asarray(rows["response_time_ms"], dtype=float),
+            "iteration_count": np.asarray(rows["iteration_count"], dtype=float),
+        }
+
+    def summarize(self, variant: Dict, rows: InteractionColumns, sample_size: int = 0) -> Dict:
+        """Métricas de uma variante a partir das suas linhas"""
+        _, ignored = parse_criteria(variant.get("success_criteria"))
+        success = self.success(variant, rows)
+
+        quality = np.asarray(rows["quality_score"], dtype=float)
+        total = len(rows)
+        return {
+            "variant_id": variant["id"],
+            "total_interactions": total,
+            "sample_size_reached": total >= sample_size,
+            "successes": int(success.sum()),
+            "success_rate": float(success.mean()) if total else None,
+            "avg_quality_score": _mean(quality),
+            "quality_std": float(np.nanstd(quality)) if np.isfinite(quality).any() else None,
+            "avg_response_time": _mean(np.asarray(rows["response_time_ms"], dtype=float)),
+            "iteration_count": _mean(np.asarray(rows["iteration_count"], dtype=float)),
+            # Não registrados pelo coletor de métricas
+            "user_satisfaction": None,
+            "completion_rate": None,
+            "ignored_criteria": ignored,
+        }
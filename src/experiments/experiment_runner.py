@@ -9,10 +9,31 @@ Location: Minas Gerais, Brazil
 
 import json
 import datetime
+import os
+import time
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from dataclasses import dataclass, asdict
 import random
+import numpy as np
+
+from src.core.metrics.columnar import InteractionColumns
+from src.experiments import statistics
+from src.experiments.bandit import POLICIES, BanditAllocator
+from src.experiments.execution import COLUMNS, ExperimentExecutor, variant_tag
+from src.experiments.registry import REGISTRY_FILE, ExperimentRegistry
+from src.experiments.sequential import DEFAULT_TAU, MIN_SAMPLES, SequentialTest
+
+PRIMARY_METRIC = "quality_score"
+RUNNING_REFRESH_SECONDS = 1.0
+# metrics_to_track -> métrica das amostras por interação
+TRACKED_METRICS = {
+    "quality_score": "quality_score",
+    "quality": "quality_score",
+    "response_time": "response_time",
+    "iteration_count": "iteration_count",
+    "success_rate": "success",
+}
 
 @dataclass
 class ExperimentVariant:
@@ -22,6 +43,7 @@ class ExperimentVariant:
     context_modifiers: List[str]
     expected_outcome: str
     success_criteria: List[str]
+    pattern: Optional[str] = None  # pattern_applied das interações desta variante
 
 @dataclass
 class Experiment:
@@ -34,36 +56,213 @@ class Experiment:
     sample_size: int
     status: str = "draft"  # draft, running, completed
     created_at: str = None
+    completed_at: str = None
+    allocation: str = "fixed"  # fixed (divisão uniforme), thompson, ucb
+    contextual: bool = False  # bandit condicionado ao context_used
     
     def __post_init__(self):
         if self.created_at is None:
             self.created_at = datetime.datetime.now().isoformat()
 
 class ExperimentRunner:
-    def __init__(self, base_path: Path = Path("experiments")):
+    def __init__(self, base_path: Path = Path("experiments"), collector=None,
+                 alpha: float = 0.05, workers: int = 1):
         self.base_path = base_path
+        # Sem coletor, os resultados são simulados
+        self.executor = ExperimentExecutor(collector) if collector is not None else None
+        # A atribuição de uma interação isolada não precisa do coletor
+        self.assigner = self.executor or ExperimentExecutor(None)
+        self.alpha = alpha
+        # Processos para as comparações (variante x métrica); 1 = no próprio processo
+        self.workers = workers
         self.hypothesis_path = base_path / "hypothesis"
         self.results_path = base_path / "results"
         self.hypothesis_path.mkdir(exist_ok=True)
         self.results_path.mkdir(exist_ok=True)
+        self.registry = ExperimentRegistry(base_path / REGISTRY_FILE)
+        # Arquivos ainda não indexados (gravados antes do registro existir)
+        self.registry.import_files(self.hypothesis_path, self.results_path)
+        # (versão do registro, experimentos em andamento) e quando foi conferido
+        self._running = None
+        self._running_checked = 0.0
+        # Bandits e testes sequenciais dos experimentos em andamento, em memória
+        self._bandits: Dict[str, BanditAllocator] = {}
+        self._sequential: Dict[str, SequentialTest] = {}
         
     def create_experiment(self, experiment: Experiment) -> str:
         """Cria novo experimento"""
-        exp_file = self.hypothesis_path / f"{experiment.id}.json"
-        with open(exp_file, 'w') as f:
-            json.dump(asdict(experiment), f, indent=2, ensure_ascii=False)
+        if experiment.allocation != "fixed" and experiment.allocation not in POLICIES:
+            raise ValueError(f"Unknown allocation: {experiment.allocation}")
+        self._write_experiment(asdict(experiment))
         return experiment.id
     
-    def run_experiment(self, experiment_id: str) -> Dict[str, Any]:
-        """Executa experimento e coleta resultados"""
-        exp_file = self.hypothesis_path / f"{experiment_id}.json"
-        if not exp_file.exists():
+    def _load_experiment(self, experiment_id: str) -> Optional[Dict]:
+        return self.registry.get_experiment(experiment_id)
+    
+    def _write_experiment(self, experiment: Dict):
+        """Registra a definição e atualiza o espelho em hypothesis/"""
+        self.registry.save_experiment(experiment)
+        self._running = None
+        self._write_json(self.hypothesis_path / f"{experiment['id']}.json", experiment)
+    
+    def _write_json(self, path: Path, data: Dict):
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        tmp.replace(path)
+    
+    def list_experiments(self, status: Optional[str] = None, since: Optional[str] = None,
+                         until: Optional[str] = None, metric: Optional[str] = None,
+                         limit: Optional[int] = None) -> List[Dict]:
+        """Experimentos (mais recentes primeiro) por status, criação em [since, until) e métrica acompanhada"""
+        return self.registry.list_experiments(status=status, since=since, until=until, metric=metric, limit=limit)
+    
+    def start_experiment(self, experiment_id: str, tau: float = DEFAULT_TAU,
+                         min_samples: int = MIN_SAMPLES) -> Dict[str, Any]:
+        """Coloca o experimento em andamento com um teste sequencial (ou bandit) novo"""
+        experiment = self._load_experiment(experiment_id)
+        if experiment is None:
+            return {"error": "Experiment not found"}
+        if experiment.get("status") == "completed":
+            return {"error": "Experiment already completed"}
+        result = {"experiment_id": experiment_id, "status": "running"}
+        if experiment.get("allocation", "fixed") in POLICIES:
+            bandit = self._bandit(experiment)
+            bandit.reset()
+            result["bandit"] = bandit.summary()
+        else:
+            result["sequential"] = self._sequential_test(experiment_id).start(
+                experiment, metric=PRIMARY_METRIC, alpha=self.alpha, tau=tau, min_samples=min_samples
+            )
+        experiment["status"] = "running"
+        self._write_experiment(experiment)
+        return result
+    
+    def _bandit(self, experiment: Dict) -> BanditAllocator:
+        bandit = self._bandits.get(experiment["id"])
+        if bandit is None:
+            bandit = self._bandits[experiment["id"]] = BanditAllocator(
+                self.results_path / f"{experiment['id']}_bandit.json",
+                [v["id"] for v in experiment["variants"]],
+                policy=experiment["allocation"],
+                contextual=experiment.get("contextual", False),
+            )
+        return bandit
+    
+    def _sequential_test(self, experiment_id: str) -> SequentialTest:
+        test = self._sequential.get(experiment_id)
+        if test is None:
+            test = self._sequential[experiment_id] = SequentialTest(self.results_path, experiment_id)
+        return test
+    
+    def _load_sequential(self, experiment_id: str) -> Optional[Dict]:
+        """Estado do teste sequencial com as observações pendentes deste processo"""
+        test = self._sequential.get(experiment_id)
+        return test.sync() if test is not None else SequentialTest(self.results_path, experiment_id).load()
+    
+    def assign_variant(self, experiment_id: str, context: Optional[List[str]] = None) -> Optional[str]:
+        """Variante que deve atender a próxima requisição (None se o experimento não está em andamento).
+
+        Bandit experiments favour the variants with the best quality so far
+        (per ``context`` when contextual); fixed ones split uniformly. Tag
+        the interaction with ``variant_tag`` so its reward reaches the
+        variant.
+        """
+        bandit = self._bandits.get(experiment_id)
+        if bandit is not None:
+            return bandit.assign(context)
+        experiment = self._running_experiments().get(experiment_id)
+        if experiment is None:
+            return None
+        if experiment.get("allocation", "fixed") not in POLICIES:
+            return random.choice(experiment["variants"])["id"]
+        return self._bandit(experiment).assign(context)
+    
+    def flush_allocations(self):
+        """Persiste as recompensas pendentes dos bandits"""
+        for bandit in self._bandits.values():
+            bandit.sync()
+    
+    def close(self):
+        """Persiste os bandits e testes sequenciais e fecha a conexão com o registro"""
+        self.flush_allocations()
+        for test in self._sequential.values():
+            test.sync()
+        self.registry.close()
+    
+    def sequential_status(self, experiment_id: str) -> Dict[str, Any]:
+        """Estado do teste sequencial (contagens, p-valores sempre válidos, decisão)"""
+        state = self._load_sequential(experiment_id)
+        if state is None:
+            return {"error": "Sequential test not started"}
+        experiment = self._load_experiment(experiment_id) or {}
+        return {**state, "status": experiment.get("status")}
+    
+    def _running_experiments(self) -> Dict[str, Dict]:
+        """Experimentos em andamento, relidos só quando o registro muda"""
+        now = time.monotonic()
+        if self._running is not None and now - self._running_checked < RUNNING_REFRESH_SECONDS:
+            return self._running[1]
+        self._running_checked = now
+        version = self.registry.version()
+        if self._running is None or self._running[0] != version:
+            running = self.registry.running()
+            # Bandits e testes de experimentos encerrados são persistidos e descartados
+            for experiment_id in set(self._bandits) - set(running):
+                self._bandits.pop(experiment_id).sync()
+            for experiment_id in set(self._sequential) - set(running):
+                self._sequential.pop(experiment_id).sync()
+            self._running = (version, running)
+        return self._running[1]
+    
+    def record_interaction(self, record: Dict, interaction_id: Optional[str] = None) -> Dict[str, Dict]:
+        """Atualiza os experimentos em andamento com uma interação.
+
+        Returns ``{experiment_id: {"variant", "decision"}}`` for the
+        experiments the interaction was assigned to. An experiment whose
+        sequential test reaches a decision is marked completed; bandit
+        experiments take the quality score as the variant's reward.
+        """
+        running = self._running_experiments()
+        if not running:
+            return {}
+        row = InteractionColumns.from_records([record], COLUMNS)
+        updates = {}
+        for experiment_id, experiment in running.items():
+            assignment, _ = self.assigner.assign(experiment, row)
+            if assignment[0] < 0:
+                continue
+            variant_id = experiment["variants"][assignment[0]]["id"]
+            if experiment.get("allocation", "fixed") in POLICIES:
+                self._bandit(experiment).update(variant_id, float(row[PRIMARY_METRIC][0]),
+                                                record.get("context_used"), interaction_id)
+                updates[experiment_id] = {"variant": variant_id, "decision": None}
+                continue
+            state = self._sequential_test(experiment_id).observe(variant_id, float(row[PRIMARY_METRIC][0]), interaction_id)
+            if state is None:
+                continue
+            if state["decision"] is not None:
+                self._complete_experiment(experiment_id)
+            updates[experiment_id] = {"variant": variant_id, "decision": state["decision"]}
+        return updates
+    
+    def _complete_experiment(self, experiment_id: str):
+        experiment = self._load_experiment(experiment_id)
+        if experiment is not None and experiment.get("status") != "completed":
+            experiment["status"] = "completed"
+            experiment["completed_at"] = datetime.datetime.now().isoformat()
+            self._write_experiment(experiment)
+    
+    def variant_tag(self, experiment_id: str, variant_id: str) -> str:
+        """Elemento de ``context_used`` que marca uma interação como desta variante"""
+        return variant_tag(experiment_id, variant_id)
+    
+    def run_experiment(self, experiment_id: str, days: Optional[int] = None) -> Dict[str, Any]:
+        """Executa experimento e coleta resultados (das interações dos últimos ``days`` dias)"""
+        experiment = self._load_experiment(experiment_id)
+        if experiment is None:
             return {"error": "Experiment not found"}
             
-        with open(exp_file) as f:
-            experiment = json.load(f)
-            
-        # Simula execução (em produção, integraria com sistema real)
         results = {
             "experiment_id": experiment_id,
             "started_at": datetime.datetime.now().isoformat(),
@@ -75,83 +274,127 @@ class ExperimentRunner:
         }
         
         # Coleta resultados para cada variante
-        for variant in experiment["variants"]:
-            results["variant_results"][variant["id"]] = self._simulate_variant_results(
-                variant, experiment["sample_size"]
-            )
+        if self.executor is not None:
+            measured, samples = self.executor.collect(experiment, days=days)
+            results.update(measured)
+        else:
+            results["mode"] = "simulated"
+            samples = {}
+            for variant in experiment["variants"]:
+                summary, samples[variant["id"]] = self._simulate_variant_results(
+                    variant, experiment["sample_size"]
+                )
+                results["variant_results"][variant["id"]] = summary
         
         # Análise estatística
-        analysis = self._statistical_analysis(results["variant_results"])
+        analysis = self._statistical_analysis(experiment, samples)
         results.update(analysis)
+        sequential = self._load_sequential(experiment_id)
+        if sequential is not None:
+            results["sequential"] = {key: sequential[key] for key in ("arms", "pairs", "decision")}
+        if experiment.get("allocation", "fixed") in POLICIES:
+            bandit = self._bandit(experiment)
+            bandit.sync()
+            results["bandit"] = bandit.summary()
         results["completed_at"] = datetime.datetime.now().isoformat()
         
-        # Salva resultados
-        result_file = self.results_path / f"{experiment_id}_results.json"
-        with open(result_file, 'w') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        # Salva resultados (registro numa transação; espelho em results/)
+        self.registry.save_results(experiment_id, results)
+        self._write_json(self.results_path / f"{experiment_id}_results.json", results)
             
         return results
     
-    def _simulate_variant_results(self, variant: Dict, sample_size: int) -> Dict:
-        """Simula resultados para uma variante (mock para desenvolvimento)"""
+    def _simulate_variant_results(self, variant: Dict, sample_size: int):
+        """Simula amostras e resultados para uma variante (mock para desenvolvimento)"""
         # Em produção, isso integraria com métricas reais
-        return {
+        rng = np.random.default_rng(random.getrandbits(32))
+        quality = np.clip(rng.normal(random.uniform(0.7, 0.95), 0.1, sample_size), 0, 1)
+        samples = {
+            "success": (quality > 0.7).astype(float),
+            "quality_score": quality,
+            "response_time": rng.normal(random.randint(800, 2000), 200, sample_size),
+            "iteration_count": rng.integers(1, 4, sample_size).astype(float),
+        }
+        summary = {
             "variant_id": variant["id"],
             "total_interactions": sample_size,
-            "success_rate": random.uniform(0.6, 0.95),
-            "avg_quality_score": random.uniform(0.7, 0.95),
-            "avg_response_time": random.randint(800, 2000),
-            "iteration_count": random.randint(1, 3),
+            "success_rate": float(samples["success"].mean()),
+            "avg_quality_score": float(quality.mean()),
+            "avg_response_time": float(samples["response_time"].mean()),
+            "iteration_count": float(samples["iteration_count"].mean()),
             "user_satisfaction": random.uniform(0.7, 0.98),
             "completion_rate": random.uniform(0.8, 0.99)
         }
+        return summary, samples
     
-    def _statistical_analysis(self, variant_results: Dict) -> Dict:
-        """Análise estatística simples para determinar vencedor"""
-        if len(variant_results) < 2:
+    def _statistical_analysis(self, experiment: Dict, samples: Dict[str, Dict[str, np.ndarray]]) -> Dict:
+        """Compara cada variante com o controle e determina o vencedor"""
+        if len(samples) < 2:
             return {"error": "Need at least 2 variants for analysis"}
-            
-        # Calcula scores ponderados
-        scores = {}
-        for variant_id, results in variant_results.items():
-            score = (
-                results["success_rate"] * 0.3 +
-                results["avg_quality_score"] * 0.3 +
-                results["user_satisfaction"] * 0.2 +
-                results["completion_rate"] * 0.2
-            )
-            scores[variant_id] = score
         
-        # Determina vencedor
-        winner = max(scores, key=scores.get)
-        best_score = scores[winner]
+        # Só variantes com dados entram na comparação
+        with_data = {v: m for v, m in samples.items() if np.isfinite(m[PRIMARY_METRIC]).any()}
+        control = experiment.get("control_variant")
+        if control not in with_data or len(with_data) < 2:
+            return {"error": "Need interactions for the control and at least one other variant",
+                    "all_scores": {v: float(np.nanmean(m[PRIMARY_METRIC])) for v, m in with_data.items()}}
         
-        # Calcula confiança (simplificado)
-        second_best = sorted(scores.values(), reverse=True)[1]
-        confidence = min((best_score - second_best) / best_score, 0.95)
+        metrics = [PRIMARY_METRIC, "success"]
+        for tracked in experiment.get("metrics_to_track", []):
+            metric = TRACKED_METRICS.get(tracked)
+            if metric and metric not in metrics:
+                metrics.append(metric)
+        comparisons = statistics.analyze(with_data, control, metrics, workers=self.workers)
+        
+        # Vencedor: maior qualidade média; significância contra o controle
+        scores = {v: float(np.nanmean(m[PRIMARY_METRIC])) for v, m in with_data.items()}
+        winner = max(scores, key=scores.get)
+        if winner != control:
+            comparison = comparisons[winner][PRIMARY_METRIC]
+            excludes_zero = comparison["ci_low"] > 0
+        else:
+            # Controle na frente: compara com a melhor variante tratada
+            runner_up = max((v for v in scores if v != control), key=scores.get)
+            comparison = comparisons[runner_up][PRIMARY_METRIC]
+            excludes_zero = comparison["ci_high"] < 0
+        p_value = comparison["adjusted_p"]
         
-        return {
+        return self._json_safe({
             "winner": winner,
-            "winner_score": best_score,
-            "confidence_level": confidence,
-            "statistical_significance": confidence > 0.8,
-            "all_scores": scores
-        }
+            "winner_score": scores[winner],
+            "primary_metric": PRIMARY_METRIC,
+            "p_value": p_value,
+            "confidence_level": 1 - p_value,
+            "statistical_significance": bool(p_value < self.alpha and excludes_zero),
+            "all_scores": scores,
+            "comparisons": comparisons
+        })
+    
+    def _json_safe(self, value):
+        """NaN/inf viram None para o JSON de resultados"""
+        if isinstance(value, dict):
+            return {k: self._json_safe(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._json_safe(v) for v in value]
+        if isinstance(value, float) and not np.isfinite(value):
+            return None
+        return value
     
     def generate_experiment_report(self, experiment_id: str) -> str:
-        """Gera relatório formatado do experimento"""
-        result_file = self.results_path / f"{experiment_id}_results.json"
-        if not result_file.exists():
+        """Gera relatório formatado do experimento (reaproveitado enquanto experimento e resultados não mudam)"""
+        inputs = self.registry.report_inputs(experiment_id)
+        if inputs is None or inputs["results_revision"] is None:
             return "Experiment results not found"
-            
-        with open(result_file) as f:
-            results = json.load(f)
-            
-        # Carrega detalhes do experimento
-        exp_file = self.hypothesis_path / f"{experiment_id}.json"
-        with open(exp_file) as f:
-            experiment = json.load(f)
-            
+        if inputs["report"] is not None:
+            return inputs["report"]
+        
+        report = self._render_report(self.registry.get_experiment(experiment_id),
+                                     self.registry.get_results(experiment_id))
+        # Revisões lidas antes do conteúdo: se algo mudou no meio, o cache só fica velho e é refeito
+        self.registry.save_report(experiment_id, inputs["experiment_revision"], inputs["results_revision"], report)
+        return report
+    
+    def _render_report(self, experiment: Dict, results: Dict) -> str:
         report = f"""
 # Experiment Report: {experiment['name']}
 
@@ -162,6 +405,8 @@ class ExperimentRunner:
 - **Winner:** {results.get('winner', 'Undetermined')}
 - **Confidence Level:** {(results.get('confidence_level') or 0):.2%}
 - **Statistical Significance:** {'Yes' if results.get('statistical_significance') else 'No'}
+- **p-value (Holm-adjusted permutation test):** {self._format(results.get('p_value'), '.4f')}
+- **Sequential Decision:** {self._sequential_summary(results.get('sequential'))}
 
 ## Variant Performance
 """
@@ -170,11 +415,17 @@ class ExperimentRunner:
             variant_name = next(v['name'] for v in experiment['variants'] if v['id'] == variant_id)
             report += f"""
 ### {variant_name}
-- Success Rate: {variant_data['success_rate']:.2%}
-- Quality Score: {variant_data['avg_quality_score']:.2f}
-- User Satisfaction: {variant_data['user_satisfaction']:.2%}
-- Completion Rate: {variant_data['completion_rate']:.2%}
+- Interactions: {variant_data['total_interactions']}
+- Success Rate: {self._format(variant_data['success_rate'], '.2%')}
+- Quality Score: {self._format(variant_data['avg_quality_score'], '.2f')}
+- User Satisfaction: {self._format(variant_data['user_satisfaction'], '.2%')}
+- Completion Rate: {self._format(variant_data['completion_rate'], '.2%')}
 """
+            comparison = results.get('comparisons', {}).get(variant_id, {}).get(PRIMARY_METRIC)
+            if comparison and comparison.get('difference') is not None:
+                report += (f"- Quality vs Control: {comparison['difference']:+.3f} "
+                           f"(95% CI {comparison['ci_low']:+.3f} to {comparison['ci_high']:+.3f}, "
+                           f"p={self._format(comparison.get('adjusted_p'), '.4f')})\n")
         
         report += f"""
 ## Conclusion
@@ -185,6 +436,23 @@ Generated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         
         return report
 
+    def _sequential_summary(self, sequential: Optional[Dict]) -> str:
+        """Resumo da decisão do teste sequencial para o relatório"""
+        if not sequential:
+            return "n/a"
+        decision = sequential.get("decision")
+        if decision is None:
+            return "running"
+        samples = sum(decision["samples"].values())
+        if decision["outcome"] == "inconclusive":
+            return f"inconclusive at sample size ({samples} interactions)"
+        return (f"{decision['winner']} after {samples} interactions "
+                f"(always-valid p={self._format(decision['p_value'], '.4f')})")
+
+    def _format(self, value, spec: str) -> str:
+        """Formata métricas que podem não ter sido medidas"""
+        return "n/a" if value is None else format(value, spec)
+
 # Exemplos de experimentos
 if __name__ == "__main__":
     runner = ExperimentRunner()
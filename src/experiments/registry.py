@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Experiment Registry
+Índice SQLite de experimentos, resultados e relatórios renderizados
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import datetime
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+REGISTRY_FILE = "registry.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    status TEXT,
+    allocation TEXT,
+    created_at TEXT,
+    completed_at TEXT,
+    updated_at TEXT,
+    revision INTEGER NOT NULL,
+    definition TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS experiments_status ON experiments (status, created_at);
+CREATE INDEX IF NOT EXISTS experiments_created ON experiments (created_at);
+CREATE TABLE IF NOT EXISTS experiment_metrics (
+    experiment_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    PRIMARY KEY (experiment_id, metric)
+);
+CREATE INDEX IF NOT EXISTS experiment_metrics_metric ON experiment_metrics (metric);
+CREATE TABLE IF NOT EXISTS results (
+    experiment_id TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL,
+    completed_at TEXT,
+    winner TEXT,
+    p_value REAL,
+    significant INTEGER,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reports (
+    experiment_id TEXT PRIMARY KEY,
+    experiment_revision INTEGER NOT NULL,
+    results_revision INTEGER NOT NULL,
+    report TEXT NOT NULL
+);
+"""
+
+
+class ExperimentRegistry:
+    """Experimentos, resultados e relatórios indexados num arquivo SQLite"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        # Escritas desta conexão (data_version só muda com escritas de outras)
+        self._writes = 0
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._connection
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+            self._writes += 1
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def version(self) -> Tuple[int, int]:
+        """Muda sempre que o registro é alterado, por este ou outro processo"""
+        with self._lock:
+            return self._connection.execute("PRAGMA data_version").fetchone()[0], self._writes
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def save_experiment(self, experiment: Dict) -> int:
+        """Insere ou atualiza a definição; retorna a nova revisão"""
+        now = datetime.datetime.now().isoformat()
+        with self._transaction() as db:
+            db.execute(
+                """INSERT INTO experiments (id, name, status, allocation, created_at, completed_at,
+                                            updated_at, revision, definition)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)
+                   ON CONFLICT (id) DO UPDATE SET
+                       name = excluded.name, status = excluded.status, allocation = excluded.allocation,
+                       created_at = excluded.created_at, completed_at = excluded.completed_at,
+                       updated_at = excluded.updated_at, revision = experiments.revision + 1,
+                       definition = excluded.definition""",
+                (experiment["id"], experiment.get("name"), experiment.get("status", "draft"),
+                 experiment.get("allocation", "fixed"), experiment.get("created_at"),
+                 experiment.get("completed_at"), now, json.dumps(experiment, ensure_ascii=False)),
+            )
+            db.execute("DELETE FROM experiment_metrics WHERE experiment_id = ?", (experiment["id"],))
+            db.executemany("INSERT OR IGNORE INTO experiment_metrics (experiment_id, metric) VALUES (?, ?)",
+                           [(experiment["id"], metric) for metric in experiment.get("metrics_to_track") or []])
+            return db.execute("SELECT revision FROM experiments WHERE id = ?", (experiment["id"],)).fetchone()[0]
+
+    def get_experiment(self, experiment_id: str) -> Optional[Dict]:
+        rows = self._query("SELECT definition FROM experiments WHERE id = ?", (experiment_id,))
+        return json.loads(rows[0]["definition"]) if rows else None
+
+    def running(self) -> Dict[str, Dict]:
+        rows = self._query("SELECT definition FROM experiments WHERE status = 'running'")
+        experiments = [json.loads(row["definition"]) for row in rows]
+        return {experiment["id"]: experiment for experiment in experiments}
+
+    def save_results(self, experiment_id: str, results: Dict) -> int:
+        """Substitui os resultados numa única transação; retorna a nova revisão"""
+        with self._transaction() as db:
+            db.execute(
+                """INSERT INTO results (experiment_id, revision, completed_at, winner, p_value, significant, data)
+                   VALUES (?, 1, ?, ?, ?, ?, ?)
+                   ON CONFLICT (experiment_id) DO UPDATE SET
+                       revision = results.revision + 1, completed_at = excluded.completed_at,
+                       winner = excluded.winner, p_value = excluded.p_value,
+                       significant = excluded.significant, data = excluded.data""",
+                (experiment_id, results.get("completed_at"), results.get("winner"), results.get("p_value"),
+                 int(bool(results.get("statistical_significance"))), json.dumps(results, ensure_ascii=False)),
+            )
+            return db.execute("SELECT revision FROM results WHERE experiment_id = ?", (experiment_id,)).fetchone()[0]
+
+    def get_results(self, experiment_id: str) -> Optional[Dict]:
+        rows = self._query("SELECT data FROM results WHERE experiment_id = ?", (experiment_id,))
+        return json.loads(rows[0]["data"]) if rows else None
+
+    def report_inputs(self, experiment_id: str) -> Optional[Dict]:
+        """Revisões atuais e o relatório em cache numa consulta (sem decodificar o JSON se o cache vale)"""
+        rows = self._query(
+            """SELECT e.revision AS experiment_revision, r.revision AS results_revision,
+                      p.experiment_revision AS cached_experiment, p.results_revision AS cached_results,
+                      p.report AS report
+               FROM experiments e
+               LEFT JOIN results r ON r.experiment_id = e.id
+               LEFT JOIN reports p ON p.experiment_id = e.id
+               WHERE e.id = ?""",
+            (experiment_id,),
+        )
+        if not rows:
+            return None
+        row = dict(rows[0])
+        fresh = (row["report"] is not None and row["cached_experiment"] == row["experiment_revision"]
+                 and row["cached_results"] == row["results_revision"])
+        return {"experiment_revision": row["experiment_revision"], "results_revision": row["results_revision"],
+                "report": row["report"] if fresh else None}
+
+    def save_report(self, experiment_id: str, experiment_revision: int, results_revision: int, report: str):
+        with self._transaction() as db:
+            db.execute("INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?)",
+                       (experiment_id, experiment_revision, results_revision, report))
+
+    def list_experiments(self, status: Optional[str] = None, since: Optional[str] = None,
+                         until: Optional[str] = None, metric: Optional[str] = None,
+                         limit: Optional[int] = None) -> List[Dict]:
+        """Resumo dos experimentos filtrados por status, data de criação (ISO) e métrica"""
+        sql = ["""SELECT e.id, e.name, e.status, e.allocation, e.created_at, e.completed_at, e.updated_at,
+                         r.winner, r.p_value, r.significant, r.completed_at AS results_at
+                  FROM experiments e LEFT JOIN results r ON r.experiment_id = e.id WHERE 1 = 1"""]
+        params = []
+        if status:
+            sql.append("AND e.status = ?")
+            params.append(status)
+        if since:
+            sql.append("AND e.created_at >= ?")
+            params.append(since)
+        if until:
+            sql.append("AND e.created_at < ?")
+            params.append(until)
+        if metric:
+            sql.append("AND e.id IN (SELECT experiment_id FROM experiment_metrics WHERE metric = ?)")
+            params.append(metric)
+        sql.append("ORDER BY e.created_at DESC")
+        if limit:
+            sql.append("LIMIT ?")
+            params.append(int(limit))
+        experiments = []
+        for row in self._query(" ".join(sql), params):
+            experiment = dict(row)
+            experiment["significant"] = None if row["significant"] is None else bool(row["significant"])
+            experiments.append(experiment)
+        return experiments
+
+    def import_files(self, hypothesis_path: Path, results_path: Path) -> int:
+        """Indexa os JSON de experimentos e resultados ainda ausentes; retorna quantos experimentos"""
+        known = {row["id"] for row in self._query("SELECT id FROM experiments")}
+        with_results = {row["experiment_id"] for row in self._query("SELECT experiment_id FROM results")}
+        imported = 0
+        for exp_file in sorted(hypothesis_path.glob("*.json")):
+            if exp_file.stem not in known:
+                try:
+                    with open(exp_file) as f:
+                        experiment = json.load(f)
+                    self.save_experiment(experiment)
+                except (OSError, json.JSONDecodeError, KeyError, TypeError):
+                    continue
+                known.add(experiment["id"])
+                imported += 1
+        for result_file in sorted(results_path.glob("*_results.json")):
+            experiment_id = result_file.name[:-len("_results.json")]
+            if experiment_id in known and experiment_id not in with_results:
+                try:
+                    with open(result_file) as f:
+                        self.save_results(experiment_id, json.load(f))
+                except (OSError, json.JSONDecodeError):
+                    continue
+        return imported
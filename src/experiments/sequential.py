@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Sequential Testing
+mSPRT com p-valores sempre válidos e parada antecipada
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import datetime
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.core.metrics.locking import file_lock
+
+DEFAULT_TAU = 0.05
+DEFAULT_ALPHA = 0.05
+MIN_SAMPLES = 10
+RECENT_IDS = 256
+PERSIST_EVERY = 100
+PERSIST_SECONDS = 5.0
+
+
+def mixture_log_lr(difference: float, variance: float, tau: float) -> float:
+    """log da razão de verossimilhança da mistura normal para a diferença de médias"""
+    tau2 = tau ** 2
+    return 0.5 * math.log(variance / (variance + tau2)) + tau2 * difference ** 2 / (2 * variance * (variance + tau2))
+
+
+def _arm_stats(arm: Dict):
+    n = arm["n"]
+    mean = arm["sum"] / n
+    variance = max(arm["sum_sq"] - arm["sum"] ** 2 / n, 0.0) / (n - 1)
+    return n, mean, variance
+
+
+class SequentialTest:
+    """Teste sequencial de um experimento (estado em memória, atualização O(1), persistência periódica)"""
+
+    def __init__(self, results_path: Path, experiment_id: str, persist_every: int = PERSIST_EVERY,
+                 persist_seconds: float = PERSIST_SECONDS):
+        self.experiment_id = experiment_id
+        self.path = results_path / f"{experiment_id}_sequential.json"
+        self.lock_path = results_path / f".{experiment_id}_sequential.lock"
+        self.persist_every = persist_every
+        self.persist_seconds = persist_seconds
+        self.state: Optional[Dict] = None
+        self._pending = []
+        self._synced = time.monotonic()
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> Optional[Dict]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _save(self, state: Dict):
+        state["updated_at"] = datetime.datetime.now().isoformat()
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump(state, f, indent=2)
+        tmp.replace(self.path)
+
+    def start(self, experiment: Dict, metric: str = "quality_score", alpha: float = DEFAULT_ALPHA,
+              tau: float = DEFAULT_TAU, min_samples: int = MIN_SAMPLES) -> Dict:
+        """Cria o estado vazio (reinicia um teste anterior do mesmo experimento)"""
+        control = experiment["control_variant"]
+        state = {
+            "experiment_id": self.experiment_id,
+            "metric": metric,
+            "alpha": alpha,
+            "tau": tau,
+            "min_samples": min_samples,
+            "max_samples": experiment.get("sample_size"),
+            "control": control,
+            "arms": {v["id"]: {"n": 0, "sum": 0.0, "sum_sq": 0.0} for v in experiment["variants"]},
+            "pairs": {v["id"]: {"p_value": 1.0, "difference": None, "log_lr": None}
+                      for v in experiment["variants"] if v["id"] != control},
+            "decision": None,
+            "recent_ids": [],
+            "started_at": datetime.datetime.now().isoformat(),
+        }
+        with file_lock(self.lock_path):
+            self._save(state)
+        self.state = state
+        self._pending = []
+        self._synced = time.monotonic()
+        return state
+
+    def observe(self, variant_id: str, value: float, interaction_id: Optional[str] = None) -> Optional[Dict]:
+        """Incorpora uma observação; retorna o estado (com ``decision`` quando o teste terminou)"""
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return None
+        if self.state is None:
+            self.state = self.load()
+        state = self.state
+        if state is None or state["decision"] is not None or variant_id not in state["arms"]:
+            return state
+        if not self._apply(state, variant_id, value, interaction_id):
+            return state
+        self._pending.append((variant_id, value, interaction_id))
+        if (state["decision"] is not None or len(self._pending) >= self.persist_every
+                or time.monotonic() - self._synced > self.persist_seconds):
+            self.sync()
+        return self.state
+
+    def sync(self) -> Optional[Dict]:
+        """Soma as observações pendentes ao estado em disco e adota o resultado"""
+        with file_lock(self.lock_path):
+            disk = self.load()
+            if disk is not None and self.state is not None and disk["started_at"] == self.state["started_at"]:
+                # Já contadas por outro processo são descartadas
+                applied = [self._apply(disk, variant_id, value, interaction_id)
+                           for variant_id, value, interaction_id in self._pending]
+                if any(applied):
+                    self._save(disk)
+            # Sem pendências (ou teste reiniciado por outro processo): só relê
+            self.state = disk
+            self._pending = []
+        self._synced = time.monotonic()
+        return self.state
+
+    def _apply(self, state: Dict, variant_id: str, value: float, interaction_id: Optional[str]) -> bool:
+        if state["decision"] is not None or variant_id not in state["arms"]:
+            return False
+        if interaction_id is not None:
+            if interaction_id in state["recent_ids"]:
+                return False
+            state["recent_ids"] = (state["recent_ids"] + [interaction_id])[-RECENT_IDS:]
+
+        arm = state["arms"][variant_id]
+        arm["n"] += 1
+        arm["sum"] += value
+        arm["sum_sq"] += value * value
+
+        # Atualizar o controle muda todos os pares; uma variante, só o seu
+        pairs = state["pairs"] if variant_id == state["control"] else {variant_id: state["pairs"][variant_id]}
+        for treatment in pairs:
+            self._update_pair(state, treatment)
+        state["decision"] = self._decide(state)
+        return True
+
+    def _update_pair(self, state: Dict, treatment: str):
+        control_arm, treatment_arm = state["arms"][state["control"]], state["arms"][treatment]
+        if min(control_arm["n"], treatment_arm["n"]) < max(state["min_samples"], 2):
+            return
+        n_c, mean_c, var_c = _arm_stats(control_arm)
+        n_t, mean_t, var_t = _arm_stats(treatment_arm)
+        variance = max(var_c / n_c + var_t / n_t, 1e-12)
+        difference = mean_t - mean_c
+        log_lr = mixture_log_lr(difference, variance, state["tau"])
+        pair = state["pairs"][treatment]
+        pair["difference"] = difference
+        pair["log_lr"] = log_lr
+        pair["p_value"] = min(pair["p_value"], math.exp(-log_lr) if log_lr > -700 else 1.0, 1.0)
+
+    def _decide(self, state: Dict) -> Optional[Dict]:
+        threshold = state["alpha"] / max(len(state["pairs"]), 1)
+        decided = {t: pair for t, pair in state["pairs"].items() if pair["p_value"] <= threshold}
+        samples = {variant: arm["n"] for variant, arm in state["arms"].items()}
+        if decided:
+            # Com mais de uma decidida, a de maior efeito
+            treatment = max(decided, key=lambda t: abs(decided[t]["difference"]))
+            better = decided[treatment]["difference"] > 0
+            return {
+                "outcome": "treatment_better" if better else "control_better",
+                "winner": treatment if better else state["control"],
+                "compared": treatment,
+                "p_value": decided[treatment]["p_value"],
+                "difference": decided[treatment]["difference"],
+                "samples": samples,
+                "decided_at": datetime.datetime.now().isoformat(),
+            }
+        max_samples = state.get("max_samples")
+        if max_samples and all(n >= max_samples for n in samples.values()):
+            return {
+                "outcome": "inconclusive",
+                "winner": None,
+                "samples": samples,
+                "decided_at": datetime.datetime.now().isoformat(),
+            }
+        return None
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Experiment Statistics
+Bootstrap, testes de permutação e Welch vetorizados com NumPy
+
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import stats as scipy_stats
+
+MAX_BINS = 64
+N_BOOTSTRAP = 10000
+N_PERMUTATIONS = 10000
+CONFIDENCE = 0.95
+
+
+@dataclass
+class Histogram:
+    """Amostra resumida: contagem, média e variância de cada bin"""
+    counts: np.ndarray
+    means: np.ndarray
+    variances: np.ndarray
+
+    @property
+    def n(self) -> int:
+        return int(self.counts.sum())
+
+    @property
+    def exact(self) -> bool:
+        return not self.variances.any()
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, max_bins: int = MAX_BINS) -> "Histogram":
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        unique, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+        if len(unique) <= max_bins:
+            return cls(counts, unique, np.zeros(len(unique)))
+        # Bins por quantis sobre os valores distintos ponderados pela contagem
+        edges = np.searchsorted(np.cumsum(counts), np.linspace(0, len(values), max_bins + 1)[1:-1])
+        group = np.searchsorted(edges, np.arange(len(unique)), side="right")[inverse]
+        counts = np.bincount(group)
+        keep = counts > 0
+        sums = np.bincount(group, weights=values)[keep]
+        squares = np.bincount(group, weights=values ** 2)[keep]
+        counts = counts[keep]
+        means = sums / counts
+        return cls(counts, means, np.maximum(squares / counts - means ** 2, 0.0))
+
+    def mean(self) -> float:
+        return float(self.counts @ self.means / self.n) if self.n else float("nan")
+
+    def draw_sums(self, rng: np.random.Generator, taken: np.ndarray, without_replacement: bool) -> np.ndarray:
+        """Soma dos valores sorteados dado quantos saíram de cada bin (linhas = reamostras)"""
+        sums = taken @ self.means
+        if not self.exact:
+            variance = taken * self.variances
+            if without_replacement:
+                population = np.maximum(self.counts - 1, 1)
+                variance = variance * (self.counts - taken) / population
+            sums = sums + np.sqrt(variance.sum(axis=1)) * rng.standard_normal(len(sums))
+        return sums
+
+
+def bootstrap_means(values, n_resamples: int = N_BOOTSTRAP,
+                    rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Médias de ``n_resamples`` reamostras bootstrap, todas de uma vez"""
+    rng = rng or np.random.default_rng()
+    histogram = values if isinstance(values, Histogram) else Histogram.from_values(values)
+    if not histogram.n:
+        return np.full(n_resamples, np.nan)
+    taken = rng.multinomial(histogram.n, histogram.counts / histogram.n, size=n_resamples)
+    return histogram.draw_sums(rng, taken, without_replacement=False) / histogram.n
+
+
+def bootstrap_ci(values, n_resamples: int = N_BOOTSTRAP, confidence: float = CONFIDENCE,
+                 rng: Optional[np.random.Generator] = None) -> Dict[str, float]:
+    """Intervalo percentil da média"""
+    histogram = Histogram.from_values(values)
+    means = bootstrap_means(histogram, n_resamples, rng)
+    low, high = np.nanpercentile(means, [50 * (1 - confidence), 50 * (1 + confidence)]) if histogram.n else (np.nan, np.nan)
+    return {"mean": histogram.mean(), "ci_low": float(low), "ci_high": float(high), "n": histogram.n}
+
+
+def permutation_test(control, treatment, n_permutations: int = N_PERMUTATIONS,
+                     rng: Optional[np.random.Generator] = None) -> float:
+    """p-valor bilateral da diferença de médias sob rótulos permutados"""
+    rng = rng or np.random.default_rng()
+    control = np.asarray(control, dtype=float)
+    treatment = np.asarray(treatment, dtype=float)
+    control, treatment = control[~np.isnan(control)], treatment[~np.isnan(treatment)]
+    if not len(control) or not len(treatment):
+        return float("nan")
+    pooled = Histogram.from_values(np.concatenate([control, treatment]))
+    n_treatment, total = len(treatment), pooled.n
+    taken = rng.multivariate_hypergeometric(pooled.counts, n_treatment, size=n_permutations)
+    treatment_sums = pooled.draw_sums(rng, taken, without_replacement=True)
+    total_sum = pooled.counts @ pooled.means
+    differences = treatment_sums / n_treatment - (total_sum - treatment_sums) / (total - n_treatment)
+    observed = treatment.mean() - control.mean()
+    # Tolerância: permutações empatadas com a observada contam como extremas
+    extreme = np.abs(differences) >= abs(observed) - 1e-12
+    return float((1 + extreme.sum()) / (n_permutations + 1))
+
+
+def welch_t_test(control, treatment) -> Dict[str, float]:
+    """Teste t de Welch (variâncias desiguais) para a diferença de médias"""
+    control = np.asarray(control, dtype=float)
+    treatment = np.asarray(treatment, dtype=float)
+    control, treatment = control[~np.isnan(control)], treatment[~np.isnan(treatment)]
+    if len(control) < 2 or len(treatment) < 2:
+        return {"t": float("nan"), "df": float("nan"), "p_value": float("nan")}
+    va, vb = control.var(ddof=1) / len(control), treatment.var(ddof=1) / len(treatment)
+    if va + vb == 0:
+        same = treatment.mean() == control.mean()
+        return {"t": 0.0 if same else float("inf"), "df": float("nan"), "p_value": 1.0 if same else 0.0}
+    t = (treatment.mean() - control.mean()) / np.sqrt(va + vb)
+    df = (va + vb) ** 2 / (va ** 2 / (len(control) - 1) + vb ** 2 / (len(treatment) - 1))
+    return {"t": float(t), "df": float(df), "p_value": float(2 * scipy_stats.t.sf(abs(t), df))}
+
+
+def compare_samples(control, treatment, n_resamples: int = N_BOOTSTRAP, n_permutations: int = N_PERMUTATIONS,
+                    confidence: float = CONFIDENCE, seed=None) -> Dict:
+    """Médias com IC, diferença com IC bootstrap, permutação e Welch para um par de amostras"""
+    rng = np.random.default_rng(seed)
+    control_histogram = Histogram.from_values(control)
+    treatment_histogram = Histogram.from_values(treatment)
+    control_means = bootstrap_means(control_histogram, n_resamples, rng)
+    treatment_means = bootstrap_means(treatment_histogram, n_resamples, rng)
+    tails = [50 * (1 - confidence), 50 * (1 + confidence)]
+
+    result = {
+        "n_control": control_histogram.n,
+        "n_treatment": treatment_histogram.n,
+        "control_mean": control_histogram.mean(),
+        "treatment_mean": treatment_histogram.mean(),
+    }
+    if not control_histogram.n or not treatment_histogram.n:
+        return {**result, "difference": None, "ci_low": None, "ci_high": None,
+                "permutation_p": None, "welch_p": None, "welch_t": None}
+    result["treatment_ci"] = [float(v) for v in np.percentile(treatment_means, tails)]
+    result["control_ci"] = [float(v) for v in np.percentile(control_means, tails)]
+    low, high = np.percentile(treatment_means - control_means, tails)
+    welch = welch_t_test(control, treatment)
+    return {
+        **result,
+        "difference": result["treatment_mean"] - result["control_mean"],
+        "ci_low": float(low),
+        "ci_high": float(high),
+        "permutation_p": permutation_test(control, treatment, n_permutations, rng),
+        "welch_t": welch["t"],
+        "welch_p": welch["p_value"],
+    }
+
+
+def holm(p_values: List[float]) -> List[float]:
+    """Correção de Holm-Bonferroni (p-valores ajustados, mesma ordem)"""
+    p = np.array([1.0 if v is None or np.isnan(v) else v for v in p_values], dtype=float)
+    order = np.argsort(p)
+    adjusted = np.minimum(1.0, np.maximum.accumulate(p[order] * (len(p) - np.arange(len(p)))))
+    result = np.empty_like(adjusted)
+    result[order] = adjusted
+    return result.tolist()
+
+
+def _compare_task(task: Tuple) -> Dict:
+    control, treatment, kwargs = task
+    return compare_samples(control, treatment, **kwargs)
+
+
+def analyze(samples: Dict[str, Dict[str, np.ndarray]], control: str, metrics: List[str],
+            workers: int = 1, seed: int = 42, **kwargs) -> Dict[str, Dict[str, Dict]]:
+    """Compara cada variante com o controle em cada métrica.
+
+    ``samples`` maps variant -> metric -> values. Each (variant, metric)
+    pair gets its own seed from ``seed``, so results do not depend on
+    ``workers``. ``adjusted_p`` is the Holm-corrected permutation p-value
+    across the treatments of one metric.
+    """
+    pairs = [(variant, metric) for variant in samples if variant != control for metric in metrics]
+    seeds = np.random.SeedSequence(seed).spawn(len(pairs))
+    tasks = [(samples[control][metric], samples[variant][metric], {**kwargs, "seed": task_seed})
+             for (variant, metric), task_seed in zip(pairs, seeds)]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks), os.cpu_count() or 1)) as pool:
+            results = list(pool.map(_compare_task, tasks))
+    else:
+        results = [_compare_task(task) for task in tasks]
+
+    analysis: Dict[str, Dict[str, Dict]] = {variant: {} for variant in samples if variant != control}
+    for (variant, metric), result in zip(pairs, results):
+        analysis[variant][metric] = result
+    for metric in metrics:
+        variants = list(analysis)
+        adjusted = holm([analysis[v][metric]["permutation_p"] for v in variants])
+        for variant, p in zip(variants, adjusted):
+            analysis[variant][metric]["adjusted_p"] = p
+    return analysis
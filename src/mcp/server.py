@@ -43,8 +43,6 @@ mcp = FastMCP("prompt-engineering-lab")
 # =============================================================================
 
 _pipeline = None
-_metrics_collector = None
-_experiment_runner = None
 _calibration_engine = None
 _dashboard = None
 
@@ -54,26 +52,24 @@ def get_pipeline():
     global _pipeline
     if _pipeline is None:
         from src.core.pipeline.integration_pipeline import IntegrationPipeline
-        _pipeline = IntegrationPipeline()
+        _pipeline = IntegrationPipeline(async_capture=True)
     return _pipeline
 
 
 def get_metrics_collector():
-    """Lazy load metrics collector"""
-    global _metrics_collector
-    if _metrics_collector is None:
-        from src.core.metrics.interaction_analyzer import MetricsCollector
-        _metrics_collector = MetricsCollector()
-    return _metrics_collector
+    """Metrics collector shared with the pipeline (one store and writer per process)"""
+    return get_pipeline().metrics_collector
 
 
 def get_experiment_runner():
-    """Lazy load experiment runner"""
-    global _experiment_runner
-    if _experiment_runner is None:
-        from src.experiments.experiment_runner import ExperimentRunner
-        _experiment_runner = ExperimentRunner()
-    return _experiment_runner
+    """Experiment runner shared with the pipeline, so bandits and sequential tests live in one place"""
+    return get_pipeline().experiment_runner
+
+
+def close_components():
+    """Flush and close the loaded components (queued captures, bandit rewards, registry connections)"""
+    if _pipeline is not None:
+        _pipeline.close()
 
 
 def get_calibration_engine():
@@ -128,7 +124,8 @@ def collect_interaction(
     quality_score: float,
     iteration_count: int,
     context_used: list[str],
-    pattern_applied: Optional[str] = None
+    pattern_applied: Optional[str] = None,
+    idempotency_key: Optional[str] = None
 ) -> str:
     """
     Collect metrics from an AI interaction for analysis and calibration.
@@ -141,6 +138,7 @@ def collect_interaction(
         iteration_count: Number of iterations needed
         context_used: List of context elements used (e.g., ["anderson-skill", "debugging"])
         pattern_applied: Optional pattern name (e.g., "chain", "parallel")
+        idempotency_key: Optional client key; retries with the same key are not stored twice
 
     Returns:
         Interaction ID for reference
@@ -155,7 +153,8 @@ def collect_interaction(
             quality_score=quality_score,
             iteration_count=iteration_count,
             context_used=context_used,
-            pattern_applied=pattern_applied
+            pattern_applied=pattern_applied,
+            idempotency_key=idempotency_key
         )
         return json.dumps({
             "status": "success",
@@ -188,6 +187,49 @@ def get_metrics_report(days: int = 7) -> str:
         return json.dumps({"status": "error", "message": str(e)})
 
 
+@mcp.tool()
+def get_latency_percentiles(days: int = 7, group_by: Optional[str] = None) -> str:
+    """
+    Get p50/p90/p99 of response time and prompt/response tokens for a period.
+
+    Args:
+        days: Number of days to include (default: 7)
+        group_by: Optional breakdown: "pattern" or "context"
+
+    Returns:
+        Percentiles computed from mergeable daily sketches (no raw-data scan)
+    """
+    logger.info(f"Computing percentiles for {days} days (group_by={group_by})")
+    try:
+        collector = get_metrics_collector()
+        report = collector.percentile_report(days=days, group_by=group_by)
+        return json.dumps(report, indent=2, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Failed to compute percentiles: {e}")
+        return json.dumps({"status": "error", "message": str(e)})
+
+
+@mcp.tool()
+def get_metric_trends(rebuild: bool = False) -> str:
+    """
+    Get 7/14/30-day rolling quality and latency, EWMA baselines and anomaly flags.
+
+    Args:
+        rebuild: Refit the trend state from all daily rollups (default: False)
+
+    Returns:
+        Rolling windows, EWMA per series, recent daily values and anomaly/changepoint flags
+    """
+    logger.info(f"Computing metric trends (rebuild={rebuild})")
+    try:
+        collector = get_metrics_collector()
+        report = collector.trend_report(rebuild=rebuild)
+        return json.dumps(report, indent=2, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Failed to compute trends: {e}")
+        return json.dumps({"status": "error", "message": str(e)})
+
+
 # =============================================================================
 # TOOLS: PERFORMANCE DASHBOARD
 # =============================================================================
@@ -195,7 +237,8 @@ def get_metrics_report(days: int = 7) -> str:
 @mcp.tool()
 def get_performance_report(days: int = 30) -> str:
     """
-    Generate comprehensive performance report with trends and visualizations.
+    Generate comprehensive performance report with trends and recommendations.
+    Charts are not rendered here; use render_performance_charts for them.
 
     Args:
         days: Number of days to analyze (default: 30)
@@ -213,6 +256,51 @@ def get_performance_report(days: int = 30) -> str:
         return json.dumps({"status": "error", "message": str(e)})
 
 
+@mcp.tool()
+def render_performance_charts(days: int = 30, wait: bool = False) -> str:
+    """
+    Render dashboard charts (PNG) into data/metrics/reports.
+
+    Args:
+        days: Number of days to chart (default: 30)
+        wait: Render before returning instead of queueing on a background worker
+
+    Returns:
+        Chart paths when cached or rendered, otherwise a "queued" status.
+        Charts are cached per window and data version.
+    """
+    logger.info(f"Rendering performance charts for {days} days (wait={wait})")
+    try:
+        pipeline = get_pipeline()
+        result = pipeline.render_performance_charts(days, wait=wait)
+        return json.dumps(result, indent=2, ensure_ascii=False, default=str)
+    except Exception as e:
+        logger.error(f"Failed to render performance charts: {e}")
+        return json.dumps({"status": "error", "message": str(e)})
+
+
+@mcp.tool()
+def export_html_dashboard(days: int = 365) -> str:
+    """
+    Write a self-contained interactive HTML dashboard into data/metrics/reports.
+
+    Args:
+        days: Number of days to include (default: 365)
+
+    Returns:
+        Path and size of the HTML file and how many days were re-emitted.
+        Built from daily rollups; unchanged days are reused from the cache.
+    """
+    logger.info(f"Exporting HTML dashboard for {days} days")
+    try:
+        pipeline = get_pipeline()
+        result = pipeline.export_html_dashboard(days)
+        return json.dumps(result, indent=2, ensure_ascii=False, default=str)
+    except Exception as e:
+        logger.error(f"Failed to export HTML dashboard: {e}")
+        return json.dumps({"status": "error", "message": str(e)})
+
+
 # =============================================================================
 # TOOLS: A/B EXPERIMENTS
 # =============================================================================
@@ -222,24 +310,33 @@ def create_experiment(
     experiment_id: str,
     name: str,
     hypothesis: str,
-    variant_a_name: str,
-    variant_a_template: str,
-    variant_b_name: str,
-    variant_b_template: str,
-    sample_size: int = 100
+    variant_a_name: Optional[str] = None,
+    variant_a_template: Optional[str] = None,
+    variant_b_name: Optional[str] = None,
+    variant_b_template: Optional[str] = None,
+    sample_size: int = 100,
+    variants: Optional[list[dict]] = None,
+    allocation: str = "fixed",
+    contextual: bool = False
 ) -> str:
     """
-    Create a new A/B experiment to test prompt variations.
+    Create a new A/B (or multi-variant) experiment to test prompt variations.
 
     Args:
         experiment_id: Unique identifier for the experiment
         name: Human-readable experiment name
         hypothesis: What you expect to happen (e.g., "Adding examples improves quality by 15%")
-        variant_a_name: Name for control variant
+        variant_a_name: Name for control variant (when variants is not given)
         variant_a_template: Prompt template for variant A
         variant_b_name: Name for test variant
         variant_b_template: Prompt template for variant B
         sample_size: Number of interactions per variant (default: 100)
+        variants: Any number of variants, the first being the control. Each has
+            "name" and "template", optionally "id", "context_modifiers",
+            "pattern" and "success_criteria"
+        allocation: "fixed" (uniform split), "thompson" or "ucb" (bandit that
+            shifts traffic toward the best quality)
+        contextual: Bandit allocation conditioned on the request's context_used
 
     Returns:
         Experiment creation confirmation
@@ -250,37 +347,49 @@ def create_experiment(
 
         runner = get_experiment_runner()
 
+        if variants is None:
+            if not (variant_a_name and variant_a_template and variant_b_name and variant_b_template):
+                return json.dumps({"status": "error",
+                                   "message": "Provide variants or both variant_a_* and variant_b_*"})
+            variants = [
+                {"id": "variant_a", "name": variant_a_name, "template": variant_a_template,
+                 "expected_outcome": "Control baseline", "success_criteria": ["quality_score > 0.7"]},
+                {"id": "variant_b", "name": variant_b_name, "template": variant_b_template,
+                 "expected_outcome": "Test improvement", "success_criteria": ["quality_score > 0.75"]},
+            ]
+        if len(variants) < 2:
+            return json.dumps({"status": "error", "message": "An experiment needs at least 2 variants"})
+
+        experiment_variants = [
+            ExperimentVariant(
+                id=variant.get("id") or f"variant_{index + 1}",
+                name=variant["name"],
+                prompt_template=variant["template"],
+                context_modifiers=variant.get("context_modifiers", []),
+                expected_outcome=variant.get("expected_outcome", "Control baseline" if index == 0 else "Test improvement"),
+                success_criteria=variant.get("success_criteria", ["quality_score > 0.7"]),
+                pattern=variant.get("pattern")
+            )
+            for index, variant in enumerate(variants)
+        ]
         experiment = Experiment(
             id=experiment_id,
             name=name,
             hypothesis=hypothesis,
-            variants=[
-                ExperimentVariant(
-                    id="variant_a",
-                    name=variant_a_name,
-                    prompt_template=variant_a_template,
-                    context_modifiers=[],
-                    expected_outcome="Control baseline",
-                    success_criteria=["quality_score > 0.7"]
-                ),
-                ExperimentVariant(
-                    id="variant_b",
-                    name=variant_b_name,
-                    prompt_template=variant_b_template,
-                    context_modifiers=[],
-                    expected_outcome="Test improvement",
-                    success_criteria=["quality_score > 0.75"]
-                )
-            ],
-            control_variant="variant_a",
+            variants=experiment_variants,
+            control_variant=experiment_variants[0].id,
             metrics_to_track=["quality_score", "response_time", "iteration_count"],
-            sample_size=sample_size
+            sample_size=sample_size,
+            allocation=allocation,
+            contextual=contextual
         )
 
         exp_id = runner.create_experiment(experiment)
         return json.dumps({
             "status": "success",
             "experiment_id": exp_id,
+            # Interações com esta tag em context_used contam para a variante
+            "variant_tags": {v.id: runner.variant_tag(exp_id, v.id) for v in experiment.variants},
             "message": f"Experiment '{name}' created successfully"
         })
     except Exception as e:
@@ -289,12 +398,43 @@ def create_experiment(
 
 
 @mcp.tool()
-def run_experiment(experiment_id: str) -> str:
+def assign_variant(experiment_id: str, context_used: Optional[list[str]] = None) -> str:
+    """
+    Pick the variant that should serve the next request of a running experiment.
+
+    Bandit experiments send more traffic to the variants with the best
+    quality so far. Add the returned tag to context_used when collecting
+    the interaction so its quality score is credited to the variant.
+
+    Args:
+        experiment_id: ID of a started experiment
+        context_used: Context elements of the request (used by contextual bandits)
+
+    Returns:
+        Variant ID and its tag
+    """
+    try:
+        assignment = get_pipeline().assign_variant(experiment_id, context_used)
+        if assignment is None:
+            return json.dumps({"status": "error", "message": "Experiment is not running"})
+        return json.dumps({"status": "success", **assignment})
+    except Exception as e:
+        logger.error(f"Failed to assign variant: {e}")
+        return json.dumps({"status": "error", "message": str(e)})
+
+
+@mcp.tool()
+def run_experiment(experiment_id: str, days: Optional[int] = None) -> str:
     """
     Run an existing A/B experiment and collect results.
 
+    Each variant is measured on the recorded interactions assigned to it:
+    those tagged with the variant's tag in context_used, or matching its
+    context modifiers.
+
     Args:
         experiment_id: ID of the experiment to run
+        days: Only use interactions from the last N days (default: all)
 
     Returns:
         Experiment results with statistical analysis and winner recommendation
@@ -302,13 +442,84 @@ def run_experiment(experiment_id: str) -> str:
     logger.info(f"Running experiment: {experiment_id}")
     try:
         runner = get_experiment_runner()
-        results = runner.run_experiment(experiment_id)
+        results = runner.run_experiment(experiment_id, days=days)
         return json.dumps(results, indent=2, ensure_ascii=False)
     except Exception as e:
         logger.error(f"Failed to run experiment: {e}")
         return json.dumps({"status": "error", "message": str(e)})
 
 
+@mcp.tool()
+def start_experiment(experiment_id: str) -> str:
+    """
+    Start an experiment with sequential testing and early stopping.
+
+    Every interaction collected afterwards updates an always-valid p-value
+    per variant; the experiment is marked completed as soon as a variant is
+    significantly better or worse than the control, or when every variant
+    reaches the sample size.
+
+    Args:
+        experiment_id: ID of the experiment to start
+
+    Returns:
+        Initial sequential test state
+    """
+    logger.info(f"Starting experiment: {experiment_id}")
+    try:
+        runner = get_experiment_runner()
+        return json.dumps(runner.start_experiment(experiment_id), indent=2, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Failed to start experiment: {e}")
+        return json.dumps({"status": "error", "message": str(e)})
+
+
+@mcp.tool()
+def get_experiment_status(experiment_id: str) -> str:
+    """
+    Get the sequential test state of a running or completed experiment.
+
+    Args:
+        experiment_id: ID of the experiment
+
+    Returns:
+        Interactions per variant, always-valid p-values and the decision, if any
+    """
+    try:
+        runner = get_experiment_runner()
+        return json.dumps(runner.sequential_status(experiment_id), indent=2, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Failed to get experiment status: {e}")
+        return json.dumps({"status": "error", "message": str(e)})
+
+
+@mcp.tool()
+def list_experiments(
+    status: Optional[str] = None,
+    days: Optional[int] = None,
+    metric: Optional[str] = None,
+    limit: Optional[int] = None
+) -> str:
+    """
+    List registered experiments, most recent first.
+
+    Args:
+        status: Only experiments with this status (draft, running, completed)
+        days: Only experiments created in the last N days
+        metric: Only experiments tracking this metric (e.g., "quality_score")
+        limit: Maximum number of experiments
+
+    Returns:
+        Experiments with status, allocation, dates and latest winner/significance
+    """
+    try:
+        result = get_pipeline().list_experiments(status=status, days=days, metric=metric, limit=limit)
+        return json.dumps(result, indent=2, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Failed to list experiments: {e}")
+        return json.dumps({"status": "error", "message": str(e)})
+
+
 @mcp.tool()
 def get_experiment_report(experiment_id: str) -> str:
     """
@@ -335,22 +546,28 @@ def get_experiment_report(experiment_id: str) -> str:
 # =============================================================================
 
 @mcp.tool()
-def train_calibration_models(force_retrain: bool = False) -> str:
+def train_calibration_models(force_retrain: bool = False, incremental: bool = False, select: bool = False) -> str:
     """
     Train ML models for auto-calibration based on historical interaction data.
 
     Requires at least 50 interactions for training.
 
     Args:
-        force_retrain: Force retraining even if models exist (default: False)
+        force_retrain: Force retraining even if models exist (default: False);
+            with incremental, restart the online models from all history
+        incremental: Update the online models with interactions captured since
+            the last checkpoint instead of refitting (default: False)
+        select: Choose hyperparameters by time-ordered cross-validation on all
+            cores, using hashed text features, and report held-out metrics
+            (default: False)
 
     Returns:
         Training results including model accuracy and clusters found
     """
-    logger.info(f"Training calibration models (force={force_retrain})")
+    logger.info(f"Training calibration models (force={force_retrain}, incremental={incremental}, select={select})")
     try:
         pipeline = get_pipeline()
-        result = pipeline.train_calibration_models(force_retrain=force_retrain)
+        result = pipeline.train_calibration_models(force_retrain=force_retrain, incremental=incremental, select=select)
         return json.dumps(result, indent=2, ensure_ascii=False)
     except Exception as e:
         logger.error(f"Failed to train models: {e}")
@@ -389,6 +606,29 @@ def suggest_optimizations(
         return json.dumps({"status": "error", "message": str(e)})
 
 
+@mcp.tool()
+def suggest_optimizations_batch(contexts: list[dict]) -> str:
+    """
+    Get optimization suggestions for several contexts in one call.
+
+    Args:
+        contexts: List of contexts, each with "type", "context_elements" and
+            optionally "target_outcome", "pattern", "prompt_tokens", "complexity", "urgency"
+
+    Returns:
+        One suggestion per context, in the same order, with predicted success rates.
+        All contexts are scored with a single call per model.
+    """
+    logger.info(f"Getting optimization suggestions for {len(contexts)} contexts")
+    try:
+        pipeline = get_pipeline()
+        result = pipeline.suggest_prompt_optimizations_batch(contexts)
+        return json.dumps(result, indent=2, ensure_ascii=False)
+    except Exception as e:
+        logger.error(f"Failed to get batch suggestions: {e}")
+        return json.dumps({"status": "error", "message": str(e)})
+
+
 @mcp.tool()
 def auto_optimize(target_metric: str = "quality_score") -> str:
     """
@@ -606,30 +846,33 @@ def main():
     logger.info(f"Starting Prompt Engineering Lab MCP Server")
     logger.info(f"Mode: {mode}, Port: {port}")
 
-    if mode == "remote":
-        # Railway/Cloud - SSE transport with health endpoint
-        logger.info("Running in REMOTE mode (SSE)")
-
-        import uvicorn
+    try:
+        if mode == "remote":
+            # Railway/Cloud - SSE transport with health endpoint
+            logger.info("Running in REMOTE mode (SSE)")
 
-        # Get the MCP SSE app
-        mcp_app = mcp.sse_app()
+            import uvicorn
 
-        # Create wrapper app with health endpoint
-        routes = [
-            Route("/health", health_endpoint, methods=["GET"]),
-        ]
+            # Get the MCP SSE app
+            mcp_app = mcp.sse_app()
 
-        # Mount MCP app
-        app = Starlette(routes=routes)
-        app.mount("/", mcp_app)
+            # Create wrapper app with health endpoint
+            routes = [
+                Route("/health", health_endpoint, methods=["GET"]),
+            ]
 
-        # Run with uvicorn
-        uvicorn.run(app, host="0.0.0.0", port=port)
-    else:
-        # Local - stdio transport
-        logger.info("Running in LOCAL mode (stdio)")
-        mcp.run(transport="stdio")
+            # Mount MCP app
+            app = Starlette(routes=routes)
+            app.mount("/", mcp_app)
+
+            # Run with uvicorn
+            uvicorn.run(app, host="0.0.0.0", port=port)
+        else:
+            # Local - stdio transport
+            logger.info("Running in LOCAL mode (stdio)")
+            mcp.run(transport="stdio")
+    finally:
+        close_components()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Shared Test Helpers
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+import random
+from pathlib import Path
+from datetime import datetime, timedelta
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.metrics.interaction_analyzer import InteractionMetrics
+
+
+def make_metrics(rng: random.Random, days_ago: float) -> InteractionMetrics:
+    return InteractionMetrics(
+        timestamp=(datetime.now() - timedelta(days=days_ago)).isoformat(),
+        prompt_tokens=rng.randint(50, 500),
+        response_tokens=rng.randint(100, 900),
+        response_time_ms=rng.randint(500, 3000),
+        quality_score=round(rng.uniform(0.3, 1.0), 3),
+        iteration_count=rng.randint(1, 4),
+        context_used=["anderson-skill", rng.choice(["debugging", "brainstorming", "code-review"])],
+        pattern_applied=rng.choice(["chain", "parallel", "evaluator", None])
+    )
+
+
+def interactions(count, seed):
+    """Stored-interaction dicts over the last 30 days, with stable IDs"""
+    rng = random.Random(seed)
+    return [{**vars(make_metrics(rng, rng.uniform(0, 30))), "id": f"{seed:04d}-{i:06d}"} for i in range(count)]
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """Run in a scratch directory: model paths are relative"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "research" / "evidence").mkdir(parents=True)
+    return tmp_path
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Tests for Auto-Calibration Online Training
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+import json
+import random
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.calibration.auto_calibration import AutoCalibrationEngine
+from src.core.metrics.interaction_analyzer import MetricsCollector
+from src.core.metrics.storage import migrate_legacy_files
+from tests.conftest import make_metrics
+
+
+class TestOnlineTraining:
+    """Test cases for incremental training from the checkpoint"""
+
+    @pytest.fixture
+    def collector(self, workspace):
+        """Collector storing in the scratch directory"""
+        storage = workspace / "data"
+        storage.mkdir()
+        collector = MetricsCollector(storage_path=storage)
+        yield collector
+        collector.close()
+
+    def capture(self, collector, count, seed):
+        rng = random.Random(seed)
+        collector.capture_many([make_metrics(rng, rng.uniform(0, 20)) for _ in range(count)])
+
+    def test_trains_only_new_interactions(self, collector):
+        """Each run folds in only what was captured since the last checkpoint"""
+        self.capture(collector, 120, seed=1)
+        engine = AutoCalibrationEngine()
+
+        first = engine.train_since_checkpoint(collector, chunk_size=50, settle_seconds=0)
+        assert first["new_samples"] == 120
+        assert first["model_accuracy"] is not None  # chunks after the first are scored
+
+        assert engine.train_since_checkpoint(collector, settle_seconds=0)["new_samples"] == 0
+
+        self.capture(collector, 30, seed=2)
+        # Outra instância retoma do checkpoint em disco
+        second = AutoCalibrationEngine().train_since_checkpoint(collector, settle_seconds=0)
+        assert second["new_samples"] == 30
+        assert second["samples_seen"] == 150
+        assert second["last_id"] > first["last_id"]
+
+    def test_recent_ids_wait_for_next_run(self, collector):
+        """Interactions newer than the settle delay are left for the next run"""
+        self.capture(collector, 20, seed=3)
+
+        result = AutoCalibrationEngine().train_since_checkpoint(collector, settle_seconds=3600)
+
+        assert result["new_samples"] == 0
+
+    def test_feature_space_is_stable(self, collector):
+        """Online features do not depend on the training data; prediction uses the latest models"""
+        self.capture(collector, 80, seed=4)
+        AutoCalibrationEngine().train_since_checkpoint(collector, settle_seconds=0)
+
+        engine = AutoCalibrationEngine()
+        prediction = engine.predict_optimal_config({
+            "context_elements": ["anderson-skill", "debugging"], "pattern": "chain", "prompt_tokens": 150
+        })
+        assert engine.model_status()["kind"] == "online"
+        assert 0 <= prediction.confidence <= 1
+
+        records = list(collector.iter_interactions())[:5]
+        X_before, _, _ = engine._extract_features(records, engine._serving_models().vectorizer)
+        X_after, _, _ = AutoCalibrationEngine()._extract_features(records, engine._hashing_vectorizer())
+        assert (X_before == X_after).all()
+
+    def test_legacy_records_join_the_first_run(self, collector):
+        """Migrated and loose legacy files (8-hex file-stem IDs) are trained on once"""
+        rng = random.Random(7)
+        for i in range(12):
+            record = {k: v for k, v in vars(make_metrics(rng, rng.uniform(1, 20))).items() if k != "id"}
+            (collector.storage_path / f"{0xa1b2c300 + i:08x}.json").write_text(json.dumps(record))
+        migrate_legacy_files(collector.storage_path)
+        (collector.storage_path / "f00dabcd.json").write_text(json.dumps(vars(make_metrics(rng, 2))))
+        self.capture(collector, 30, seed=8)
+
+        first = AutoCalibrationEngine().train_since_checkpoint(collector, settle_seconds=0)
+        assert first["new_samples"] == 43
+        assert len(first["last_id"]) == 26  # o cursor avança só por IDs ordenados
+
+        assert AutoCalibrationEngine().train_since_checkpoint(collector, settle_seconds=0)["new_samples"] == 0
+
+    def test_reset_restarts_from_history(self, collector):
+        """reset discards the online models and folds all stored interactions again"""
+        self.capture(collector, 60, seed=5)
+        engine = AutoCalibrationEngine()
+        engine.train_since_checkpoint(collector, settle_seconds=0)
+
+        result = engine.train_since_checkpoint(collector, settle_seconds=0, reset=True)
+
+        assert result["new_samples"] == 60
+        assert result["samples_seen"] == 60
+
+
+class TestBatchPrediction:
+    """Test cases for predicting many contexts at once"""
+
+    def test_batch_matches_single_predictions(self, workspace):
+        """predict_batch returns the same patterns as one call per context"""
+        rng = random.Random(6)
+        interactions = [vars(make_metrics(rng, 1)) for _ in range(80)]
+        engine = AutoCalibrationEngine()
+        engine.train_models(interactions)
+
+        contexts = [
+            {"type": kind, "context_elements": ["anderson-skill", kind], "pattern": pattern,
+             "prompt_tokens": tokens, "urgency": urgency}
+            for kind, pattern, tokens, urgency in [
+                ("debugging", "chain", 150, 1), ("brainstorming", "parallel", 400, 2),
+                ("code-review", None, 90, 3), ("unknown", "evaluator", 1200, 1)]
+        ]
+
+        batch = engine.predict_batch(contexts)
+
+        assert len(batch) == len(contexts)
+        for context, predicted in zip(contexts, batch):
+            single = engine.predict_optimal_config(context)
+            assert predicted.context_type == context["type"]
+            assert predicted.confidence == pytest.approx(single.confidence)
+            assert predicted.recommended_adjustments == single.recommended_adjustments
+        assert engine.predict_batch([]) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
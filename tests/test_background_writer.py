@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for Batch and Background Capture
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+import random
+import tempfile
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.metrics.interaction_analyzer import MetricsCollector
+from tests.conftest import make_metrics
+
+
+class TestBatchCapture:
+    """Test cases for capture_many and the background writer"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def test_capture_many(self, temp_dir):
+        """A batch is stored in one call and returns one ID per interaction"""
+        rng = random.Random(1)
+        collector = MetricsCollector(storage_path=temp_dir)
+        batch = [make_metrics(rng, days_ago=rng.uniform(0, 3)) for _ in range(50)]
+
+        ids = collector.capture_many(batch)
+
+        assert len(ids) == 50
+        stored = list(collector.iter_interactions())
+        assert sorted(r["id"] for r in stored) == sorted(ids)
+        assert collector.generate_report(days=7)["total_interactions"] == 50
+        collector.close()
+
+    def test_enqueue_drains_on_close(self, temp_dir):
+        """Queued interactions are all persisted once the collector closes"""
+        rng = random.Random(2)
+        collector = MetricsCollector(storage_path=temp_dir)
+        collector.start_background_writer(flush_interval=0.05, max_batch=16)
+        ids = [collector.enqueue_interaction(make_metrics(rng, days_ago=0.1)) for _ in range(200)]
+        collector.close()
+
+        reopened = MetricsCollector(storage_path=temp_dir)
+        stored = list(reopened.iter_interactions())
+        assert sorted(r["id"] for r in stored) == sorted(ids)
+        assert reopened.generate_report(days=1)["total_interactions"] == 200
+        reopened.close()
+
+    def test_report_sees_queued_interactions(self, temp_dir):
+        """Reads wait for the queue, so a report includes everything enqueued before it"""
+        rng = random.Random(3)
+        collector = MetricsCollector(storage_path=temp_dir)
+        for _ in range(30):
+            collector.enqueue_interaction(make_metrics(rng, days_ago=0.5))
+
+        assert collector.generate_report(days=7)["total_interactions"] == 30
+        assert collector.writer.errors == 0
+        collector.close()
+
+    def test_enqueue_after_close_fails(self, temp_dir):
+        """A closed writer rejects new records instead of dropping them silently"""
+        collector = MetricsCollector(storage_path=temp_dir)
+        writer = collector.start_background_writer()
+        collector.close()
+
+        with pytest.raises(RuntimeError):
+            writer.enqueue({"id": "x"})
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
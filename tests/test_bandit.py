@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tests for Bandit Allocation
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import json
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.experiments.bandit import BanditAllocator, context_key
+
+MEANS = {"a": 0.5, "b": 0.6, "c": 0.8}
+
+
+def play(bandit, rounds, means=MEANS, context=None, seed=0):
+    """Simula requisições; retorna as variantes escolhidas"""
+    rng = random.Random(seed)
+    picks = []
+    for _ in range(rounds):
+        variant = bandit.assign(context)
+        picks.append(variant)
+        bandit.update(variant, min(max(rng.gauss(means[variant], 0.1), 0.0), 1.0), context)
+    return picks
+
+
+class TestBanditAllocator:
+    """Test cases for BanditAllocator"""
+
+    @pytest.mark.parametrize("policy", ["thompson", "ucb"])
+    def test_traffic_shifts_to_best_variant(self, tmp_path, policy):
+        bandit = BanditAllocator(tmp_path / "b.json", list(MEANS), policy=policy, seed=1)
+
+        picks = play(bandit, 2000)
+
+        assert picks[-500:].count("c") > 0.8 * 500
+        summary = bandit.summary()
+        assert summary["variants"]["c"]["mean_reward"] == pytest.approx(0.8, abs=0.02)
+        assert max(summary["variants"], key=lambda v: summary["variants"][v]["allocation"]) == "c"
+
+    def test_ucb_tries_every_variant_first(self, tmp_path):
+        bandit = BanditAllocator(tmp_path / "b.json", list(MEANS), policy="ucb")
+        assert play(bandit, 3) == ["a", "b", "c"]
+
+    def test_contextual_learns_per_context(self, tmp_path):
+        """Each context converges to its own best variant"""
+        bandit = BanditAllocator(tmp_path / "b.json", list(MEANS), contextual=True, seed=2)
+        flipped = {"a": 0.85, "b": 0.6, "c": 0.4}
+        for round_ in range(10):
+            play(bandit, 100, MEANS, ["writing"], seed=round_)
+            play(bandit, 100, flipped, ["debugging", "python"], seed=round_ + 100)
+
+        writing = [bandit.assign(["writing"]) for _ in range(200)]
+        debugging = [bandit.assign(["python", "debugging"]) for _ in range(200)]
+        assert writing.count("c") > 150
+        assert debugging.count("a") > 150
+        assert bandit.summary()["contexts"] == 2
+
+    def test_context_key_ignores_order_and_tags(self):
+        assert context_key(["b", "a", "variant:exp/x", "a"]) == "a|b"
+        assert context_key(None) == ""
+
+    def test_processes_merge_their_updates(self, tmp_path):
+        """Two allocators on one file add their counts instead of overwriting"""
+        path = tmp_path / "b.json"
+        first = BanditAllocator(path, list(MEANS), persist_every=1000)
+        second = BanditAllocator(path, list(MEANS), persist_every=1000)
+        for _ in range(10):
+            first.update("a", 1.0)
+            second.update("b", 0.0)
+
+        first.sync()
+        second.sync()
+
+        state = json.loads(path.read_text())
+        assert state["arms"]["a"] == [10.0, 0.0]
+        assert state["arms"]["b"] == [0.0, 10.0]
+        assert second.arms["a"] == [10.0, 0.0]
+
+    def test_repeated_interaction_is_counted_once(self, tmp_path):
+        """Within a process and across processes sharing the state file"""
+        path = tmp_path / "b.json"
+        first = BanditAllocator(path, list(MEANS), persist_every=1000)
+        second = BanditAllocator(path, list(MEANS), persist_every=1000)
+        first.update("a", 1.0, interaction_id="id-1")
+        first.update("a", 1.0, interaction_id="id-1")
+        second.update("a", 1.0, interaction_id="id-1")
+        second.update("a", 0.0, interaction_id="id-2")
+
+        first.sync()
+        second.sync()
+
+        assert json.loads(path.read_text())["arms"]["a"] == [1.0, 1.0]
+        assert json.loads(path.read_text())["recent_ids"] == ["id-1", "id-2"]
+
+    def test_persists_periodically(self, tmp_path):
+        path = tmp_path / "b.json"
+        bandit = BanditAllocator(path, list(MEANS), persist_every=5)
+        for _ in range(4):
+            bandit.update("a", 0.5)
+        assert not path.exists()
+
+        bandit.update("a", 0.5)
+
+        assert BanditAllocator(path, list(MEANS)).arms["a"] == [2.5, 2.5]
+
+    def test_invalid_input(self, tmp_path):
+        with pytest.raises(ValueError):
+            BanditAllocator(tmp_path / "b.json", list(MEANS), policy="greedy")
+        bandit = BanditAllocator(tmp_path / "b.json", list(MEANS))
+        bandit.update("unknown", 1.0)
+        bandit.update("a", float("nan"))
+        bandit.update("b", 7.0)  # limitada a [0, 1]
+        assert bandit.arms["a"] == [0.0, 0.0]
+        assert bandit.arms["b"] == [1.0, 0.0]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the Metrics Benchmark Suite
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.metrics.bench_suite import compare
+from benchmarks.metrics.workload import WorkloadGenerator
+
+
+class TestWorkloadGenerator:
+    """Test cases for the synthetic interaction generator"""
+
+    def test_same_seed_same_workload(self):
+        """A seed reproduces the same interactions"""
+        now = datetime(2025, 6, 1, 12)
+        first = WorkloadGenerator(seed=7, now=now).generate(200)
+        second = WorkloadGenerator(seed=7, now=now).generate(200)
+        other = WorkloadGenerator(seed=8, now=now).generate(200)
+
+        assert first == second
+        assert first != other
+
+    def test_distributions_are_plausible(self):
+        """Timestamps cover the period and values stay within their ranges"""
+        now = datetime(2025, 6, 1, 12)
+        interactions = WorkloadGenerator(seed=1, days=90, now=now).generate(3000)
+        timestamps = [datetime.fromisoformat(m.timestamp) for m in interactions]
+
+        assert all(now - timedelta(days=91) <= t <= now for t in timestamps)
+        assert min(timestamps) < now - timedelta(days=60)
+        assert all(0 <= m.quality_score <= 1 for m in interactions)
+        assert all(1 <= m.iteration_count <= 6 for m in interactions)
+        assert all(1 <= len(m.context_used) == len(set(m.context_used)) <= 4 for m in interactions)
+        # Popularidade enviesada: o padrão mais comum domina os menos comuns
+        patterns = Counter(m.pattern_applied for m in interactions)
+        assert patterns["chain"] > 3 * patterns["reflection"]
+        # Dias úteis concentram o tráfego
+        weekday = sum(t.weekday() < 5 for t in timestamps)
+        assert weekday / len(timestamps) > 0.8
+
+
+class TestCompare:
+    """Test cases for comparing two result files"""
+
+    def test_flags_regressions(self):
+        """Benchmarks slower than the threshold are marked as regressions"""
+        baseline = {"runs": [{"size": 10, "results": {"a": {"seconds": 1.0}, "b": {"seconds": 1.0}}}]}
+        current = {"runs": [{"size": 10, "results": {"a": {"seconds": 1.5}, "b": {"seconds": 0.9},
+                                                     "c": {"seconds": 1.0}}}]}
+
+        changes = {c["benchmark"]: c for c in compare(current, baseline, threshold=0.2)}
+
+        assert set(changes) == {"a", "b"}
+        assert changes["a"]["regression"] is True
+        assert changes["b"]["regression"] is False
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
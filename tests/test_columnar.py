@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Tests for the Columnar Interaction Snapshot
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+import random
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.calibration.auto_calibration import AutoCalibrationEngine
+from src.core.metrics.columnar import InteractionColumns, load_columns, load_snapshot
+from src.core.metrics.interaction_analyzer import MetricsCollector
+from tests.conftest import make_metrics
+
+
+def by_id(records):
+    return {r["id"]: r for r in records}
+
+
+class TestInteractionColumns:
+    """Test cases for the columnar encoding"""
+
+    def test_encoding_roundtrip(self):
+        """Dictionary and list-offset encodings decode back to the original values"""
+        records = [
+            {"id": "a", "timestamp": "2025-01-02T10:00:00", "quality_score": 0.9,
+             "pattern_applied": "chain", "context_used": ["x", "y"]},
+            {"id": "b", "timestamp": "2025-01-01T10:00:00", "pattern_applied": None, "context_used": []},
+            {"id": "c", "quality_score": 0.4, "pattern_applied": "parallel", "context_used": ["y"]},
+        ]
+        columns = InteractionColumns.from_records(records)
+
+        assert list(columns.pattern_values()) == ["chain", None, "parallel"]
+        assert columns.context_lists() == [["x", "y"], [], ["y"]]
+        assert np.isnan(columns["quality_score"][1])
+        assert np.isnat(columns["timestamp"][2])
+
+        picked = columns.take(np.array([2, 0]))
+        assert picked.context_lists() == [["y"], ["x", "y"]]
+        assert list(picked["id"]) == ["c", "a"]
+
+    def test_concat_merges_dictionaries(self):
+        """Blocks with different dictionaries are re-coded into one"""
+        first = InteractionColumns.from_records([{"pattern_applied": "chain", "context_used": ["x"]}])
+        second = InteractionColumns.from_records([{"pattern_applied": "router", "context_used": ["z", "x"]},
+                                                  {"context_used": []}])
+        merged = InteractionColumns.concat([first, second.take(slice(0, 2))])
+
+        assert len(merged) == 3
+        assert list(merged.pattern_values()) == ["chain", "router", None]
+        assert merged.context_lists() == [["x"], ["z", "x"], []]
+
+
+class TestSnapshot:
+    """Test cases for the on-disk snapshot"""
+
+    @pytest.fixture
+    def collector(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            collector = MetricsCollector(storage_path=Path(tmpdir))
+            yield collector
+            collector.close()
+
+    def test_snapshot_plus_tail_matches_raw_scan(self, collector):
+        """Snapshot rows plus records written after it equal a raw scan of the window"""
+        rng = random.Random(7)
+        collector.capture_many([make_metrics(rng, rng.uniform(0, 20)) for _ in range(200)])
+        result = collector.build_snapshot()
+        assert result["rows"] == 200
+        collector.capture_many([make_metrics(rng, rng.uniform(0, 20)) for _ in range(40)])
+
+        for days in (3, 7, 30):
+            columns = collector.load_columns(days=days)
+            raw = by_id(collector.iter_interactions(days=days))
+            rows = zip(columns["id"], columns["quality_score"], columns.pattern_values(), columns.context_lists())
+
+            assert len(columns) == len(raw)
+            for interaction_id, quality, pattern, contexts in rows:
+                assert quality == raw[interaction_id]["quality_score"]
+                assert pattern == raw[interaction_id]["pattern_applied"]
+                assert contexts == raw[interaction_id]["context_used"]
+
+    def test_snapshot_is_memory_mapped(self, collector):
+        """Readers map only the requested columns"""
+        rng = random.Random(8)
+        collector.capture_many([make_metrics(rng, 1) for _ in range(20)])
+        collector.build_snapshot()
+
+        columns, watermark = load_snapshot(collector.storage_path, columns=["quality_score"])
+        assert set(columns.arrays) == {"quality_score"}
+        assert isinstance(columns["quality_score"], np.memmap)
+        assert watermark
+
+    def test_rebuild_replaces_generation(self, collector):
+        """A second compaction swaps the current generation and removes the old one"""
+        rng = random.Random(9)
+        collector.capture_many([make_metrics(rng, 1) for _ in range(10)])
+        first = collector.build_snapshot()
+        collector.capture_many([make_metrics(rng, 1) for _ in range(5)])
+        second = collector.build_snapshot()
+
+        generations = list((collector.storage_path / "snapshot").glob("gen-*"))
+        assert [g.name for g in generations] == [second["generation"]] != [first["generation"]]
+        assert len(load_columns(collector.storage_path)) == 15
+
+    def test_window_without_snapshot_reads_recent_partitions(self, collector, monkeypatch):
+        """Without a snapshot, a windowed load opens only partitions that can hold newer records"""
+        from src.core.metrics import storage
+        rng = random.Random(11)
+        collector.capture_many([make_metrics(rng, days_ago) for days_ago in range(60) for _ in range(2)])
+        collector.flush()
+        opened = set()
+        iter_segment_from = storage.iter_segment_from
+
+        def counting(path, offset=0):
+            opened.add(path.parent.name)
+            return iter_segment_from(path, offset)
+
+        monkeypatch.setattr(storage, "iter_segment_from", counting)
+        since = datetime.now() - timedelta(days=7)
+        columns = load_columns(collector.storage_path, since=since)
+
+        expected = [r for r in collector.iter_interactions() if datetime.fromisoformat(r["timestamp"]) > since]
+        assert len(columns) == len(expected)
+        assert len(storage.list_partitions(collector.storage_path)) == 60
+        assert len(opened) <= 9
+
+    def test_extract_features_from_columns(self, collector):
+        """Feature extraction gives the same matrix from columns and from dicts"""
+        rng = random.Random(10)
+        collector.capture_many([make_metrics(rng, rng.uniform(0, 5)) for _ in range(60)])
+        collector.build_snapshot()
+        records = sorted(collector.iter_interactions(), key=lambda r: r["timestamp"])
+
+        engine = AutoCalibrationEngine(data_path=collector.storage_path)
+        X_cols, y_cols, q_cols = engine._extract_features(collector.load_columns())
+        X_dicts, y_dicts, q_dicts = engine._extract_features(records)
+
+        np.testing.assert_allclose(X_cols, X_dicts)
+        np.testing.assert_array_equal(y_cols, y_dicts)
+        np.testing.assert_allclose(q_cols, q_dicts)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
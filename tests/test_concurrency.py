@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for Concurrent Access to the Metrics Store
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+import json
+import multiprocessing
+import random
+import tempfile
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.metrics.interaction_analyzer import MetricsCollector
+from src.core.metrics.retention import RetentionPolicy
+from src.core.metrics.storage import iter_stored_interactions
+from tests.conftest import make_metrics
+
+WRITERS = 4
+PER_WRITER = 300
+SEGMENT_BYTES = 16 * 1024  # força rotação de segmentos durante o teste
+
+
+def _context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+
+
+def _writer(storage_path, seed, ids):
+    """Grava PER_WRITER interações alternando chamadas unitárias e em lote"""
+    rng = random.Random(seed)
+    collector = MetricsCollector(storage_path=storage_path, max_segment_bytes=SEGMENT_BYTES)
+    written = []
+    while len(written) < PER_WRITER:
+        if rng.random() < 0.5:
+            written.append(collector.capture_interaction(make_metrics(rng, rng.uniform(0, 3))))
+        else:
+            size = min(rng.randint(2, 20), PER_WRITER - len(written))
+            written.extend(collector.capture_many([make_metrics(rng, rng.uniform(0, 3)) for _ in range(size)]))
+    collector.close()
+    ids.put(written)
+
+
+def _reader(storage_path, stop, problems):
+    """Lê continuamente enquanto os escritores gravam; registra qualquer anomalia"""
+    collector = MetricsCollector(storage_path=storage_path)
+    last_total = 0
+    while not stop.is_set():
+        seen = set()
+        for record in iter_stored_interactions(storage_path):
+            if not isinstance(record, dict) or len(record.get("id") or "") != 26:
+                problems.put(f"torn record: {record!r}")
+            elif record["id"] in seen:
+                problems.put(f"duplicate id: {record['id']}")
+            seen.add(record["id"])
+        report = collector.generate_report(days=7)
+        total = report.get("total_interactions", 0)
+        if total < last_total:
+            problems.put(f"report went backwards: {last_total} -> {total}")
+        last_total = total
+    collector.close()
+    problems.put(None)
+
+
+def _maintenance(storage_path, stop):
+    """Compacta segmentos em paralelo com as escritas"""
+    collector = MetricsCollector(storage_path=storage_path, max_segment_bytes=SEGMENT_BYTES)
+    while not stop.wait(0.05):
+        collector.apply_retention(RetentionPolicy(raw_days=30, target_segment_bytes=4 * SEGMENT_BYTES))
+    collector.close()
+
+
+class TestConcurrentWriters:
+    """Several writer processes, concurrent readers and maintenance"""
+
+    @pytest.fixture
+    def temp_storage(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def test_no_lost_or_torn_records(self, temp_storage):
+        """Every captured interaction is stored exactly once and reports see all of them"""
+        ctx = _context()
+        ids, problems, stop = ctx.Queue(), ctx.Queue(), ctx.Event()
+        reader = ctx.Process(target=_reader, args=(temp_storage, stop, problems))
+        maintenance = ctx.Process(target=_maintenance, args=(temp_storage, stop))
+        writers = [ctx.Process(target=_writer, args=(temp_storage, seed, ids)) for seed in range(WRITERS)]
+        reader.start()
+        maintenance.start()
+        for process in writers:
+            process.start()
+
+        expected = []
+        for _ in writers:
+            expected.extend(ids.get(timeout=120))
+        for process in writers:
+            process.join(timeout=60)
+            assert process.exitcode == 0
+        stop.set()
+        maintenance.join(timeout=60)
+        assert maintenance.exitcode == 0
+
+        issues = []
+        while True:
+            item = problems.get(timeout=60)
+            if item is None:
+                break
+            issues.append(item)
+        reader.join(timeout=60)
+        assert issues == []
+
+        stored = [record["id"] for record in iter_stored_interactions(temp_storage)]
+        assert len(expected) == WRITERS * PER_WRITER
+        assert sorted(stored) == sorted(expected)
+
+        collector = MetricsCollector(storage_path=temp_storage)
+        assert collector.generate_report(days=7)["total_interactions"] == len(expected)
+        # Os agregados persistidos por processos diferentes também fecham a conta
+        collector.rebuild_rollups()
+        assert collector.generate_report(days=7)["total_interactions"] == len(expected)
+
+    def test_index_merges_entries_from_all_writers(self, temp_storage):
+        """The shared index ends up describing every segment written by every process"""
+        ctx = _context()
+        ids = ctx.Queue()
+        writers = [ctx.Process(target=_writer, args=(temp_storage, seed, ids)) for seed in range(2)]
+        for process in writers:
+            process.start()
+        for _ in writers:
+            ids.get(timeout=120)
+        for process in writers:
+            process.join(timeout=60)
+
+        with open(temp_storage / "segments" / "index.json") as f:
+            index = json.load(f)
+        segments = {f"{p.parent.name}/{p.name}" for p in (temp_storage / "segments").glob("*/*.jsonl")}
+        indexed = {f"{day}/{name}" for day, entry in index["partitions"].items() for name in entry["segments"]}
+        assert indexed == segments
+        counted = sum(seg["count"] for entry in index["partitions"].values() for seg in entry["segments"].values())
+        assert counted == 2 * PER_WRITER
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
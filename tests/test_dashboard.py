@@ -16,6 +16,7 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
 from src.core.calibration.dashboard import PerformanceDashboard
+from src.core.calibration.report_context import ReportContext
 
 
 class TestPerformanceDashboard:
@@ -166,6 +167,180 @@ class TestPerformanceDashboard:
         assert "anderson-skill" in context_perf
         # anderson-skill appears in all 3 interactions
 
+    def test_context_statistics_single_pass(self, dashboard):
+        """Per-context mean, count and percentiles match a row-by-row computation"""
+        import numpy as np
+        import pandas as pd
+
+        df = pd.DataFrame({
+            "quality_score": [0.9, 0.5, 0.7, 0.3, 0.8],
+            "context_used": [["a", "b"], ["b"], None, ["a", "c"], ["a"]],
+        })
+
+        ctx = ReportContext(df)
+        stats = ctx.context_stats
+
+        assert list(stats.index) == ["a", "b", "c"]  # ordem de primeira aparição
+        assert stats.loc["a", "count"] == 3
+        assert stats.loc["a", "mean"] == pytest.approx(np.mean([0.9, 0.3, 0.8]))
+        assert stats.loc["b", "p50"] == pytest.approx(0.7)
+        assert dashboard._analyze_context_performance(df, ctx)["c"] == pytest.approx(0.3)
+        assert dashboard._analyze_patterns(df, ctx)["context_distribution"] == {"a": 3, "b": 2, "c": 1}
+
+    def test_generate_recommendations_low_performing_context(self, dashboard):
+        """Frequent contexts with low quality are called out"""
+        import pandas as pd
+
+        df = pd.DataFrame([
+            {"quality_score": 0.4, "iteration_count": 1, "response_time_ms": 1000, "context_used": ["legacy"]}
+            for _ in range(5)
+        ] + [
+            {"quality_score": 0.95, "iteration_count": 1, "response_time_ms": 1000, "context_used": ["debugging"]}
+            for _ in range(5)
+        ])
+
+        with patch.object(dashboard, '_calculate_trends', return_value={"insufficient_data": True}):
+            recommendations = dashboard._generate_recommendations(df)
+
+        assert any("Low-performing contexts detected: legacy" == r for r in recommendations)
+
+    @patch('src.core.calibration.dashboard.PerformanceDashboard._create_visualizations')
+    @patch('src.core.calibration.dashboard.PerformanceDashboard._save_report')
+    def test_report_computes_shared_values_once(self, mock_save, mock_viz, dashboard, sample_interactions):
+        """Timestamps are parsed once per report and every section is timed"""
+        import pandas as pd
+
+        self._save_interactions(dashboard.data_path, sample_interactions)
+
+        with patch('src.core.calibration.report_context.pd.to_datetime', wraps=pd.to_datetime) as to_datetime:
+            report = dashboard.generate_comprehensive_report(days=7)
+
+        assert to_datetime.call_count == 1
+        timings = report["section_timings_ms"]
+        for section in ("load_data", "parse_timestamps", "daily_aggregates", "trends",
+                        "pattern_analysis", "recommendations", "save_report"):
+            assert section in timings
+
+    @patch('src.core.calibration.dashboard._load_plotting')
+    def test_report_does_not_render_charts(self, mock_load, dashboard, sample_interactions):
+        """The report API returns metrics without importing or calling matplotlib"""
+        self._save_interactions(dashboard.data_path, sample_interactions)
+
+        report = dashboard.generate_comprehensive_report(days=7)
+
+        assert "error" not in report
+        assert "charts" not in report
+        mock_load.assert_not_called()
+        assert not list(dashboard.reports_path.glob("*.png"))
+
+    @patch('src.core.calibration.dashboard._load_plotting')
+    def test_render_charts_cached_by_data_version(self, mock_load, dashboard, sample_interactions):
+        """Identical chart requests render once; new data renders again"""
+        self._save_interactions(dashboard.data_path, sample_interactions)
+
+        def fake_render(df, days, ctx=None, tag=None):
+            path = dashboard.reports_path / f"dashboard_{days}days_{tag}.png"
+            path.write_bytes(b"png")
+            return [path]
+
+        with patch.object(dashboard, '_create_visualizations', side_effect=fake_render) as render:
+            first = dashboard.render_charts(days=7)
+            second = dashboard.render_charts(days=7)
+            assert render.call_count == 1
+            assert first["status"] == "rendered"
+            assert second["status"] == "cached"
+            assert second["paths"] == first["paths"]
+
+            extra = dict(sample_interactions[0], timestamp=datetime.now().isoformat())
+            with open(dashboard.data_path / "interaction_new.json", 'w') as f:
+                json.dump(extra, f)
+            third = dashboard.render_charts(days=7)
+
+            assert render.call_count == 2
+            assert third["data_version"] != first["data_version"]
+
+            # Em segundo plano: o mesmo cache
+            job = dashboard.render_charts_async(days=7)
+            assert job.result(timeout=30)["status"] == "cached"
+            dashboard.close()
+
+    @patch('src.core.calibration.dashboard._load_plotting')
+    def test_render_charts_reads_data_version_once(self, mock_load, dashboard, sample_interactions):
+        """The cache lookup and the manifest use the same data version"""
+        from src.core.calibration import dashboard as dashboard_module
+        self._save_interactions(dashboard.data_path, sample_interactions)
+
+        with patch.object(dashboard, '_create_visualizations', return_value=[]), \
+             patch.object(dashboard_module, 'data_version', wraps=dashboard_module.data_version) as version:
+            dashboard.render_charts(days=7)
+            assert version.call_count == 1
+            assert dashboard.render_charts(days=7)["status"] == "cached"
+            assert version.call_count == 2
+
+    @patch('src.core.calibration.dashboard.PerformanceDashboard._save_report')
+    def test_reports_reuse_one_rollup_store(self, mock_save, dashboard, sample_interactions):
+        """Rollups come from the collector, or one store per dashboard; legacy data creates none"""
+        from src.core.metrics.interaction_analyzer import InteractionMetrics, MetricsCollector
+        from src.core.calibration import dashboard as dashboard_module
+
+        self._save_interactions(dashboard.data_path, sample_interactions)
+        with patch.object(dashboard_module, 'RollupStore', wraps=dashboard_module.RollupStore) as store:
+            assert "error" not in dashboard.generate_comprehensive_report(days=7)
+            assert store.call_count == 0
+        assert not (dashboard.data_path / "rollups").exists()
+
+        collector = MetricsCollector(storage_path=dashboard.data_path)
+        collector.capture_interaction(InteractionMetrics(
+            timestamp=datetime.now().isoformat(), prompt_tokens=100, response_tokens=200,
+            response_time_ms=1000, quality_score=0.8, iteration_count=1, context_used=["debugging"]))
+        collector.flush()
+        with patch.object(dashboard_module, 'RollupStore', wraps=dashboard_module.RollupStore) as store:
+            dashboard.generate_comprehensive_report(days=7)
+            dashboard.generate_comprehensive_report(days=7)
+            assert store.call_count == 1
+
+            shared = PerformanceDashboard(data_path=dashboard.data_path, collector=collector)
+            shared.reports_path = dashboard.reports_path
+            report = shared.generate_comprehensive_report(days=7)
+            assert store.call_count == 1
+        assert report["percentiles"]["overall"]
+        collector.close()
+
+    def test_export_html_reemits_changed_days_only(self, dashboard):
+        """The HTML export is built from rollups and only re-encodes days that changed"""
+        from src.core.metrics.interaction_analyzer import InteractionMetrics, MetricsCollector
+
+        def interaction(days_ago, pattern, context):
+            return InteractionMetrics(
+                timestamp=(datetime.now() - timedelta(days=days_ago)).isoformat(),
+                prompt_tokens=100, response_tokens=200, response_time_ms=1000 + 100 * days_ago,
+                quality_score=0.8, iteration_count=1, context_used=[context], pattern_applied=pattern)
+
+        collector = MetricsCollector(storage_path=dashboard.data_path)
+        collector.capture_many([interaction(d, "chain" if d % 2 else "parallel", "</script>debugging")
+                                for d in range(5) for _ in range(3)])
+        collector.flush()
+
+        first = dashboard.export_html(days=30)
+        assert first["status"] == "written"
+        assert first["days"] == first["reemitted_days"] == 5
+        assert dashboard.export_html(days=30)["status"] == "unchanged"
+
+        collector.capture_interaction(interaction(0, "chain", "review"))
+        collector.close()
+        third = dashboard.export_html(days=30)
+        assert third["status"] == "written"
+        assert third["reemitted_days"] == 1
+
+        html = Path(third["path"]).read_text()
+        start = html.index('type="application/json">') + len('type="application/json">')
+        data = json.loads(html[start:html.index("</script>", start)])
+        today = data["days"][-1][1]
+        assert today["n"] == 4
+        assert today["p"]["chain"][0] == 1 and today["p"]["chain"][1] == pytest.approx(0.8)
+        # Um contexto com "</script>" não fecha o bloco de dados
+        assert set(today["c"]) == {"</script>debugging", "review"}
+
     def test_generate_recommendations_low_quality(self, dashboard):
         """Test recommendations for low quality scores"""
         import pandas as pd
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for Experiment Registry
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.experiments.registry import ExperimentRegistry
+
+
+def definition(experiment_id, status="draft", created_at="2026-01-01T00:00:00", metrics=("quality_score",)):
+    return {"id": experiment_id, "name": experiment_id.title(), "status": status, "created_at": created_at,
+            "metrics_to_track": list(metrics), "variants": [], "control_variant": ""}
+
+
+class TestExperimentRegistry:
+    """Test cases for ExperimentRegistry"""
+
+    @pytest.fixture
+    def registry(self, tmp_path):
+        registry = ExperimentRegistry(tmp_path / "registry.sqlite3")
+        yield registry
+        registry.close()
+
+    def test_save_and_update_experiment(self, registry):
+        assert registry.save_experiment(definition("a")) == 1
+        assert registry.save_experiment(definition("a", status="running")) == 2
+        assert registry.get_experiment("a")["status"] == "running"
+        assert registry.get_experiment("missing") is None
+        assert list(registry.running()) == ["a"]
+
+    def test_list_filters(self, registry):
+        registry.save_experiment(definition("old", "completed", "2026-01-01T10:00:00"))
+        registry.save_experiment(definition("speed", "running", "2026-02-01T10:00:00", ["response_time"]))
+        registry.save_experiment(definition("new", "running", "2026-03-01T10:00:00"))
+        registry.save_results("old", {"winner": "v1", "p_value": 0.01, "statistical_significance": True})
+
+        assert [e["id"] for e in registry.list_experiments()] == ["new", "speed", "old"]
+        assert [e["id"] for e in registry.list_experiments(status="running")] == ["new", "speed"]
+        assert [e["id"] for e in registry.list_experiments(since="2026-02-01")] == ["new", "speed"]
+        assert [e["id"] for e in registry.list_experiments(until="2026-02-01")] == ["old"]
+        assert [e["id"] for e in registry.list_experiments(metric="response_time")] == ["speed"]
+        assert [e["id"] for e in registry.list_experiments(limit=1)] == ["new"]
+        old = registry.list_experiments(status="completed")[0]
+        assert (old["winner"], old["p_value"], old["significant"]) == ("v1", 0.01, True)
+
+    def test_results_and_report_revisions(self, registry):
+        registry.save_experiment(definition("a"))
+        assert registry.report_inputs("a")["results_revision"] is None
+        assert registry.save_results("a", {"winner": "v1"}) == 1
+
+        inputs = registry.report_inputs("a")
+        assert inputs["report"] is None
+        registry.save_report("a", inputs["experiment_revision"], inputs["results_revision"], "report v1")
+        assert registry.report_inputs("a")["report"] == "report v1"
+
+        # Novos resultados ou nova definição invalidam o relatório
+        registry.save_results("a", {"winner": "v2"})
+        assert registry.report_inputs("a")["report"] is None
+        assert registry.get_results("a") == {"winner": "v2"}
+        inputs = registry.report_inputs("a")
+        registry.save_report("a", inputs["experiment_revision"], inputs["results_revision"], "report v2")
+        registry.save_experiment(definition("a", status="completed"))
+        assert registry.report_inputs("a")["report"] is None
+
+    def test_version_tracks_other_connections(self, tmp_path, registry):
+        other = ExperimentRegistry(tmp_path / "registry.sqlite3")
+        before = registry.version()
+        other.save_experiment(definition("a", status="running"))
+
+        assert registry.version() != before
+        assert list(registry.running()) == ["a"]
+        other.close()
+
+    def test_import_files(self, tmp_path):
+        hypothesis, results = tmp_path / "hypothesis", tmp_path / "results"
+        hypothesis.mkdir()
+        results.mkdir()
+        (hypothesis / "a.json").write_text(json.dumps(definition("a")))
+        (hypothesis / "broken.json").write_text("{")
+        (results / "a_results.json").write_text(json.dumps({"winner": "v1"}))
+
+        registry = ExperimentRegistry(tmp_path / "registry.sqlite3")
+        assert registry.import_files(hypothesis, results) == 1
+        assert registry.get_results("a") == {"winner": "v1"}
+        # Já indexados: só arquivos novos entram
+        assert registry.import_files(hypothesis, results) == 0
+        (hypothesis / "b.json").write_text(json.dumps(definition("b")))
+        (results / "b_results.json").write_text(json.dumps({"winner": "v2"}))
+        assert registry.import_files(hypothesis, results) == 1
+        assert registry.get_results("b") == {"winner": "v2"}
+        registry.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -13,6 +13,8 @@ from datetime import datetime
 import sys
 import os
 
+import numpy as np
+
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent))
 
@@ -21,6 +23,7 @@ from src.experiments.experiment_runner import (
     ExperimentVariant,
     ExperimentRunner
 )
+from src.core.metrics.interaction_analyzer import InteractionMetrics, MetricsCollector
 
 class TestExperimentVariant:
     """Test cases for ExperimentVariant dataclass"""
@@ -432,5 +435,336 @@ class TestIntegration:
             result_file = runner.results_path / f"{exp_id}_results.json"
             assert result_file.exists()
 
+class TestMeasuredExecution:
+    """Test cases for measuring variants on recorded interactions"""
+
+    @pytest.fixture
+    def collector(self, tmp_path):
+        collector = MetricsCollector(storage_path=tmp_path / "data")
+        yield collector
+        collector.close()
+
+    def interaction(self, context, quality, pattern=None, response_time=1000):
+        return InteractionMetrics(
+            timestamp=datetime.now().isoformat(), prompt_tokens=100, response_tokens=200,
+            response_time_ms=response_time, quality_score=quality, iteration_count=1,
+            context_used=context, pattern_applied=pattern
+        )
+
+    def experiment(self, runner):
+        experiment = Experiment(
+            id="measured",
+            name="Measured",
+            hypothesis="Examples raise quality",
+            variants=[
+                ExperimentVariant(id="control", name="Control", prompt_template="Standard",
+                                  context_modifiers=[], expected_outcome="Baseline",
+                                  success_criteria=["quality_score > 0.7"]),
+                ExperimentVariant(id="examples", name="Examples", prompt_template="With examples",
+                                  context_modifiers=["examples"], expected_outcome="Better",
+                                  success_criteria=["quality_score > 0.7", "response_time < 1500"]),
+                ExperimentVariant(id="chain", name="Chain", prompt_template="Chained",
+                                  context_modifiers=[], expected_outcome="Better", pattern="chain",
+                                  success_criteria=["quality > 0.7"]),
+            ],
+            control_variant="control",
+            metrics_to_track=["quality_score"],
+            sample_size=2
+        )
+        runner.create_experiment(experiment)
+        return experiment.id
+
+    def test_variants_are_measured_from_stored_interactions(self, tmp_path, collector):
+        """Rows are assigned by tag, then by the most specific matching variant"""
+        runner = ExperimentRunner(base_path=tmp_path, collector=collector)
+        experiment_id = self.experiment(runner)
+        collector.capture_many([
+            self.interaction(["base"], 0.5),
+            self.interaction(["base"], 0.9),
+            self.interaction(["examples", "base"], 0.8, response_time=1000),
+            self.interaction(["examples"], 0.9, response_time=2000),
+            self.interaction(["base"], 0.95, pattern="chain"),
+            # Tag explícita vence os critérios; tag de outro experimento exclui a linha
+            self.interaction(["examples", runner.variant_tag(experiment_id, "control")], 0.6),
+            self.interaction(["base", runner.variant_tag("other", "control")], 0.1),
+            # Atende "examples" e "chain" com a mesma especificidade
+            self.interaction(["examples"], 0.7, pattern="chain"),
+        ])
+
+        results = runner.run_experiment(experiment_id)
+
+        assert results["mode"] == "measured"
+        assert results["interactions_scanned"] == 8
+        assert (results["explicitly_tagged"], results["unassigned"], results["ambiguous"]) == (1, 1, 1)
+        control = results["variant_results"]["control"]
+        assert control["total_interactions"] == 3
+        assert control["avg_quality_score"] == pytest.approx((0.5 + 0.9 + 0.6) / 3)
+        assert control["success_rate"] == pytest.approx(1 / 3)
+        examples = results["variant_results"]["examples"]
+        assert examples["total_interactions"] == 2
+        assert examples["success_rate"] == 0.5  # a segunda falha em response_time
+        assert examples["avg_response_time"] == 1500
+        chain = results["variant_results"]["chain"]
+        assert (chain["total_interactions"], chain["sample_size_reached"]) == (1, False)
+        assert chain["ignored_criteria"] == []
+        assert results["winner"] == "chain"
+        assert "n/a" in runner.generate_experiment_report(experiment_id)
+
+    def test_clear_difference_is_significant(self, tmp_path, collector):
+        """A real quality gap is reported with its p-value and CI against the control"""
+        runner = ExperimentRunner(base_path=tmp_path, collector=collector)
+        experiment_id = self.experiment(runner)
+        rng = np.random.default_rng(0)
+        collector.capture_many(
+            [self.interaction(["base"], round(float(q), 3)) for q in rng.normal(0.6, 0.1, 150)] +
+            [self.interaction(["examples"], round(float(q), 3)) for q in rng.normal(0.8, 0.1, 150)]
+        )
+
+        results = runner.run_experiment(experiment_id)
+
+        assert results["winner"] == "examples"
+        assert results["statistical_significance"] is True
+        comparison = results["comparisons"]["examples"]["quality_score"]
+        assert comparison["ci_low"] > 0.1
+        assert results["p_value"] < 0.01
+        assert "chain" not in results["comparisons"]  # sem dados, fora da análise
+        assert "Quality vs Control" in runner.generate_experiment_report(experiment_id)
+
+    def test_success_is_compared_on_the_control_criteria(self, tmp_path, collector):
+        """Cross-variant success uses one threshold; per-variant criteria stay in the summary"""
+        runner = ExperimentRunner(base_path=tmp_path, collector=collector)
+        experiment_id = self.experiment(runner)
+        collector.capture_many(
+            [self.interaction(["base"], 0.75) for _ in range(20)] +
+            [self.interaction(["examples"], 0.75, response_time=2000) for _ in range(20)]
+        )
+
+        results = runner.run_experiment(experiment_id)
+
+        # "examples" exige response_time < 1500: falha pelo próprio critério
+        assert results["variant_results"]["examples"]["success_rate"] == 0
+        success = results["comparisons"]["examples"]["success"]
+        assert success["control_mean"] == success["treatment_mean"] == 1.0
+        assert success["difference"] == 0
+
+    def test_variants_without_data(self, tmp_path, collector):
+        """Analysis needs at least two variants with interactions"""
+        runner = ExperimentRunner(base_path=tmp_path, collector=collector)
+        experiment_id = self.experiment(runner)
+        collector.capture_many([self.interaction(["base"], 0.8)])
+
+        results = runner.run_experiment(experiment_id)
+
+        assert results["variant_results"]["examples"]["total_interactions"] == 0
+        assert results["variant_results"]["examples"]["success_rate"] is None
+        assert "Need interactions for the control" in results["error"]
+
+
+class TestSequentialExperiments:
+    """Test cases for running experiments with early stopping"""
+
+    def experiment(self, runner, sample_size=500):
+        experiment = Experiment(
+            id="early",
+            name="Early stop",
+            hypothesis="Examples raise quality",
+            variants=[
+                ExperimentVariant(id="control", name="Control", prompt_template="Standard",
+                                  context_modifiers=[], expected_outcome="Baseline",
+                                  success_criteria=["quality_score > 0.7"]),
+                ExperimentVariant(id="examples", name="Examples", prompt_template="With examples",
+                                  context_modifiers=["examples"], expected_outcome="Better",
+                                  success_criteria=["quality_score > 0.7"]),
+            ],
+            control_variant="control",
+            metrics_to_track=["quality_score"],
+            sample_size=sample_size
+        )
+        runner.create_experiment(experiment)
+        return experiment.id
+
+    def record(self, context, quality):
+        return {"timestamp": datetime.now().isoformat(), "quality_score": quality,
+                "response_time_ms": 1000, "iteration_count": 1, "context_used": context}
+
+    def test_decision_completes_experiment(self, tmp_path):
+        """The first decision marks the experiment completed and stops counting"""
+        runner = ExperimentRunner(base_path=tmp_path)
+        experiment_id = self.experiment(runner)
+        assert runner.record_interaction(self.record(["base"], 0.5)) == {}  # ainda em rascunho
+
+        started = runner.start_experiment(experiment_id)
+        assert started["status"] == "running"
+
+        rng = np.random.default_rng(0)
+        decided_at = None
+        for i in range(500):
+            runner.record_interaction(self.record(["base"], float(rng.normal(0.6, 0.1))), f"c{i}")
+            update = runner.record_interaction(self.record(["examples"], float(rng.normal(0.8, 0.1))), f"e{i}")
+            assert update[experiment_id]["variant"] == "examples"
+            if update[experiment_id]["decision"]:
+                decided_at = i
+                break
+
+        assert decided_at is not None and decided_at < 100
+        status = runner.sequential_status(experiment_id)
+        assert status["status"] == "completed"
+        assert status["decision"]["winner"] == "examples"
+        hypothesis = json.loads((tmp_path / "hypothesis" / f"{experiment_id}.json").read_text())
+        assert hypothesis["completed_at"] is not None
+        # Concluído: não recebe mais tráfego
+        assert runner.record_interaction(self.record(["examples"], 0.9)) == {}
+
+        runner.run_experiment(experiment_id)
+        assert "Sequential Decision:** examples after" in runner.generate_experiment_report(experiment_id)
+
+    def test_interactions_do_not_rewrite_the_test_state(self, tmp_path):
+        """Observations are kept in memory and saved on close"""
+        runner = ExperimentRunner(base_path=tmp_path)
+        experiment_id = self.experiment(runner)
+        runner.start_experiment(experiment_id)
+        state_file = tmp_path / "results" / f"{experiment_id}_sequential.json"
+
+        for i in range(10):
+            runner.record_interaction(self.record(["base"], 0.6), f"c{i}")
+        assert json.loads(state_file.read_text())["arms"]["control"]["n"] == 0
+
+        runner.close()
+        assert json.loads(state_file.read_text())["arms"]["control"]["n"] == 10
+
+    def test_start_errors(self, tmp_path):
+        runner = ExperimentRunner(base_path=tmp_path)
+        assert runner.start_experiment("missing") == {"error": "Experiment not found"}
+        assert "error" in runner.sequential_status("missing")
+
+
+class TestBanditExperiments:
+    """Test cases for bandit traffic allocation"""
+
+    def experiment(self, runner, allocation="thompson", variants=4):
+        experiment = Experiment(
+            id="bandit",
+            name="Bandit",
+            hypothesis="One of the prompts is best",
+            variants=[ExperimentVariant(id=f"v{i}", name=f"V{i}", prompt_template=f"Prompt {i}",
+                                        context_modifiers=[], expected_outcome="",
+                                        success_criteria=["quality_score > 0.7"])
+                      for i in range(variants)],
+            control_variant="v0",
+            metrics_to_track=["quality_score"],
+            sample_size=100,
+            allocation=allocation
+        )
+        runner.create_experiment(experiment)
+        return experiment.id
+
+    def test_assignments_follow_rewards(self, tmp_path):
+        """Traffic moves to the variant whose interactions score best"""
+        runner = ExperimentRunner(base_path=tmp_path)
+        experiment_id = self.experiment(runner)
+        assert runner.assign_variant(experiment_id) is None  # ainda não iniciado
+
+        started = runner.start_experiment(experiment_id)
+        assert set(started["bandit"]["variants"]) == {"v0", "v1", "v2", "v3"}
+
+        rng = np.random.default_rng(0)
+        picks = []
+        for _ in range(1500):
+            variant = runner.assign_variant(experiment_id, ["debugging"])
+            picks.append(variant)
+            quality = 0.85 if variant == "v2" else 0.55
+            update = runner.record_interaction({
+                "timestamp": datetime.now().isoformat(),
+                "quality_score": float(np.clip(rng.normal(quality, 0.1), 0, 1)),
+                "context_used": ["debugging", runner.variant_tag(experiment_id, variant)],
+            })
+            assert update[experiment_id]["variant"] == variant
+
+        assert picks[-300:].count("v2") > 250
+        runner.flush_allocations()
+        results = runner.run_experiment(experiment_id)
+        assert results["bandit"]["variants"]["v2"]["allocation"] > 0.9
+        assert not (tmp_path / "results" / f"{experiment_id}_sequential.json").exists()
+
+    def test_fixed_allocation_splits_uniformly(self, tmp_path):
+        runner = ExperimentRunner(base_path=tmp_path)
+        experiment_id = self.experiment(runner, allocation="fixed", variants=3)
+        runner.start_experiment(experiment_id)
+
+        picks = [runner.assign_variant(experiment_id) for _ in range(600)]
+
+        assert {picks.count(v) for v in ("v0", "v1", "v2")} <= set(range(150, 251))
+
+    def test_unknown_allocation(self, tmp_path):
+        with pytest.raises(ValueError):
+            self.experiment(ExperimentRunner(base_path=tmp_path), allocation="greedy")
+
+
+class TestExperimentRegistryIntegration:
+    """Test cases for the runner's indexed storage"""
+
+    def experiment(self, experiment_id, metrics=("quality_score",)):
+        return Experiment(
+            id=experiment_id, name=experiment_id.title(), hypothesis="Cached reports",
+            variants=[ExperimentVariant(id=f"v{i}", name=f"V{i}", prompt_template="", context_modifiers=[],
+                                        expected_outcome="", success_criteria=[]) for i in range(2)],
+            control_variant="v0", metrics_to_track=list(metrics), sample_size=20
+        )
+
+    def test_report_is_cached_until_results_change(self, tmp_path):
+        runner = ExperimentRunner(base_path=tmp_path)
+        runner.create_experiment(self.experiment("cached"))
+        runner.run_experiment("cached")
+
+        first = runner.generate_experiment_report("cached")
+        # Lido do registro: os espelhos JSON não são consultados
+        (tmp_path / "hypothesis" / "cached.json").unlink()
+        (tmp_path / "results" / "cached_results.json").unlink()
+        assert runner.generate_experiment_report("cached") is not None
+        assert runner.generate_experiment_report("cached") == first
+
+        runner.run_experiment("cached")
+        assert (tmp_path / "results" / "cached_results.json").exists()
+        second = runner.generate_experiment_report("cached")
+        assert second == runner.registry.report_inputs("cached")["report"]
+        assert runner.registry.report_inputs("cached")["results_revision"] == 2
+
+    def test_list_experiments(self, tmp_path):
+        runner = ExperimentRunner(base_path=tmp_path)
+        runner.create_experiment(self.experiment("quality"))
+        runner.create_experiment(self.experiment("speed", metrics=("response_time",)))
+        runner.start_experiment("speed")
+
+        assert {e["id"] for e in runner.list_experiments()} == {"quality", "speed"}
+        assert [e["id"] for e in runner.list_experiments(status="running")] == ["speed"]
+        assert [e["id"] for e in runner.list_experiments(metric="quality_score")] == ["quality"]
+
+    def test_existing_files_are_imported(self, tmp_path):
+        runner = ExperimentRunner(base_path=tmp_path)
+        runner.create_experiment(self.experiment("legacy"))
+        runner.run_experiment("legacy")
+        runner.registry.close()
+        (tmp_path / "registry.sqlite3").unlink()
+
+        reopened = ExperimentRunner(base_path=tmp_path)
+
+        assert [e["id"] for e in reopened.list_experiments()] == ["legacy"]
+        assert "Experiment Report: Legacy" in reopened.generate_experiment_report("legacy")
+        reopened.close()
+
+    def test_files_written_after_the_registry_are_imported(self, tmp_path):
+        runner = ExperimentRunner(base_path=tmp_path)
+        runner.create_experiment(self.experiment("indexed"))
+        runner.close()
+        late = json.loads((tmp_path / "hypothesis" / "indexed.json").read_text())
+        late["id"], late["name"] = "late", "Late"
+        (tmp_path / "hypothesis" / "late.json").write_text(json.dumps(late))
+
+        reopened = ExperimentRunner(base_path=tmp_path)
+
+        assert {e["id"] for e in reopened.list_experiments()} == {"indexed", "late"}
+        reopened.close()
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for the Calibration Feature Store
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+import numpy as np
+from scipy import sparse
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.calibration.auto_calibration import AutoCalibrationEngine
+from src.core.calibration.feature_store import FeatureStore
+from src.core.metrics.columnar import InteractionColumns
+from tests.conftest import interactions
+
+
+class TestFeatureStore:
+    """Test cases for the on-disk feature cache"""
+
+    def make_rows(self, ids):
+        text = sparse.random(len(ids), 16, density=0.2, format="csr", random_state=len(ids))
+        numeric = np.arange(len(ids) * 2, dtype=float).reshape(-1, 2)
+        return text, numeric
+
+    def test_lookup_returns_rows_in_query_order(self, tmp_path):
+        """Cached rows come back in the order of the requested IDs"""
+        store = FeatureStore(tmp_path, {"schema": 1}, n_features=16)
+        ids = np.array(["c", "a", "b", ""])
+        text, numeric = self.make_rows(ids)
+        store.add(ids, text, numeric)
+
+        found, cached_text, cached_numeric = store.lookup(np.array(["b", "x", "c", ""]))
+
+        assert found.tolist() == [True, False, True, False]
+        assert (cached_text.toarray() == text[[2, 0]].toarray()).all()
+        assert (cached_numeric == numeric[[2, 0]]).all()
+        assert len(store) == 3  # o ID vazio não é cacheado
+
+    def test_schema_change_starts_an_empty_cache(self, tmp_path):
+        """Another schema hash never sees rows of the previous one"""
+        ids = np.array(["a", "b"])
+        FeatureStore(tmp_path, {"schema": 1}, n_features=16).add(ids, *self.make_rows(ids))
+
+        found, _, _ = FeatureStore(tmp_path, {"schema": 2}, n_features=16).lookup(ids)
+
+        assert not found.any()
+
+    def test_compaction_merges_chunks(self, tmp_path):
+        """Past the chunk limit all chunks are merged, keeping every row"""
+        store = FeatureStore(tmp_path, {"schema": 1}, n_features=16, max_chunks=3)
+        expected = {}
+        for batch in range(5):
+            ids = np.array([f"{batch}-{i}" for i in range(4)])
+            text, numeric = self.make_rows(ids)
+            store.add(ids, text, numeric + batch)
+            expected.update(zip(ids, numeric + batch))
+
+        assert len(store._chunk_names()) <= 3
+        ids = np.array(sorted(expected))
+        found, _, numeric = store.lookup(ids)
+        assert found.all()
+        assert (numeric == np.array([expected[i] for i in ids])).all()
+
+
+class TestCachedFeaturization:
+    """Test cases for the engine's use of the feature store"""
+
+    def test_retraining_only_featurizes_new_interactions(self, workspace, monkeypatch):
+        """Cached rows are reused and equal to freshly computed ones"""
+        engine = AutoCalibrationEngine()
+        old = interactions(80, seed=1)
+        engine.train_models(old, feature_space="hashing")
+
+        featurized = []
+        original = engine._featurize
+        monkeypatch.setattr(engine, "_featurize", lambda rows, vectorizer=None: (
+            featurized.append(len(rows)), original(rows, vectorizer))[1])
+        new = interactions(20, seed=2)
+        result = engine.train_models(old + new, feature_space="hashing")
+
+        assert featurized == [20]
+        assert result["samples_used"] == 100
+        columns = InteractionColumns.from_records(new + old)
+        X_cached, _, _ = engine._extract_features(columns, engine.vectorizer)
+        text, numeric = original(columns, engine.vectorizer)
+        assert np.allclose(X_cached, np.hstack([text.toarray(), numeric]))
+
+    def test_tfidf_rows_are_not_cached(self, workspace):
+        """A TF-IDF fit depends on the whole training set, so nothing is stored"""
+        AutoCalibrationEngine().train_models(interactions(80, seed=1))
+
+        assert not (workspace / "research" / "evidence" / "models" / "features").exists()
+
+    def test_prediction_reuses_normalized_contexts(self, workspace):
+        """Equivalent contexts share one cached row per served version"""
+        engine = AutoCalibrationEngine()
+        engine.train_models(interactions(80, seed=1))
+        context = {"context_elements": ["anderson-skill", "Debugging"], "pattern": "chain"}
+        same = {"context_elements": ["debugging", "anderson-skill"], "pattern": "chain"}
+
+        first = engine.predict_optimal_config(context)
+        second = engine.predict_optimal_config(same)
+
+        assert len(engine._context_features) == 1
+        assert second.confidence == first.confidence
+        # A conversão de um contexto isolado usa o mesmo cache
+        row = engine._context_to_features(same)
+        assert len(engine._context_features) == 1
+        assert np.array_equal(row[0], next(iter(engine._context_features.values())))
+        engine.train_models(interactions(90, seed=3))
+        engine.predict_optimal_config(context)
+        assert len(engine._context_features) == 2  # nova versão, nova chave
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
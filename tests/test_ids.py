@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Tests for Interaction IDs and Idempotency
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.metrics.ids import (
+    IdempotencyIndex,
+    InteractionIdGenerator,
+    id_lower_bound,
+    id_timestamp,
+    is_interaction_id,
+)
+from src.core.metrics.interaction_analyzer import InteractionMetrics, MetricsCollector
+
+
+def make_metrics(quality: float = 0.8) -> InteractionMetrics:
+    return InteractionMetrics(
+        timestamp=datetime.now().isoformat(),
+        prompt_tokens=150,
+        response_tokens=280,
+        response_time_ms=1200,
+        quality_score=quality,
+        iteration_count=1,
+        context_used=["anderson-skill"]
+    )
+
+
+class TestInteractionIds:
+    """Test cases for time-ordered IDs"""
+
+    def test_ids_are_unique_and_monotonic(self):
+        """IDs generated in a tight loop never repeat and sort in creation order"""
+        generator = InteractionIdGenerator()
+        ids = [generator.new_id() for _ in range(20000)]
+
+        assert len(set(ids)) == len(ids)
+        assert ids == sorted(ids)
+        assert all(is_interaction_id(i) for i in ids)
+
+    def test_id_encodes_timestamp(self):
+        """The timestamp prefix round-trips to the millisecond and bounds ID ranges"""
+        moment = datetime(2025, 3, 14, 15, 9, 26, 535000)
+        generator = InteractionIdGenerator()
+        interaction_id = generator.new_id(moment)
+
+        assert id_timestamp(interaction_id) == moment
+        assert id_lower_bound(moment) <= interaction_id < id_lower_bound(moment + timedelta(milliseconds=1))
+
+    def test_explicit_moment_does_not_pin_the_clock(self):
+        """A future-dated ID leaves later clock IDs on the current time"""
+        generator = InteractionIdGenerator()
+        future = datetime.now() + timedelta(days=365)
+        generator.new_id(future)
+        generator.new_id(future)
+
+        now_id = generator.new_id()
+
+        assert id_timestamp(now_id) < datetime.now() + timedelta(seconds=1)
+        assert len({generator.new_id(future) for _ in range(100)}) == 100
+
+    def test_same_input_does_not_collide(self, tmp_path):
+        """Identical timestamp and token counts no longer overwrite each other"""
+        collector = MetricsCollector(storage_path=tmp_path)
+        metrics = make_metrics()
+        first = collector.capture_interaction(metrics)
+        second = collector.capture_interaction(metrics)
+
+        assert first != second
+        assert collector.generate_report(days=1)["total_interactions"] == 2
+        collector.close()
+
+    def test_since_id_range_scan(self, tmp_path):
+        """since_id selects interactions by capture order without timestamps"""
+        collector = MetricsCollector(storage_path=tmp_path)
+        ids = [collector.capture_interaction(make_metrics()) for _ in range(10)]
+
+        newer = [r["id"] for r in collector.iter_interactions(since_id=ids[6])]
+        assert newer == ids[6:]
+        collector.close()
+
+
+class TestIdempotency:
+    """Test cases for idempotency-key de-duplication"""
+
+    @pytest.fixture
+    def temp_dir(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def test_retry_returns_original_id(self, temp_dir):
+        """A retried capture with the same key stores nothing new"""
+        collector = MetricsCollector(storage_path=temp_dir)
+        first = collector.capture_interaction(make_metrics(), idempotency_key="req-1")
+        retry = collector.capture_interaction(make_metrics(), idempotency_key="req-1")
+        other = collector.capture_interaction(make_metrics(), idempotency_key="req-2")
+
+        assert retry == first
+        assert other != first
+        assert len(list(collector.iter_interactions())) == 2
+        collector.close()
+
+    def test_keys_survive_restart(self, temp_dir):
+        """The key set is reloaded from disk by a new collector"""
+        collector = MetricsCollector(storage_path=temp_dir)
+        first = collector.enqueue_interaction(make_metrics(), idempotency_key="req-1")
+        collector.close()
+
+        reopened = MetricsCollector(storage_path=temp_dir)
+        assert reopened.capture_interaction(make_metrics(), idempotency_key="req-1") == first
+        assert len(list(reopened.iter_interactions())) == 1
+        reopened.close()
+
+    def test_failed_append_releases_the_key(self, temp_dir, monkeypatch):
+        """A key whose write failed is released, so the retry stores the interaction"""
+        collector = MetricsCollector(storage_path=temp_dir)
+
+        def failing(record):
+            raise OSError("disk full")
+
+        with monkeypatch.context() as patched:
+            patched.setattr(collector.store, "append", failing)
+            with pytest.raises(OSError):
+                collector.capture_interaction(make_metrics(), idempotency_key="req-1")
+        retry = collector.capture_interaction(make_metrics(), idempotency_key="req-1")
+
+        assert [r["id"] for r in collector.iter_interactions()] == [retry]
+        collector.close()
+
+        reopened = IdempotencyIndex(temp_dir)
+        assert reopened.get("req-1") == retry
+        reopened.close()
+
+    def test_failed_batch_releases_queued_keys(self, temp_dir, monkeypatch):
+        """A queued interaction whose batch failed does not consume its key"""
+        collector = MetricsCollector(storage_path=temp_dir)
+        write_records = collector.write_records
+
+        def failing(records):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(collector, "write_records", failing)
+        lost = collector.enqueue_interaction(make_metrics(), idempotency_key="req-1")
+        collector.writer.flush()
+        assert collector.writer.errors == 1
+        assert collector.idempotency.get("req-1") is None
+
+        monkeypatch.setattr(collector, "write_records", write_records)
+        retry = collector.enqueue_interaction(make_metrics(), idempotency_key="req-1")
+        assert retry != lost
+        assert [r["id"] for r in collector.iter_interactions()] == [retry]
+        collector.close()
+
+    def test_torn_key_log(self, temp_dir):
+        """A partial last line is ignored and does not corrupt later keys"""
+        index = IdempotencyIndex(temp_dir)
+        index.claim("a", "ID-A")
+        index.close()
+        with open(temp_dir / "idempotency" / IdempotencyIndex.LOG_FILE, 'a') as f:
+            f.write("deadbeef")
+
+        index = IdempotencyIndex(temp_dir)
+        assert index.claim("b", "ID-B") is None
+        index.close()
+
+        reloaded = IdempotencyIndex(temp_dir)
+        assert reloaded.get("a") == "ID-A"
+        assert reloaded.get("b") == "ID-B"
+        assert len(reloaded) == 2
+        reloaded.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
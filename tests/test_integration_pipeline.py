@@ -87,6 +87,48 @@ class TestIntegrationPipeline:
 
         assert interaction_id == "test-id-123"
         mock_components['metrics_collector'].capture_interaction.assert_called_once()
+        # Running experiments see the interaction under the same ID
+        record, recorded_id = mock_components['experiment_runner'].record_interaction.call_args[0]
+        assert recorded_id == "test-id-123"
+        assert record["quality_score"] == 0.85
+
+    def test_assign_variant(self, pipeline, mock_components):
+        """Assignment returns the variant and the tag to collect it with"""
+        runner = mock_components['experiment_runner']
+        runner.assign_variant.return_value = "v2"
+        runner.variant_tag.return_value = "variant:exp/v2"
+
+        assert pipeline.assign_variant("exp", ["debugging"]) == {"variant_id": "v2", "tag": "variant:exp/v2"}
+        runner.assign_variant.assert_called_once_with("exp", ["debugging"])
+
+        runner.assign_variant.return_value = None
+        assert pipeline.assign_variant("exp") is None
+
+    def test_retried_interaction_rewards_bandit_once(self, pipeline, tmp_path):
+        """A retry with the same idempotency key does not reward its variant again"""
+        from src.core.metrics.interaction_analyzer import MetricsCollector
+        from src.experiments.experiment_runner import Experiment, ExperimentRunner, ExperimentVariant
+
+        pipeline.metrics_collector = MetricsCollector(storage_path=tmp_path / "data")
+        pipeline.experiment_runner = runner = ExperimentRunner(base_path=tmp_path)
+        runner.create_experiment(Experiment(
+            id="bandit", name="Bandit", hypothesis="", control_variant="v0",
+            variants=[ExperimentVariant(id=f"v{i}", name=f"V{i}", prompt_template="", context_modifiers=[],
+                                        expected_outcome="", success_criteria=[]) for i in range(2)],
+            metrics_to_track=["quality_score"], sample_size=10, allocation="thompson"
+        ))
+        runner.start_experiment("bandit")
+        tag = runner.variant_tag("bandit", "v1")
+
+        ids = {pipeline.collect_interaction(prompt_tokens=10, response_tokens=20, response_time_ms=100,
+                                            quality_score=0.9, iteration_count=1, context_used=[tag],
+                                            idempotency_key="request-1")
+               for _ in range(3)}
+
+        assert len(ids) == 1
+        runner.flush_allocations()
+        assert runner.run_experiment("bandit")["bandit"]["variants"]["v1"]["observations"] == 1
+        pipeline.metrics_collector.close()
 
     def test_collect_interaction_auto_success_indicators(self, pipeline, mock_components):
         """Test that success indicators are auto-generated when not provided"""
@@ -118,6 +160,9 @@ class TestIntegrationPipeline:
         assert health['overall_status'] == 'healthy'
         assert 'components' in health
         assert health['components']['metrics_collection']['status'] == 'operational'
+        # The experiment check only reads the registry
+        assert health['components']['experiment_system']['status'] == 'operational'
+        mock_components['experiment_runner'].create_experiment.assert_not_called()
 
     def test_run_health_check_no_data(self, pipeline, mock_components):
         """Test health check with no data"""
@@ -152,6 +197,37 @@ class TestIntegrationPipeline:
         assert result['required'] == 50
         assert result['available'] == 10
 
+    def test_train_calibration_models_incremental(self, pipeline, mock_components):
+        """Incremental training folds new interactions without building a report"""
+        engine = mock_components['calibration_engine']
+        engine.train_since_checkpoint.return_value = {
+            'new_samples': 40, 'samples_seen': 140, 'model_accuracy': 0.8, 'last_id': 'X'
+        }
+
+        result = pipeline.train_calibration_models(incremental=True)
+
+        assert result['status'] == 'success'
+        assert result['new_samples'] == 40
+        engine.train_since_checkpoint.assert_called_once_with(mock_components['metrics_collector'], reset=False)
+        mock_components['metrics_collector'].generate_report.assert_not_called()
+
+    def test_train_calibration_models_with_selection(self, pipeline, mock_components):
+        """Model selection is forwarded and its held-out metrics are reported"""
+        collector = mock_components['metrics_collector']
+        collector.generate_report.return_value = {'total_interactions': 200}
+        collector.load_columns.return_value = [{}] * 200
+        engine = mock_components['calibration_engine']
+        engine.train_models.return_value = {
+            'model_accuracy': 0.7, 'clusters_found': 3, 'samples_used': 200, 'model_version': 'v1',
+            'model_selection': {'best_params': {'n_estimators': 50}, 'held_out': {'accuracy_mean': 0.7}}
+        }
+
+        result = pipeline.train_calibration_models(select=True, workers=2)
+
+        assert result['status'] == 'success'
+        assert result['model_selection']['best_params'] == {'n_estimators': 50}
+        engine.train_models.assert_called_once_with([{}] * 200, select=True, workers=2)
+
     def test_train_calibration_models_no_data(self, pipeline, mock_components):
         """Test training fails with no data"""
         mock_components['metrics_collector'].generate_report.return_value = {
@@ -193,6 +269,27 @@ class TestIntegrationPipeline:
         assert result['status'] == 'prediction_failed'
         assert len(result['fallback_recommendations']) > 0
 
+    def test_suggest_prompt_optimizations_batch(self, pipeline, mock_components):
+        """Batch suggestions call the engine once and keep the input order"""
+        predictions = []
+        for confidence in (0.9, 0.4):
+            prediction = MagicMock()
+            prediction.confidence = confidence
+            prediction.recommended_adjustments = [f"adjust {confidence}"]
+            prediction.prompt_characteristics = {}
+            predictions.append(prediction)
+        engine = mock_components['calibration_engine']
+        engine.predict_batch.return_value = predictions
+        engine.suggest_context_improvements.return_value = []
+
+        contexts = [{'context_elements': ['debugging']}, {'context_elements': ['design']}]
+        result = pipeline.suggest_prompt_optimizations_batch(contexts)
+
+        assert result['status'] == 'success'
+        assert [r['predicted_success_rate'] for r in result['results']] == [0.9, 0.4]
+        engine.predict_batch.assert_called_once_with(contexts)
+        engine.predict_optimal_config.assert_not_called()
+
     def test_generate_performance_report(self, pipeline, mock_components):
         """Test performance report generation"""
         mock_components['dashboard'].generate_comprehensive_report.return_value = {
@@ -203,6 +300,7 @@ class TestIntegrationPipeline:
         result = pipeline.generate_performance_report(days=30)
 
         assert result['status'] == 'success'
+        mock_components['dashboard'].generate_comprehensive_report.assert_called_once_with(30, render_charts=False)
         assert 'report' in result
         assert 'insights' in result
         assert 'generated_at' in result
@@ -217,6 +315,26 @@ class TestIntegrationPipeline:
 
         assert result['status'] == 'report_failed'
 
+    def test_render_performance_charts_queues_when_not_cached(self, pipeline, mock_components):
+        """Charts missing from the cache are queued on the background worker"""
+        dashboard = mock_components['dashboard']
+        dashboard.cached_charts.return_value = None
+
+        result = pipeline.render_performance_charts(days=7)
+
+        assert result['status'] == 'queued'
+        dashboard.render_charts_async.assert_called_once_with(7)
+
+    def test_render_performance_charts_returns_cached(self, pipeline, mock_components):
+        """Cached charts are returned without rendering"""
+        dashboard = mock_components['dashboard']
+        dashboard.cached_charts.return_value = {'status': 'cached', 'paths': ['a.png']}
+
+        result = pipeline.render_performance_charts(days=7)
+
+        assert result['status'] == 'cached'
+        dashboard.render_charts_async.assert_not_called()
+
     def test_generate_insights_excellent_quality(self, pipeline):
         """Test insight generation for excellent quality"""
         report = {'avg_quality_score': 0.95}
@@ -256,6 +374,37 @@ class TestIntegrationPipeline:
 
         assert any("declining" in i.lower() for i in insights)
 
+    def test_cli_html_export_covers_a_year_by_default(self, mock_components, monkeypatch, capsys):
+        """Test the html action uses the same default window as export_html"""
+        from src.core.pipeline import integration_pipeline
+        dashboard = mock_components['dashboard']
+        dashboard.export_html.return_value = {"status": "written"}
+
+        monkeypatch.setattr(sys, 'argv', ['integration_pipeline', 'html'])
+        integration_pipeline.main()
+        dashboard.export_html.assert_called_with(365)
+
+        monkeypatch.setattr(sys, 'argv', ['integration_pipeline', 'html', '--days', '30'])
+        integration_pipeline.main()
+        dashboard.export_html.assert_called_with(30)
+
+    def test_cli_lists_all_experiments_by_default(self, mock_components, monkeypatch, capsys):
+        """Test the experiments action applies a date filter only with --days"""
+        from src.core.pipeline import integration_pipeline
+        runner = mock_components['experiment_runner']
+        runner.list_experiments.return_value = []
+
+        monkeypatch.setattr(sys, 'argv', ['integration_pipeline', 'experiments'])
+        integration_pipeline.main()
+        assert runner.list_experiments.call_args.kwargs['since'] is None
+
+        monkeypatch.setattr(sys, 'argv', ['integration_pipeline', 'experiments', '--days', '7'])
+        integration_pipeline.main()
+        assert runner.list_experiments.call_args.kwargs['since'] is not None
+        # Registry connections are released on exit
+        assert runner.close.call_count == 2
+        assert '"count": 0' in capsys.readouterr().out
+
 
 class TestIntegrationPipelineEdgeCases:
     """Edge case tests for integration pipeline"""
@@ -98,18 +98,38 @@ class TestMetricsCollector:
         interaction_id = collector.capture_interaction(metrics)
         
         assert interaction_id is not None
-        assert len(interaction_id) == 8  # MD5 hash truncated to 8 chars
+        assert len(interaction_id) == 26  # ULID-style, time-ordered
         
-        # Verify file was created
-        expected_file = collector.storage_path / f"{interaction_id}.json"
-        assert expected_file.exists()
+        # Verify record was appended to a segment
+        segments = list((collector.storage_path / "segments").glob("*/*.jsonl"))
+        assert len(segments) == 1
         
         # Verify content
-        with open(expected_file) as f:
-            saved_data = json.load(f)
+        with open(segments[0]) as f:
+            saved_data = json.loads(f.readline())
+            assert saved_data['id'] == interaction_id
             assert saved_data['prompt_tokens'] == 150
             assert saved_data['quality_score'] == 0.85
     
+    def test_capture_interaction_legacy_backend(self, temp_storage):
+        """Test that the legacy backend keeps one JSON file per interaction"""
+        collector = MetricsCollector(storage_path=temp_storage, backend="legacy")
+        metrics = InteractionMetrics(
+            timestamp=datetime.now().isoformat(),
+            prompt_tokens=150,
+            response_tokens=280,
+            response_time_ms=1200,
+            quality_score=0.85,
+            iteration_count=1,
+            context_used=["anderson-skill"]
+        )
+        
+        interaction_id = collector.capture_interaction(metrics)
+        
+        expected_file = temp_storage / f"{interaction_id}.json"
+        assert expected_file.exists()
+        assert collector.generate_report(days=7)['total_interactions'] == 1
+    
     def test_generate_report_empty_data(self, collector):
         """Test report generation with no data"""
         report = collector.generate_report(days=7)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the Calibration Model Registry
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+import threading
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.calibration.auto_calibration import AutoCalibrationEngine
+from src.core.calibration.model_registry import ModelBundle, ModelCache, ModelRegistry
+from tests.conftest import interactions
+
+
+CONTEXT = {"context_elements": ["anderson-skill", "debugging"], "pattern": "chain"}
+
+
+class TestModelRegistry:
+    """Test cases for versioned artifacts and promotion"""
+
+    def test_training_registers_and_promotes_a_version(self, workspace):
+        """Each training run is a new version with metadata; the last one is active"""
+        engine = AutoCalibrationEngine()
+        first = engine.train_models(interactions(80, seed=1))["model_version"]
+        second = engine.train_models(interactions(90, seed=2))["model_version"]
+
+        status = engine.model_status()
+        assert status["active_version"] == second != first
+        assert status["kind"] == "batch"
+        assert status["training_data"]["samples"] == 90
+        assert status["training_data"]["first_timestamp"] < status["training_data"]["last_timestamp"]
+        assert status["feature_schema_hash"]
+        assert status["load_seconds"] >= 0
+        assert engine.registry.versions() == sorted([first, second])
+
+    def test_promote_is_rollback(self, workspace):
+        """Promoting an older version serves it again"""
+        engine = AutoCalibrationEngine()
+        first = engine.train_models(interactions(80, seed=1))["model_version"]
+        engine.train_models(interactions(80, seed=3))
+
+        engine.promote(first)
+
+        assert engine.model_status()["active_version"] == first
+        with pytest.raises(ValueError):
+            engine.promote("missing")
+
+    def test_prune_keeps_active_and_previous(self, workspace):
+        """Old versions are removed beyond the retention count"""
+        registry = ModelRegistry(workspace / "registry", keep=2)
+        versions = []
+        for i in range(4):
+            versions.append(registry.register(ModelBundle(None, {"i": i}, None, None), {"kind": "test"}))
+        registry.promote(versions[0])
+        registry.promote(versions[3])
+
+        assert registry.versions() == [versions[0], versions[2], versions[3]]
+        assert registry.load(versions[0]).success_predictor == {"i": 0}
+
+
+class TestModelCache:
+    """Test cases for hot-swapping the served version"""
+
+    def test_other_process_promotion_is_picked_up(self, workspace):
+        """A serving engine switches to a version promoted by another engine"""
+        serving = AutoCalibrationEngine()
+        serving.model_cache.check_interval = 0
+        trainer = AutoCalibrationEngine()
+        trainer.train_models(interactions(80, seed=1))
+
+        serving.predict_optimal_config(CONTEXT)
+        held = serving._serving_models()
+        second = trainer.train_models(interactions(120, seed=4))["model_version"]
+
+        serving.predict_optimal_config(CONTEXT)
+        assert serving._serving_models().version == second
+        # Quem já tinha o bundle anterior continua podendo usá-lo
+        assert held.version != second
+        assert held.success_predictor.predict_proba(serving._contexts_to_features([CONTEXT], held.vectorizer)).shape == (1, 2)
+
+    def test_loading_does_not_block_readers(self, workspace):
+        """While one thread loads a new version, others keep the current bundle"""
+        registry = ModelRegistry(workspace / "registry")
+        old = registry.register(ModelBundle(None, "old", None, None), {"kind": "test"})
+        registry.promote(old)
+        cache = ModelCache(registry, check_interval=0)
+        assert cache.get().success_predictor == "old"
+
+        registry.promote(registry.register(ModelBundle(None, "new", None, None), {"kind": "test"}))
+        cache._loading.acquire()
+        try:
+            result = []
+            reader = threading.Thread(target=lambda: result.append(cache.get()))
+            reader.start()
+            reader.join(timeout=5)
+            assert result[0].success_predictor == "old"
+        finally:
+            cache._loading.release()
+        assert cache.get().success_predictor == "new"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for Calibration Model Selection
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+import random
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.calibration.auto_calibration import AutoCalibrationEngine
+from src.core.calibration.model_selection import SharedArrays, scaling_report, search, time_splits
+from tests.conftest import make_metrics
+
+GRID = {"n_estimators": [10, 30], "max_depth": [None, 4], "n_clusters": [2, 3]}
+
+
+def dataset(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 6))
+    y = (X[:, 0] + 0.3 * rng.normal(size=n) > 0).astype(int)
+    return X, y
+
+
+class TestTimeSplits:
+    """Test cases for expanding-window folds"""
+
+    def test_folds_train_on_the_past_only(self):
+        """Each fold's test block starts where its training rows end"""
+        folds = time_splits(103, n_splits=4)
+
+        assert folds == [(20, 40), (40, 60), (60, 80), (80, 103)]
+        with pytest.raises(ValueError):
+            time_splits(3, n_splits=4)
+
+
+class TestSearch:
+    """Test cases for the parallel grid search"""
+
+    def test_pool_matches_in_process_search(self):
+        """Workers reading shared memory score exactly like a single process"""
+        X, y = dataset()
+
+        single = search(X, y, grid=GRID, workers=1)
+        pooled = search(X, y, grid=GRID, workers=2)
+
+        assert single["best_params"] == pooled["best_params"]
+        assert single["forest"] == pooled["forest"]
+        assert single["tasks"] == (4 + 2) * 4
+        assert single["held_out"]["roc_auc_mean"] > 0.8
+        assert all(row["folds"] == 4 for row in single["forest"] + single["clusters"])
+
+    def test_shared_arrays_are_released(self):
+        """Segments are unlinked when the block exits"""
+        from multiprocessing import shared_memory
+
+        with SharedArrays({"X": np.arange(10.0)}) as shared:
+            name = shared.spec["X"][0]
+            attached = shared_memory.SharedMemory(name=name)
+            assert np.ndarray((10,), dtype=float, buffer=attached.buf)[3] == 3.0
+            attached.close()
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    def test_scaling_report(self):
+        """The same search is timed for each worker count"""
+        X, y = dataset(200)
+
+        report = scaling_report(X, y, worker_counts=[1, 2], grid={"n_estimators": [10], "max_depth": [4],
+                                                                  "n_clusters": [2]})
+
+        assert [run["workers"] for run in report["runs"]] == [1, 2]
+        assert report["runs"][0]["speedup"] == 1.0
+        assert all(run["seconds"] > 0 for run in report["runs"])
+
+
+class TestEngineSelection:
+    """Test cases for train_models(select=True)"""
+
+    def test_reports_held_out_metrics(self, tmp_path, monkeypatch):
+        """The chosen parameters are used and held-out accuracy is reported"""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "research" / "evidence").mkdir(parents=True)
+        monkeypatch.setattr("src.core.calibration.model_selection.DEFAULT_GRID", GRID)
+        rng = random.Random(7)
+        interactions = [vars(make_metrics(rng, rng.uniform(0, 30))) for _ in range(120)]
+        engine = AutoCalibrationEngine()
+
+        result = engine.train_models(interactions, select=True, workers=1)
+
+        selection = result["model_selection"]
+        assert result["model_accuracy"] == selection["held_out"]["accuracy_mean"]
+        # TF-IDF ajustado em todas as linhas vazaria os folds futuros
+        assert result["feature_space"] == "hashing"
+        assert engine.success_predictor.n_estimators == selection["best_params"]["n_estimators"]
+        assert engine.pattern_clusterer.n_clusters == selection["best_params"]["n_clusters"]
+        assert engine.model_status()["metrics"]["held_out"] == selection["held_out"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
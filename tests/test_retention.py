@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for Metrics Retention
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+import random
+import tempfile
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.metrics.interaction_analyzer import MetricsCollector
+from src.core.metrics.retention import RetentionPolicy
+from tests.conftest import make_metrics
+
+
+class TestRetention:
+    """Test cases for expiry, downsampling and compaction"""
+
+    @pytest.fixture
+    def temp_storage(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def test_expired_days_survive_as_rollups(self, temp_storage):
+        """Raw data past raw_days is deleted but reports still cover it"""
+        rng = random.Random(11)
+        collector = MetricsCollector(storage_path=temp_storage)
+        collector.capture_many([make_metrics(rng, rng.uniform(0.5, 40)) for _ in range(400)])
+        before = collector.generate_report(days=60)
+
+        result = collector.apply_retention(RetentionPolicy(raw_days=10), measure_scan=True)
+
+        assert result["partitions_expired"] > 0
+        assert result["bytes_reclaimed"] > 0
+        assert "scan_seconds_change" in result
+        remaining = [p.name for p in (temp_storage / "segments").iterdir() if p.is_dir()]
+        assert all(p >= result["cutoff_day"] for p in remaining)
+
+        after = collector.generate_report(days=60)
+        assert after["total_interactions"] == before["total_interactions"]
+        assert after["avg_quality_score"] == pytest.approx(before["avg_quality_score"])
+        assert after["percentiles"] == before["percentiles"]
+
+        # Rebuilding from raw data keeps the downsampled days
+        collector.rebuild_rollups()
+        assert collector.generate_report(days=60)["total_interactions"] == before["total_interactions"]
+        collector.close()
+
+    def test_compaction_merges_small_segments(self, temp_storage):
+        """Small segments are merged without losing or duplicating records"""
+        rng = random.Random(12)
+        collector = MetricsCollector(storage_path=temp_storage, max_segment_bytes=2048)
+        collector.capture_many([make_metrics(rng, rng.uniform(0, 2)) for _ in range(300)])
+        ids = sorted(r["id"] for r in collector.iter_interactions())
+        report = collector.generate_report(days=7)
+
+        result = collector.apply_retention(RetentionPolicy(raw_days=30, target_segment_bytes=64 * 1024))
+
+        assert result["segments_after"] < result["segments_before"]
+        assert result["bytes_reclaimed"] == 0
+        assert sorted(r["id"] for r in collector.iter_interactions()) == ids
+        # Watermarks follow the compacted segments: nothing is folded twice
+        assert collector.generate_report(days=7)["total_interactions"] == report["total_interactions"]
+
+        # An unchanged partition is not compacted again
+        second = collector.apply_retention()
+        assert second["segments_merged"] == 0
+
+        collector.capture_many([make_metrics(rng, 0.1) for _ in range(5)])
+        assert collector.generate_report(days=7)["total_interactions"] == report["total_interactions"] + 5
+        collector.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
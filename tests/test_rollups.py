@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for Interaction Rollups
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+import random
+import statistics
+import tempfile
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.metrics.interaction_analyzer import MetricsCollector
+from src.core.metrics.rollups import InteractionRollup
+from tests.conftest import make_metrics
+
+
+class TestInteractionRollup:
+    """Test cases for the mergeable rollup"""
+
+    def test_mean_and_std(self):
+        """Sums and sums of squares give the sample mean and deviation"""
+        scores = [0.5, 0.7, 0.9, 0.6]
+        rollup = InteractionRollup.from_records({"quality_score": s} for s in scores)
+
+        assert rollup.mean("quality_score") == pytest.approx(statistics.mean(scores))
+        assert rollup.std("quality_score") == pytest.approx(statistics.stdev(scores))
+
+    def test_merge_equals_union(self):
+        """Merging two rollups equals rolling up the union of their records"""
+        records = [{"quality_score": i / 10, "iteration_count": i % 3 + 1,
+                    "pattern_applied": "chain" if i % 2 else "parallel",
+                    "context_used": ["a", "b"] if i % 2 else ["a"]} for i in range(10)]
+
+        merged = InteractionRollup.from_records(records[:4]).merge(InteractionRollup.from_records(records[4:]))
+        whole = InteractionRollup.from_records(records)
+
+        assert merged.to_dict() == whole.to_dict()
+
+    def test_serialization_roundtrip(self):
+        """Rollups survive a to_dict/from_dict roundtrip"""
+        rollup = InteractionRollup.from_records([
+            {"quality_score": 0.9, "response_time_ms": 1200, "pattern_applied": "chain", "context_used": ["x"]}
+        ])
+        assert InteractionRollup.from_dict(rollup.to_dict()).to_dict() == rollup.to_dict()
+
+
+class TestCollectorRollups:
+    """Test cases for rollup-backed reports"""
+
+    @pytest.fixture
+    def temp_storage(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def test_reports_match_raw_scan(self, temp_storage):
+        """Rollup-backed reports match a full scan for several windows"""
+        rng = random.Random(7)
+        collector = MetricsCollector(storage_path=temp_storage)
+        for _ in range(300):
+            collector.capture_interaction(make_metrics(rng, rng.uniform(0, 45)))
+
+        for days in (1, 7, 30, 60):
+            report = collector.generate_report(days=days)
+            raw = list(collector.iter_interactions(days=days))
+
+            assert report['total_interactions'] == len(raw)
+            assert report['avg_quality_score'] == pytest.approx(statistics.mean(r['quality_score'] for r in raw))
+            assert report['avg_response_time'] == pytest.approx(statistics.mean(r['response_time_ms'] for r in raw))
+            assert sum(report['quality_distribution'].values()) == len(raw)
+
+    def test_rollups_persist_across_instances(self, temp_storage):
+        """Rollups saved on close are reloaded by a new collector"""
+        rng = random.Random(1)
+        collector = MetricsCollector(storage_path=temp_storage)
+        for _ in range(20):
+            collector.capture_interaction(make_metrics(rng, rng.uniform(0, 5)))
+        collector.close()
+
+        reopened = MetricsCollector(storage_path=temp_storage)
+        assert sum(r.count for r in reopened.rollups.days.values()) == 20
+        assert reopened.rollups.refresh() == 0
+
+    def test_refresh_picks_up_other_writers(self, temp_storage):
+        """Records appended by another collector are folded in on report"""
+        rng = random.Random(2)
+        reader = MetricsCollector(storage_path=temp_storage)
+        writer = MetricsCollector(storage_path=temp_storage)
+        for _ in range(10):
+            writer.capture_interaction(make_metrics(rng, 0.1))
+        writer.flush()
+
+        assert reader.generate_report(days=7)['total_interactions'] == 10
+
+    def test_rebuild_rollups(self, temp_storage):
+        """Rebuilding regenerates rollups from raw data"""
+        rng = random.Random(3)
+        collector = MetricsCollector(storage_path=temp_storage)
+        for _ in range(15):
+            collector.capture_interaction(make_metrics(rng, rng.uniform(0, 10)))
+        before = collector.generate_report(days=30)
+        collector.close()
+
+        (temp_storage / "rollups" / "state.json").unlink()
+        result = MetricsCollector(storage_path=temp_storage).rebuild_rollups()
+
+        assert result['interactions'] == 15
+        after = MetricsCollector(storage_path=temp_storage).generate_report(days=30)
+        assert after['total_interactions'] == before['total_interactions']
+        assert after['avg_quality_score'] == pytest.approx(before['avg_quality_score'])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for Sequential Testing
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.experiments.sequential import SequentialTest, mixture_log_lr
+
+EXPERIMENT = {
+    "id": "seq",
+    "control_variant": "control",
+    "variants": [{"id": "control"}, {"id": "treatment"}],
+    "sample_size": 400,
+}
+
+
+def feed(test, rng, control_mean, treatment_mean, n, sd=0.1):
+    """Alterna observações das duas variantes até ``n`` por variante ou uma decisão"""
+    state = None
+    for i in range(n):
+        for variant, mean in (("control", control_mean), ("treatment", treatment_mean)):
+            state = test.observe(variant, float(rng.normal(mean, sd)), f"{variant}-{i}")
+            if state["decision"] is not None:
+                return state
+    return state
+
+
+class TestMixtureRatio:
+    """Test cases for the mixture likelihood ratio"""
+
+    def test_grows_with_the_effect(self):
+        """Larger effects at the same variance give more evidence"""
+        ratios = [mixture_log_lr(d, 1e-4, 0.05) for d in (0.0, 0.01, 0.05)]
+        assert ratios[0] < 0 < ratios[2]
+        assert ratios == sorted(ratios)
+
+
+class TestSequentialTest:
+    """Test cases for SequentialTest"""
+
+    def test_clear_effect_stops_early(self, tmp_path):
+        """A large effect is decided long before the sample size"""
+        test = SequentialTest(tmp_path, "seq")
+        test.start(EXPERIMENT)
+
+        state = feed(test, np.random.default_rng(0), 0.6, 0.75, 400)
+
+        decision = state["decision"]
+        assert decision["outcome"] == "treatment_better"
+        assert decision["winner"] == "treatment"
+        assert decision["p_value"] <= 0.05
+        assert sum(decision["samples"].values()) < 200
+        # Persistido e congelado após a decisão
+        assert json.loads(test.path.read_text())["decision"] == decision
+        assert test.observe("control", 0.1)["arms"]["control"]["n"] == decision["samples"]["control"]
+
+    def test_worse_treatment_favours_control(self, tmp_path):
+        test = SequentialTest(tmp_path, "seq")
+        test.start(EXPERIMENT)
+
+        state = feed(test, np.random.default_rng(1), 0.8, 0.6, 400)
+
+        assert state["decision"]["outcome"] == "control_better"
+        assert state["decision"]["winner"] == "control"
+
+    def test_no_effect_runs_to_inconclusive(self, tmp_path):
+        """Without an effect the test reaches the sample size undecided"""
+        test = SequentialTest(tmp_path, "seq")
+        test.start({**EXPERIMENT, "sample_size": 150})
+
+        state = feed(test, np.random.default_rng(2), 0.7, 0.7, 150)
+
+        assert state["decision"]["outcome"] == "inconclusive"
+        assert state["decision"]["samples"] == {"control": 150, "treatment": 150}
+        assert state["pairs"]["treatment"]["p_value"] > 0.05
+
+    def test_p_value_never_increases(self, tmp_path):
+        test = SequentialTest(tmp_path, "seq")
+        test.start({**EXPERIMENT, "sample_size": None})
+        rng = np.random.default_rng(3)
+
+        p_values = []
+        for i in range(60):
+            state = test.observe("control", float(rng.normal(0.7, 0.1)))
+            state = test.observe("treatment", float(rng.normal(0.72, 0.1)))
+            p_values.append(state["pairs"]["treatment"]["p_value"])
+
+        assert all(b <= a for a, b in zip(p_values, p_values[1:]))
+
+    def test_repeated_interaction_is_counted_once(self, tmp_path):
+        test = SequentialTest(tmp_path, "seq")
+        test.start(EXPERIMENT)
+
+        test.observe("control", 0.7, "id-1")
+        state = test.observe("control", 0.7, "id-1")
+
+        assert state["arms"]["control"]["n"] == 1
+        assert state["arms"]["control"]["sum"] == pytest.approx(0.7)
+
+    def test_observations_are_saved_periodically(self, tmp_path):
+        """Observations stay in memory until persist_every, then merge with other processes"""
+        test = SequentialTest(tmp_path, "seq", persist_every=5)
+        test.start(EXPERIMENT)
+        other = SequentialTest(tmp_path, "seq", persist_every=5)
+
+        for i in range(4):
+            test.observe("control", 0.7, f"a-{i}")
+            other.observe("treatment", 0.6, f"b-{i}")
+        assert json.loads(test.path.read_text())["arms"]["control"]["n"] == 0
+
+        test.observe("control", 0.7, "a-4")
+        other.observe("treatment", 0.6, "a-4")  # já contada pelo outro processo
+        other.sync()
+
+        state = json.loads(test.path.read_text())
+        assert state["arms"]["control"]["n"] == 5
+        assert state["arms"]["treatment"]["n"] == 4
+
+    def test_observe_without_start(self, tmp_path):
+        assert SequentialTest(tmp_path, "missing").observe("control", 0.5) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
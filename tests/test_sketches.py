@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for Quantile Sketches
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+import random
+import tempfile
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.metrics.interaction_analyzer import MetricsCollector
+from src.core.metrics.sketches import QuantileSketch
+from tests.conftest import make_metrics
+
+
+class TestQuantileSketch:
+    """Test cases for the DDSketch-style quantile sketch"""
+
+    def test_relative_accuracy(self):
+        """Quantiles stay within the configured relative error"""
+        rng = np.random.default_rng(1)
+        values = rng.lognormal(mean=7, sigma=1, size=20000)
+        sketch = QuantileSketch.from_values(values, relative_accuracy=0.01)
+
+        for q in (0.5, 0.9, 0.99):
+            exact = np.quantile(values, q, method="lower")
+            assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+
+    def test_merge_equals_single_pass(self):
+        """Merging sketches of two halves equals sketching everything at once"""
+        values = [random.Random(2).uniform(1, 5000) for _ in range(1000)]
+        merged = QuantileSketch.from_values(values[:400]).merge(QuantileSketch.from_values(values[400:]))
+        whole = QuantileSketch.from_values(values)
+
+        assert merged.to_dict() == whole.to_dict()
+        assert QuantileSketch.from_dict(whole.to_dict()).quantiles() == whole.quantiles()
+
+    def test_zero_and_empty(self):
+        """Zeros land in their own bucket and an empty sketch returns None"""
+        assert QuantileSketch().quantile(0.5) is None
+        sketch = QuantileSketch.from_values([0, 0, 0, 10])
+        assert sketch.quantile(0.5) == 0
+        assert sketch.quantile(1.0) == pytest.approx(10, rel=0.01)
+
+
+class TestPercentileReports:
+    """Test cases for percentiles in the collector reports"""
+
+    def test_report_percentiles_match_raw_data(self):
+        """Windowed percentiles from day sketches match the raw values"""
+        rng = random.Random(3)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            collector = MetricsCollector(storage_path=Path(tmpdir))
+            collector.capture_many([make_metrics(rng, rng.uniform(0, 20)) for _ in range(500)])
+
+            report = collector.generate_report(days=7)
+            raw = list(collector.iter_interactions(days=7))
+            latency = sorted(r["response_time_ms"] for r in raw)
+            p90 = latency[int(0.9 * (len(latency) - 1))]
+            assert report["percentiles"]["response_time_ms"]["p90"] == pytest.approx(p90, rel=0.02)
+
+            chain = sorted(r["prompt_tokens"] for r in raw if r["pattern_applied"] == "chain")
+            p50 = chain[int(0.5 * (len(chain) - 1))]
+            assert report["percentiles_by_pattern"]["chain"]["prompt_tokens"]["p50"] == pytest.approx(p50, rel=0.02)
+
+            by_context = collector.percentile_report(days=7, group_by="context")
+            assert "debugging" in by_context["groups"]
+            collector.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for Experiment Statistics
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+import numpy as np
+from scipy import stats as scipy_stats
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.experiments.statistics import (
+    Histogram, analyze, bootstrap_ci, bootstrap_means, compare_samples, holm, permutation_test, welch_t_test
+)
+
+
+class TestHistogram:
+    """Test cases for the binned sample summary"""
+
+    def test_few_distinct_values_are_exact(self):
+        """Success flags keep one bin per value and no within-bin variance"""
+        histogram = Histogram.from_values(np.array([0, 1, 1, 0, 1, np.nan]))
+
+        assert histogram.exact
+        assert histogram.counts.tolist() == [2, 3]
+        assert histogram.mean() == pytest.approx(0.6)
+
+    def test_quantile_bins_keep_the_moments(self):
+        """Binned counts, means and variances add up to the sample's"""
+        values = np.random.default_rng(0).normal(size=5000)
+        histogram = Histogram.from_values(values, max_bins=16)
+
+        assert len(histogram.counts) <= 16 and histogram.n == 5000
+        assert histogram.mean() == pytest.approx(values.mean())
+        total_variance = (histogram.counts @ (histogram.variances + histogram.means ** 2)) / 5000 - values.mean() ** 2
+        assert total_variance == pytest.approx(values.var())
+
+
+class TestResampling:
+    """Test cases for bootstrap and permutation statistics"""
+
+    def test_bootstrap_spread_matches_standard_error(self):
+        """Bootstrap means spread like the standard error of the mean"""
+        rng = np.random.default_rng(1)
+        values = rng.exponential(size=20000)
+
+        means = bootstrap_means(values, 5000, rng)
+
+        assert means.std() == pytest.approx(values.std() / np.sqrt(len(values)), rel=0.05)
+        ci = bootstrap_ci(values, 5000, rng=rng)
+        assert ci["ci_low"] < values.mean() < ci["ci_high"]
+
+    def test_permutation_agrees_with_welch(self):
+        """On large normal samples the permutation and Welch p-values agree"""
+        rng = np.random.default_rng(2)
+        control, treatment = rng.normal(0, 1, 4000), rng.normal(0.06, 1, 4000)
+
+        permutation = permutation_test(control, treatment, 20000, rng)
+        welch = welch_t_test(control, treatment)
+
+        assert welch["p_value"] == pytest.approx(scipy_stats.ttest_ind(treatment, control, equal_var=False).pvalue)
+        assert permutation == pytest.approx(welch["p_value"], abs=0.01)
+
+    def test_no_difference_is_not_significant(self):
+        """Identical samples give a p-value of 1 and a CI around zero"""
+        values = np.random.default_rng(3).uniform(size=500)
+
+        result = compare_samples(values, values.copy(), 2000, 2000, seed=0)
+
+        assert result["difference"] == 0
+        assert result["permutation_p"] == 1.0
+        assert result["ci_low"] < 0 < result["ci_high"]
+
+    def test_holm(self):
+        """Holm multiplies the k-th smallest p-value by (m - k + 1), monotonically"""
+        assert holm([0.01, 0.04, 0.03]) == pytest.approx([0.03, 0.06, 0.06])
+        assert holm([float("nan"), 0.01]) == pytest.approx([1.0, 0.02])
+
+
+class TestAnalyze:
+    """Test cases for multi-variant, multi-metric analysis"""
+
+    def samples(self):
+        rng = np.random.default_rng(4)
+        return {
+            variant: {"quality": rng.normal(mean, 0.1, 800), "success": (rng.random(800) < rate).astype(float)}
+            for variant, mean, rate in [("control", 0.7, 0.6), ("better", 0.75, 0.7), ("same", 0.7, 0.6)]
+        }
+
+    def test_pool_matches_in_process(self):
+        """Per-pair seeds make the results independent of the worker count"""
+        samples = self.samples()
+
+        single = analyze(samples, "control", ["quality", "success"], n_resamples=2000, n_permutations=2000)
+        pooled = analyze(samples, "control", ["quality", "success"], workers=2,
+                         n_resamples=2000, n_permutations=2000)
+
+        assert single == pooled
+        assert single["better"]["quality"]["adjusted_p"] < 0.01
+        assert single["better"]["quality"]["ci_low"] > 0
+        assert single["same"]["quality"]["adjusted_p"] > 0.01
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
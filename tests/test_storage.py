@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Tests for Interaction Storage Backends
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+import json
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.metrics.storage import (
+    SegmentedLogStore,
+    LegacyFileStore,
+    create_store,
+    iter_segment,
+    iter_stored_interactions,
+    list_partitions,
+    load_index,
+    migrate_legacy_files
+)
+
+
+def make_record(i: int, days_ago: int = 0) -> dict:
+    return {
+        "id": f"rec-{i:04d}",
+        "timestamp": (datetime.now() - timedelta(days=days_ago)).isoformat(),
+        "prompt_tokens": 100 + i,
+        "response_tokens": 200,
+        "response_time_ms": 1000,
+        "quality_score": 0.8,
+        "iteration_count": 1,
+        "context_used": ["anderson-skill"],
+        "pattern_applied": "chain",
+        "success_indicators": ["task_completed"]
+    }
+
+
+class TestSegmentedLogStore:
+    """Test cases for the append-only segmented store"""
+
+    @pytest.fixture
+    def temp_storage(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def test_append_and_read_back(self, temp_storage):
+        """Records are read back in append order"""
+        store = SegmentedLogStore(temp_storage)
+        for i in range(10):
+            store.append(make_record(i))
+
+        ids = [r["id"] for r in store.iter_records()]
+        assert ids == [f"rec-{i:04d}" for i in range(10)]
+        store.close()
+
+    def test_segments_rotate_at_size_limit(self, temp_storage):
+        """A new segment is opened once the size bound is reached"""
+        store = SegmentedLogStore(temp_storage, max_segment_bytes=1024)
+        store.append_many(make_record(i) for i in range(50))
+        store.close()
+
+        segments = store.segment_files()
+        assert len(segments) > 1
+        assert all(s.stat().st_size <= 1024 for s in segments)
+        assert len(list(iter_stored_interactions(temp_storage))) == 50
+
+    def test_reopen_appends_to_last_segment(self, temp_storage):
+        """Reopening the store continues the existing tail segment"""
+        store = SegmentedLogStore(temp_storage)
+        store.append(make_record(1))
+        store.close()
+
+        store = SegmentedLogStore(temp_storage)
+        store.append(make_record(2))
+        store.close()
+
+        assert len(store.segment_files()) == 1
+        assert len(list(store.iter_records())) == 2
+
+    def test_torn_tail_is_ignored_and_repaired(self, temp_storage):
+        """A partially written record is skipped by readers and truncated by writers"""
+        store = SegmentedLogStore(temp_storage)
+        store.append(make_record(1))
+        store.close()
+
+        segment = store.segment_files()[-1]
+        with open(segment, 'ab') as f:
+            f.write(b'{"id": "torn", "timest')
+
+        assert [r["id"] for r in iter_stored_interactions(temp_storage)] == ["rec-0001"]
+
+        store = SegmentedLogStore(temp_storage)
+        store.append(make_record(2))
+        store.close()
+
+        assert [r["id"] for r in store.iter_records()] == ["rec-0001", "rec-0002"]
+
+    def test_invalid_fsync_policy(self, temp_storage):
+        """Unknown fsync policies are rejected"""
+        with pytest.raises(ValueError):
+            SegmentedLogStore(temp_storage, fsync="sometimes")
+
+    def test_loose_legacy_files_are_read(self, temp_storage):
+        """Legacy files not yet migrated are still visible"""
+        with open(temp_storage / "abc12345.json", 'w') as f:
+            json.dump(make_record(7), f)
+
+        store = SegmentedLogStore(temp_storage)
+        store.append(make_record(1))
+
+        assert len(list(store.iter_records())) == 2
+        store.close()
+
+
+class TestDayPartitions:
+    """Test cases for day partitioning and the sidecar index"""
+
+    @pytest.fixture
+    def store(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            store = SegmentedLogStore(Path(tmpdir))
+            # 30 days of history, 3 records per day
+            store.append_many(make_record(day * 3 + i, days_ago=day) for day in range(30) for i in range(3))
+            store.flush()
+            yield store
+            store.close()
+
+    def test_records_partitioned_by_day(self, store):
+        """Each day of history gets its own partition"""
+        partitions = list_partitions(store.storage_path)
+        assert len(partitions) == 30
+        assert partitions == sorted(partitions)
+
+    def test_index_tracks_partitions(self, store):
+        """The sidecar index holds min/max timestamp and counts per partition"""
+        index = load_index(store.segments_path)
+        assert set(index) == set(list_partitions(store.storage_path))
+        for entry in index.values():
+            assert entry["count"] == 3
+            assert entry["min_ts"] <= entry["max_ts"]
+
+    def test_window_reads_only_needed_partitions(self, store):
+        """A 7-day read opens at most 8 partitions (7 days + the boundary day)"""
+        since = datetime.now() - timedelta(days=7)
+        with patch('src.core.metrics.storage.iter_segment', wraps=iter_segment) as spy:
+            records = list(store.iter_records(since=since))
+
+        assert spy.call_count <= 8
+        expected = [r for r in iter_stored_interactions(store.storage_path)
+                    if datetime.fromisoformat(r["timestamp"]) > since]
+        assert sorted(r["id"] for r in records) == sorted(r["id"] for r in expected)
+
+    def test_stale_index_falls_back_to_day_bounds(self, store):
+        """Appends not yet reflected in the index are still returned"""
+        (store.segments_path / "index.json").unlink()
+        since = datetime.now() - timedelta(days=2)
+        assert len(list(iter_stored_interactions(store.storage_path, since=since))) >= 6
+
+
+class TestLegacyMigration:
+    """Test cases for the legacy backend and migration"""
+
+    @pytest.fixture
+    def temp_storage(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def test_create_store_by_name(self, temp_storage):
+        """Backends are selected by name"""
+        assert isinstance(create_store("legacy", temp_storage), LegacyFileStore)
+        assert isinstance(create_store("segmented", temp_storage), SegmentedLogStore)
+        with pytest.raises(ValueError):
+            create_store("parquet", temp_storage)
+
+    def test_migrate_legacy_files(self, temp_storage):
+        """Migration moves every valid file into segments in timestamp order"""
+        legacy = LegacyFileStore(temp_storage)
+        for i in range(5):
+            legacy.append(make_record(i, days_ago=5 - i))
+        with open(temp_storage / "broken.json", 'w') as f:
+            f.write("not json")
+
+        result = migrate_legacy_files(temp_storage)
+
+        assert result == {"migrated": 5, "skipped": 1}
+        assert list(temp_storage.glob("rec-*.json")) == []
+        records = list(iter_stored_interactions(temp_storage))
+        # broken.json stays behind but is unreadable
+        assert [r["id"] for r in records] == [f"rec-{i:04d}" for i in range(5)]
+
+    def test_migrate_with_archive(self, temp_storage):
+        """Migrated files can be archived instead of deleted"""
+        legacy = LegacyFileStore(temp_storage)
+        legacy.append(make_record(1))
+        archive = temp_storage.parent / (temp_storage.name + "-archive")
+
+        try:
+            migrate_legacy_files(temp_storage, archive_path=archive)
+            assert (archive / "rec-0001.json").exists()
+        finally:
+            for file in archive.glob("*"):
+                file.unlink()
+            archive.rmdir()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for the Trend Engine
+Author: Anderson Henrique da Silva
+Location: Minas Gerais, Brazil
+"""
+
+import pytest
+import random
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.metrics.interaction_analyzer import MetricsCollector
+from src.core.metrics.rollups import InteractionRollup, RollupStore
+from src.core.metrics.trends import TrendEngine, histogram_quantile
+from tests.conftest import make_metrics
+
+START = date(2025, 1, 1)
+
+
+def day_rollup(rng: random.Random, quality: float = 0.8, latency: float = 1000, count: int = 40) -> InteractionRollup:
+    return InteractionRollup.from_records({
+        "quality_score": min(max(rng.gauss(quality, 0.05), 0), 1),
+        "response_time_ms": max(rng.gauss(latency, 50), 1),
+        "iteration_count": 1,
+    } for _ in range(count))
+
+
+def fill(store: RollupStore, rollups):
+    for offset, rollup in enumerate(rollups):
+        store.days[(START + timedelta(days=offset)).isoformat()] = rollup
+
+
+class TestTrendEngine:
+    """Test cases for rolling windows and anomaly flags"""
+
+    @pytest.fixture
+    def temp_storage(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield Path(tmpdir)
+
+    def test_rolling_windows_match_direct_merge(self, temp_storage):
+        """Rolling means equal merging the window's daily rollups"""
+        rng = random.Random(1)
+        store = RollupStore(temp_storage)
+        fill(store, [day_rollup(rng, quality=0.5 + day / 100) for day in range(40)])
+
+        engine = TrendEngine(temp_storage)
+        assert engine.update(store, today=START + timedelta(days=40)) == 40
+
+        report = engine.report()
+        assert report["as_of"] == (START + timedelta(days=39)).isoformat()
+        for window in (7, 14, 30):
+            days = [(START + timedelta(days=d)).isoformat() for d in range(40 - window, 40)]
+            merged = store.merge_days(days)
+            rolling = report["rolling"][f"{window}d"]
+            assert rolling["days"] == window
+            assert rolling["count"] == merged.count
+            assert rolling["quality_mean"] == pytest.approx(merged.mean("quality_score"))
+            assert rolling["latency_percentiles"] == merged.sketches["response_time_ms"].quantiles()
+        assert len(report["daily"]) == 30
+
+    def test_incremental_update_matches_rebuild(self, temp_storage):
+        """A new day is folded alone, with the same result as refitting all history"""
+        rng = random.Random(2)
+        store = RollupStore(temp_storage)
+        fill(store, [day_rollup(rng) for _ in range(21)])
+
+        engine = TrendEngine(temp_storage)
+        engine.update(store, today=START + timedelta(days=20))
+        # Hoje (dia 20) ainda está incompleto
+        assert engine.last_day == (START + timedelta(days=19)).isoformat()
+
+        reloaded = TrendEngine(temp_storage)
+        assert reloaded.update(store, today=START + timedelta(days=21)) == 1
+        assert reloaded.update(store, today=START + timedelta(days=21)) == 0
+
+        fresh = TrendEngine(Path(temp_storage) / "other")
+        fresh.rebuild(store, today=START + timedelta(days=21))
+        assert reloaded.report() == fresh.report()
+
+    def test_flags_quality_drop_and_latency_shift(self, temp_storage):
+        """A one-day quality drop is an anomaly; a sustained latency rise is a changepoint"""
+        rng = random.Random(3)
+        days = [day_rollup(rng) for _ in range(20)]
+        days.append(day_rollup(rng, quality=0.4))
+        days += [day_rollup(rng, latency=1150) for _ in range(10)]
+        store = RollupStore(temp_storage)
+        fill(store, days)
+
+        engine = TrendEngine(temp_storage)
+        engine.update(store, today=START + timedelta(days=len(days)))
+        flags = engine.report()["flags"]
+
+        drop = [f for f in flags if f["metric"] == "quality_score" and f["kind"] == "anomaly"]
+        assert drop[0]["day"] == (START + timedelta(days=20)).isoformat()
+        assert drop[0]["direction"] == "down" and drop[0]["regression"]
+        shifts = [f for f in flags if f["metric"] == "response_time_p90" and f["day"] > drop[0]["day"]]
+        assert shifts and all(f["direction"] == "up" for f in shifts)
+        # Nada sinalizado no período estável
+        assert all(f["day"] >= (START + timedelta(days=20)).isoformat() for f in flags)
+
+    def test_histogram_quantile(self):
+        """Quantiles interpolate within the histogram bins"""
+        assert histogram_quantile([0] * 10, 0.5) is None
+        assert histogram_quantile([0, 0, 0, 0, 0, 0, 0, 10, 0, 0], 0.5) == pytest.approx(0.75)
+
+
+class TestCollectorTrends:
+    """Test cases for the collector's trend report"""
+
+    def test_trend_report_covers_complete_days(self):
+        """Only days before today are folded into the trends"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            rng = random.Random(4)
+            collector = MetricsCollector(storage_path=Path(tmpdir))
+            collector.capture_many([make_metrics(rng, rng.uniform(0, 10)) for _ in range(300)])
+
+            report = collector.trend_report()
+
+            assert report["as_of"] == (date.today() - timedelta(days=1)).isoformat()
+            assert 0 < report["rolling"]["7d"]["count"] < 300
+            collector.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])